@@ -14,13 +14,24 @@ Roles include:
 
 Trust levels are assigned to edges based on community affiliation,
 with intra-community connections receiving higher trust.
+
+Vectorized variants (assign_roles_bulk, assign_trust_levels_bulk) draw all roles and
+trust values from a per-run numpy Generator into arrays (see graph_arrays.py), with an
+optional write-back to the networkx graph for code that still needs it.
+
+All functions draw from an explicit per-run random stream (a RunRNG or numpy Generator, see
+rng_context.py) rather than the global random / np.random state, and take role proportions from
+an explicit SimulationConfig (config.py).
 '''
 
-import random
 import numpy as np
 from config import  *
 import networkx as nx
 from typing import Dict
+from network_generator import community_labels
+from rng_context import RunRNG, as_run_rng
+from graph_arrays import (GraphArrays, AgentArrays, SUSCEPTIBLE_NORMAL, HIGHLY_SUSCEPTIBLE,
+                          SUPER_SPREADER)
 
 # Define agent roles and properties
 class Agent:
@@ -52,13 +63,16 @@ class Agent:
         self.p_share_real = 0.0
 
 
-def assign_roles(G: nx.Graph, percent_fc: float = percent_fact_checkers) -> Dict[int, Agent]:
+def assign_roles(G: nx.Graph, percent_fc: float | None = None, rng: RunRNG | None = None,
+                 config: SimulationConfig = DEFAULT_CONFIG) -> Dict[int, Agent]:
     """
     Assigns roles to agents in the graph based on network structure and predefined proportions.
 
     Parameters:
         G : nx.Graph. Social network graph.
-        percent_fc : float. Percentage of skeptical users assigned as fact-checkers.
+        percent_fc : float or None. Percentage of skeptical users assigned as fact-checkers (config value if None).
+        rng : RunRNG or None. Per-run random stream (a fresh unseeded one if None).
+        config : SimulationConfig. Role proportions; counts are based on config.num_agents.
 
     Returns:
         Dict[int, Agent]: Mapping of node IDs to Agent instances.
@@ -70,13 +84,14 @@ def assign_roles(G: nx.Graph, percent_fc: float = percent_fact_checkers) -> Dict
         >>> len(agents) == 100
         True
     """
+    rng = as_run_rng(rng)
     agents = {}
 
     # Top-level role counts
-    num_influencers = int(percent_influencers * num_agents)
-    num_skeptical = int(percent_skeptical * num_agents)
-    num_fact_checkers = int(percent_fc * num_skeptical)
-    num_susceptible = int(percent_susceptible * num_agents)
+    counts = config.role_counts(config.num_agents, percent_fc)
+    num_influencers = counts['influencers']
+    num_fact_checkers = counts['fact_checkers']
+    num_susceptible = counts['susceptible']
 
     # Rank nodes by degree (descending)
     sorted_nodes_by_degree = sorted(G.degree(), key=lambda x: x[1], reverse=True)
@@ -86,21 +101,18 @@ def assign_roles(G: nx.Graph, percent_fc: float = percent_fact_checkers) -> Dict
     influencers = set(sorted_nodes[:num_influencers])
 
     # Shuffle all nodes for other role assignments
-    random.shuffle(sorted_nodes)
+    rng.shuffle(sorted_nodes)
 
     fact_checkers = set(sorted_nodes[:num_fact_checkers])
     susceptible_pool = sorted_nodes[num_fact_checkers:num_fact_checkers + num_susceptible]
     susceptibles = set(susceptible_pool)
 
     # Susceptible subgroup counts
-    num_super_spreaders = max(1, int(percent_super_spreader * num_susceptible))
-    num_highly_susceptible = random.randint(
-        int(percent_highly_susceptible_range[0] * num_susceptible),
-        int(percent_highly_susceptible_range[1] * num_susceptible)
-    )
+    num_super_spreaders = counts['super_spreaders']
+    num_highly_susceptible = rng.randint(counts['highly_low'], counts['highly_high'])
     num_normal_susceptible = num_susceptible - num_highly_susceptible - num_super_spreaders
 
-    random.shuffle(susceptible_pool)
+    rng.shuffle(susceptible_pool)
     super_spreaders = set(susceptible_pool[:num_super_spreaders])
     highly_susceptible = set(susceptible_pool[num_super_spreaders:
                                               num_super_spreaders + num_highly_susceptible])
@@ -127,17 +139,20 @@ def assign_roles(G: nx.Graph, percent_fc: float = percent_fact_checkers) -> Dict
 
 
 # Assign trust levels to edges
-def assign_trust_levels(G: nx.Graph, num_communities: int) -> Dict[int, int]:
+def assign_trust_levels(G: nx.Graph, num_communities: int, rng: np.random.Generator | None = None) -> Dict[int, int]:
     """
     Assigns trust values to edges in the network based on community affiliation.
     Intra-community edges receive high trust (0.8–1.0), inter-community edges lower trust (0.1–0.5).
+    Community labels are taken from G.graph['community'] when the graph was built by
+    create_social_network(); otherwise nodes are split into contiguous blocks in node order.
 
     Parameters:
         G : nx.Graph. Graph with nodes and edges.
         num_communities : int. Number of modular communities assumed.
+        rng : RunRNG, np.random.Generator or None. Per-run random stream (a fresh unseeded one if None).
 
     Returns:
-        Dict[int, int]: Mapping of node ID to community label.
+        Dict[int, int]: Mapping of node ID to community label (-1 for nodes outside any community).
 
     Examples:
         >>> G = nx.path_graph(10)
@@ -146,16 +161,105 @@ def assign_trust_levels(G: nx.Graph, num_communities: int) -> Dict[int, int]:
         True
         >>> all(0 <= v < 2 for v in labels.values())
         True
+        >>> G[4][5]['trust'] < 0.8 <= G[3][4]['trust']
+        True
     """
-    community_labels = {}
-    for i, node in enumerate(G.nodes()):
-        community_labels[node] = i % num_communities
+    labels = G.graph.get('community')
+    if labels is None:
+        labels = community_labels(G.number_of_nodes(), num_communities)
+        community_labels_by_node = dict(zip(G.nodes(), labels.tolist()))
+    else:
+        community_labels_by_node = {node: int(labels[node]) for node in G.nodes()}
 
-    for u, v in G.edges():
-        if community_labels[u] == community_labels[v]:
-            trust = np.random.uniform(0.8, 1.0) # intra-community
+    rng = as_run_rng(rng)
+    uniforms = rng.random(G.number_of_edges()).tolist()
+    for (u, v), uniform in zip(G.edges(), uniforms):
+        if community_labels_by_node[u] == community_labels_by_node[v] != -1:
+            trust = 0.8 + 0.2 * uniform # intra-community
         else:
-            trust = np.random.uniform(0.1, 0.5) # inter-community
+            trust = 0.1 + 0.4 * uniform # inter-community
         G[u][v]['trust'] = trust
 
-    return community_labels
\ No newline at end of file
+    return community_labels_by_node
+
+
+def assign_roles_bulk(degrees: np.ndarray, rng: np.random.Generator, percent_fc: float | None = None,
+                      config: SimulationConfig = DEFAULT_CONFIG) -> AgentArrays:
+    """
+    Vectorized counterpart of assign_roles() that writes roles into an AgentArrays instead
+    of building Agent objects. Role counts are derived from the number of nodes in the graph.
+
+    Parameters:
+        degrees : np.ndarray. Degree of every node (index = node id).
+        rng : np.random.Generator. Per-run random generator.
+        percent_fc : float or None. Percentage of skeptical users assigned as fact-checkers (config value if None).
+        config : SimulationConfig. Role proportions.
+
+    Returns:
+        AgentArrays : AgentArrays. Role flags per agent (share probabilities left at zero).
+
+    Examples:
+        >>> roles = assign_roles_bulk(np.arange(1000), np.random.default_rng(0))
+        >>> int(roles.is_influencer.sum()), bool(roles.is_influencer[999])
+        (25, True)
+        >>> int(roles.is_susceptible.sum())
+        100
+    """
+    n = len(degrees)
+    roles = AgentArrays(n)
+
+    counts = config.role_counts(n, percent_fc)
+    num_influencers = counts['influencers']
+    num_fact_checkers = counts['fact_checkers']
+    num_susceptible = counts['susceptible']
+
+    # Influencers are the highest degree nodes (stable order, as in assign_roles)
+    by_degree = np.argsort(-np.asarray(degrees), kind='stable')
+    roles.is_influencer[by_degree[:num_influencers]] = True
+
+    shuffled = rng.permutation(n)
+    roles.is_fact_checker[shuffled[:num_fact_checkers]] = True
+    susceptible_pool = rng.permutation(shuffled[num_fact_checkers:num_fact_checkers + num_susceptible])
+
+    num_super_spreaders = counts['super_spreaders']
+    num_highly_susceptible = int(rng.integers(counts['highly_low'], counts['highly_high'] + 1))
+    roles.susceptible_code[susceptible_pool] = SUSCEPTIBLE_NORMAL
+    roles.susceptible_code[susceptible_pool[num_super_spreaders:num_super_spreaders + num_highly_susceptible]] = HIGHLY_SUSCEPTIBLE
+    roles.susceptible_code[susceptible_pool[:num_super_spreaders]] = SUPER_SPREADER
+    return roles
+
+
+def assign_trust_levels_bulk(graph: GraphArrays, rng: np.random.Generator, G: nx.Graph | None = None) -> np.ndarray:
+    """
+    Vectorized counterpart of assign_trust_levels(). Uses the community labels stored on the
+    GraphArrays and draws every edge trust in two calls (one for intra-community edges,
+    one for inter-community edges). The intra-community edge mask is cached on the GraphArrays,
+    so redrawing trust on a reused graph costs only the two draws.
+
+    Parameters:
+        graph : GraphArrays. Array view of the network, with community labels set.
+        rng : np.random.Generator. Per-run random generator.
+        G : nx.Graph or None. If given, trust values are also written back as networkx edge attributes.
+
+    Returns:
+        np.ndarray: Trust value of every undirected edge.
+
+    Examples:
+        >>> from network_generator import community_labels
+        >>> graph = GraphArrays.from_networkx(nx.path_graph(10))
+        >>> graph.set_community(community_labels(10, 2))
+        >>> trust = assign_trust_levels_bulk(graph, np.random.default_rng(0))
+        >>> len(trust) == graph.num_edges
+        True
+        >>> bool(trust[4] < 0.8 <= trust[3])  # edge 4-5 crosses the two communities
+        True
+    """
+    intra = graph.intra_community
+    trust = np.empty(graph.num_edges)
+    trust[intra] = rng.uniform(0.8, 1.0, size=int(intra.sum()))  # intra-community
+    trust[~intra] = rng.uniform(0.1, 0.5, size=int((~intra).sum()))  # inter-community
+    graph.set_edge_trust(trust)
+
+    if G is not None:
+        graph.write_trust_to_networkx(G)
+    return trust
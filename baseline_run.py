@@ -12,16 +12,336 @@ share counts, and attribution of spread origin (influencer vs. regular user).
 This script is intended to be called from main.py or hypothesis experiments for controlled testing.
 '''
 
-from typing import List, Dict, List, Tuple, Any, Set
+import functools
+import multiprocessing
+import os
+import threading
+import warnings
+import dataclasses
+from dataclasses import dataclass
+from typing import List, Dict, List, Tuple, Any, Set, Iterable, Iterator
 from config import  *
 from network_generator import *
 from news_item import *
 from agent_initializer import *
-from simulation import simulate_spread, initialize_p_shares
+from graph_arrays import GraphArrays
+from event_trace import TraceRecorder
+from simulation import simulate_spread, initialize_p_shares, initialize_p_shares_bulk
+from engine import simulate_spread_arrays, transmission_table
+from partitioned_engine import simulate_spread_partitioned
+from rng_context import RunRNG
+from progress import track
+
+def new_metrics() -> dict[str, list[Any]]:
+    """Returns an empty metrics dictionary with the keys filled by run_baseline_simulation()."""
+    return {
+        'fake_reach': [], 'real_reach': [],
+        'fake_peak_round': [], 'real_peak_round': [],
+        'fake_shares': [], 'real_shares': [],
+        'fake_belief_count': [], 'real_belief_count': [],
+        'influencer_reach_fake': [], 'normal_reach_fake': []
+    }
+
+
+def record_run_metrics(metrics: dict[str, list[Any]], stats: dict[str, list[int]], shares: dict[str, int],
+                       final_beliefs: dict[str, int], influencer_impact: dict[str, int]) -> None:
+    """
+    Appends the outcome of one simulation run to a metrics dictionary (see new_metrics()).
+
+    Parameters:
+        metrics : dict. Metrics dictionary to extend.
+        stats : dict. Cumulative reach per round for 'fake' and 'real'.
+        shares : dict. Number of shares per news type.
+        final_beliefs : dict. Final believer count per news type.
+        influencer_impact : dict. Fake-news reach attributed to 'influencer' and 'normal' seeds.
+
+    Examples:
+        >>> metrics = new_metrics()
+        >>> record_run_metrics(metrics, {'fake': [1, 3, 4], 'real': [1]}, {'fake': 5, 'real': 0},
+        ...                    {'fake': 4, 'real': 1}, {'influencer': 2, 'normal': 2})
+        >>> int(metrics['fake_peak_round'][0]), metrics['real_peak_round'][0], metrics['fake_shares']
+        (1, 0, [5])
+    """
+    metrics['fake_reach'].append(stats['fake'])
+    metrics['real_reach'].append(stats['real'])
+    metrics['fake_shares'].append(shares['fake'])
+    metrics['real_shares'].append(shares['real'])
+    metrics['fake_peak_round'].append(np.argmax(np.diff(stats['fake'])) + 1 if len(stats['fake']) > 1 else 0)
+    metrics['real_peak_round'].append(np.argmax(np.diff(stats['real'])) + 1 if len(stats['real']) > 1 else 0)
+    metrics['fake_belief_count'].append((final_beliefs['fake']))
+    metrics['real_belief_count'].append((final_beliefs['real']))
+    metrics['influencer_reach_fake'].append(influencer_impact['influencer'])
+    metrics['normal_reach_fake'].append(influencer_impact['normal'])
+
+
+def seed_run(seed: int | None, run_index: int) -> RunRNG:
+    """
+    Returns the random stream of run run_index of an experiment. With a seed, the stream derives from
+    SeedSequence(seed, spawn_key=(run_index,)), so a run reproduces regardless of which runs were
+    executed before it (or in which process); without one, it is freshly seeded.
+
+    Parameters:
+        seed : int or None. Base seed of the experiment.
+        run_index : int. Global index of the run.
+
+    Returns:
+        RunRNG : Random stream of the run (network, roles, trust, share probabilities and spread).
+
+    Examples:
+        >>> seed_run(42, 7).random() == seed_run(42, 7).random()
+        True
+    """
+    return RunRNG.for_run(seed, run_index) if seed is not None else RunRNG()
+
+
+@dataclass(frozen=True)
+class RunOptions:
+    """
+    How an experiment is executed, as opposed to what it computes (the hypothesis, percent_fc, variant
+    flags, real news delay, seed and config arguments of run_baseline_simulation()). Only engine
+    changes the results, and only in distribution; the result cache ignores processes, progress and
+    memory_budget.
+
+    Attributes:
+        engine : str. 'reference' runs simulate_spread() on the networkx graph; 'arrays' runs the
+            array engine (engine.py) on the CSR arrays without building Agent objects; 'partitioned'
+            runs the community-partitioned engine (partitioned_engine.py) in this process.
+        trace_dir : str or None. If given, an event trace of every run is written there as run_<n>.trace
+            (see event_trace.py).
+        processes : int. Worker processes (see iter_runs()); results are the same as with 1.
+        progress : bool or str. Display a progress bar with rate, ETA and the running mean reach on stderr
+            (a str is used as its label).
+        cancel : threading.Event or None. When set, stops early and returns the runs finished so far.
+        memory_budget : int, str or None. If given (bytes or e.g. '4GiB'), processes is lowered and traces are
+            dropped as needed to fit the budget (see memory.plan_experiment(), which first runs a few calibration
+            runs); MemoryError if it cannot fit, and a warning if traces are dropped or the measured peak (see
+            memory.MemoryMonitor) exceeds the budget.
+
+    Examples:
+        >>> options = RunOptions(engine='arrays')
+        >>> options.replace(processes=4).processes, options.processes
+        (4, 1)
+    """
+    engine: str = 'reference'
+    trace_dir: str | None = None
+    processes: int = 1
+    progress: bool | str = False
+    cancel: threading.Event | None = None
+    memory_budget: int | str | None = None
+
+    def replace(self, **changes) -> 'RunOptions':
+        """Returns a copy with some options changed."""
+        return dataclasses.replace(self, **changes)
+
+
+DEFAULT_OPTIONS = RunOptions()
+
+
+@dataclass
+class RunResult:
+    """
+    Outcome of one simulation run, as yielded by iter_runs().
+
+    Attributes:
+        run_index : int. Global index of the run.
+        stats : dict. Cumulative reach per round for 'fake' and 'real'.
+        shares : dict. Number of shares per news type.
+        final_beliefs : dict. Final believer count per news type.
+        belief_revised_count : int. Number of belief revisions.
+        influencer_impact : dict. Fake-news reach attributed to 'influencer' and 'normal' seeds.
+    """
+    run_index: int
+    stats: Dict[str, List[int]]
+    shares: Dict[str, int]
+    final_beliefs: Dict[str, int]
+    belief_revised_count: int
+    influencer_impact: Dict[str, int]
+
+
+class MetricsAccumulator:
+    """
+    Builds the metrics dictionary of run_baseline_simulation() one run at a time, so partial results
+    can be inspected while runs are still streaming in; run_baseline_simulation() shows summary() next
+    to its progress bar.
+
+    Attributes:
+        metrics : dict. Metrics dictionary (see new_metrics()) of the runs added so far.
+        belief_revised_counts : list. Belief revision count of every run added so far.
+
+    Examples:
+        >>> accumulator = MetricsAccumulator().consume(iter_runs(3, seed=1))
+        >>> (accumulator.metrics, accumulator.belief_revised_counts) == run_baseline_simulation(3, seed=1)
+        True
+        >>> len(accumulator), accumulator.mean_final_reach('fake') > 0
+        (3, True)
+        >>> streaming = MetricsAccumulator()
+        >>> [len(streaming) for run in streaming.stream(iter_runs(2, seed=1))]
+        [1, 2]
+        >>> MetricsAccumulator().summary()
+        'mean reach fake 0.0 real 0.0'
+    """
+    def __init__(self):
+        self.metrics = new_metrics()
+        self.belief_revised_counts = []
+
+    def __len__(self) -> int:
+        return len(self.belief_revised_counts)
+
+    def add(self, run: RunResult) -> None:
+        """Appends the outcome of one run."""
+        record_run_metrics(self.metrics, run.stats, run.shares, run.final_beliefs, run.influencer_impact)
+        self.belief_revised_counts.append(run.belief_revised_count)
+
+    def consume(self, runs: Iterable[RunResult]) -> 'MetricsAccumulator':
+        """Adds every run of a stream and returns self."""
+        for run in runs:
+            self.add(run)
+        return self
+
+    def stream(self, runs: Iterable[RunResult]) -> Iterator[RunResult]:
+        """Adds every run of a stream as it passes, yielding it on to further consumers."""
+        for run in runs:
+            self.add(run)
+            yield run
+
+    def mean_final_reach(self, news_type: str) -> float:
+        """Mean final reach of 'fake' or 'real' news over the runs added so far."""
+        finals = [reach[-1] for reach in self.metrics[f"{news_type}_reach"] if len(reach) > 0]
+        return float(np.mean(finals)) if finals else 0.0
+
+    def summary(self) -> str:
+        """Running summary of the runs added so far: mean final reach of both news types."""
+        return f"mean reach fake {self.mean_final_reach('fake'):.1f} real {self.mean_final_reach('real'):.1f}"
+
+
+def simulate_run(run_num: int, hypothesis: str | None = None, real_news_delay: int = 0, trace_dir: str | None = None,
+                 engine: str = 'reference', seed: int | None = None,
+                 config: SimulationConfig = DEFAULT_CONFIG) -> RunResult:
+    """
+    Executes one run: generates the network, assigns roles, share probabilities and trust, seeds
+    both news types and simulates the spread.
+
+    Parameters:
+        run_num : int. Global index of the run (seeds it with seed_run(seed, run_num)).
+        hypothesis, real_news_delay, seed : As in run_baseline_simulation().
+        trace_dir, engine : As in RunOptions (passed separately, since worker processes cannot
+            receive its cancel event).
+        config : SimulationConfig. Parameters of the run (percent_fc and variant flags already folded in);
+            temporal mode (config.temporal_rewire_rate > 0) requires engine='arrays'.
+
+    Returns:
+        RunResult : Outcome of the run.
+    """
+    if config.temporal_rewire_rate > 0 and engine != 'arrays':
+        raise ValueError(f"Temporal mode (temporal_rewire_rate > 0) requires engine='arrays', not '{engine}'")
+    rng = seed_run(seed, run_num)
+    # Re-initialize network and agents for each run
+    G = create_social_network(rng=rng, config=config)
+    graph = GraphArrays.from_networkx(G)
+    roles = assign_roles_bulk(graph.degrees(), rng, config=config)
+    initialize_p_shares_bulk(roles, rng, config=config)
+
+    # Initialize news items
+    news_items = {
+        'fake': NewsItem("Fake News", is_fake=True),
+        'real': NewsItem("Real News", is_fake=False)
+    }
+    trace = TraceRecorder() if trace_dir is not None else None
+
+    assign_trust_levels_bulk(graph, rng)
+    if engine == 'arrays':
+        stats, final_beliefs, belief_revised_count, influencer_impact = simulate_spread_arrays(
+            graph, roles, news_items, hypothesis=hypothesis,
+            real_news_delay=real_news_delay, rng=rng, trace=trace, config=config)
+    elif engine == 'partitioned':
+        stats, final_beliefs, belief_revised_count, influencer_impact = simulate_spread_partitioned(
+            graph, roles, news_items=news_items, hypothesis=hypothesis,
+            real_news_delay=real_news_delay, seed=rng.seed_int(), parallel=False, trace=trace, config=config)
+    else:
+        agents = roles.to_agents(graph.degrees())
+
+        # Reset agent belief states and shared status
+        for agent in agents.values():
+            agent.belief_state = None
+            agent.has_shared = {'fake': False, 'real': False}
+
+        # Run simulation for others
+        stats, final_beliefs, belief_revised_count, influencer_impact = simulate_spread(
+            G, agents, news_items, hypothesis=hypothesis, real_news_delay=real_news_delay,
+            trace=trace, rng=rng, graph=graph, transmission=transmission_table(graph, roles, config), config=config)
+    if trace is not None:
+        trace.save(os.path.join(trace_dir, f"run_{run_num:05d}.trace"))
+
+    shares = {news_type: item.shared_count for news_type, item in news_items.items()}
+    return RunResult(run_num, stats, shares, final_beliefs, belief_revised_count, influencer_impact)
+
+
+def iter_runs(num_runs: int = 1000, hypothesis: str | None = None, percent_fc: float | None = None,
+              variant_flag: Dict[str, bool] | None = None, real_news_delay: int = 0, seed: int | None = None,
+              first_run: int = 0, config: SimulationConfig = DEFAULT_CONFIG, options: RunOptions = DEFAULT_OPTIONS,
+              ordered: bool = True) -> Iterator[RunResult]:
+    """
+    Yields the outcome of every run as soon as it is available, from this process or from a pool of
+    options.processes worker processes. Stopping early (break, close(), or setting options.cancel)
+    terminates the pool, so no further runs are computed.
+
+    Parameters:
+        num_runs, hypothesis, percent_fc, variant_flag, real_news_delay, seed, first_run, config :
+            As in run_baseline_simulation().
+        options : RunOptions. engine, trace_dir, processes and cancel are used (progress and
+            memory_budget are applied by run_baseline_simulation()).
+        ordered : bool. Yield runs in run order (True) or in completion order (False, pooled only).
+
+    Returns:
+        Iterator[RunResult] : One RunResult per run.
+
+    Examples:
+        >>> [run.run_index for run in iter_runs(3, seed=1, first_run=5)]
+        [5, 6, 7]
+        >>> arrays = RunOptions(engine='arrays')
+        >>> pooled = [run.stats for run in iter_runs(4, seed=2, options=arrays.replace(processes=2))]
+        >>> pooled == [run.stats for run in iter_runs(4, seed=2, options=arrays)]
+        True
+        >>> cancel = threading.Event()
+        >>> runs = []
+        >>> for run in iter_runs(50, seed=1, options=arrays.replace(cancel=cancel)):
+        ...     runs.append(run)
+        ...     if len(runs) == 2:
+        ...         cancel.set()
+        >>> len(runs)
+        2
+    """
+    if percent_fc is not None:
+        config = config.replace(percent_fact_checkers=percent_fc)
+    if variant_flag is not None:
+        config = config.with_variants(variant_flag)
+    if options.trace_dir is not None:
+        os.makedirs(options.trace_dir, exist_ok=True)
+
+    run_one = functools.partial(simulate_run, hypothesis=hypothesis, real_news_delay=real_news_delay,
+                                trace_dir=options.trace_dir, engine=options.engine, seed=seed, config=config)
+    run_numbers = range(first_run, first_run + num_runs)
+    if options.processes == 1:
+        results = map(run_one, run_numbers)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(options.processes)
+        results = pool.imap(run_one, run_numbers) if ordered else pool.imap_unordered(run_one, run_numbers)
+    try:
+        for result in results:
+            if options.cancel is not None and options.cancel.is_set():
+                return
+            yield result
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
 
 # Metrics Collection for baseline (1,000) Runs
-def run_baseline_simulation(num_runs: int = 1000, hypothesis: str | None = None, percent_fc: float = percent_fact_checkers,
-    variant_flag: Dict[str, bool] = variant_config, real_news_delay: int = 0) -> tuple[
+def run_baseline_simulation(num_runs: int = 1000, hypothesis: str | None = None, percent_fc: float | None = None,
+    variant_flag: Dict[str, bool] | None = None, real_news_delay: int = 0, seed: int | None = None,
+    first_run: int = 0, config: SimulationConfig = DEFAULT_CONFIG, options: RunOptions = DEFAULT_OPTIONS) -> tuple[
     dict[str, list[Any]], list[int | Any]]:
     """
     Executes multiple Monte Carlo simulation runs using default parameters
@@ -30,9 +350,15 @@ def run_baseline_simulation(num_runs: int = 1000, hypothesis: str | None = None,
     Parameters:
         num_runs : int. Number of simulation runs to perform.
         hypothesis : str or None. Optional hypothesis label ('h2', 'h3') for variant configuration.
-        percent_fc : float. Proportion of skeptical agents designated as fact-checkers.
-        variant_flag : dict. Flags enabling variant features (e.g., influencer control, trust boost).
+        percent_fc : float or None. Proportion of skeptical agents designated as fact-checkers (overrides config).
+        variant_flag : dict or None. Flags enabling variant features (e.g., influencer control, trust boost; overrides config).
         real_news_delay : int. Number of rounds to delay the real news release (used in Hypothesis 3).
+        seed : int or None. If given, run i is seeded with seed_run(seed, first_run + i), which makes
+            results reproducible and lets an experiment be split into run ranges (see sharding.py).
+        first_run : int. Global index of the first run (used for seeding and trace file names).
+        config : SimulationConfig. Parameters of every run.
+        options : RunOptions. Engine, traces, worker processes, progress display, cancellation and memory
+            budget.
 
     Returns:
         metrics : dict. Dictionary containing time-series and aggregate metrics across runs.
@@ -46,50 +372,57 @@ def run_baseline_simulation(num_runs: int = 1000, hypothesis: str | None = None,
         True
         >>> isinstance(revisions, list)
         True
+        >>> whole, _ = run_baseline_simulation(num_runs=3, seed=1)
+        >>> part, _ = run_baseline_simulation(num_runs=2, seed=1, first_run=1)
+        >>> whole['fake_reach'][1:] == part['fake_reach']
+        True
+        >>> same, _ = run_baseline_simulation(num_runs=2, seed=1, first_run=1, config=DEFAULT_CONFIG.replace(percent_fact_checkers=0.5))
+        >>> other, _ = run_baseline_simulation(num_runs=2, seed=1, first_run=1, percent_fc=0.5)
+        >>> same == other
+        True
+        >>> arrays = RunOptions(engine='arrays')
+        >>> run_baseline_simulation(2, seed=1, options=arrays.replace(memory_budget='64GiB')) == run_baseline_simulation(2, seed=1, options=arrays)
+        True
+        >>> run_baseline_simulation(2, seed=1, options=RunOptions(memory_budget='1MiB'))  # doctest: +ELLIPSIS
+        Traceback (most recent call last):
+        ...
+        MemoryError: Experiment does not fit the memory budget:
+        ...
     """
-    stats = {'fake': [], 'real': []}
-    belief_revised_counts = []
-    metrics = {
-        'fake_reach': [], 'real_reach': [],
-        'fake_peak_round': [], 'real_peak_round': [],
-        'fake_shares': [], 'real_shares': [],
-        'fake_belief_count': [], 'real_belief_count': [],
-        'influencer_reach_fake': [], 'normal_reach_fake': []
-    }
-
-    for run_num in range(num_runs):
-        # Re-initialize network and agents for each run
-        G = create_social_network(num_agents, num_communities, k_neighbors)
-        agents = assign_roles(G,percent_fc=percent_fc)
-        assign_trust_levels(G, num_communities)
-        initialize_p_shares(agents)
+    monitor = None
+    if options.memory_budget is not None:
+        from memory import plan_experiment, MemoryMonitor, format_bytes
 
-        # Reset agent belief states and shared status
-        for agent in agents.values():
-            agent.belief_state = None
-            agent.has_shared = {'fake': False, 'real': False}
-
-        # Initialize news items
-        news_items = {
-            'fake': NewsItem("Fake News", is_fake=True),
-            'real': NewsItem("Real News", is_fake=False)
-        }
+        if percent_fc is not None:
+            config = config.replace(percent_fact_checkers=percent_fc)
+        if variant_flag is not None:
+            config = config.with_variants(variant_flag)
+        percent_fc = variant_flag = None
+        plan = plan_experiment(options.memory_budget, num_runs, hypothesis, real_news_delay, options.engine,
+                               trace=options.trace_dir is not None, max_processes=options.processes, seed=seed,
+                               config=config)
+        if not plan.fits:
+            raise MemoryError(f"Experiment does not fit the memory budget:\n{plan.report()}")
+        if options.trace_dir is not None and not plan.keep_traces:
+            warnings.warn(f"Traces do not fit the memory budget and are not written to {options.trace_dir}:\n"
+                          f"{plan.report()}", ResourceWarning, stacklevel=2)
+        options = options.replace(processes=plan.processes,
+                                  trace_dir=options.trace_dir if plan.keep_traces else None)
+        monitor = MemoryMonitor()
 
-        # Run simulation for others
-        stats, final_beliefs, belief_revised_count, influencer_impact = simulate_spread(G, agents, news_items, hypothesis=hypothesis, variant_flag_dict=variant_flag, real_news_delay=real_news_delay)
-
-        # Record metrics
-        metrics['fake_reach'].append(stats['fake'])
-        metrics['real_reach'].append(stats['real'])
-        metrics['fake_shares'].append(news_items['fake'].shared_count)
-        metrics['real_shares'].append(news_items['real'].shared_count)
-        metrics['fake_peak_round'].append(np.argmax(np.diff(stats['fake'])) + 1 if len(stats['fake']) > 1 else 0)
-        metrics['real_peak_round'].append(np.argmax(np.diff(stats['real'])) + 1 if len(stats['real']) > 1 else 0)
-        metrics['fake_belief_count'].append((final_beliefs['fake']))
-        metrics['real_belief_count'].append((final_beliefs['real']))
-        metrics['influencer_reach_fake'].append(influencer_impact['influencer'])
-        metrics['normal_reach_fake'].append(influencer_impact['normal'])
-
-        belief_revised_counts.append(belief_revised_count)
-
-    return metrics, belief_revised_counts
\ No newline at end of file
+    # Metrics are folded in as each run arrives, so the progress bar shows the running summary
+    accumulator = MetricsAccumulator()
+    runs = accumulator.stream(iter_runs(num_runs, hypothesis=hypothesis, percent_fc=percent_fc,
+                                        variant_flag=variant_flag, real_news_delay=real_news_delay, seed=seed,
+                                        first_run=first_run, config=config, options=options))
+    if options.progress:
+        runs = track(runs, num_runs, label=options.progress if isinstance(options.progress, str) else 'runs',
+                     status=accumulator.summary)
+    if monitor is not None:
+        runs = monitor.track(runs)
+    for _ in runs:
+        pass
+    if monitor is not None and monitor.total_peak() > plan.budget:
+        warnings.warn(f"Measured peak of {format_bytes(monitor.total_peak())} exceeds the memory budget of "
+                      f"{format_bytes(plan.budget)}", ResourceWarning, stacklevel=2)
+    return accumulator.metrics, accumulator.belief_revised_counts
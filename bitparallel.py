@@ -0,0 +1,643 @@
+'''
+bitparallel.py
+
+This module advances 64 independent runs of the array engine (engine.py) on one fixed network at
+once. Each run is a bit position (a lane) of uint64 words: every per-agent state field (belief in
+fake or real news, has_shared, ever infected, scheduled shares) is one word per agent and news
+type, so a single pass over the CSR rows of a round's sharers moves every lane forward:
+
+- A contact (sender, receiver) carries the word of lanes in which the sender shares the news and
+  the receiver is still open (or, under Hypothesis 3, believes the other news).
+- Transmission is decided for all lanes of a contact at once by comparing packed random words with
+  the binary digits of the slot's transmission probability (packed_less()); only the lanes still
+  undecided after each digit draw further random words, so a contact costs a few words, not 64 draws.
+- When several contacts reach the same agent in the same lane, one of them wins, drawn separately
+  for every lane (first_arrivals(); a segmented prefix OR over the contacts of each target finds
+  the contested lanes).
+- Fact-checker flagging is tracked per lane; in a lane's flag round, the position of the flag among
+  that lane's fake contacts is drawn explicitly, so later contacts get the flagged threshold as in
+  CascadeState._propagate().
+- Share delays are drawn with one packed uniform per lane compared with every cumulative probability
+  of the delay table.
+- Reach, share and believer counts per lane are vertical popcounts (lane_popcount()) of the words.
+
+Every lane follows the model of simulate_spread() and matches the array engine on the same network
+in distribution. Lanes draw their own processing orders (ties between senders, fact-checker flags),
+so the runs of a batch are independent apart from sharing the network.
+
+As with run_parallel_simulation(), runs cycle over a small ensemble of networks rather than building
+one network per run; temporal mode (config.temporal_rewire_rate > 0) is not supported.
+
+It includes:
+- lane_popcount(), packed_less(), first_arrivals(): bit-parallel primitives
+- BitParallelCascade: packed state of up to 64 runs on one network
+- run_bitparallel_simulation(): batch runner with the calling convention of run_parallel_simulation()
+
+Command line usage:
+    python bitparallel.py --num-runs 640 --seed 1
+'''
+
+import argparse
+import sys
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+
+from config import *
+from graph_arrays import AgentArrays
+from engine import FAKE, REAL, NEWS_TYPES, transmission_table
+from baseline_run import RunResult, MetricsAccumulator
+from parallel_run import build_problem
+from rng_context import RunRNG
+
+LANES = 64
+PRECISION = 32  # binary digits of every packed probability comparison
+DENSE_LANES = 4  # mean active lanes per word from which packed_less() compares digit-wise
+ALL_LANES = np.uint64(2 ** 64 - 1)
+NO_LANES = np.uint64(0)
+
+
+def _swar_popcount(words: np.ndarray) -> np.ndarray:
+    # set bits of every uint64 word by parallel bit summing (np.bitwise_count needs numpy >= 2.0)
+    words = np.asarray(words, dtype=np.uint64)
+    words = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    words = (words & np.uint64(0x3333333333333333)) + ((words >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    words = (words + (words >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (words * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+_bit_count = getattr(np, 'bitwise_count', _swar_popcount)
+
+
+def lane_popcount(words: np.ndarray) -> np.ndarray:
+    """
+    Counts, for every lane (bit position), how many words have that bit set (a vertical popcount).
+
+    Parameters:
+        words : np.ndarray. uint64 words.
+
+    Returns:
+        np.ndarray : int64 array of LANES counts; entry i counts bit i.
+
+    Examples:
+        >>> lane_popcount(np.array([0b101, 0b100, 1 << 63], dtype=np.uint64))[[0, 1, 2, 63]].tolist()
+        [1, 0, 2, 1]
+    """
+    words = words[words != 0]
+    if _bit_count(words).sum() < DENSE_LANES * len(words):
+        return np.bincount(_unpack(words)[1].astype(np.int64), minlength=LANES)
+    bits = np.unpackbits(np.ascontiguousarray(words, dtype='<u8').view(np.uint8).reshape(-1, 8), axis=1,
+                         bitorder='little')
+    return bits.sum(axis=0, dtype=np.int64)
+
+
+def _unpack(words: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (position in words, lane) of every set bit: the lowest set bits are peeled off for DENSE_LANES
+    # steps, then the words that still have bits left are unpacked whole
+    rows, lanes = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.uint64)]
+    positions = np.flatnonzero(words)
+    remaining = words[positions]
+    for _ in range(DENSE_LANES):
+        if len(positions) == 0:
+            break
+        lowest = remaining & (NO_LANES - remaining)
+        rows.append(positions)
+        lanes.append(_bit_count(lowest - np.uint64(1)).astype(np.uint64))
+        remaining ^= lowest
+        keep = remaining != 0
+        positions, remaining = positions[keep], remaining[keep]
+    if len(positions):
+        bits = np.unpackbits(np.ascontiguousarray(remaining, dtype='<u8').view(np.uint8).reshape(-1, 8), axis=1,
+                             bitorder='little')
+        row, lane = np.nonzero(bits)
+        rows.append(positions[row])
+        lanes.append(lane.astype(np.uint64))
+    return np.concatenate(rows), np.concatenate(lanes)
+
+
+def lane_mask(lanes: int) -> np.uint64:
+    """
+    Returns the word with the lowest lanes bits set.
+
+    Examples:
+        >>> int(lane_mask(3)), bool(lane_mask(LANES) == ALL_LANES)
+        (7, True)
+    """
+    return ALL_LANES if lanes >= LANES else np.uint64((1 << lanes) - 1)
+
+
+def packed_less(thresholds: Sequence[np.ndarray], active: np.ndarray, rng: np.random.Generator,
+                precision: int = PRECISION) -> List[np.ndarray]:
+    """
+    Bernoulli trials for packed lanes: for every element and every set bit of its active word, draws
+    one uniform U (shared by all thresholds) and sets that bit of result k where U < thresholds[k].
+
+    U is compared with the threshold one binary digit at a time, most significant first; a random
+    word supplies the digit of U for all 64 lanes, and lanes whose digit differs from the threshold's
+    are decided. Elements with no undecided lane left drop out, so an element costs about
+    log2(active lanes) + 2 random words. Thresholds are truncated to precision binary digits.
+    Sparse words (fewer than DENSE_LANES active lanes on average, as in small cascades) are cheaper
+    to unpack: each active lane then gets its own uniform draw, and the successes are packed back.
+
+    Parameters:
+        thresholds : sequence of np.ndarray. Probability of every element, one array per comparison.
+        active : np.ndarray. uint64 word of the lanes to decide for every element.
+        rng : np.random.Generator. Source of the random words.
+        precision : int. Number of binary digits compared.
+
+    Returns:
+        list of np.ndarray : uint64 word of the successful lanes of every element, one per threshold.
+            Since U is shared, a lower threshold always succeeds in a subset of the lanes.
+
+    Examples:
+        >>> rng = np.random.default_rng(0)
+        >>> active = np.full(2000, ALL_LANES)
+        >>> low, high = packed_less([np.full(2000, 0.09), np.full(2000, 0.3)], active, rng)
+        >>> round(float(lane_popcount(high).sum()) / (2000 * LANES), 2), bool(np.all(low & ~high == 0))
+        (0.3, True)
+        >>> [int(word) for word in packed_less([np.array([1.0, 0.0])], np.array([5, 5], dtype=np.uint64), rng)[0]]
+        [5, 0]
+    """
+    active = np.asarray(active, dtype=np.uint64)
+    results = np.zeros((len(thresholds), len(active)), dtype=np.uint64)
+    idx = np.flatnonzero(active)
+    if _bit_count(active[idx]).sum() < DENSE_LANES * len(idx):
+        rows, lanes = _unpack(active[idx])
+        uniforms = rng.random(len(rows))
+        for result, threshold in zip(results, thresholds):
+            hit = uniforms < np.asarray(threshold)[idx[rows]]
+            np.bitwise_or.at(result, idx[rows[hit]], np.left_shift(np.uint64(1), lanes[hit]))
+        return list(results)
+    scale = float(2 ** precision)
+    digits = np.floor(np.clip(np.asarray(thresholds, dtype=np.float64).reshape(len(thresholds), -1)[:, idx],
+                              0.0, 1.0) * scale).astype(np.uint64)
+    words = np.broadcast_to(active[idx], digits.shape)
+    certain = digits >= np.uint64(2 ** precision)  # probability 1: every lane succeeds
+    decided = np.where(certain, words, NO_LANES)
+    undecided = np.where(certain, NO_LANES, words)
+    one = np.uint64(1)
+    for bit in range(precision - 1, -1, -1):
+        if len(idx) == 0:
+            break
+        uniform_digits = rng.bit_generator.random_raw(len(idx))
+        spread = np.uint64(0) - ((digits >> np.uint64(bit)) & one)  # the threshold digit in all 64 lanes
+        decided |= undecided & ~uniform_digits & spread  # U has a 0 where the threshold has a 1
+        undecided &= ~(uniform_digits ^ spread)
+        keep = undecided.any(axis=0)
+        if 2 * np.count_nonzero(keep) <= len(idx):
+            results[:, idx[~keep]] = decided[:, ~keep]
+            idx, digits, decided, undecided = idx[keep], digits[:, keep], decided[:, keep], undecided[:, keep]
+    results[:, idx] = decided
+    return list(results)
+
+
+def first_arrivals(targets: np.ndarray, words: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Keeps, in every lane, only the first contact of each target in that lane's own shuffled order:
+    where several contacts reach a target in the same lane, one of them wins, chosen uniformly and
+    independently of the other lanes. Uncontested lanes cost no random draws.
+
+    Parameters:
+        targets : np.ndarray. Receiving agent of every contact.
+        words : np.ndarray. uint64 word of the lanes in which every contact succeeded.
+        rng : np.random.Generator. Source of the processing orders.
+
+    Returns:
+        np.ndarray : The lanes every contact wins; for each target the winners of a lane are unique.
+
+    Examples:
+        >>> rng = np.random.default_rng(0)
+        >>> wins = first_arrivals(np.array([4, 4, 4, 7]), np.array([0b011, 0b110, 0b100, 0b1], dtype=np.uint64), rng)
+        >>> [int(np.bitwise_or.reduce(wins[:3])), int(wins[3])]
+        [7, 1]
+        >>> int(wins[0] & wins[1]) | int(wins[1] & wins[2]) | int(wins[0] & wins[2])
+        0
+
+        Two contacts reaching one target in all 64 lanes: each wins about half of the lanes, and the
+        lanes are decided independently (one order shared by all lanes would only give 0 or ALL_LANES).
+
+        >>> rounds = [first_arrivals(np.array([0, 0]), np.full(2, ALL_LANES), rng)[0] for _ in range(200)]
+        >>> shares = lane_popcount(np.array(rounds)) / 200
+        >>> bool(np.all(np.abs(shares - 0.5) < 0.15)), len(set(int(word) for word in rounds)) > 190
+        (True, True)
+    """
+    wins = words.copy()
+    contacts = np.flatnonzero(words)
+    order = contacts[np.argsort(targets[contacts], kind='stable')]
+    groups, seen = targets[order], words[order]
+    # segmented inclusive prefix OR (Hillis-Steele): seen[i] = OR of words[order[j]] for j <= i in the same target
+    shift = 1
+    while shift < len(order):
+        same = groups[shift:] == groups[:-shift]
+        if not same.any():
+            break
+        seen[shift:] |= np.where(same, seen[:-shift], NO_LANES)
+        shift *= 2
+    before = np.zeros_like(seen)
+    before[1:] = np.where(groups[1:] == groups[:-1], seen[:-1], NO_LANES)
+    if not (words[order] & before).any():
+        return wins
+    # lanes reached more than once per target; each (target, lane) pair draws its own winner
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    group = np.cumsum(np.r_[False, groups[1:] != groups[:-1]])
+    contested = np.bitwise_or.reduceat(words[order] & before, starts)[group] & words[order]
+    wins[order] &= ~contested
+    rows, lanes = _unpack(contested)
+    pair_group = group[rows]
+    ranked = np.lexsort((rng.random(len(rows)), lanes, pair_group))
+    first = np.r_[True, (pair_group[ranked][1:] != pair_group[ranked][:-1]) | (lanes[ranked][1:] != lanes[ranked][:-1])]
+    winners = ranked[first]
+    np.bitwise_or.at(wins, order[rows[winners]], np.left_shift(np.uint64(1), lanes[winners]))
+    return wins
+
+
+def _or_by_target(targets: np.ndarray, words: np.ndarray, size: int) -> np.ndarray:
+    merged = np.zeros(size, dtype=np.uint64)
+    np.bitwise_or.at(merged, targets, words)
+    return merged
+
+
+class BitParallelCascade:
+    """
+    Packed state of up to LANES independent runs on one network, advanced one round at a time.
+
+    Attributes:
+        lanes : int. Number of runs (lanes 0 .. lanes - 1).
+        belief : np.ndarray. uint64 (2, n) words; lanes in which each agent believes fake / real news.
+        has_shared : np.ndarray. uint64 (2, n) words; lanes in which each agent shared each news type.
+        infected : np.ndarray. uint64 (2, n) words; lanes in which each agent was ever reached by each news type.
+        influencer_origin : np.ndarray or None. uint64 words; lanes in which an agent's fake news reach traces
+            back to an influencer seed (Hypothesis 2, Variant A attribution).
+        pending : np.ndarray. uint64 (slots, 2, n) ring of scheduled shares, indexed by round % slots.
+        pending_lanes : np.ndarray. uint64 word per ring slot; lanes with at least one share scheduled there.
+        flagged : np.uint64. Lanes in which the fake news has been flagged by a fact-checker.
+        reach, shared_count : np.ndarray. (2, lanes) counts per news type and lane.
+        revised : np.ndarray. Belief revisions per lane.
+        alive : np.uint64. Lanes whose cascade is still running.
+        rounds : np.ndarray. Number of rounds simulated by each lane.
+        round_num : int. Next round to simulate.
+    """
+    def __init__(self, graph, roles: AgentArrays, rng: np.random.Generator, lanes: int = LANES,
+                 hypothesis: str | None = None, transmission: np.ndarray | None = None, real_news_delay: int = 0,
+                 config: SimulationConfig = DEFAULT_CONFIG):
+        if not 0 < lanes <= LANES:
+            raise ValueError(f"lanes must be between 1 and {LANES}, not {lanes}")
+        if config.temporal_rewire_rate > 0:
+            raise ValueError("The bit-parallel engine needs a fixed network (temporal_rewire_rate = 0)")
+        n = roles.num_agents
+        self.graph = graph
+        self.roles = roles
+        self.rng = rng
+        self.lanes = lanes
+        self.config = config
+        self.hypothesis = hypothesis
+        self.revise = hypothesis == 'h3'
+        self.track_sources = hypothesis == 'h2' and config.variant_A
+        if transmission is None:
+            transmission = transmission_table(graph, roles, config)
+        self.transmission = transmission
+        self.delay_tables = tuple(config.delay_arrays[name] for name in ('fake', 'real', 'influencer_fake'))
+        self.influencer_fast = config.variant_B  # Variant B: influencers share fake news faster
+        self.real_news_delay = real_news_delay if hypothesis == 'h3' else 0
+
+        self.belief = np.zeros((2, n), dtype=np.uint64)
+        self.has_shared = np.zeros((2, n), dtype=np.uint64)
+        self.infected = np.zeros((2, n), dtype=np.uint64)
+        self.influencer_origin = np.zeros(n, dtype=np.uint64) if self.track_sources else None
+        max_delay = max(int(delays.max()) for delays, _ in config.delay_arrays.values())
+        self.pending = np.zeros((max_delay + self.real_news_delay + 1, 2, n), dtype=np.uint64)
+        self.pending_lanes = np.zeros(len(self.pending), dtype=np.uint64)
+        self.flagged = NO_LANES
+        self.reach = np.zeros((2, lanes), dtype=np.int64)
+        self.shared_count = np.zeros((2, lanes), dtype=np.int64)
+        self.revised = np.zeros(lanes, dtype=np.int64)
+        self.alive = lane_mask(lanes)
+        self.rounds = np.zeros(lanes, dtype=np.int64)
+        self.round_num = 0
+        self._running = np.arange(lanes)
+        self._history = []
+
+    @property
+    def done(self) -> bool:
+        """Whether every lane has died out or reached max_rounds."""
+        return self.alive == NO_LANES
+
+    def seed_news(self) -> None:
+        """Seeds both news types in every lane and schedules the seeds' first shares (as in CascadeState.seed_news)."""
+        n = self.roles.num_agents
+        seeds = np.zeros((2, n), dtype=np.uint64)
+        for code in (FAKE, REAL):
+            for lane in range(self.lanes):
+                chosen = self._select_seeds_variant() if self.track_sources else \
+                    self.rng.choice(n, self.config.seed_count, replace=False)
+                seeds[code, chosen] |= np.uint64(1 << lane)
+        self.belief[FAKE] = seeds[FAKE] & ~seeds[REAL]  # real news is seeded second and overwrites
+        self.belief[REAL] = seeds[REAL]
+        self.infected[:] = seeds
+        self.reach += np.stack([lane_popcount(seeds[FAKE]), lane_popcount(seeds[REAL])])[:, :self.lanes]
+        if self.influencer_origin is not None:
+            self.influencer_origin = np.where(self.roles.is_influencer, seeds[FAKE], NO_LANES)
+        for code in (FAKE, REAL):
+            agents = np.flatnonzero(seeds[code])
+            offset = self.real_news_delay if code == REAL else 0
+            self._schedule(agents, np.full(len(agents), code, dtype=np.int8), seeds[code, agents], offset)
+
+    def _select_seeds_variant(self) -> np.ndarray:
+        influencers = np.flatnonzero(self.roles.is_influencer)
+        others = np.flatnonzero(~self.roles.is_influencer)
+        seed_influencers = self.rng.choice(influencers, min(7, len(influencers)), replace=False)
+        seed_others = self.rng.choice(others, self.config.seed_count - len(seed_influencers), replace=False)
+        return np.concatenate([seed_influencers, seed_others])
+
+    def _schedule(self, agents: np.ndarray, codes: np.ndarray, words: np.ndarray, start_round: int,
+                  variant: bool = True) -> None:
+        # draws a delay per (agent, lane) and sets the lanes in the pending words of start_round + delay;
+        # one uniform per lane is compared with every cumulative probability of the agent's delay table
+        if len(agents) == 0:
+            return
+        table = codes.astype(np.int64)
+        if variant and self.influencer_fast:
+            table[(codes == FAKE) & self.roles.is_influencer[agents]] = 2
+        used = np.unique(table).tolist()
+        width = max(len(self.delay_tables[index][0]) for index in used)
+        cumulative = np.ones((width - 1, len(agents)))
+        delays = np.empty((width, len(agents)), dtype=np.int64)
+        for index in used:
+            table_delays, table_cumulative = self.delay_tables[index]
+            rows = table == index
+            cumulative[:len(table_delays) - 1, rows] = table_cumulative[:-1, None]
+            delays[:, rows] = table_delays[np.minimum(np.arange(width), len(table_delays) - 1), None]
+        below = packed_less(cumulative, words, self.rng) if width > 1 else []
+        earlier = NO_LANES
+        for position in range(width):
+            upto = below[position] if position < width - 1 else words
+            chosen = upto & ~earlier
+            earlier = upto
+            slots = (start_round + delays[position]) % len(self.pending)
+            self.pending[slots, codes, agents] |= chosen
+            np.bitwise_or.at(self.pending_lanes, slots, chosen)
+
+    def _infect(self, senders: np.ndarray, receivers: np.ndarray, news: np.ndarray, wins: np.ndarray,
+                round_num: int, variant: bool = True) -> np.ndarray:
+        # sets the belief of the winning lanes of every contact to its news, counts first infections and
+        # schedules the new believers' shares; returns the lanes changed per (news, agent)
+        n = self.roles.num_agents
+        won = wins != 0
+        keys, inverse = np.unique(news[won].astype(np.int64) * n + receivers[won], return_inverse=True)
+        codes, targets = (keys // n).astype(np.int8), keys % n
+        words = _or_by_target(inverse, wins[won], len(keys))
+        self.belief[codes, targets] |= words
+        self.belief[1 - codes, targets] &= ~words
+        fresh = words & ~self.infected[codes, targets]
+        self.infected[codes, targets] |= words
+        for code in (FAKE, REAL):
+            self.reach[code] += lane_popcount(fresh[codes == code])[:self.lanes]
+        if self.influencer_origin is not None:
+            # fake news reach inherits the origin class of the winning sender (see lineage.py)
+            origin = _or_by_target(inverse, self.influencer_origin[senders[won]] & wins[won], len(keys))
+            fake = codes == FAKE
+            self.influencer_origin[targets[fake]] = ((self.influencer_origin[targets[fake]] & ~fresh[fake])
+                                                     | (origin[fake] & fresh[fake]))
+        self._schedule(targets, codes, words, round_num, variant)
+        return words
+
+    def advance_round(self) -> None:
+        """Processes the shares scheduled for the current round in every running lane and records the reach."""
+        round_num = self.round_num
+        slot = round_num % len(self.pending)
+        if self.pending_lanes[slot] & self.alive:
+            due = self.pending[slot] & self.alive
+            sharing = due & ~self.has_shared
+            self.has_shared |= sharing
+            for code in (FAKE, REAL):
+                self.shared_count[code] += lane_popcount(sharing[code])[:self.lanes]
+            if sharing.any():
+                self._propagate(sharing, round_num)
+        self.pending[slot] = NO_LANES
+        self.pending_lanes[slot] = NO_LANES
+
+        self._history.append(self.reach.copy())  # lanes that are done keep their final reach
+        self.rounds[self._running] += 1
+        self.round_num += 1
+        if self.round_num >= self.config.max_rounds:
+            alive = NO_LANES
+        else:
+            alive = self.alive & np.bitwise_or.reduce(self.pending_lanes)  # lanes with shares still scheduled
+        if alive != self.alive:
+            self.alive = alive
+            self._running = _unpack(np.array([alive]))[1].astype(np.int64)
+
+    def _contacts(self, sharing: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # (sender, receiver, news, sharing lanes, unflagged transmission probability) of every contact
+        parts = []
+        for code in (FAKE, REAL):
+            ids = np.flatnonzero(sharing[code])
+            owner, slots = self.graph.expand_slots(ids)
+            senders = ids[owner]
+            parts.append((senders, self.graph.indices[slots], np.full(len(slots), code, dtype=np.int8),
+                          sharing[code, senders], self.transmission[code, slots]))
+        return tuple(np.concatenate(columns) for columns in zip(*parts))
+
+    def _propagate(self, sharing: np.ndarray, round_num: int) -> None:
+        senders, receivers, news, lanes, threshold = self._contacts(sharing)
+        believes = self.belief[:, receivers]  # snapshot before this round's changes, as in CascadeState
+        open_lanes = lanes & ~(believes[FAKE] | believes[REAL])
+
+        if self.revise:
+            conflicting = lanes & believes[1 - news, np.arange(len(news))]
+            if _bit_count(conflicting).any():
+                self._revise(senders, receivers, news, conflicting, round_num)
+
+        is_fake = news == FAKE
+        reduced_threshold = np.where(is_fake, threshold * 0.3, threshold)
+        accepted, reduced = packed_less([threshold, reduced_threshold], open_lanes, self.rng)
+        flagged = np.where(is_fake, self.flagged, NO_LANES)
+        accepted = (accepted & ~flagged) | (reduced & flagged)  # reduced trust for flagged fake news
+        self._check_facts(receivers, is_fake, open_lanes, accepted, reduced)
+
+        self._infect(senders, receivers, news, first_arrivals(receivers, accepted, self.rng), round_num)
+
+    def _check_facts(self, receivers: np.ndarray, is_fake: np.ndarray, open_lanes: np.ndarray,
+                     accepted: np.ndarray, reduced: np.ndarray) -> None:
+        # Fact-checker intervention, per unflagged lane: the first successful flag (in the lane's shuffled
+        # order) reduces trust for all later fake contacts of the round
+        hits = np.where(is_fake & self.roles.is_fact_checker[receivers], accepted & ~self.flagged, NO_LANES)
+        candidates = np.bitwise_or.reduce(hits)
+        for lane in np.flatnonzero(lane_popcount(np.array([candidates]))).tolist():
+            bit = np.uint64(1 << lane)
+            contacts = np.flatnonzero(is_fake & ((open_lanes & bit) != 0))  # the lane's fake contacts
+            positions = self.rng.random(len(contacts))  # place of each contact in the lane's shuffled order
+            order = np.argsort(positions)
+            is_check = (hits[contacts[order]] & bit) != 0
+            checks, check_positions = contacts[order][is_check], positions[order][is_check]
+            _, first = np.unique(receivers[checks], return_index=True)
+            first = np.sort(first)  # first contact of each fact-checker
+            flags = first[self.rng.random(len(first)) < self.config.p_fact_check]
+            if len(flags) == 0:
+                continue
+            flag_position = check_positions[flags[0]]
+            self.flagged |= bit
+            later = contacts[positions > flag_position]
+            accepted[later] = (accepted[later] & ~bit) | (reduced[later] & bit)
+
+    def _revise(self, senders: np.ndarray, receivers: np.ndarray, news: np.ndarray, conflicting: np.ndarray,
+                round_num: int) -> None:
+        # an agent that already believes the other news may check the facts and change its belief
+        chance = np.where(self.roles.is_fact_checker[receivers], self.config.p_belief_revision, 0.25)
+        hits, = packed_less([chance], conflicting, self.rng)
+        revised = self._infect(senders, receivers, news, first_arrivals(receivers, hits, self.rng), round_num,
+                               variant=False)
+        self.revised += lane_popcount(revised)[:self.lanes]
+
+    def run(self) -> None:
+        """Advances every lane until it dies out or max_rounds is reached."""
+        while not self.done:
+            self.advance_round()
+
+    def results(self) -> List[RunResult]:
+        """
+        Returns the outcome of every lane in the same form as simulate_spread() (run_index is the lane).
+        """
+        history = np.array(self._history, dtype=np.int64).reshape(-1, 2, self.lanes)
+        stats = [{news_type: history[:self.rounds[lane], code, lane].tolist()
+                  for code, news_type in enumerate(NEWS_TYPES)} for lane in range(self.lanes)]
+        believers = [lane_popcount(self.belief[code])[:self.lanes] for code in (FAKE, REAL)]
+        if self.influencer_origin is not None:
+            from_influencers = lane_popcount(self.infected[FAKE] & self.influencer_origin)[:self.lanes]
+            from_others = lane_popcount(self.infected[FAKE] & ~self.influencer_origin)[:self.lanes]
+        else:
+            from_influencers = from_others = np.zeros(self.lanes, dtype=np.int64)
+        return [RunResult(lane, stats[lane],
+                          {news_type: int(self.shared_count[code, lane]) for code, news_type in enumerate(NEWS_TYPES)},
+                          {news_type: int(believers[code][lane]) for code, news_type in enumerate(NEWS_TYPES)},
+                          int(self.revised[lane]),
+                          {'influencer': int(from_influencers[lane]), 'normal': int(from_others[lane])})
+                for lane in range(self.lanes)]
+
+
+def simulate_spread_bitparallel(graph, roles: AgentArrays, lanes: int = LANES, hypothesis: str | None = None,
+                                real_news_delay: int = 0,
+                                rng: np.random.Generator | None = None, transmission: np.ndarray | None = None,
+                                config: SimulationConfig = DEFAULT_CONFIG) -> List[RunResult]:
+    """
+    Simulates lanes independent runs of the spread of fake and real news on one network at once.
+
+    Parameters:
+        graph : GraphArrays. Network with trust weights.
+        roles : AgentArrays. Roles and share probabilities of every agent.
+        lanes : int. Number of runs (at most LANES).
+        hypothesis, real_news_delay, transmission, config : As in engine.simulate_spread_arrays().
+        rng : np.random.Generator or None. Random generator of the batch (a fresh one if None).
+
+    Returns:
+        list of RunResult : Outcome of every run, with run_index set to its lane.
+
+    Examples:
+        >>> import networkx as nx
+        >>> from graph_arrays import GraphArrays
+        >>> from agent_initializer import assign_roles_bulk
+        >>> from simulation import initialize_p_shares_bulk
+        >>> rng = np.random.default_rng(0)
+        >>> graph = GraphArrays.from_networkx(nx.erdos_renyi_graph(200, 0.05, seed=1))
+        >>> roles = assign_roles_bulk(graph.degrees(), rng)
+        >>> initialize_p_shares_bulk(roles, rng)
+        >>> runs = simulate_spread_bitparallel(graph, roles, hypothesis='h3', rng=rng)
+        >>> len(runs), all(run.stats['fake'][0] >= seed_count for run in runs)
+        (64, True)
+        >>> all(run.final_beliefs['fake'] + run.final_beliefs['real'] <= run.stats['fake'][-1] + run.stats['real'][-1]
+        ...     for run in runs)
+        True
+
+        Per-lane statistics match those of independent runs of the array engine on the same network:
+
+        >>> from engine import simulate_spread_arrays
+        >>> lanes = [run.stats['fake'][-1] for run in runs]
+        >>> scalar = [simulate_spread_arrays(graph, roles, hypothesis='h3', rng=np.random.default_rng([0, run]))[0]['fake'][-1]
+        ...           for run in range(64)]
+        >>> bool(abs(np.mean(lanes) / np.mean(scalar) - 1) < 0.15), bool(0.7 < np.std(lanes) / np.std(scalar) < 1.4)
+        (True, True)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    state = BitParallelCascade(graph, roles, rng, lanes=lanes, hypothesis=hypothesis,
+                               transmission=transmission,
+                               real_news_delay=real_news_delay, config=config)
+    state.seed_news()
+    state.run()
+    return state.results()
+
+
+def run_bitparallel_simulation(num_runs: int = 1000, ensemble_size: int = 1, hypothesis: str | None = None,
+                               percent_fc: float | None = None, variant_flag: Dict[str, bool] | None = None,
+                               real_news_delay: int = 0, seed: int | None = None, network_seed: int | None = None,
+                               config: SimulationConfig = DEFAULT_CONFIG) -> tuple[dict[str, list[Any]], list[int]]:
+    """
+    Executes Monte Carlo runs in batches of up to LANES packed runs per network.
+
+    Networks are generated exactly as in run_parallel_simulation() with the same seed (or network_seed),
+    and run i uses network i % ensemble_size in both, so the two runners can be compared on identical
+    networks (equivalence.py registers them as 'bitparallel' and 'ensemble').
+
+    Parameters:
+        num_runs, ensemble_size, hypothesis, percent_fc, variant_flag, real_news_delay, seed, network_seed,
+            config : As in run_parallel_simulation().
+
+    Returns:
+        metrics : dict. Same keys as run_baseline_simulation(), runs in index order.
+        belief_revised_counts : list. List of belief revision counts per run.
+
+    Examples:
+        >>> metrics, revisions = run_bitparallel_simulation(num_runs=70, ensemble_size=2, seed=7)
+        >>> len(metrics['fake_reach']), len(revisions)
+        (70, 70)
+        >>> again, _ = run_bitparallel_simulation(num_runs=70, ensemble_size=2, seed=7)
+        >>> metrics['fake_belief_count'] == again['fake_belief_count']
+        True
+    """
+    if percent_fc is not None:
+        config = config.replace(percent_fact_checkers=percent_fc)
+    if variant_flag is not None:
+        config = config.with_variants(variant_flag)
+    entropy = np.random.SeedSequence(seed).entropy
+    network_entropy = entropy if network_seed is None else np.random.SeedSequence(network_seed).entropy
+    outcomes = []
+    for index in range(min(ensemble_size, num_runs)):
+        network_rng = RunRNG(np.random.SeedSequence(network_entropy, spawn_key=(0, index)))
+        graph, roles, transmission = build_problem(network_rng, config=config)
+        run_indices = list(range(index, num_runs, ensemble_size))
+        for batch, start in enumerate(range(0, len(run_indices), LANES)):
+            batch_runs = run_indices[start:start + LANES]
+            rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(2, index, batch)))
+            for run in simulate_spread_bitparallel(graph, roles, len(batch_runs), hypothesis, real_news_delay,
+                                                   rng=rng, transmission=transmission, config=config):
+                run.run_index = batch_runs[run.run_index]
+                outcomes.append(run)
+    outcomes.sort(key=lambda run: run.run_index)
+    accumulator = MetricsAccumulator().consume(outcomes)
+    return accumulator.metrics, accumulator.belief_revised_counts
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Time bit-parallel runs against the array engine on the same "
+                                                 "networks.")
+    parser.add_argument('--num-runs', type=int, default=640)
+    parser.add_argument('--ensemble-size', type=int, default=1)
+    parser.add_argument('--hypothesis', choices=['h2', 'h3'], default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from parallel_run import run_parallel_simulation
+
+    for label, runner in (('arrays', lambda **kwargs: run_parallel_simulation(processes=0, **kwargs)),
+                          ('bitparallel', run_bitparallel_simulation)):
+        start = time.perf_counter()
+        metrics, _ = runner(num_runs=args.num_runs, ensemble_size=args.ensemble_size, hypothesis=args.hypothesis,
+                            seed=args.seed)
+        elapsed = time.perf_counter() - start
+        finals = [reach[-1] for reach in metrics['fake_reach']]
+        print(f"{label:12s} {elapsed:8.2f} s  {args.num_runs / elapsed:9.1f} runs/s  "
+              f"mean final fake reach {np.mean(finals):.1f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -15,8 +15,17 @@ Key Configuration Areas:
 
 This modular approach supports transparent and consistent updates across the codebase
 without manually changing values across multiple files.
+
+The values below are the defaults. SimulationConfig (end of this module) bundles them into one
+frozen object, DEFAULT_CONFIG, that is passed explicitly to the network generator, initializers,
+engines and runners; other configurations are derived with DEFAULT_CONFIG.replace(...).
 '''
 
+import dataclasses
+import functools
+from typing import Dict as _Dict, Tuple as _Tuple
+import numpy as _np
+
 # === Simulation Control ===
 num_agents = 1500 # total number of nodes in the network
 seed_count = 10  # number of users initially seeded with news
@@ -68,4 +77,143 @@ variant_config = {
 num_communities = 5
 rewire_fraction = 0.1  # the probability of rewiring each edge in Watts-Strogatz model
 ba_attachment = 3  # number of edges, each new node attachs to in Barabasi-Albert model
-k_neighbors = 10 # each node is joined with its k nearest neighbors in Watts-Strogatz model
\ No newline at end of file
+k_neighbors = 10 # each node is joined with its k nearest neighbors in Watts-Strogatz model
+temporal_rewire_rate = 0.0  # probability per round that an edge is rewired during a run (0 = static network, see temporal_graph.py)
+
+# === Immutable configuration object ===
+def _as_pairs(distribution) -> _Tuple[_Tuple[int, float], ...]:
+    items = distribution.items() if isinstance(distribution, dict) else distribution
+    return tuple(sorted((int(delay), float(prob)) for delay, prob in items))
+
+
+@dataclasses.dataclass(frozen=True)
+class SimulationConfig:
+    """
+    Frozen, hashable bundle of every simulation parameter above. Functions that need parameters
+    take a config argument (DEFAULT_CONFIG = the module values), so one process can run several
+    configurations side by side, configurations can be used as cache or deduplication keys, and
+    they pickle cheaply to worker processes.
+
+    Delay distributions are stored as sorted (delay, probability) pairs and may be given as dicts;
+    derived tables (cumulative delays, role counts) are computed once per configuration.
+
+    Examples:
+        >>> config = SimulationConfig(p_fact_check=0.5, fake_delay_distribution={2: 0.5, 1: 0.5})
+        >>> config.fake_delay_distribution, config.delay_cumulative['fake']
+        (((1, 0.5), (2, 0.5)), ((1, 0.5), (2, 1.0)))
+        >>> config == DEFAULT_CONFIG.replace(p_fact_check=0.5, fake_delay_distribution={1: 0.5, 2: 0.5})
+        True
+        >>> len({config, DEFAULT_CONFIG, SimulationConfig()})
+        2
+        >>> DEFAULT_CONFIG.with_variants({'variant_C': True}).variant_flags
+        {'variant_A': False, 'variant_B': False, 'variant_C': True}
+        >>> DEFAULT_CONFIG.role_counts(1000)['fact_checkers']
+        171
+    """
+    # Simulation control
+    num_agents: int = num_agents
+    seed_count: int = seed_count
+    max_rounds: int = max_rounds
+    # Role counts
+    percent_influencers: float = percent_influencers
+    percent_skeptical: float = percent_skeptical
+    percent_fact_checkers: float = percent_fact_checkers
+    percent_susceptible: float = percent_susceptible
+    percent_highly_susceptible_range: _Tuple[float, float] = percent_highly_susceptible_range
+    percent_super_spreader: float = percent_super_spreader
+    # News sharing probability ranges
+    p_fake_fact_checker: _Tuple[float, float] = p_fake_fact_checker
+    p_fake_susceptible: _Tuple[float, float] = p_fake_susceptible
+    p_fake_highly_susceptible: _Tuple[float, float] = p_fake_highly_susceptible
+    p_fake_super_spreader: _Tuple[float, float] = p_fake_super_spreader
+    p_fake_normal: _Tuple[float, float] = p_fake_normal
+    p_real_normal: _Tuple[float, float] = p_real_normal
+    # Fact-checking intervention
+    p_fact_check: float = p_fact_check
+    p_belief_revision: float = p_belief_revision
+    # Share delays
+    fake_delay_distribution: _Tuple[_Tuple[int, float], ...] = _as_pairs(fake_delay_distribution)
+    real_delay_distribution: _Tuple[_Tuple[int, float], ...] = _as_pairs(real_delay_distribution)
+    influencer_fake_delay_distribution: _Tuple[_Tuple[int, float], ...] = ((1, 0.95), (2, 0.05))  # Variant B
+    # Hypothesis 2 variants
+    variant_A: bool = variant_config['variant_A']
+    variant_B: bool = variant_config['variant_B']
+    variant_C: bool = variant_config['variant_C']
+    # Network structure
+    num_communities: int = num_communities
+    rewire_fraction: float = rewire_fraction
+    ba_attachment: int = ba_attachment
+    k_neighbors: int = k_neighbors
+    temporal_rewire_rate: float = temporal_rewire_rate
+
+    def __post_init__(self):
+        for field in dataclasses.fields(self):
+            value = getattr(self, field.name)
+            if field.name.endswith('delay_distribution'):
+                object.__setattr__(self, field.name, _as_pairs(value))
+            elif isinstance(value, list):
+                object.__setattr__(self, field.name, tuple(value))
+
+    def replace(self, **changes) -> 'SimulationConfig':
+        """Returns a copy with some parameters changed."""
+        return dataclasses.replace(self, **changes)
+
+    def with_variants(self, variant_flag_dict: _Dict[str, bool]) -> 'SimulationConfig':
+        """Returns a copy with the Hypothesis 2 variant flags of variant_flag_dict (missing flags unchanged)."""
+        return self.replace(**{name: bool(variant_flag_dict[name])
+                               for name in ('variant_A', 'variant_B', 'variant_C') if name in variant_flag_dict})
+
+    @property
+    def variant_flags(self) -> _Dict[str, bool]:
+        """Variant flags as a new dict, in the form taken by the runners' variant_flag argument and recorded in traces."""
+        return {'variant_A': self.variant_A, 'variant_B': self.variant_B, 'variant_C': self.variant_C}
+
+    @functools.cached_property
+    def delay_cumulative(self) -> _Dict[str, _Tuple[_Tuple[int, float], ...]]:
+        """(delay, cumulative probability) pairs of the 'fake', 'real' and 'influencer_fake' delay distributions."""
+        tables = {}
+        for name in ('fake', 'real', 'influencer_fake'):
+            cumulative = 0.0
+            pairs = []
+            for delay, prob in getattr(self, f'{name}_delay_distribution'):
+                cumulative += prob
+                pairs.append((delay, cumulative))
+            tables[name] = tuple(pairs)
+        return tables
+
+    @functools.cached_property
+    def delay_arrays(self) -> _Dict[str, _Tuple[_np.ndarray, _np.ndarray]]:
+        """Delays and cumulative probabilities of each delay distribution as arrays (see engine.draw_delays)."""
+        return {name: (_np.array([delay for delay, _ in pairs], dtype=_np.int64), _np.array([cum for _, cum in pairs]))
+                for name, pairs in self.delay_cumulative.items()}
+
+    def role_counts(self, n: int, percent_fc: float | None = None) -> _Dict[str, int]:
+        """
+        Role group sizes for a network of n agents: influencers, skeptical, fact_checkers, susceptible,
+        super_spreaders and the range of highly susceptible agents (highly_low, highly_high).
+        """
+        percent_fc = self.percent_fact_checkers if percent_fc is None else percent_fc
+        return dict(_role_counts(n, self.percent_influencers, self.percent_skeptical, percent_fc,
+                                 self.percent_susceptible, self.percent_super_spreader,
+                                 self.percent_highly_susceptible_range))
+
+
+@functools.lru_cache(maxsize=1024)
+def _role_counts(n: int, percent_influencers: float, percent_skeptical: float, percent_fc: float,
+                 percent_susceptible: float, percent_super_spreader: float,
+                 percent_highly_susceptible_range: _Tuple[float, float]) -> _Dict[str, int]:
+    # keyed on the role fields only, so cached entries do not keep configurations alive
+    num_skeptical = int(percent_skeptical * n)
+    num_susceptible = int(percent_susceptible * n)
+    return {
+        'influencers': int(percent_influencers * n),
+        'skeptical': num_skeptical,
+        'fact_checkers': int(percent_fc * num_skeptical),
+        'susceptible': num_susceptible,
+        'super_spreaders': max(1, int(percent_super_spreader * num_susceptible)),
+        'highly_low': int(percent_highly_susceptible_range[0] * num_susceptible),
+        'highly_high': int(percent_highly_susceptible_range[1] * num_susceptible),
+    }
+
+
+DEFAULT_CONFIG = SimulationConfig()
@@ -0,0 +1,319 @@
+'''
+edge_list_loader.py
+
+This module loads real social graphs from SNAP-style edge lists ("u v" per line, extra columns
+ignored, '#' or '%' comment lines, plain text or .gz) into a memory-mapped CSR on disk, so the
+misinformation model can run on follower graphs with tens of millions of edges without building
+a networkx graph.
+
+The build streams the file in chunks and keeps only per-node arrays in memory:
+1. Node ids are collected and relabeled to 0..n-1 in increasing id order (relabel=True).
+2. Every edge is mapped, oriented as (min, max) and self loops are dropped; the pairs are written
+   to a temporary file and partitioned into node-range buckets small enough for memory_bytes.
+3. Each bucket is de-duplicated, which also symmetrizes the graph (u v and v u are one edge),
+   and node degrees are accumulated.
+4. Buckets are visited in node order and scattered into the on-disk CSR arrays; rows come out
+   sorted, as in GraphArrays built from networkx.
+
+The result is a GraphArrays over read-only memory maps that plugs directly into
+assign_roles_bulk(), initialize_p_shares_bulk(), assign_trust_levels_bulk() (with community labels
+from a SNAP community file, one community per line) and the array engine.
+
+It includes:
+- iter_edge_chunks(): streaming parser of edge list files
+- read_communities(): per-node labels from a SNAP community file
+- build_csr() / load_csr(): on-disk CSR build and memory-mapped loading
+
+Command line usage:
+    python edge_list_loader.py soc-LiveJournal1.txt.gz graph_dir --communities com-lj.top5000.cmty.txt.gz
+'''
+
+import argparse
+import gzip
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+from typing import Iterator, List, Tuple
+import numpy as np
+
+from graph_arrays import GraphArrays
+
+DEFAULT_CHUNK_EDGES = 1_000_000
+DEFAULT_MEMORY_BYTES = 256 * 1024 ** 2
+_BYTES_PER_BUCKET_EDGE = 96  # peak working memory per raw edge while a bucket is de-duplicated and scattered
+
+CSR_FILES = ('indptr', 'indices', 'slot_edge', 'edge_u', 'edge_v', 'node_ids')
+
+
+def _open_text(path: str):
+    return gzip.open(path, 'rt') if path.endswith('.gz') else open(path, 'r')
+
+
+def iter_edge_chunks(path: str, chunk_edges: int = DEFAULT_CHUNK_EDGES) -> Iterator[np.ndarray]:
+    """
+    Streams an edge list file as (k, 2) int64 arrays of at most chunk_edges edges.
+
+    Parameters:
+        path : str. Edge list file, gzip-compressed if it ends with .gz.
+        chunk_edges : int. Maximum number of lines per chunk.
+
+    Examples:
+        >>> path = os.path.join(tempfile.mkdtemp(), 'edges.txt')
+        >>> _ = open(path, 'w').write('# comment\\n1 2\\n2 3 1577836800\\n\\n3 1\\n')
+        >>> [chunk.tolist() for chunk in iter_edge_chunks(path, chunk_edges=2)]
+        [[[1, 2]], [[2, 3]], [[3, 1]]]
+    """
+    with _open_text(path) as f:
+        while True:
+            lines = list(itertools.islice(f, chunk_edges))
+            if not lines:
+                return
+            lines = [line for line in lines if line.strip() and line[0] not in '#%']
+            if lines:
+                yield np.loadtxt(lines, dtype=np.int64, usecols=(0, 1), ndmin=2)
+
+
+def _collect_node_ids(path: str, chunk_edges: int) -> np.ndarray:
+    # sorted unique node ids; chunk results are merged once they outgrow the merged set
+    node_ids = np.empty(0, dtype=np.int64)
+    pending: List[np.ndarray] = []
+    pending_size = 0
+    for chunk in iter_edge_chunks(path, chunk_edges):
+        pending.append(np.unique(chunk))
+        pending_size += len(pending[-1])
+        if pending_size > max(len(node_ids), chunk_edges):
+            node_ids = np.unique(np.concatenate([node_ids] + pending))
+            pending, pending_size = [], 0
+    return np.unique(np.concatenate([node_ids] + pending))
+
+
+def _bucket_starts(lo_counts: np.ndarray, max_edges: int) -> np.ndarray:
+    # first node of every bucket so that each bucket holds about max_edges raw edges
+    cumulative = np.cumsum(lo_counts)
+    targets = np.arange(max_edges, cumulative[-1] if len(cumulative) else 0, max_edges)
+    return np.unique(np.concatenate([[0], np.searchsorted(cumulative, targets, side='right')]))
+
+
+def read_communities(path: str, node_ids: np.ndarray) -> np.ndarray:
+    """
+    Reads a SNAP community file (one community per line, member ids separated by whitespace) into
+    one label per node; nodes in several communities keep the first, nodes in none get -1.
+
+    Parameters:
+        path : str. Community file, gzip-compressed if it ends with .gz.
+        node_ids : np.ndarray. Sorted original id of every node (as returned by build_csr()).
+
+    Returns:
+        np.ndarray : int32 community label per node.
+    """
+    labels = np.full(len(node_ids), -1, dtype=np.int32)
+    with _open_text(path) as f:
+        community = 0
+        for line in f:
+            if not line.strip() or line[0] in '#%':
+                continue
+            members = np.array(line.split(), dtype=np.int64)
+            positions = np.searchsorted(node_ids, members)
+            known = positions < len(node_ids)
+            known[known] = node_ids[positions[known]] == members[known]
+            positions = positions[known]
+            positions = positions[labels[positions] < 0]
+            labels[positions] = community
+            community += 1
+    return labels
+
+
+def build_csr(path: str, out_dir: str, chunk_edges: int = DEFAULT_CHUNK_EDGES,
+              memory_bytes: int = DEFAULT_MEMORY_BYTES, relabel: bool = True,
+              community_path: str | None = None) -> Tuple[GraphArrays, np.ndarray]:
+    """
+    Builds the undirected, de-duplicated CSR of an edge list file in out_dir (one .npy file per
+    array, see CSR_FILES) and returns it memory-mapped.
+
+    Parameters:
+        path : str. Edge list file (plain text or .gz).
+        out_dir : str. Output directory (created if missing; existing CSR files are overwritten).
+        chunk_edges : int. Lines parsed per chunk.
+        memory_bytes : int. Approximate working memory for the bucket passes (per-node arrays excluded).
+        relabel : bool. Map the sorted distinct ids to 0..n-1; if False, ids must already be
+            non-negative node numbers and n = largest id + 1.
+        community_path : str or None. Optional SNAP community file for trust assignment.
+
+    Returns:
+        graph : GraphArrays. Read-only memory-mapped network (with community labels if given).
+        node_ids : np.ndarray. Original id of every node.
+
+    Examples:
+        >>> import networkx as nx
+        >>> folder = tempfile.mkdtemp()
+        >>> path = os.path.join(folder, 'edges.txt.gz')
+        >>> with gzip.open(path, 'wt') as f:
+        ...     _ = f.write('# FromNodeId ToNodeId\\n10 20\\n20 10\\n10 30\\n30 30\\n40 10\\n20 30\\n10 20\\n')
+        >>> graph, node_ids = build_csr(path, os.path.join(folder, 'csr'), chunk_edges=3, memory_bytes=200)
+        >>> node_ids.tolist(), graph.num_edges, graph.degrees().tolist()
+        ([10, 20, 30, 40], 4, [3, 2, 2, 1])
+        >>> G = nx.relabel_nodes(nx.Graph([(10, 20), (10, 30), (40, 10), (20, 30)]), {10: 0, 20: 1, 30: 2, 40: 3})
+        >>> reference = GraphArrays.from_networkx(G)
+        >>> bool((graph.indices == reference.indices).all() and (graph.indptr == reference.indptr).all())
+        True
+        >>> rows = np.repeat(np.arange(graph.num_nodes), graph.degrees())  # every slot points at its edge
+        >>> graph.edge_u[graph.slot_edge].tolist() == np.minimum(rows, graph.indices).tolist()
+        True
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=out_dir, prefix='build-')
+    try:
+        if relabel:
+            node_ids = _collect_node_ids(path, chunk_edges)
+        else:
+            largest = max((int(chunk.max()) for chunk in iter_edge_chunks(path, chunk_edges)), default=-1)
+            node_ids = np.arange(largest + 1, dtype=np.int64)
+        num_nodes = len(node_ids)
+
+        # oriented, relabeled pairs without self loops
+        pairs_path = os.path.join(work_dir, 'pairs.bin')
+        lo_counts = np.zeros(num_nodes, dtype=np.int64)
+        with open(pairs_path, 'wb') as f:
+            for chunk in iter_edge_chunks(path, chunk_edges):
+                mapped = np.searchsorted(node_ids, chunk) if relabel else chunk
+                lo, hi = mapped.min(axis=1), mapped.max(axis=1)
+                keep = lo != hi
+                pair = np.column_stack([lo[keep], hi[keep]]).astype(np.int32)
+                pair.tofile(f)
+                lo_counts += np.bincount(pair[:, 0], minlength=num_nodes)
+
+        # partition into node-range buckets
+        starts = _bucket_starts(lo_counts, max(1, memory_bytes // _BYTES_PER_BUCKET_EDGE))
+        bucket_paths = [os.path.join(work_dir, f'bucket_{b}.bin') for b in range(len(starts))]
+        bucket_files = [open(bucket_path, 'wb') for bucket_path in bucket_paths]
+        try:
+            with open(pairs_path, 'rb') as f:
+                while True:
+                    pair = np.fromfile(f, dtype=np.int32, count=2 * chunk_edges).reshape(-1, 2)
+                    if not len(pair):
+                        break
+                    bucket = np.searchsorted(starts, pair[:, 0], side='right') - 1
+                    order = np.argsort(bucket, kind='stable')
+                    bounds = np.searchsorted(bucket[order], np.arange(1, len(starts)))
+                    for b, part in enumerate(np.split(pair[order], bounds)):
+                        if len(part):
+                            part.tofile(bucket_files[b])
+        finally:
+            for bucket_file in bucket_files:
+                bucket_file.close()
+        os.remove(pairs_path)
+
+        # de-duplicate every bucket and count degrees
+        degree = np.zeros(num_nodes, dtype=np.int64)
+        bucket_edges = []
+        for bucket_path in bucket_paths:
+            pair = np.fromfile(bucket_path, dtype=np.int32).reshape(-1, 2).astype(np.int64)
+            key = np.unique(pair[:, 0] * num_nodes + pair[:, 1])
+            pair = np.column_stack([key // num_nodes, key % num_nodes]).astype(np.int32)
+            pair.tofile(bucket_path)
+            degree += np.bincount(pair.ravel(), minlength=num_nodes)
+            bucket_edges.append(len(pair))
+        num_edges = sum(bucket_edges)
+
+        # scatter the buckets into the on-disk arrays
+        def create(name: str, dtype, length: int) -> np.ndarray:
+            return np.lib.format.open_memmap(os.path.join(out_dir, name + '.npy'), mode='w+', dtype=dtype,
+                                             shape=(length,))
+
+        indptr = create('indptr', np.int64, num_nodes + 1)
+        indptr[0] = 0
+        np.cumsum(degree, out=indptr[1:])
+        indices = create('indices', np.int32, 2 * num_edges)
+        slot_edge = create('slot_edge', np.int64, 2 * num_edges)
+        edge_u = create('edge_u', np.int32, num_edges)
+        edge_v = create('edge_v', np.int32, num_edges)
+        cursor = np.array(indptr[:-1])
+        first_edge = 0
+        for bucket_path, count in zip(bucket_paths, bucket_edges):
+            pair = np.fromfile(bucket_path, dtype=np.int32).reshape(-1, 2)
+            edge_ids = np.arange(first_edge, first_edge + count, dtype=np.int64)
+            edge_u[first_edge:first_edge + count] = pair[:, 0]
+            edge_v[first_edge:first_edge + count] = pair[:, 1]
+            rows = np.concatenate([pair[:, 0], pair[:, 1]])
+            cols = np.concatenate([pair[:, 1], pair[:, 0]])
+            order = np.lexsort((cols, rows))
+            rows, cols = rows[order], cols[order]
+            row_ids, row_first, row_counts = np.unique(rows, return_index=True, return_counts=True)
+            positions = cursor[rows] + np.arange(len(rows)) - np.repeat(row_first, row_counts)
+            indices[positions] = cols
+            slot_edge[positions] = np.concatenate([edge_ids, edge_ids])[order]
+            cursor[row_ids] += row_counts
+            first_edge += count
+            os.remove(bucket_path)
+        for array in (indptr, indices, slot_edge, edge_u, edge_v):
+            array.flush()
+        np.save(os.path.join(out_dir, 'node_ids.npy'), node_ids)
+        if community_path is not None:
+            np.save(os.path.join(out_dir, 'community.npy'), read_communities(community_path, node_ids))
+        elif os.path.exists(os.path.join(out_dir, 'community.npy')):
+            os.remove(os.path.join(out_dir, 'community.npy'))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return load_csr(out_dir)
+
+
+def load_csr(directory: str, mmap_mode: str = 'r') -> Tuple[GraphArrays, np.ndarray]:
+    """
+    Opens a CSR written by build_csr() as memory maps.
+
+    Parameters:
+        directory : str. Output directory of build_csr().
+        mmap_mode : str. numpy memory-map mode ('r' read-only, 'c' copy-on-write).
+
+    Returns:
+        graph : GraphArrays. Memory-mapped network (with community labels if they were built).
+        node_ids : np.ndarray. Original id of every node.
+
+    Examples:
+        >>> from agent_initializer import assign_roles_bulk, assign_trust_levels_bulk
+        >>> from simulation import initialize_p_shares_bulk
+        >>> from engine import simulate_spread_arrays
+        >>> folder = tempfile.mkdtemp()
+        >>> edges, communities = os.path.join(folder, 'edges.txt'), os.path.join(folder, 'cmty.txt')
+        >>> rng = np.random.default_rng(0)
+        >>> np.savetxt(edges, rng.integers(0, 300, size=(3000, 2)) * 7 + 100, fmt='%d')
+        >>> _ = open(communities, 'w').write(' '.join(str(i * 7 + 100) for i in range(150)) + '\\n')
+        >>> _ = build_csr(edges, folder, community_path=communities)
+        >>> graph, node_ids = load_csr(folder)
+        >>> sorted(set(graph.community.tolist())), isinstance(graph.indices, np.memmap)
+        ([-1, 0], True)
+        >>> roles = assign_roles_bulk(graph.degrees(), rng)
+        >>> initialize_p_shares_bulk(roles, rng)
+        >>> _ = assign_trust_levels_bulk(graph, rng)
+        >>> stats, _, _, _ = simulate_spread_arrays(graph, roles, rng=rng)
+        >>> stats['fake'][0] > 0
+        True
+    """
+    arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode) for name in CSR_FILES}
+    community_path = os.path.join(directory, 'community.npy')
+    community = np.load(community_path) if os.path.exists(community_path) else None
+    graph = GraphArrays.from_arrays(arrays['edge_u'], arrays['edge_v'], arrays['indptr'], arrays['indices'],
+                                    arrays['slot_edge'], community=community)
+    return graph, arrays['node_ids']
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build a memory-mapped CSR from a SNAP-style edge list.")
+    parser.add_argument('edges', help="edge list file (plain text or .gz)")
+    parser.add_argument('out_dir', help="output directory of the CSR arrays")
+    parser.add_argument('--communities', help="SNAP community file (one community per line)")
+    parser.add_argument('--chunk-edges', type=int, default=DEFAULT_CHUNK_EDGES)
+    parser.add_argument('--memory-mb', type=int, default=DEFAULT_MEMORY_BYTES // 1024 ** 2)
+    parser.add_argument('--no-relabel', action='store_true', help="ids are already node numbers 0..n-1")
+    args = parser.parse_args(argv)
+
+    graph, _ = build_csr(args.edges, args.out_dir, chunk_edges=args.chunk_edges,
+                         memory_bytes=args.memory_mb * 1024 ** 2, relabel=not args.no_relabel,
+                         community_path=args.communities)
+    print(f"{graph.num_nodes} nodes, {graph.num_edges} undirected edges written to {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
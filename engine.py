@@ -0,0 +1,487 @@
+'''
+engine.py
+
+This module contains an array-based propagation engine that follows the same model as
+simulate_spread() in simulation.py, but keeps all per-agent state in NumPy arrays and
+processes every share scheduled for a round as one vectorized batch:
+
+- Shares of a round are shuffled, de-duplicated and expanded into (sender, receiver) contacts.
+  On a GraphArrays, the transmission probability of every contact is read from a per-slot table
+  built once per run (see transmission_table()); other graphs provide trust through expand().
+- Transmission, fact-checker flagging, Hypothesis 3 belief revision and delay sampling are
+  decided with array operations; when several senders reach the same agent in a round, the
+  first successful one (in shuffled order) wins, as in the sequential loop.
+
+Any graph object providing expand(sources) -> (owner, neighbors, trust) and num_nodes can be
+used: GraphArrays (explicit CSR), ImplicitSocialGraph (procedurally generated adjacency) or
+DynamicCSR (temporal_graph.py). Agent roles and share probabilities come from an AgentArrays.
+
+With config.temporal_rewire_rate > 0 (temporal mode), the run's network is copied into a
+DynamicCSR and edges are rewired in place after every round (see temporal_graph.rewire_edges()).
+
+Because all draws come from a numpy Generator in a different order than the reference loop,
+results match simulate_spread() in distribution rather than bit for bit.
+'''
+
+import copy
+from collections import defaultdict
+from typing import Dict, Any, Tuple
+import numpy as np
+from config import *
+from news_item import NewsItem
+from graph_arrays import AgentArrays
+from event_trace import TraceRecorder, EVENT_SEED, EVENT_SHARE, EVENT_INFECT, EVENT_REVISION
+from lineage import CascadeLineage
+from temporal_graph import DynamicCSR, rewire_edges
+
+FAKE = 0
+REAL = 1
+NO_BELIEF = -1
+NEWS_TYPES = ('fake', 'real')
+
+
+def delay_table(delay_dist: Dict[int, float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converts a delay distribution into arrays of delays and cumulative probabilities.
+
+    Parameters:
+        delay_dist : dict. Delay distribution dictionary (delay: probability).
+
+    Returns:
+        delays : np.ndarray. Delays in increasing order.
+        cumulative : np.ndarray. Cumulative probability of each delay.
+
+    Examples:
+        >>> delays, cumulative = delay_table({6: 0.85, 12: 0.10, 18: 0.05})
+        >>> delays.tolist(), round(float(cumulative[-1]), 6)
+        ([6, 12, 18], 1.0)
+    """
+    delays = sorted(delay_dist)
+    cumulative = np.cumsum([delay_dist[d] for d in delays])
+    return np.array(delays, dtype=np.int64), cumulative
+
+
+def draw_delays(table: Tuple[np.ndarray, np.ndarray], uniforms: np.ndarray) -> np.ndarray:
+    """
+    Maps uniform draws to delays: the first delay whose cumulative probability covers the draw
+    (same rule as sample_delay_from_distribution).
+
+    Parameters:
+        table : tuple. Delays and cumulative probabilities from delay_table().
+        uniforms : np.ndarray. Uniform draws in [0, 1).
+
+    Returns:
+        np.ndarray : Delay of every draw.
+
+    Examples:
+        >>> draw_delays(delay_table({1: 0.7, 2: 0.3}), np.array([0.1, 0.7, 0.9])).tolist()
+        [1, 1, 2]
+    """
+    delays, cumulative = table
+    idx = np.minimum(np.searchsorted(cumulative, uniforms, side='left'), len(delays) - 1)
+    return delays[idx]
+
+
+def transmission_table(graph, roles: AgentArrays, config: SimulationConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """
+    Precomputes the unflagged transmission probability of every directed CSR edge (slot): the source's
+    share probability times the edge trust, times 1.2 for influencer sources under Variant C. None of
+    these change during a run; only the fake news flag (a scalar 0.3 factor) does.
+
+    Parameters:
+        graph : GraphArrays. Network with trust weights.
+        roles : AgentArrays. Share probabilities and influencer flags of every agent.
+        config : SimulationConfig. Gives the Variant C flag.
+
+    Returns:
+        np.ndarray : float32 array of shape (2, number of slots); row FAKE and row REAL.
+
+    Examples:
+        >>> import networkx as nx
+        >>> from graph_arrays import GraphArrays
+        >>> graph = GraphArrays.from_networkx(nx.path_graph(2))
+        >>> roles = AgentArrays(2)
+        >>> roles.p_share_fake[:] = 0.5; roles.p_share_real[:] = 0.1; roles.is_influencer[0] = True
+        >>> transmission_table(graph, roles, DEFAULT_CONFIG.replace(variant_C=True)).astype(float).round(3).tolist()
+        [[0.3, 0.25], [0.06, 0.05]]
+    """
+    sources = np.repeat(np.arange(graph.num_nodes), np.diff(graph.indptr))
+    weight = graph.slot_trust
+    if config.variant_C:
+        weight = weight * np.where(roles.is_influencer, 1.2, 1.0)[sources]
+    table = np.empty((2, len(sources)), dtype=np.float32)
+    np.multiply(roles.p_share_fake[sources], weight, out=table[FAKE], casting='same_kind')
+    np.multiply(roles.p_share_real[sources], weight, out=table[REAL], casting='same_kind')
+    return table
+
+
+def first_per_target(candidates: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Keeps, for every distinct target, only the first candidate (in array order) that reaches it.
+
+    Parameters:
+        candidates : np.ndarray. Indices of candidate contacts, in processing order.
+        targets : np.ndarray. Receiving agent of every contact.
+
+    Returns:
+        np.ndarray : Subset of candidates, still in processing order.
+
+    Examples:
+        >>> first_per_target(np.array([0, 1, 2, 3]), np.array([5, 6, 5, 7])).tolist()
+        [0, 1, 3]
+    """
+    _, first = np.unique(targets[candidates], return_index=True)
+    return candidates[np.sort(first)]
+
+
+class CascadeState:
+    """
+    Mutable state of one array-engine run, advanced one round at a time.
+
+    Attributes:
+        config : SimulationConfig. Parameters of the run.
+        belief : np.ndarray. int8 belief per agent (NO_BELIEF, FAKE or REAL).
+        has_shared : np.ndarray. Boolean (2, n) array; whether each agent shared each news type.
+        infected : np.ndarray. Boolean (2, n) array; whether each agent was ever reached by each news type.
+        reach : list. Number of agents ever reached by fake and real news.
+        shared_count : list. Number of shares of fake and real news.
+        flagged : bool. Whether the fake news has been flagged by a fact-checker.
+        revised : int. Number of belief revisions (Hypothesis 3).
+        lineage : CascadeLineage or None. Infection forest (always kept for Hypothesis 2, Variant A attribution).
+        graph : Network of the run; a private DynamicCSR that is rewired between rounds in temporal mode.
+        schedule : dict. round -> list of (agent ids, news codes) share batches.
+        round_num : int. Next round to simulate.
+        stats : dict. Reach per simulated round for 'fake' and 'real'.
+        done : bool. Whether the cascade has died out or max_rounds was reached.
+    """
+    def __init__(self, graph, roles: AgentArrays, rng: np.random.Generator, hypothesis: str | None = None,
+                 trace: TraceRecorder | None = None,
+                 transmission: np.ndarray | None = None, lineage: CascadeLineage | None = None,
+                 config: SimulationConfig = DEFAULT_CONFIG):
+        n = roles.num_agents
+        self.config = config
+        self.rewire_rate = config.temporal_rewire_rate
+        if self.rewire_rate > 0:
+            graph = DynamicCSR.from_graph(graph) if not isinstance(graph, DynamicCSR) else graph
+            transmission = None  # per-slot probabilities would go stale as edges change
+        self.graph = graph
+        self.roles = roles
+        self.rng = rng
+        self.hypothesis = hypothesis
+        self.revise = hypothesis == 'h3'
+        self.track_sources = hypothesis == 'h2' and config.variant_A
+        self.trace = trace
+
+        # Per-run constant tables
+        self.p_share = np.stack([roles.p_share_fake, roles.p_share_real])
+        self.trust_boost = np.where(roles.is_influencer, 1.2, 1.0) if config.variant_C else None
+        if transmission is None and hasattr(graph, 'expand_slots'):
+            transmission = transmission_table(graph, roles, config)
+        self.transmission = transmission
+        self.delay_tables = (config.delay_arrays['fake'], config.delay_arrays['real'])
+        self.influencer_fake_delays = config.delay_arrays['influencer_fake'] if config.variant_B else None
+
+        # Mutable state
+        self.belief = np.full(n, NO_BELIEF, dtype=np.int8)
+        self.has_shared = np.zeros((2, n), dtype=bool)
+        self.infected = np.zeros((2, n), dtype=bool)
+        self.reach = [0, 0]
+        self.shared_count = [0, 0]
+        self.flagged = False
+        self.revised = 0
+        if lineage is None and self.track_sources:
+            lineage = CascadeLineage(n)
+        self.lineage = lineage
+        self.schedule = defaultdict(list)
+        self.round_num = 0
+        self.done = False
+        self.stats = {'fake': [], 'real': []}
+
+    def seed_news(self, real_news_delay: int = 0) -> None:
+        """
+        Seeds both news types and schedules the seeds' first shares (as in simulate_spread).
+
+        Parameters:
+            real_news_delay : int. Delay in seeding real news (used in Hypothesis 3).
+
+        Returns:
+            None
+        """
+        for code, news_type in enumerate(NEWS_TYPES):
+            delay_round = real_news_delay if news_type == 'real' and self.hypothesis == 'h3' else 0
+            if self.track_sources:
+                seeds = self._select_seeds_variant()
+            else:
+                seeds = self.rng.choice(self.roles.num_agents, self.config.seed_count, replace=False)
+            codes = np.full(len(seeds), code, dtype=np.int8)
+            self.belief[seeds] = code
+            self._schedule(seeds, codes, self._sample_delays(seeds, codes) + delay_round)
+            self._mark_infected(seeds, codes)
+            if self.lineage is not None:
+                self.lineage.add_seeds(code, seeds, self.roles.is_influencer)
+            if self.trace is not None:
+                self.trace.record_many(0, -1, seeds, code, EVENT_SEED)
+
+    def _select_seeds_variant(self) -> np.ndarray:
+        influencers = np.flatnonzero(self.roles.is_influencer)
+        others = np.flatnonzero(~self.roles.is_influencer)
+        seed_influencers = self.rng.choice(influencers, min(7, len(influencers)), replace=False)
+        seed_others = self.rng.choice(others, self.config.seed_count - len(seed_influencers), replace=False)
+        return np.concatenate([seed_influencers, seed_others])
+
+    def _sample_delays(self, agents: np.ndarray, codes: np.ndarray, variant: bool = True) -> np.ndarray:
+        uniforms = self.rng.random(len(agents))
+        delays = np.empty(len(agents), dtype=np.int64)
+        for code in (FAKE, REAL):
+            mask = codes == code
+            delays[mask] = draw_delays(self.delay_tables[code], uniforms[mask])
+        if variant and self.influencer_fake_delays is not None:
+            fast = (codes == FAKE) & self.roles.is_influencer[agents]
+            delays[fast] = draw_delays(self.influencer_fake_delays, uniforms[fast])
+        return delays
+
+    def _schedule(self, agents: np.ndarray, codes: np.ndarray, rounds: np.ndarray) -> None:
+        for share_round in np.unique(rounds).tolist():
+            mask = rounds == share_round
+            self.schedule[share_round].append((agents[mask], codes[mask]))
+
+    def _mark_infected(self, agents: np.ndarray, codes: np.ndarray) -> None:
+        fresh = ~self.infected[codes, agents]
+        self.infected[codes, agents] = True
+        counts = np.bincount(codes[fresh], minlength=2)
+        self.reach[FAKE] += int(counts[FAKE])
+        self.reach[REAL] += int(counts[REAL])
+
+    def advance_round(self) -> None:
+        """
+        Processes every share scheduled for the current round and records the round's reach.
+
+        Returns:
+            None
+        """
+        round_num = self.round_num
+        batches = self.schedule.pop(round_num, None)
+        if batches:
+            ids = np.concatenate([agents for agents, _ in batches])
+            codes = np.concatenate([codes for _, codes in batches])
+            order = self.rng.permutation(len(ids)) # Randomize processing order of events to avoid bias
+            ids, codes = ids[order], codes[order]
+
+            # keep the first share of each (agent, news) pair that has not been shared yet
+            keep = first_per_target(np.arange(len(ids)), codes.astype(np.int64) * self.roles.num_agents + ids)
+            ids, codes = ids[keep], codes[keep]
+            fresh = ~self.has_shared[codes, ids]
+            ids, codes = ids[fresh], codes[fresh]
+
+            if len(ids):
+                self.has_shared[codes, ids] = True
+                counts = np.bincount(codes, minlength=2)
+                self.shared_count[FAKE] += int(counts[FAKE])
+                self.shared_count[REAL] += int(counts[REAL])
+                if self.trace is not None:
+                    self.trace.record_many(round_num, ids, np.full(len(ids), -1), codes, EVENT_SHARE)
+                self._propagate(ids, codes, round_num)
+
+        self.stats['fake'].append(self.reach[FAKE])
+        self.stats['real'].append(self.reach[REAL])
+        self.round_num += 1
+        if not self.schedule or self.round_num >= self.config.max_rounds: # spread is over
+            self.done = True
+        elif self.rewire_rate > 0:
+            rewire_edges(self.graph, self.rewire_rate, self.rng)
+
+    def _contacts(self, ids: np.ndarray, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (owner, neighbor, unflagged transmission probability) of every contact
+        if self.transmission is not None:
+            owner, slots = self.graph.expand_slots(ids)
+            return owner, self.graph.indices[slots], self.transmission[codes[owner], slots]
+        owner, neighbors, trust = self.graph.expand(ids)
+        threshold = self.p_share[codes[owner], ids[owner]] * trust
+        if self.trust_boost is not None:
+            threshold *= self.trust_boost[ids[owner]]
+        return owner, neighbors, threshold
+
+    def _propagate(self, ids: np.ndarray, codes: np.ndarray, round_num: int) -> None:
+        owner, neighbors, threshold = self._contacts(ids, codes)
+        sources = ids[owner]
+        news = codes[owner]
+        beliefs = self.belief[neighbors]
+
+        if self.revise:
+            conflicting = (beliefs != NO_BELIEF) & (beliefs != news)
+            if conflicting.any():
+                self._revise(sources[conflicting], neighbors[conflicting], news[conflicting], round_num)
+
+        open_contacts = beliefs == NO_BELIEF
+        sources, neighbors, news, threshold = (sources[open_contacts], neighbors[open_contacts],
+                                               news[open_contacts], threshold[open_contacts])
+        if len(neighbors) == 0:
+            return
+
+        is_fake = news == FAKE
+        if self.flagged:
+            threshold[is_fake] *= 0.3 # reduce trust for flagged fake news
+        uniforms = self.rng.random(len(neighbors))
+        accepted = uniforms < threshold
+
+        if not self.flagged:
+            # Fact-checker intervention: the first successful flag reduces trust for all later fake contacts
+            flag_at = self._first_flag(accepted & is_fake & self.roles.is_fact_checker[neighbors], neighbors)
+            if flag_at is not None:
+                self.flagged = True
+                later = is_fake & (np.arange(len(neighbors)) > flag_at)
+                accepted[later] = uniforms[later] < threshold[later] * 0.3
+
+        winners = first_per_target(np.flatnonzero(accepted), neighbors)
+        targets, senders, target_news = neighbors[winners], sources[winners], news[winners]
+        self.belief[targets] = target_news
+        self._mark_infected(targets, target_news)
+        if self.lineage is not None:
+            self.lineage.record_many(target_news, targets, senders) # Inherit source for comparison during H2
+        if self.trace is not None:
+            self.trace.record_many(round_num, senders, targets, target_news, EVENT_INFECT)
+        self._schedule(targets, target_news, round_num + self._sample_delays(targets, target_news))
+
+    def _first_flag(self, fact_checker_hits: np.ndarray, neighbors: np.ndarray) -> int | None:
+        candidates = first_per_target(np.flatnonzero(fact_checker_hits), neighbors)
+        if len(candidates) == 0:
+            return None
+        flags = candidates[self.rng.random(len(candidates)) < self.config.p_fact_check]
+        return int(flags[0]) if len(flags) else None
+
+    def _revise(self, sources: np.ndarray, neighbors: np.ndarray, news: np.ndarray, round_num: int) -> None:
+        # an agent that already believes the other news may check the facts and change its belief
+        revision_chance = np.where(self.roles.is_fact_checker[neighbors], self.config.p_belief_revision, 0.25)
+        hits = first_per_target(np.flatnonzero(self.rng.random(len(neighbors)) < revision_chance), neighbors)
+        targets, senders, target_news = neighbors[hits], sources[hits], news[hits]
+        self.belief[targets] = target_news
+        self._mark_infected(targets, target_news)
+        self.revised += len(targets)
+        if self.lineage is not None:
+            self.lineage.record_many(target_news, targets, senders)
+        if self.trace is not None:
+            self.trace.record_many(round_num, senders, targets, target_news, EVENT_REVISION)
+        self._schedule(targets, target_news, round_num + self._sample_delays(targets, target_news, variant=False))
+
+    def run(self) -> None:
+        """Advances the cascade until it dies out or max_rounds is reached."""
+        while not self.done:
+            self.advance_round()
+
+    def fork(self, rng: np.random.Generator) -> 'CascadeState':
+        """
+        Returns an independent copy of the run that continues with its own random generator. The
+        network, roles and per-run tables are shared; forks are not traced.
+
+        Parameters:
+            rng : np.random.Generator. Random generator of the copy.
+
+        Returns:
+            CascadeState : The copy, at the same round.
+        """
+        clone = copy.copy(self)
+        clone.rng = rng
+        clone.trace = None
+        if self.rewire_rate > 0:
+            clone.graph = self.graph.copy()
+        clone.belief = self.belief.copy()
+        clone.has_shared = self.has_shared.copy()
+        clone.infected = self.infected.copy()
+        clone.reach = list(self.reach)
+        clone.shared_count = list(self.shared_count)
+        clone.lineage = copy.deepcopy(self.lineage)
+        # scheduled batches are never modified in place, so the lists can share them
+        clone.schedule = defaultdict(list, {share_round: list(batches) for share_round, batches in self.schedule.items()})
+        clone.stats = {news_type: list(reach) for news_type, reach in self.stats.items()}
+        return clone
+
+    def results(self) -> tuple[dict[str, list[int]], dict[str, int], int, dict[str, int]]:
+        """
+        Returns the run outcome in the same form as simulate_spread().
+
+        Returns:
+            stats : dict[str, list[int]]. Reach by round for each news type.
+            final_beliefs : dict[str, int]. Final number of agents believing fake or real news.
+            belief_revised_count : int. Number of belief revisions.
+            influencer_impact : dict[str, int]. Spread attribution (influencer vs. normal) for fake news (only in H2).
+        """
+        final_beliefs = {'fake': int((self.belief == FAKE).sum()), 'real': int((self.belief == REAL).sum())}
+        influencer_impact = {'influencer': 0, 'normal': 0}
+        if self.track_sources:
+            influencer_impact = self.lineage.origin_counts(FAKE)
+        return self.stats, final_beliefs, self.revised, influencer_impact
+
+
+def simulate_spread_arrays(graph, roles: AgentArrays, news_items: Dict[str, NewsItem] | None = None, hypothesis=None,
+                           real_news_delay=0,
+                           rng: np.random.Generator | None = None, trace: TraceRecorder | None = None,
+                           transmission: np.ndarray | None = None,
+                           lineage: CascadeLineage | None = None,
+                           config: SimulationConfig = DEFAULT_CONFIG) -> tuple[dict[str, list[int]], dict[str, int], int, dict[str, int]]:
+    """
+    Array-engine counterpart of simulate_spread(): simulates the round-based spread of fake and
+    real news with the same hypothesis and variant options.
+
+    Parameters:
+        graph : GraphArrays or ImplicitSocialGraph. Network providing expand() with trust weights.
+        roles : AgentArrays. Roles and share probabilities of every agent.
+        news_items : dict or None. If given, shared_count and is_flagged_fake of the 'fake' and 'real' items are updated.
+        hypothesis : str or None. One of 'h2', 'h3', or None to control variant logic.
+        real_news_delay : int. Optional delay in seeding real news (used in Hypothesis 3).
+        rng : np.random.Generator or None. Per-run random generator (a fresh one if None).
+        trace : TraceRecorder or None. If given, every seed, share, infection and belief revision is recorded into it.
+        transmission : np.ndarray or None. Per-slot table from transmission_table(), if already built for this
+            graph, roles and variant flags (built on the fly for a GraphArrays otherwise).
+        lineage : CascadeLineage or None. If given, filled with the infection forest of the run.
+        config : SimulationConfig. Seed count, fact-checking and revision probabilities, delays, round limit and
+            Hypothesis 2 variant flags.
+
+    Returns:
+        stats : dict[str, list[int]]. Reach by round for each news type.
+        final_beliefs : dict[str, int]. Final number of agents believing fake or real news.
+        belief_revised_count : int. Number of agents who switched beliefs after receiving conflicting news.
+        influencer_impact : dict[str, int]. Spread attribution (influencer vs. normal) for fake news (only in H2).
+
+    Examples:
+        >>> import networkx as nx
+        >>> from graph_arrays import GraphArrays
+        >>> from agent_initializer import assign_roles_bulk
+        >>> from simulation import initialize_p_shares_bulk
+        >>> rng = np.random.default_rng(0)
+        >>> graph = GraphArrays.from_networkx(nx.erdos_renyi_graph(200, 0.05, seed=1))
+        >>> roles = assign_roles_bulk(graph.degrees(), rng)
+        >>> initialize_p_shares_bulk(roles, rng)
+        >>> stats, beliefs, revised, impact = simulate_spread_arrays(graph, roles, hypothesis='h3', rng=rng)
+        >>> stats['fake'][0] >= seed_count and len(stats['fake']) == len(stats['real'])
+        True
+        >>> from lineage import CascadeLineage
+        >>> lineage = CascadeLineage(roles.num_agents)
+        >>> stats, _, _, _ = simulate_spread_arrays(graph, roles, rng=rng, lineage=lineage)
+        >>> sum(lineage.reach_per_seed(0).values()) == stats['fake'][-1]
+        True
+        >>> edges = graph.indices.copy()
+        >>> temporal = DEFAULT_CONFIG.replace(temporal_rewire_rate=0.05)
+        >>> stats, _, _, _ = simulate_spread_arrays(graph, roles, rng=rng, config=temporal)
+        >>> stats['fake'][-1] > 0 and bool(np.array_equal(graph.indices, edges))  # the caller's graph stays static
+        True
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    state = CascadeState(graph, roles, rng, hypothesis=hypothesis, trace=trace,
+                         transmission=transmission, lineage=lineage, config=config)
+    state.seed_news(real_news_delay)
+    state.run()
+
+    if news_items is not None:
+        news_items['fake'].shared_count += state.shared_count[FAKE]
+        news_items['real'].shared_count += state.shared_count[REAL]
+        news_items['fake'].is_flagged_fake = news_items['fake'].is_flagged_fake or state.flagged
+    if trace is not None:
+        trace.metadata.update({
+            'num_agents': roles.num_agents,
+            'rounds': len(state.stats['fake']),
+            'hypothesis': hypothesis,
+            'variant_flags': config.variant_flags,
+            'influencers': np.flatnonzero(roles.is_influencer).tolist(),
+        })
+    return state.results()
@@ -0,0 +1,230 @@
+'''
+equivalence.py
+
+This module checks that an alternative simulation engine reproduces the behavior of the reference
+engine (simulate_spread() on the networkx graph). Engines that consume random numbers differently
+cannot give bit-identical runs, so the check is statistical: both engines run the same experiment
+points with independent seeds, and the distribution of every per-run outcome is compared.
+
+Per point and outcome, two checks must pass:
+- a two-sample Kolmogorov-Smirnov test at level alpha / (number of tests) (Bonferroni), which
+  catches changes in shape as well as location;
+- a tolerance band on the mean: |mean_candidate - mean_reference| <= rel_tol * |mean_reference|
+  + band_sigmas * standard error of the difference, which bounds systematic shifts.
+
+Outcomes compared (see outcomes.OUTCOMES): final reach, shares and believers of both news types, peak rounds,
+belief revision counts and the influencer / normal attribution of fake news reach.
+
+Engines are batch runners with the calling convention of run_baseline_simulation()
+(num_runs, seed, hypothesis, percent_fc, variant_flag, real_news_delay, config) returning
+(metrics, belief_revised_counts); register_engine() adds new ones. Wall time per point gives the
+speedup table of the report.
+
+It includes:
+- ENGINES / register_engine(): engine registry
+- ks_2samp(): two-sample Kolmogorov-Smirnov statistic and asymptotic p-value
+- default_points(): baseline, every H2 variant, H3 delays and H1 fact-checker percentages
+- compare_engines(), format_report()
+
+Command line usage:
+    python equivalence.py arrays --num-runs 300
+    python equivalence.py bitparallel --reference ensemble --num-runs 640
+'''
+
+import argparse
+import functools
+import math
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+
+from config import SimulationConfig, DEFAULT_CONFIG
+from baseline_run import run_baseline_simulation, RunOptions
+from parallel_run import run_parallel_simulation
+from bitparallel import run_bitparallel_simulation
+from sharding import experiment_points
+from outcomes import OUTCOMES, outcome_samples
+
+# Networks shared by the fixed-network engines, whatever the run seed: compare 'bitparallel' against
+# 'ensemble', which runs the array engine on the same networks
+FIXED_ENSEMBLE_SIZE = 4
+FIXED_NETWORK_SEED = 0
+
+ENGINES: Dict[str, Callable] = {
+    'reference': functools.partial(run_baseline_simulation, options=RunOptions(engine='reference')),
+    'arrays': functools.partial(run_baseline_simulation, options=RunOptions(engine='arrays')),
+    'partitioned': functools.partial(run_baseline_simulation, options=RunOptions(engine='partitioned')),
+    'ensemble': functools.partial(run_parallel_simulation, processes=0, ensemble_size=FIXED_ENSEMBLE_SIZE,
+                                  network_seed=FIXED_NETWORK_SEED),
+    'bitparallel': functools.partial(run_bitparallel_simulation, ensemble_size=FIXED_ENSEMBLE_SIZE,
+                                     network_seed=FIXED_NETWORK_SEED),
+}
+
+
+def register_engine(name: str, runner: Callable) -> None:
+    """
+    Registers a batch runner under name.
+
+    Parameters:
+        name : str. Engine name used by compare_engines().
+        runner : callable. runner(num_runs, seed=..., hypothesis=..., percent_fc=..., variant_flag=...,
+            real_news_delay=..., config=...) -> (metrics, belief_revised_counts), as run_baseline_simulation().
+    """
+    ENGINES[name] = runner
+
+
+def ks_2samp(x: np.ndarray, y: np.ndarray) -> Tuple[float, float]:
+    """
+    Two-sample Kolmogorov-Smirnov test.
+
+    Returns:
+        statistic : float. Largest distance between the two empirical distribution functions.
+        p_value : float. Asymptotic p-value (Kolmogorov distribution with the usual small-sample
+            correction); conservative for discrete outcomes such as counts.
+
+    Examples:
+        >>> rng = np.random.default_rng(0)
+        >>> statistic, p_value = ks_2samp(rng.normal(size=300), rng.normal(size=300))
+        >>> p_value > 0.05
+        True
+        >>> statistic, p_value = ks_2samp(rng.normal(size=300), rng.normal(0.5, size=300))
+        >>> p_value < 0.001
+        True
+        >>> ks_2samp(np.zeros(5), np.zeros(7))
+        (0.0, 1.0)
+    """
+    x, y = np.sort(np.asarray(x, dtype=float)), np.sort(np.asarray(y, dtype=float))
+    values = np.concatenate([x, y])
+    cdf_x = np.searchsorted(x, values, side='right') / len(x)
+    cdf_y = np.searchsorted(y, values, side='right') / len(y)
+    statistic = float(np.abs(cdf_x - cdf_y).max())
+    if statistic == 0.0:
+        return 0.0, 1.0
+    effective = math.sqrt(len(x) * len(y) / (len(x) + len(y)))
+    lam = (effective + 0.12 + 0.11 / effective) * statistic
+    p_value = 2.0 * sum((-1) ** (j - 1) * math.exp(-2.0 * j * j * lam * lam) for j in range(1, 101))
+    return statistic, float(min(1.0, max(0.0, p_value)))
+
+
+def default_points() -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Returns the experiment points compared by default: the baseline, every H2 variant, H3 with
+    delays 0, 3 and 6 and H1 with 50%, 70% and 90% fact-checkers.
+
+    Examples:
+        >>> [label for label, _ in default_points()][:2], len(default_points())
+        (['baseline', 'h2:baseline'], 12)
+    """
+    points = experiment_points('baseline')
+    for kind, values in (('h2', None), ('h3', [0, 3, 6]), ('h1', [0.5, 0.7, 0.9])):
+        points += [(f"{kind}:{label}", kwargs) for label, kwargs in experiment_points(kind, values)]
+    return points
+
+
+def _timed_samples(engine: str, num_runs: int, seed: int, kwargs: Dict[str, Any],
+                   config: SimulationConfig) -> Tuple[Dict[str, np.ndarray], float]:
+    start = time.perf_counter()
+    metrics, belief_revised_counts = ENGINES[engine](num_runs, seed=seed, config=config, **kwargs)
+    return outcome_samples(metrics, belief_revised_counts), time.perf_counter() - start
+
+
+def compare_engines(candidate: str, reference: str = 'reference',
+                    points: List[Tuple[str, Dict[str, Any]]] | None = None, num_runs: int = 200, seed: int = 0,
+                    alpha: float = 0.01, rel_tol: float = 0.05, band_sigmas: float = 3.0,
+                    config: SimulationConfig = DEFAULT_CONFIG) -> Dict[str, Any]:
+    """
+    Runs the reference and the candidate engine on every point and compares their outcome distributions.
+
+    Parameters:
+        candidate : str. Registered engine under test.
+        reference : str. Registered reference engine.
+        points : list or None. (label, run_baseline_simulation keyword arguments) pairs (default_points() if None).
+        num_runs : int. Runs per engine and point.
+        seed : int. Base seed; the reference uses seed and the candidate seed + 1, so samples are independent.
+        alpha : float. Family-wise significance level of the KS tests.
+        rel_tol : float. Relative shift of the mean tolerated beyond sampling noise.
+        band_sigmas : float. Width of the sampling-noise part of the mean band, in standard errors.
+        config : SimulationConfig. Base configuration of every point.
+
+    Returns:
+        dict : 'passed' (bool), 'rows' (one dict per point and outcome: point, outcome, means, ks
+            statistic and p-value, band, passed), 'timings' (one dict per point: reference and
+            candidate seconds, speedup) and the test settings.
+
+    Examples:
+        >>> report = compare_engines('arrays', points=[('baseline', {'hypothesis': None})], num_runs=30)
+        >>> report['passed'], len(report['rows']) == len(OUTCOMES)
+        (True, True)
+    """
+    points = default_points() if points is None else points
+    threshold = alpha / (len(points) * len(OUTCOMES))
+    rows, timings = [], []
+    for label, kwargs in points:
+        reference_samples, reference_seconds = _timed_samples(reference, num_runs, seed, kwargs, config)
+        candidate_samples, candidate_seconds = _timed_samples(candidate, num_runs, seed + 1, kwargs, config)
+        timings.append({'point': label, 'reference_seconds': reference_seconds,
+                        'candidate_seconds': candidate_seconds,
+                        'speedup': reference_seconds / candidate_seconds if candidate_seconds > 0 else math.inf})
+        for outcome in OUTCOMES:
+            x, y = reference_samples[outcome], candidate_samples[outcome]
+            statistic, p_value = ks_2samp(x, y)
+            difference = float(y.mean() - x.mean())
+            standard_error = math.sqrt(x.var(ddof=1) / len(x) + y.var(ddof=1) / len(y)) if num_runs > 1 else 0.0
+            band = rel_tol * abs(float(x.mean())) + band_sigmas * standard_error
+            rows.append({'point': label, 'outcome': outcome, 'reference_mean': float(x.mean()),
+                         'candidate_mean': float(y.mean()), 'ks_statistic': statistic, 'p_value': p_value,
+                         'band': band, 'passed': p_value >= threshold and abs(difference) <= band})
+    return {
+        'candidate': candidate, 'reference': reference, 'num_runs': num_runs, 'alpha': alpha,
+        'ks_threshold': threshold, 'passed': all(row['passed'] for row in rows), 'rows': rows, 'timings': timings,
+    }
+
+
+def format_report(report: Dict[str, Any], show_all: bool = False) -> str:
+    """
+    Formats a compare_engines() report: failing comparisons (all of them if show_all), a per-point
+    pass/fail summary and the speedup table.
+    """
+    lines = [f"{report['candidate']} vs {report['reference']}: {'PASS' if report['passed'] else 'FAIL'} "
+             f"({report['num_runs']} runs per engine and point, KS threshold {report['ks_threshold']:.2e})", '']
+    shown = [row for row in report['rows'] if show_all or not row['passed']]
+    if shown:
+        lines.append(f"{'point':<16} {'outcome':<22} {'ref mean':>10} {'cand mean':>10} {'band':>8} "
+                     f"{'KS D':>6} {'p':>8}  result")
+        for row in shown:
+            lines.append(f"{row['point']:<16} {row['outcome']:<22} {row['reference_mean']:10.2f} "
+                         f"{row['candidate_mean']:10.2f} {row['band']:8.2f} {row['ks_statistic']:6.3f} "
+                         f"{row['p_value']:8.2e}  {'ok' if row['passed'] else 'FAIL'}")
+        lines.append('')
+    lines.append(f"{'point':<16} {'result':<6} {'ref (s)':>9} {'cand (s)':>9} {'speedup':>8}")
+    for timing in report['timings']:
+        passed = all(row['passed'] for row in report['rows'] if row['point'] == timing['point'])
+        lines.append(f"{timing['point']:<16} {'PASS' if passed else 'FAIL':<6} {timing['reference_seconds']:9.2f} "
+                     f"{timing['candidate_seconds']:9.2f} {timing['speedup']:7.1f}x")
+    total_reference = sum(timing['reference_seconds'] for timing in report['timings'])
+    total_candidate = sum(timing['candidate_seconds'] for timing in report['timings'])
+    lines.append(f"{'total':<16} {'':<6} {total_reference:9.2f} {total_candidate:9.2f} "
+                 f"{total_reference / total_candidate if total_candidate > 0 else math.inf:7.1f}x")
+    return '\n'.join(lines)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare a candidate engine with the reference engine.")
+    parser.add_argument('candidate', choices=sorted(ENGINES))
+    parser.add_argument('--reference', choices=sorted(ENGINES), default='reference')
+    parser.add_argument('--num-runs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--alpha', type=float, default=0.01)
+    parser.add_argument('--rel-tol', type=float, default=0.05)
+    parser.add_argument('--all', action='store_true', help="list every comparison, not only failures")
+    args = parser.parse_args(argv)
+
+    report = compare_engines(args.candidate, args.reference, num_runs=args.num_runs, seed=args.seed,
+                             alpha=args.alpha, rel_tol=args.rel_tol)
+    print(format_report(report, show_all=args.all))
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,438 @@
+'''
+event_trace.py
+
+This module records and replays per-run event traces of the news propagation simulation.
+Instead of re-running an odd simulation with print statements, simulate_spread() can be given
+a TraceRecorder that logs every seed, share, infection and (Hypothesis 3) belief revision as a
+fixed-width record:
+
+    (round, source, target, news code, event kind)
+
+Records are appended to a preallocated NumPy buffer that doubles when full, and are written
+to disk in a compact binary format (a small header, a JSON metadata block, then the raw
+14-byte records). The replay functions rebuild reach curves, influencer attribution and
+cascade trees from a trace without re-simulating.
+
+Usage from the command line:
+    python event_trace.py path/to/run.trace
+'''
+
+import json
+import struct
+import sys
+import time
+from typing import Dict, List, Any
+import numpy as np
+import networkx as nx
+
+from config import SimulationConfig, DEFAULT_CONFIG
+
+TRACE_DTYPE = np.dtype([
+    ('round', '<i4'),
+    ('source', '<i4'),
+    ('target', '<i4'),
+    ('news', 'u1'),
+    ('kind', 'u1'),
+])
+
+# event kinds
+EVENT_SEED = 0       # target was seeded with the news (source is -1)
+EVENT_SHARE = 1      # source shared the news with its neighbors (target is -1)
+EVENT_INFECT = 2     # target adopted the news received from source
+EVENT_REVISION = 3   # target switched its belief to the news received from source (Hypothesis 3)
+
+EVENT_NAMES = {EVENT_SEED: 'seed', EVENT_SHARE: 'share', EVENT_INFECT: 'infect', EVENT_REVISION: 'revision'}
+
+NEWS_CODES = {'fake': 0, 'real': 1}
+NEWS_NAMES = {code: name for name, code in NEWS_CODES.items()}
+
+TRACE_MAGIC = b'MSTRACE1'
+_HEADER = struct.Struct('<8sQI')  # magic, record count, metadata length
+
+
+class TraceRecorder:
+    """
+    Append-only buffer of fixed-width simulation events.
+
+    The buffer starts with initial_capacity records and doubles whenever it is full, so
+    recording costs amortized O(1) per event. If max_events is set, recording stops once
+    that many events have been stored and truncated is set, which bounds both the memory
+    and the time spent on tracing a runaway cascade.
+
+    Attributes:
+        metadata : dict. Free-form run information saved with the trace (num_agents, influencers, rounds, ...).
+        truncated : bool. Whether events were dropped because max_events was reached.
+    """
+    def __init__(self, initial_capacity: int = 1024, max_events: int | None = None):
+        self._buffer = np.empty(max(1, initial_capacity), dtype=TRACE_DTYPE)
+        self._size = 0
+        self.max_events = max_events
+        self.truncated = False
+        self.metadata = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def record(self, round_num: int, source: int, target: int, news_type: str, kind: int) -> None:
+        """
+        Appends one event.
+
+        Parameters:
+            round_num : int. Simulation round of the event.
+            source : int. Agent that sent the news (-1 for seeding).
+            target : int. Agent that received the news (-1 for a share event).
+            news_type : str. Either 'fake' or 'real'.
+            kind : int. One of EVENT_SEED, EVENT_SHARE, EVENT_INFECT, EVENT_REVISION.
+
+        Returns:
+            None
+
+        Examples:
+            >>> trace = TraceRecorder(initial_capacity=1)
+            >>> trace.record(0, -1, 5, 'fake', EVENT_SEED)
+            >>> trace.record(1, 5, 7, 'fake', EVENT_INFECT)
+            >>> len(trace), trace.records['target'].tolist()
+            (2, [5, 7])
+        """
+        size = self._size
+        if self.max_events is not None and size >= self.max_events:
+            self.truncated = True
+            return
+        if size == len(self._buffer):
+            grown = np.empty(2 * size, dtype=TRACE_DTYPE)
+            grown[:size] = self._buffer
+            self._buffer = grown
+        self._buffer[size] = (round_num, source, target, NEWS_CODES[news_type], kind)
+        self._size = size + 1
+
+    def record_many(self, round_num: int, sources: np.ndarray, targets: np.ndarray, news_codes: np.ndarray, kind: int) -> None:
+        """
+        Appends a batch of events of one kind from the same round (used by the array engines).
+
+        Parameters:
+            round_num : int. Simulation round of the events.
+            sources : np.ndarray or int. Sending agents (-1 for seeding).
+            targets : np.ndarray. Receiving agents (-1 for share events).
+            news_codes : np.ndarray or int. News codes (see NEWS_CODES) of the events.
+            kind : int. One of EVENT_SEED, EVENT_SHARE, EVENT_INFECT, EVENT_REVISION.
+
+        Returns:
+            None
+
+        Examples:
+            >>> trace = TraceRecorder(initial_capacity=1)
+            >>> trace.record_many(2, np.array([4, 4]), np.array([5, 6]), np.array([0, 0]), EVENT_INFECT)
+            >>> trace.records['round'].tolist(), trace.records['target'].tolist()
+            ([2, 2], [5, 6])
+        """
+        count = len(targets)
+        if self.max_events is not None and self._size + count > self.max_events:
+            count = max(0, self.max_events - self._size)
+            self.truncated = True
+        if count == 0:
+            return
+        size = self._size
+        if size + count > len(self._buffer):
+            capacity = len(self._buffer)
+            while capacity < size + count:
+                capacity *= 2
+            grown = np.empty(capacity, dtype=TRACE_DTYPE)
+            grown[:size] = self._buffer[:size]
+            self._buffer = grown
+        batch = self._buffer[size:size + count]
+        batch['round'] = round_num
+        batch['source'] = np.broadcast_to(sources, np.shape(targets))[:count]
+        batch['target'] = targets[:count]
+        batch['news'] = np.broadcast_to(news_codes, np.shape(targets))[:count]
+        batch['kind'] = kind
+        self._size = size + count
+
+    @property
+    def records(self) -> np.ndarray:
+        """Structured array view of the recorded events, in recording order."""
+        return self._buffer[:self._size]
+
+    def save(self, path: str) -> None:
+        """
+        Writes the trace to a binary file: header, JSON metadata, then the packed records.
+
+        Parameters:
+            path : str. Output file path.
+
+        Returns:
+            None
+        """
+        metadata = dict(self.metadata, truncated=self.truncated)
+        meta_bytes = json.dumps(metadata).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(TRACE_MAGIC, self._size, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(self.records.tobytes())
+
+
+def load_trace(path: str) -> tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Reads a trace written by TraceRecorder.save().
+
+    Parameters:
+        path : str. Trace file path.
+
+    Returns:
+        records : np.ndarray. Structured array of events (dtype TRACE_DTYPE).
+        metadata : dict. Run metadata stored with the trace.
+
+    Examples:
+        >>> import os, tempfile
+        >>> trace = TraceRecorder()
+        >>> trace.record(0, -1, 3, 'real', EVENT_SEED)
+        >>> trace.metadata['rounds'] = 1
+        >>> path = os.path.join(tempfile.mkdtemp(), 'run.trace')
+        >>> trace.save(path)
+        >>> records, metadata = load_trace(path)
+        >>> records['target'].tolist(), metadata['rounds']
+        ([3], 1)
+    """
+    with open(path, 'rb') as f:
+        magic, count, meta_len = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != TRACE_MAGIC:
+            raise ValueError(f"{path} is not a simulation trace file")
+        metadata = json.loads(f.read(meta_len).decode('utf-8'))
+        records = np.frombuffer(f.read(count * TRACE_DTYPE.itemsize), dtype=TRACE_DTYPE)
+    return records, metadata
+
+
+def replay_reach_curves(records: np.ndarray, num_rounds: int) -> Dict[str, List[int]]:
+    """
+    Recomputes the per-round reach curves returned by simulate_spread() as stats.
+    The reach of a news type after round r is the number of distinct agents that were seeded
+    with it, infected by it or converted to it up to and including round r.
+
+    Parameters:
+        records : np.ndarray. Trace records.
+        num_rounds : int. Number of simulated rounds (trace metadata 'rounds').
+
+    Returns:
+        dict : dict. Reach per round for 'fake' and 'real'.
+
+    Examples:
+        >>> trace = TraceRecorder()
+        >>> trace.record(0, -1, 1, 'fake', EVENT_SEED)
+        >>> trace.record(1, 1, 2, 'fake', EVENT_INFECT)
+        >>> trace.record(3, 2, 1, 'fake', EVENT_INFECT)
+        >>> replay_reach_curves(trace.records, 4)['fake']
+        [1, 2, 2, 2]
+    """
+    curves = {}
+    adopting = np.isin(records['kind'], (EVENT_SEED, EVENT_INFECT, EVENT_REVISION))
+    for news_type, code in NEWS_CODES.items():
+        events = records[adopting & (records['news'] == code)]
+        _, first = np.unique(events['target'], return_index=True)
+        first_rounds = events['round'][first]
+        per_round = np.bincount(first_rounds, minlength=num_rounds)[:num_rounds]
+        curves[news_type] = np.cumsum(per_round).tolist()
+    return curves
+
+
+def tracks_influencer_sources(hypothesis: str | None, variant_flags: Dict[str, bool] | None) -> bool:
+    """
+    Whether a run attributes fake news reach to influencer and normal seeds (Hypothesis 2, Variant A).
+
+    Examples:
+        >>> tracks_influencer_sources('h2', {'variant_A': True}), tracks_influencer_sources(None, {'variant_A': True})
+        (True, False)
+    """
+    return hypothesis == 'h2' and bool((variant_flags or {}).get('variant_A'))
+
+
+def replay_influencer_attribution(records: np.ndarray, influencers: List[int], hypothesis: str | None = None,
+                                  variant_flags: Dict[str, bool] | None = None) -> Dict[str, int]:
+    """
+    Recomputes the Hypothesis 2 influencer attribution: every seed is labelled by its own role,
+    every infected agent inherits the label of the agent it received the news from, and the
+    labels of all agents ever reached by fake news are counted. As in the simulators, the
+    attribution only applies under Hypothesis 2 with Variant A; otherwise both counts are 0.
+
+    Parameters:
+        records : np.ndarray. Trace records.
+        influencers : list. Ids of influencer agents (trace metadata 'influencers').
+        hypothesis : str or None. Hypothesis of the traced run (trace metadata 'hypothesis').
+        variant_flags : dict or None. Variant flags of the traced run (trace metadata 'variant_flags').
+
+    Returns:
+        dict : dict. Number of fake-news agents attributed to 'influencer' and 'normal' seeds.
+
+    Examples:
+        >>> trace = TraceRecorder()
+        >>> trace.record(0, -1, 1, 'fake', EVENT_SEED)
+        >>> trace.record(0, -1, 4, 'fake', EVENT_SEED)
+        >>> trace.record(1, 1, 2, 'fake', EVENT_INFECT)
+        >>> replay_influencer_attribution(trace.records, [1], 'h2', {'variant_A': True})
+        {'influencer': 2, 'normal': 1}
+        >>> replay_influencer_attribution(trace.records, [1], 'h2', {'variant_A': False})
+        {'influencer': 0, 'normal': 0}
+    """
+    if not tracks_influencer_sources(hypothesis, variant_flags):
+        return {'influencer': 0, 'normal': 0}
+    influencer_set = set(influencers)
+    source_map = {}
+    fake_reached = set()
+    fake_code = NEWS_CODES['fake']
+    for _, source, target, news, kind in records.tolist():
+        if kind == EVENT_SEED:
+            source_map[target] = 'influencer' if target in influencer_set else 'normal'
+        elif kind == EVENT_INFECT:
+            source_map[target] = source_map.get(source, 'unknown')
+        elif kind != EVENT_REVISION:
+            continue
+        if news == fake_code:
+            fake_reached.add(target)
+    return {
+        'influencer': sum(1 for uid in fake_reached if source_map.get(uid) == 'influencer'),
+        'normal': sum(1 for uid in fake_reached if source_map.get(uid) == 'normal')
+    }
+
+
+def replay_cascade_tree(records: np.ndarray, news_type: str) -> nx.DiGraph:
+    """
+    Rebuilds the cascade forest of one news type: seeds are roots and every infection or
+    belief revision adds an edge from the sender to the receiver.
+
+    Parameters:
+        records : np.ndarray. Trace records.
+        news_type : str. Either 'fake' or 'real'.
+
+    Returns:
+        nx.DiGraph : Directed forest with a 'round' attribute on every node and edge.
+
+    Examples:
+        >>> trace = TraceRecorder()
+        >>> trace.record(0, -1, 1, 'fake', EVENT_SEED)
+        >>> trace.record(2, 1, 2, 'fake', EVENT_INFECT)
+        >>> tree = replay_cascade_tree(trace.records, 'fake')
+        >>> list(tree.edges()), tree.nodes[2]['round']
+        ([(1, 2)], 2)
+    """
+    tree = nx.DiGraph()
+    code = NEWS_CODES[news_type]
+    for round_num, source, target, news, kind in records.tolist():
+        if news != code or kind == EVENT_SHARE:
+            continue
+        if kind == EVENT_SEED:
+            tree.add_node(target, round=round_num)
+        else:
+            tree.add_node(target, round=round_num)
+            tree.add_edge(source, target, round=round_num)
+    return tree
+
+
+def cascade_depth(tree: nx.DiGraph) -> int:
+    """
+    Returns the length of the longest seed-to-leaf chain in a cascade forest
+    (revisions may close cycles, which are ignored).
+
+    Parameters:
+        tree : nx.DiGraph. Cascade forest from replay_cascade_tree().
+
+    Returns:
+        int : int. Maximum number of hops from a seed.
+    """
+    roots = [node for node, indegree in tree.in_degree() if indegree == 0]
+    depth = 0
+    for root in roots:
+        lengths = nx.single_source_shortest_path_length(tree, root)
+        depth = max(depth, max(lengths.values()))
+    return depth
+
+
+def measure_trace_overhead(num_runs: int = 20, seed: int = 0, config: SimulationConfig = DEFAULT_CONFIG) -> Dict[str, float]:
+    """
+    Times the same simulate_spread() runs with and without a TraceRecorder attached.
+    Networks and initial states are built once and reused for both timings.
+
+    Parameters:
+        num_runs : int. Number of simulation runs to time.
+        seed : int. Seed of the run streams (both passes replay the same streams).
+        config : SimulationConfig. Parameters of the networks and runs.
+
+    Returns:
+        dict : dict. Seconds spent without and with tracing, the relative overhead and
+            the average number of events recorded per run.
+    """
+    from network_generator import create_social_network
+    from graph_arrays import GraphArrays
+    from agent_initializer import assign_roles_bulk, assign_trust_levels_bulk
+    from simulation import simulate_spread, initialize_p_shares_bulk
+    from news_item import NewsItem
+    from rng_context import RunRNG
+
+    rng = RunRNG(seed)
+    setups = []
+    for _ in range(num_runs):
+        G = create_social_network(rng=rng, config=config)
+        graph = GraphArrays.from_networkx(G)
+        roles = assign_roles_bulk(graph.degrees(), rng, config=config)
+        initialize_p_shares_bulk(roles, rng, config=config)
+        assign_trust_levels_bulk(graph, rng, G=G)
+        setups.append((G, roles, graph.degrees()))
+
+    timings = {}
+    events = 0
+    for traced in (False, True):
+        elapsed = 0.0
+        for run_index, (G, roles, degrees) in enumerate(setups):
+            agents = roles.to_agents(degrees)
+            news_items = {'fake': NewsItem("Fake News", is_fake=True), 'real': NewsItem("Real News", is_fake=False)}
+            trace = TraceRecorder() if traced else None
+            start = time.perf_counter()
+            simulate_spread(G, agents, news_items, hypothesis='h3', trace=trace, rng=RunRNG.for_run(seed, run_index),
+                            config=config)
+            elapsed += time.perf_counter() - start
+            if traced:
+                events += len(trace)
+        timings['traced' if traced else 'untraced'] = elapsed
+
+    return {
+        'untraced_seconds': timings['untraced'],
+        'traced_seconds': timings['traced'],
+        'relative_overhead': timings['traced'] / timings['untraced'] - 1.0,
+        'events_per_run': events / num_runs,
+    }
+
+
+def summarize_trace(path: str) -> None:
+    """
+    Prints reach, attribution and cascade statistics recomputed from a trace file.
+
+    Parameters:
+        path : str. Trace file path.
+
+    Returns:
+        None
+    """
+    records, metadata = load_trace(path)
+    num_rounds = metadata.get('rounds', int(records['round'].max()) + 1 if len(records) else 0)
+    kinds, counts = np.unique(records['kind'], return_counts=True)
+
+    print(f"Trace {path}: {len(records)} events over {num_rounds} rounds"
+          f"{' (truncated)' if metadata.get('truncated') else ''}")
+    for kind, count in zip(kinds.tolist(), counts.tolist()):
+        print(f"  {EVENT_NAMES[kind]:<9} {count}")
+
+    curves = replay_reach_curves(records, num_rounds)
+    for news_type in NEWS_CODES:
+        tree = replay_cascade_tree(records, news_type)
+        final_reach = curves[news_type][-1] if curves[news_type] else 0
+        print(f"{news_type.capitalize()} News - Final Reach: {final_reach} | Cascade Depth: {cascade_depth(tree)}")
+
+    if 'influencers' in metadata:
+        impact = replay_influencer_attribution(records, metadata['influencers'], metadata.get('hypothesis'),
+                                               metadata.get('variant_flags'))
+        print(f"Fake reach attributed to influencer seeds: {impact['influencer']} | normal seeds: {impact['normal']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python event_trace.py TRACE_FILE [TRACE_FILE ...]")
+        sys.exit(1)
+    for trace_path in sys.argv[1:]:
+        summarize_trace(trace_path)
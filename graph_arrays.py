@@ -0,0 +1,389 @@
+'''
+graph_arrays.py
+
+This module defines flat NumPy representations of the social network and of the agent
+population. They mirror the networkx graph and the Agent dictionary used by the reference
+simulation, but store every attribute in contiguous arrays so that initialization and
+propagation can run as vectorized passes instead of per-node / per-edge Python loops.
+
+It includes:
+- GraphArrays: undirected edge list plus a CSR (compressed sparse row) adjacency,
+  with per-slot trust weights
+- AgentArrays: per-agent role flags and share probabilities
+- Conversion helpers from networkx graphs and Agent dictionaries, and back
+
+Role codes used for susceptible agents:
+- SUSCEPTIBLE_NONE (0), SUSCEPTIBLE_NORMAL (1), HIGHLY_SUSCEPTIBLE (2), SUPER_SPREADER (3)
+'''
+
+from typing import Dict, Optional
+import numpy as np
+import networkx as nx
+
+SUSCEPTIBLE_NONE = 0
+SUSCEPTIBLE_NORMAL = 1
+HIGHLY_SUSCEPTIBLE = 2
+SUPER_SPREADER = 3
+
+SUSCEPTIBLE_TYPE_NAMES = {
+    SUSCEPTIBLE_NONE: None,
+    SUSCEPTIBLE_NORMAL: 'normal',
+    HIGHLY_SUSCEPTIBLE: 'highly_susceptible',
+    SUPER_SPREADER: 'super_spreader',
+}
+SUSCEPTIBLE_TYPE_CODES = {name: code for code, name in SUSCEPTIBLE_TYPE_NAMES.items()}
+
+
+class GraphArrays:
+    """
+    Array view of an undirected social network with nodes labelled 0..num_nodes-1.
+
+    Every undirected edge e = (edge_u[e], edge_v[e]) appears twice in the CSR adjacency,
+    once in the row of each endpoint. slot_edge maps each CSR slot back to its edge id,
+    so per-edge values (such as trust) can be drawn once per edge and scattered to both slots.
+
+    Attributes:
+        num_nodes : int. Number of nodes.
+        edge_u : np.ndarray. First endpoint of each undirected edge (int32).
+        edge_v : np.ndarray. Second endpoint of each undirected edge (int32).
+        indptr : np.ndarray. CSR row pointer of length num_nodes + 1 (int64).
+        indices : np.ndarray. CSR neighbor ids (int32).
+        slot_edge : np.ndarray. Undirected edge id of every CSR slot (int64).
+        community : np.ndarray or None. Community label per node (-1 = no community).
+        edge_trust : np.ndarray or None. Trust value per undirected edge (float64).
+    """
+    def __init__(self, num_nodes: int, edge_u: np.ndarray, edge_v: np.ndarray, community: Optional[np.ndarray] = None):
+        self.num_nodes = int(num_nodes)
+        self.edge_u = np.asarray(edge_u, dtype=np.int32)
+        self.edge_v = np.asarray(edge_v, dtype=np.int32)
+        self.community = None
+        self._intra_community = None
+        self.edge_trust = None
+        self._slot_trust = None
+        self._build_csr()
+        if community is not None:
+            self.set_community(community)
+
+    def _build_csr(self) -> None:
+        num_edges = len(self.edge_u)
+        rows = np.concatenate([self.edge_u, self.edge_v])
+        cols = np.concatenate([self.edge_v, self.edge_u])
+        edge_ids = np.concatenate([np.arange(num_edges), np.arange(num_edges)])
+        order = np.lexsort((cols, rows))
+        self.indices = cols[order].astype(np.int32)
+        self.slot_edge = edge_ids[order].astype(np.int64)
+        counts = np.bincount(rows, minlength=self.num_nodes)
+        self.indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+
+    @classmethod
+    def from_networkx(cls, G: nx.Graph, trust_attr: Optional[str] = None) -> 'GraphArrays':
+        """
+        Builds the array representation of a graph whose nodes are the integers 0..n-1.
+        Community labels stored in G.graph['community'] (see create_social_network) are carried over.
+
+        Parameters:
+            G : nx.Graph. Social network graph.
+            trust_attr : str or None. If given, edge trust is read from this edge attribute (0.5 where missing).
+
+        Returns:
+            GraphArrays : GraphArrays. Edge list and CSR adjacency of G.
+
+        Examples:
+            >>> import networkx as nx
+            >>> graph = GraphArrays.from_networkx(nx.path_graph(4))
+            >>> graph.num_edges, graph.degrees().tolist()
+            (3, [1, 2, 2, 1])
+            >>> graph.indices[graph.indptr[1]:graph.indptr[2]].tolist()
+            [0, 2]
+            >>> G = nx.path_graph(3); G[0][1]['trust'] = 0.9
+            >>> GraphArrays.from_networkx(G, trust_attr='trust').edge_trust.tolist()
+            [0.9, 0.5]
+        """
+        num_nodes = G.number_of_nodes()
+        edges = np.fromiter((x for edge in G.edges() for x in edge), dtype=np.int64,
+                            count=2 * G.number_of_edges()).reshape(-1, 2)
+        graph = cls(num_nodes, edges[:, 0], edges[:, 1], community=G.graph.get('community'))
+        if trust_attr is not None:
+            graph.set_edge_trust(np.fromiter((trust for _, _, trust in G.edges(data=trust_attr, default=0.5)),
+                                             dtype=np.float64, count=G.number_of_edges()))
+        return graph
+
+    @classmethod
+    def from_csr(cls, indptr: np.ndarray, indices: np.ndarray, slot_trust: np.ndarray,
+                 community: Optional[np.ndarray] = None) -> 'GraphArrays':
+        """
+        Wraps existing CSR arrays (for example shared-memory or memory-mapped views) without copying
+        or rebuilding them. The undirected edge list is not available on such a view.
+
+        Parameters:
+            indptr : np.ndarray. CSR row pointer.
+            indices : np.ndarray. CSR neighbor ids.
+            slot_trust : np.ndarray. Trust value of every CSR slot.
+            community : np.ndarray or None. Community label per node.
+
+        Returns:
+            GraphArrays : GraphArrays. View over the given arrays.
+
+        Examples:
+            >>> import networkx as nx
+            >>> graph = GraphArrays.from_networkx(nx.path_graph(3))
+            >>> view = GraphArrays.from_csr(graph.indptr, graph.indices, graph.slot_trust)
+            >>> view.degrees().tolist(), view.indices is graph.indices
+            ([1, 2, 1], True)
+        """
+        graph = cls.__new__(cls)
+        graph.num_nodes = len(indptr) - 1
+        graph.edge_u = graph.edge_v = graph.slot_edge = None
+        graph.indptr = indptr
+        graph.indices = indices
+        graph.community = community
+        graph._intra_community = None
+        graph.edge_trust = None
+        graph._slot_trust = slot_trust
+        return graph
+
+    @classmethod
+    def from_arrays(cls, edge_u: np.ndarray, edge_v: np.ndarray, indptr: np.ndarray, indices: np.ndarray,
+                    slot_edge: np.ndarray, community: Optional[np.ndarray] = None) -> 'GraphArrays':
+        """
+        Wraps a complete, already built edge list and CSR adjacency (for example memory-mapped arrays
+        written by edge_list_loader.py) without copying or rebuilding them.
+
+        Parameters:
+            edge_u, edge_v : np.ndarray. Endpoints of each undirected edge.
+            indptr : np.ndarray. CSR row pointer.
+            indices : np.ndarray. CSR neighbor ids, sorted within each row.
+            slot_edge : np.ndarray. Undirected edge id of every CSR slot.
+            community : np.ndarray or None. Community label per node.
+
+        Returns:
+            GraphArrays : GraphArrays. View over the given arrays.
+
+        Examples:
+            >>> graph = GraphArrays.from_networkx(nx.path_graph(3))
+            >>> view = GraphArrays.from_arrays(graph.edge_u, graph.edge_v, graph.indptr, graph.indices, graph.slot_edge)
+            >>> view.num_edges, view.slot_trust.tolist()
+            (2, [0.5, 0.5, 0.5, 0.5])
+        """
+        graph = cls.__new__(cls)
+        graph.num_nodes = len(indptr) - 1
+        graph.edge_u, graph.edge_v = edge_u, edge_v
+        graph.indptr, graph.indices, graph.slot_edge = indptr, indices, slot_edge
+        graph.community = None
+        graph._intra_community = None
+        graph.edge_trust = None
+        graph._slot_trust = None
+        if community is not None:
+            graph.set_community(community)
+        return graph
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices) // 2
+
+    def degrees(self) -> np.ndarray:
+        """Returns the degree of every node as an int64 array."""
+        return np.diff(self.indptr)
+
+    def set_community(self, community: np.ndarray) -> None:
+        """Stores the community label of every node and invalidates the cached intra-community mask."""
+        self.community = np.asarray(community, dtype=np.int32)
+        self._intra_community = None
+
+    @property
+    def intra_community(self) -> np.ndarray:
+        """Boolean mask of undirected edges whose endpoints share a community (cached)."""
+        if self._intra_community is None:
+            if self.community is None:
+                raise ValueError("GraphArrays has no community labels; call set_community() first")
+            cu = self.community[self.edge_u]
+            self._intra_community = (cu == self.community[self.edge_v]) & (cu >= 0)
+        return self._intra_community
+
+    def set_edge_trust(self, edge_trust: np.ndarray) -> None:
+        """Stores one trust value per undirected edge and invalidates the per-slot cache."""
+        self.edge_trust = np.asarray(edge_trust, dtype=np.float64)
+        self._slot_trust = None
+
+    @property
+    def slot_trust(self) -> np.ndarray:
+        """Trust value of every CSR slot, i.e. of every directed (node, neighbor) pair."""
+        if self._slot_trust is None:
+            if self.edge_trust is None:
+                self._slot_trust = np.full(len(self.indices), 0.5)
+            else:
+                self._slot_trust = self.edge_trust[self.slot_edge]
+        return self._slot_trust
+
+    def expand_slots(self, sources: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Gathers the CSR slots of several rows at once.
+
+        Parameters:
+            sources : np.ndarray. Node ids whose adjacency rows are gathered.
+
+        Returns:
+            owner : np.ndarray. Position in sources of the row each slot belongs to.
+            slots : np.ndarray. CSR slot indices, row after row in the order of sources.
+
+        Examples:
+            >>> graph = GraphArrays.from_networkx(nx.path_graph(4))
+            >>> owner, slots = graph.expand_slots(np.array([2, 0]))
+            >>> owner.tolist(), graph.indices[slots].tolist()
+            ([0, 0, 1], [1, 3, 1])
+        """
+        starts = self.indptr[sources]
+        counts = self.indptr[np.asarray(sources) + 1] - starts
+        owner = np.repeat(np.arange(len(counts)), counts)
+        row_offsets = np.cumsum(counts) - counts
+        slots = np.arange(int(counts.sum()), dtype=np.int64) + np.repeat(starts - row_offsets, counts)
+        return owner, slots
+
+    def expand(self, sources: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Adjacency protocol used by the array engine (see engine.py): returns every
+        (source, neighbor, trust) contact of the given nodes.
+
+        Parameters:
+            sources : np.ndarray. Node ids whose neighbors are gathered.
+
+        Returns:
+            owner : np.ndarray. Position in sources of each contact's sender.
+            neighbors : np.ndarray. Receiving node of each contact.
+            trust : np.ndarray. Trust of the edge carrying each contact.
+        """
+        owner, slots = self.expand_slots(sources)
+        return owner, self.indices[slots], self.slot_trust[slots]
+
+    def write_trust_to_networkx(self, G: nx.Graph) -> None:
+        """
+        Copies the per-edge trust values into the 'trust' attribute of the matching networkx edges.
+
+        Parameters:
+            G : nx.Graph. The graph this GraphArrays was built from.
+
+        Returns:
+            None
+        """
+        for u, v, trust in zip(self.edge_u.tolist(), self.edge_v.tolist(), self.edge_trust.tolist()):
+            G[u][v]['trust'] = trust
+
+
+class AgentArrays:
+    """
+    Array view of the agent population: one entry per node id.
+
+    Attributes:
+        is_influencer : np.ndarray. Boolean influencer flag per agent.
+        is_fact_checker : np.ndarray. Boolean fact-checker flag per agent.
+        susceptible_code : np.ndarray. int8 susceptible sub-type code (see module docstring).
+        p_share_fake : np.ndarray. Probability of sharing fake news per agent.
+        p_share_real : np.ndarray. Probability of sharing real news per agent.
+    """
+    def __init__(self, num_agents: int):
+        self.num_agents = int(num_agents)
+        self.is_influencer = np.zeros(num_agents, dtype=bool)
+        self.is_fact_checker = np.zeros(num_agents, dtype=bool)
+        self.susceptible_code = np.zeros(num_agents, dtype=np.int8)
+        self.p_share_fake = np.zeros(num_agents)
+        self.p_share_real = np.zeros(num_agents)
+
+    @property
+    def is_susceptible(self) -> np.ndarray:
+        return self.susceptible_code != SUSCEPTIBLE_NONE
+
+    ARRAY_FIELDS = ('is_influencer', 'is_fact_checker', 'susceptible_code', 'p_share_fake', 'p_share_real')
+
+    def as_dict(self) -> Dict[str, np.ndarray]:
+        """Returns the per-agent arrays by field name (see ARRAY_FIELDS)."""
+        return {field: getattr(self, field) for field in self.ARRAY_FIELDS}
+
+    @classmethod
+    def from_dict(cls, arrays: Dict[str, np.ndarray]) -> 'AgentArrays':
+        """
+        Wraps existing per-agent arrays (for example shared-memory views) without copying them.
+
+        Examples:
+            >>> roles = AgentArrays(3)
+            >>> AgentArrays.from_dict(roles.as_dict()).p_share_fake is roles.p_share_fake
+            True
+        """
+        roles = cls.__new__(cls)
+        roles.num_agents = len(arrays['is_influencer'])
+        for field in cls.ARRAY_FIELDS:
+            setattr(roles, field, arrays[field])
+        return roles
+
+    @classmethod
+    def from_agents(cls, agents: Dict[int, 'Agent']) -> 'AgentArrays':
+        """
+        Collects role flags and share probabilities from a dictionary of Agent objects.
+
+        Parameters:
+            agents : dict. Mapping of node ids 0..n-1 to Agent instances.
+
+        Returns:
+            AgentArrays : AgentArrays. Array copy of the agents' roles and probabilities.
+
+        Examples:
+            >>> from agent_initializer import Agent
+            >>> agents = {0: Agent(0), 1: Agent(1)}
+            >>> agents[1].is_susceptible, agents[1].susceptible_type = True, 'super_spreader'
+            >>> AgentArrays.from_agents(agents).susceptible_code.tolist()
+            [0, 3]
+        """
+        roles = cls(len(agents))
+        for uid, agent in agents.items():
+            roles.is_influencer[uid] = agent.is_influencer
+            roles.is_fact_checker[uid] = agent.is_fact_checker
+            if agent.is_susceptible:
+                roles.susceptible_code[uid] = SUSCEPTIBLE_TYPE_CODES[agent.susceptible_type]
+            roles.p_share_fake[uid] = agent.p_share_fake
+            roles.p_share_real[uid] = agent.p_share_real
+        return roles
+
+    def to_agents(self, degrees: Optional[np.ndarray] = None) -> Dict[int, 'Agent']:
+        """
+        Builds Agent objects from the arrays, for code that still works on the Agent dictionary.
+
+        Parameters:
+            degrees : np.ndarray or None. Optional degree array used to fill number_of_friends.
+
+        Returns:
+            Dict[int, Agent]: Mapping of node ids to Agent instances.
+        """
+        from agent_initializer import Agent
+
+        agents = {}
+        for uid in range(self.num_agents):
+            agents[uid] = Agent(uid)
+        self.write_back(agents, degrees)
+        return agents
+
+    def write_back(self, agents: Dict[int, 'Agent'], degrees: Optional[np.ndarray] = None) -> None:
+        """
+        Copies role flags and share probabilities into existing Agent objects.
+
+        Parameters:
+            agents : dict. Mapping of node ids to Agent instances.
+            degrees : np.ndarray or None. Optional degree array used to fill number_of_friends.
+
+        Returns:
+            None
+        """
+        influencer = self.is_influencer.tolist()
+        fact_checker = self.is_fact_checker.tolist()
+        codes = self.susceptible_code.tolist()
+        p_fake = self.p_share_fake.tolist()
+        p_real = self.p_share_real.tolist()
+        friends = degrees.tolist() if degrees is not None else None
+        for uid, agent in agents.items():
+            agent.is_influencer = influencer[uid]
+            agent.is_fact_checker = fact_checker[uid]
+            agent.is_susceptible = codes[uid] != SUSCEPTIBLE_NONE
+            agent.susceptible_type = SUSCEPTIBLE_TYPE_NAMES[codes[uid]]
+            agent.p_share_fake = p_fake[uid]
+            agent.p_share_real = p_real[uid]
+            if friends is not None:
+                agent.number_of_friends = friends[uid]
@@ -6,22 +6,29 @@ of increasing the proportion of fact-checkers in a social network on the spread
 and real news. The experiment is conducted by varying the fact-checker percentage and
 collecting outcome metrics across multiple simulation runs.
 
-Returns aggregated statistics used for analysis and visualization.
+Returns aggregated statistics used for analysis and visualization; main.py prints them.
 '''
 
 import numpy as np
-from baseline_run import run_baseline_simulation
+from config import SimulationConfig, DEFAULT_CONFIG
+from baseline_run import run_baseline_simulation, RunOptions, DEFAULT_OPTIONS
 
-def run_hypothesis1_experiment(fact_checker_variants: list[float], num_runs: int = 1000) -> list[dict]:
+def run_hypothesis1_experiment(fact_checker_variants: list[float], num_runs: int = 1000,
+                               config: SimulationConfig = DEFAULT_CONFIG, seed: int | None = None,
+                               options: RunOptions = DEFAULT_OPTIONS) -> list[dict]:
     """
     Runs simulation for varying percentages of fact-checkers and returns reach metrics.
 
     Parameters:
         fact_checker_variants : list of float. List of percentages of skeptical users to assign as fact-checkers.
         num_runs : int. Number of simulation runs per configuration.
+        config : SimulationConfig. Base configuration; its fact-checker percentage is replaced by each variant.
+        seed : int or None. Base seed of the runs of every configuration (unseeded if None).
+        options : RunOptions. Engine, processes, progress and other runner options (see baseline_run.RunOptions); a
+            progress bar is labelled with the fact-checker percentage.
 
     Returns:
-        list of dict. Each dict contains aggregated results for a fact-checker configuration.
+        list of dict. Each dict contains aggregated results (share and reach statistics) for a fact-checker configuration.
 
     Examples:
         >>> results = run_hypothesis1_experiment([0.1, 0.3], num_runs=5) # doctest: +SKIP
@@ -32,20 +39,18 @@ def run_hypothesis1_experiment(fact_checker_variants: list[float], num_runs: int
 
     for fc_pct in fact_checker_variants:
         h1_metrics, h1_belief_revised_count = run_baseline_simulation(
-            num_runs, hypothesis='h1', percent_fc=fc_pct)
+            num_runs, hypothesis='h1', config=config.replace(percent_fact_checkers=fc_pct), seed=seed,
+            options=options.replace(progress=f"H1 fc={fc_pct}") if options.progress else options)
 
         final_reach_fake = [run[-1] for run in h1_metrics['fake_reach'] if len(run) > 0]
         final_reach_real = [run[-1] for run in h1_metrics['real_reach'] if len(run) > 0]
 
-        print("\n")
-        print(f"H1 Results when fact-checker percent is {fc_pct}:")
-        print(f"Average number of fake news shares: {np.mean(h1_metrics['fake_shares']):.1f} ± {np.std(h1_metrics['fake_shares']):.1f}")
-        print(f"Average number of real news shares: {np.mean(h1_metrics['real_shares']):.1f}± {np.std(h1_metrics['real_shares']):.1f}")
-        print(f"Fake News - Avg Reach: {np.mean(final_reach_fake):.1f} ± {np.std(final_reach_fake):.1f}")
-        print(f"Real News - Avg Reach: {np.mean(final_reach_real):.1f} ± {np.std(final_reach_real):.1f}")
-
         results.append({
             'fc_percent': fc_pct,
+            'fake_shares_mean': np.mean(h1_metrics['fake_shares']),
+            'fake_shares_std': np.std(h1_metrics['fake_shares']),
+            'real_shares_mean': np.mean(h1_metrics['real_shares']),
+            'real_shares_std': np.std(h1_metrics['real_shares']),
             'fake_mean': np.mean(final_reach_fake),
             'fake_std': np.std(final_reach_fake),
             'real_mean': np.mean(final_reach_real),
@@ -9,13 +9,26 @@ enables a combination of control flags:
 - Variant C: Boost trust in influencer-shared content.
 
 Each variant is run using shared simulation logic, and results are aggregated for
-comparison across key metrics.
+comparison across key metrics; main.py prints them.
 '''
 
 import numpy as np
-from baseline_run import run_baseline_simulation
-
-def run_variant(name: str, variant_flags: dict, hypothesis: str = 'h2') -> tuple[str, dict]:
+from config import SimulationConfig, DEFAULT_CONFIG
+from baseline_run import run_baseline_simulation, RunOptions, DEFAULT_OPTIONS
+
+# Influencer behavior variants compared under Hypothesis 2
+H2_VARIANTS = {
+    'baseline': {'variant_A': False, 'variant_B': False, 'variant_C': False},
+    'variant_AB': {'variant_A': True, 'variant_B': True, 'variant_C': False},
+    'variant_BC': {'variant_A': False, 'variant_B': True, 'variant_C': True},
+    'variant_CA': {'variant_A': True, 'variant_B': False, 'variant_C': True},
+    'variant_ABC': {'variant_A': True, 'variant_B': True, 'variant_C': True},
+}
+
+
+def run_variant(name: str, variant_flags: dict, hypothesis: str = 'h2',
+                config: SimulationConfig = DEFAULT_CONFIG, num_runs: int = 1000,
+                seed: int | None = None, options: RunOptions = DEFAULT_OPTIONS) -> tuple[str, dict]:
     """
     Executes a single variant run under Hypothesis 2 and collects key metrics.
 
@@ -23,6 +36,11 @@ def run_variant(name: str, variant_flags: dict, hypothesis: str = 'h2') -> tuple
         name : str. Label for the variant (e.g., 'variant_AB').
         variant_flags : dict. Flags controlling which influencer mechanisms are enabled.
         hypothesis : str. Optional hypothesis label, defaults to 'h2'.
+        config : SimulationConfig. Base configuration; its variant flags are replaced by variant_flags.
+        num_runs : int. Number of simulation runs.
+        seed : int or None. Base seed of the runs (unseeded if None).
+        options : RunOptions. Engine, processes, progress and other runner options (see baseline_run.RunOptions); a
+            progress bar is labelled with the variant name.
 
     Returns:
         tuple : tuple. Variant label and a dictionary of outcome metrics.
@@ -33,22 +51,15 @@ def run_variant(name: str, variant_flags: dict, hypothesis: str = 'h2') -> tuple
         >>> 'final_fake' in result and 'shared_fake' in result
         True
     """
-    h2_metrics, h2_belief_revised_count = run_baseline_simulation(num_runs=1000, hypothesis=hypothesis, variant_flag=variant_flags)
+    h2_metrics, h2_belief_revised_count = run_baseline_simulation(num_runs=num_runs, hypothesis=hypothesis,
+                                                                 config=config.with_variants(variant_flags),
+                                                                 seed=seed,
+                                                                 options=options.replace(progress=f"H2 {name}")
+                                                                 if options.progress else options)
 
     # Collect results
     final_reach_fake = [run[-1] for run in h2_metrics['fake_reach'] if len(run) > 0]
     final_reach_real = [run[-1] for run in h2_metrics['real_reach'] if len(run) > 0]
-    print("\n")
-    print(f"H2 Results for {name}:")
-    print(f"Average number of fake news shares: {np.mean(h2_metrics['fake_shares']):.1f} ± {np.std(h2_metrics['fake_shares']):.1f}")
-    print(f"Average number of real news shares: {np.mean(h2_metrics['real_shares']):.1f}± {np.std(h2_metrics['real_shares']):.1f}")
-    print(f"Fake News - Avg Reach: {np.mean(final_reach_fake):.1f} ± {np.std(final_reach_fake):.1f}")
-    print(f"Real News - Avg Reach: {np.mean(final_reach_real):.1f} ± {np.std(final_reach_real):.1f}")
-
-    if variant_flags['variant_A']:
-        print(f"\n{name} - Influencer Impact when variant A - Increasing the number of initial influencer seeds")
-        print(f"Avg reach of fake news from influencers: {np.mean(h2_metrics['influencer_reach_fake']):.1f} ± {np.std(h2_metrics['influencer_reach_fake']):.1f}")
-        print(f"Avg reach of fake news from normal users: {np.mean(h2_metrics['normal_reach_fake']):.1f} ± {np.std(h2_metrics['normal_reach_fake']):.1f}")
 
     # Store aggregated results
     result = {
@@ -56,16 +67,29 @@ def run_variant(name: str, variant_flags: dict, hypothesis: str = 'h2') -> tuple
         'final_real': np.mean(h2_metrics['real_belief_count']),
         'shared_fake': np.mean(h2_metrics['fake_shares']),
         'shared_real': np.mean(h2_metrics['real_shares']),
+        'shared_fake_std': np.std(h2_metrics['fake_shares']),
+        'shared_real_std': np.std(h2_metrics['real_shares']),
+        'reach_fake_mean': np.mean(final_reach_fake),
+        'reach_fake_std': np.std(final_reach_fake),
+        'reach_real_mean': np.mean(final_reach_real),
+        'reach_real_std': np.std(final_reach_real),
         'influencer_reach_fake': h2_metrics['influencer_reach_fake'],
         'normal_reach_fake': h2_metrics['normal_reach_fake']
     }
     return name, result
 
 
-def run_all_variants() -> dict:
+def run_all_variants(config: SimulationConfig = DEFAULT_CONFIG, num_runs: int = 1000, seed: int | None = None,
+                     options: RunOptions = DEFAULT_OPTIONS) -> dict:
     """
     Executes all defined influencer behavior variants and aggregates results.
 
+    Parameters:
+        config : SimulationConfig. Base configuration of every variant.
+        num_runs : int. Number of simulation runs per variant.
+        seed : int or None. Base seed of the runs of every variant (unseeded if None).
+        options : RunOptions. Runner options of every variant (see run_variant()).
+
     Returns:
         dict : dict. Dictionary mapping variant name to its outcome metrics.
 
@@ -74,17 +98,10 @@ def run_all_variants() -> dict:
         >>> 'variant_ABC' in results and 'final_real' in results['variant_ABC'] # doctest: +SKIP
         True
     """
-    variants = {
-        'baseline': {'variant_A': False, 'variant_B': False, 'variant_C': False},
-        'variant_AB': {'variant_A': True, 'variant_B': True, 'variant_C': False},
-        'variant_BC': {'variant_A': False, 'variant_B': True, 'variant_C': True},
-        'variant_CA': {'variant_A': True, 'variant_B': False, 'variant_C': True},
-        'variant_ABC': {'variant_A': True, 'variant_B': True, 'variant_C': True},
-    }
-
     all_results = {}
-    for name, flags in variants.items():
-        label, data = run_variant(name, flags)
+    for name, flags in H2_VARIANTS.items():
+        label, data = run_variant(name, flags, config=config, num_runs=num_runs, seed=seed,
+                                  options=options)
         all_results[label] = data
 
     return all_results
\ No newline at end of file
@@ -10,18 +10,25 @@ By varying the delay offset for real news, the experiment tracks:
 - Belief conversion rates
 - Final belief counts per news type
 
-Results are printed and returned for visualization and analysis.
+Results are returned for visualization and analysis; main.py prints them.
 '''
 
 import numpy as np
-from baseline_run import run_baseline_simulation
+from config import SimulationConfig, DEFAULT_CONFIG
+from baseline_run import run_baseline_simulation, RunOptions, DEFAULT_OPTIONS
 
-def run_hypothesis3(real_news_delay: int) -> dict:
+def run_hypothesis3(real_news_delay: int, config: SimulationConfig = DEFAULT_CONFIG, num_runs: int = 1000,
+                    seed: int | None = None, options: RunOptions = DEFAULT_OPTIONS) -> dict:
     """
     Runs simulation with delayed real news to evaluate belief revision (Hypothesis 3).
 
     Parameters:
         real_news_delay : int. Number of rounds to delay real news introduction.
+        config : SimulationConfig. Parameters of every run.
+        num_runs : int. Number of simulation runs.
+        seed : int or None. Base seed of the runs (unseeded if None).
+        options : RunOptions. Engine, processes, progress and other runner options (see baseline_run.RunOptions); a
+            progress bar is labelled with the delay.
 
     Returns:
         dict : dict. Dictionary with simulation metrics and average belief revisions.
@@ -32,21 +39,10 @@ def run_hypothesis3(real_news_delay: int) -> dict:
         True
     """
     h3_metrics, h3_belief_revised_counts = run_baseline_simulation(
-        num_runs=1000, hypothesis='h3', real_news_delay=real_news_delay
+        num_runs=num_runs, hypothesis='h3', real_news_delay=real_news_delay, config=config, seed=seed,
+        options=options.replace(progress=f"H3 delay={real_news_delay}") if options.progress else options
     )
 
-    final_reach_fake = [run[-1] for run in h3_metrics['fake_reach'] if len(run) > 0]
-    final_reach_real = [run[-1] for run in h3_metrics['real_reach'] if len(run) > 0]
-
-    print("\n")
-    print(f"H3 Results with a delay of {real_news_delay} rounds:")
-    print(f"Average number of fake news shares: {np.mean(h3_metrics['fake_shares']):.1f} ± {np.std(h3_metrics['fake_shares']):.1f}")
-    print(f"Average number of real news shares: {np.mean(h3_metrics['real_shares']):.1f}± {np.std(h3_metrics['real_shares']):.1f}")
-    print(f"Fake News - Avg Reach: {np.mean(final_reach_fake):.1f} ± {np.std(final_reach_fake):.1f}")
-    print(f"Real News - Avg Reach: {np.mean(final_reach_real):.1f} ± {np.std(final_reach_real):.1f}")
-    print(f"Fake News Avg Believers: {np.mean(h3_metrics['fake_belief_count']):.1f} ± {np.std(h3_metrics['fake_belief_count']):.1f}")
-    print(f"Real News Avg Believers: {np.mean(h3_metrics['real_belief_count']):.1f} ± {np.std(h3_metrics['real_belief_count']):.1f}")
-
     results = {
         'metrics': h3_metrics,
         'belief_revised_count': np.mean(h3_belief_revised_counts)
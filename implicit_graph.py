@@ -0,0 +1,341 @@
+'''
+implicit_graph.py
+
+This module provides an implicit (procedurally generated) version of the hybrid network built by
+create_social_network(), for networks far too large to hold as a networkx graph or even as an
+explicit CSR array.
+
+Most edges of the hybrid network are ring-lattice edges of the Watts-Strogatz communities: node u
+of a community is joined to the k_neighbors / 2 nodes on each side of it. Those edges can be
+computed from the node id, so only the exceptions are stored:
+
+- one bit per lattice edge telling whether it was rewired (decided by a counter-based hash),
+- the replacement edges of rewired lattice edges and the Barabási–Albert overlay, as a small CSR.
+
+Edge trust is not stored either: it is derived from a counter-based hash of the edge's endpoints
+and a trust seed, using the same intra-/inter-community ranges as assign_trust_levels().
+ImplicitSocialGraph implements the expand() adjacency protocol of the array engine, so it can be
+passed to simulate_spread_arrays() in place of a GraphArrays.
+'''
+
+import numpy as np
+from config import *
+from graph_arrays import GraphArrays
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+_REWIRE_SALT = 0x5157
+_TRUST_SALT = 0x7457
+
+
+def splitmix64(x: np.ndarray) -> np.ndarray:
+    """
+    Counter-based hash (SplitMix64 finalizer) of an array of 64-bit counters.
+
+    Parameters:
+        x : np.ndarray. Counters (converted to uint64).
+
+    Returns:
+        np.ndarray : uint64 hash of every counter.
+
+    Examples:
+        >>> a = splitmix64(np.arange(3))
+        >>> bool((a == splitmix64(np.arange(3))).all()) and len(set(a.tolist())) == 3
+        True
+    """
+    z = np.asarray(x, dtype=np.uint64) + _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * _MIX1
+    z = (z ^ (z >> np.uint64(27))) * _MIX2
+    return z ^ (z >> np.uint64(31))
+
+
+def hash_uniform(x: np.ndarray) -> np.ndarray:
+    """Maps counters to reproducible uniform floats in [0, 1) through splitmix64()."""
+    return (splitmix64(x) >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def _stream_key(seed: int, salt: int) -> np.uint64:
+    return splitmix64(np.array([seed * 65536 + salt]))[0]
+
+
+def preferential_attachment_edges(num_nodes: int, m: int, rng: np.random.Generator,
+                                  block_fraction: float = 0.01) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Generates Barabási–Albert edges with arrays instead of a per-node loop.
+
+    Like nx.barabasi_albert_graph, it starts from a star on m + 1 nodes and attaches every new node
+    to m distinct existing nodes chosen proportionally to degree (by sampling the list of edge
+    endpoints). New nodes are added in blocks of about block_fraction of the current network size,
+    whose targets are sampled from the endpoint list as of the start of the block.
+
+    Parameters:
+        num_nodes : int. Total number of nodes.
+        m : int. Number of edges attached from every new node.
+        rng : np.random.Generator. Random generator.
+        block_fraction : float. Relative size of the blocks of nodes attached together.
+
+    Returns:
+        sources : np.ndarray. First endpoint of every edge (the newer node).
+        targets : np.ndarray. Second endpoint of every edge.
+
+    Examples:
+        >>> sources, targets = preferential_attachment_edges(1000, 3, np.random.default_rng(0))
+        >>> len(sources) == 3 * (1000 - 3 - 1) + 3 and bool((targets < sources).all())
+        True
+    """
+    num_edges = m + m * (num_nodes - m - 1)
+    sources = np.empty(num_edges, dtype=np.int32)
+    targets = np.empty(num_edges, dtype=np.int32)
+    endpoints = np.empty(2 * num_edges, dtype=np.int32)
+
+    # initial star: node 0 joined to nodes 1..m
+    sources[:m] = np.arange(1, m + 1)
+    targets[:m] = 0
+    endpoints[:m] = np.arange(1, m + 1)
+    endpoints[m:2 * m] = 0
+    num_filled_edges = m
+    num_endpoints = 2 * m
+
+    source = m + 1
+    while source < num_nodes:
+        block = min(num_nodes - source, max(1, int(source * block_fraction)))
+        picks = endpoints[rng.integers(0, num_endpoints, size=(block, m))]
+        for _ in range(20):  # resample rows that picked the same node twice
+            picks.sort(axis=1)
+            duplicated = (picks[:, 1:] == picks[:, :-1]).any(axis=1)
+            if not duplicated.any():
+                break
+            picks[duplicated] = endpoints[rng.integers(0, num_endpoints, size=(int(duplicated.sum()), m))]
+        new_nodes = np.repeat(np.arange(source, source + block, dtype=np.int32), m)
+
+        end = num_filled_edges + block * m
+        sources[num_filled_edges:end] = new_nodes
+        targets[num_filled_edges:end] = picks.ravel()
+        endpoints[num_endpoints:num_endpoints + block * m] = picks.ravel()
+        endpoints[num_endpoints + block * m:num_endpoints + 2 * block * m] = new_nodes
+        num_filled_edges = end
+        num_endpoints += 2 * block * m
+        source += block
+
+    return sources, targets
+
+
+class ImplicitSocialGraph:
+    """
+    Hybrid Watts-Strogatz / Barabási–Albert network whose lattice edges are generated on the fly.
+
+    Attributes:
+        num_nodes : int. Number of nodes.
+        community_size : int. Nodes per Watts-Strogatz community (contiguous id blocks).
+        half_k : int. Lattice neighbors on each side of a node (k_neighbors // 2).
+        trust_seed : int. Seed of the edge trust hash; change it with reseed_trust() to redraw all trust values.
+        extra_indptr, extra_indices : np.ndarray. CSR of the stored exception edges (rewired and BA edges).
+
+    The structure parameters (num_agents, num_communities, k_neighbors, rewire_fraction, ba_attachment)
+    default to those of config; explicit arguments override it, as in create_social_network().
+
+    Examples:
+        >>> ImplicitSocialGraph(config=DEFAULT_CONFIG.replace(num_agents=600, num_communities=2)).community_size
+        300
+    """
+    def __init__(self, num_agents: int | None = None, num_communities: int | None = None,
+                 k_neighbors: int | None = None, rewire_fraction: float | None = None,
+                 ba_attachment: int | None = None, seed: int = 0, chunk_size: int = 1 << 22,
+                 config: SimulationConfig = DEFAULT_CONFIG):
+        num_agents = config.num_agents if num_agents is None else num_agents
+        num_communities = config.num_communities if num_communities is None else num_communities
+        k_neighbors = config.k_neighbors if k_neighbors is None else k_neighbors
+        rewire_fraction = config.rewire_fraction if rewire_fraction is None else rewire_fraction
+        ba_attachment = config.ba_attachment if ba_attachment is None else ba_attachment
+        self.num_nodes = int(num_agents)
+        self.num_communities = int(num_communities)
+        self.community_size = num_agents // num_communities
+        self.num_lattice_nodes = self.community_size * num_communities
+        self.half_k = k_neighbors // 2
+        self.rewire_fraction = rewire_fraction
+        self.trust_seed = seed
+        self._rewire_key = _stream_key(seed, _REWIRE_SALT)
+        self._trust_key = _stream_key(seed, _TRUST_SALT)
+        rng = np.random.default_rng(seed)
+
+        # Which lattice edges (owner u, offset j) were rewired: one bit each
+        num_slots = self.num_lattice_nodes * self.half_k
+        rewired = np.empty(num_slots, dtype=bool)
+        for start in range(0, num_slots, chunk_size):
+            counters = np.arange(start, min(start + chunk_size, num_slots), dtype=np.uint64)
+            rewired[start:start + len(counters)] = hash_uniform(counters ^ self._rewire_key) < rewire_fraction
+        rewired_slots = np.flatnonzero(rewired)
+        self._rewired_bits = np.packbits(rewired, bitorder='little')
+        del rewired
+
+        # Replacement edges of rewired lattice edges: (owner, random node of the same community)
+        owners = (rewired_slots // self.half_k).astype(np.int64)
+        replacements = self._draw_replacements(owners, rng)
+
+        # Barabási–Albert overlay across the whole network
+        ba_sources, ba_targets = preferential_attachment_edges(self.num_nodes, ba_attachment, rng)
+
+        self._build_extras(np.concatenate([owners, ba_sources]), np.concatenate([replacements, ba_targets]))
+
+    def _draw_replacements(self, owners: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        base = (owners // self.community_size) * self.community_size
+        local = owners - base
+        replacement_local = rng.integers(0, self.community_size, size=len(owners))
+        for _ in range(50):  # avoid self loops and existing lattice neighbors, as in nx.watts_strogatz_graph
+            distance = np.abs(replacement_local - local)
+            distance = np.minimum(distance, self.community_size - distance)
+            invalid = distance <= self.half_k
+            if not invalid.any():
+                break
+            replacement_local[invalid] = rng.integers(0, self.community_size, size=int(invalid.sum()))
+        return base + replacement_local
+
+    def _build_extras(self, a: np.ndarray, b: np.ndarray) -> None:
+        a, b = np.minimum(a, b).astype(np.int64), np.maximum(a, b).astype(np.int64)
+        keep = a != b
+        keys = np.sort(a[keep] * self.num_nodes + b[keep])
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        a, b = keys // self.num_nodes, keys % self.num_nodes
+        keep = ~self._is_lattice_edge(a, b)  # the edge already exists in the (unrewired) lattice
+        a, b = a[keep].astype(np.int32), b[keep].astype(np.int32)
+
+        rows = np.concatenate([a, b])
+        cols = np.concatenate([b, a])
+        order = np.argsort(rows, kind='stable')
+        self.extra_indices = cols[order]
+        del order
+        self.extra_indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=self.num_nodes), out=self.extra_indptr[1:])
+        self.num_extra_edges = len(a)
+
+    def community_of(self, nodes: np.ndarray) -> np.ndarray:
+        """Community label of the given nodes (-1 for nodes outside the lattice blocks)."""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        return np.where(nodes < self.num_lattice_nodes, nodes // max(1, self.community_size), -1)
+
+    def _is_rewired(self, owners: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        slots = owners * self.half_k + (offsets - 1)
+        return ((self._rewired_bits[slots >> 3] >> (slots & 7).astype(np.uint8)) & 1).astype(bool)
+
+    def _is_lattice_edge(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Whether (a, b) is a lattice edge that was not rewired."""
+        ca, cb = self.community_of(a), self.community_of(b)
+        same = (ca == cb) & (ca >= 0)
+        forward = (b - a) % max(1, self.community_size)
+        backward = self.community_size - forward
+        result = np.zeros(len(a), dtype=bool)
+        for distance, owner in ((forward, a), (backward, b)):
+            hit = same & (distance >= 1) & (distance <= self.half_k)
+            result[hit] |= ~self._is_rewired(owner[hit], distance[hit])
+        return result
+
+    def reseed_trust(self, trust_seed: int) -> None:
+        """Redraws every edge trust value at once by changing the trust hash seed."""
+        self.trust_seed = trust_seed
+        self._trust_key = _stream_key(trust_seed, _TRUST_SALT)
+
+    def edge_trust(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        Trust of the edges (a, b): 0.8–1.0 inside a community, 0.1–0.5 across communities,
+        derived from a hash of the unordered endpoint pair.
+        """
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        u = hash_uniform((lo * self.num_nodes + hi).astype(np.uint64) ^ self._trust_key)
+        ca = self.community_of(a)
+        intra = (ca == self.community_of(b)) & (ca >= 0)
+        return np.where(intra, 0.8 + 0.2 * u, 0.1 + 0.4 * u)
+
+    def expand(self, sources: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Adjacency protocol used by the array engine: returns every (source, neighbor, trust)
+        contact of the given nodes, generating lattice neighbors on the fly.
+
+        Parameters:
+            sources : np.ndarray. Node ids whose neighbors are gathered.
+
+        Returns:
+            owner : np.ndarray. Position in sources of each contact's sender (non-decreasing).
+            neighbors : np.ndarray. Receiving node of each contact.
+            trust : np.ndarray. Trust of the edge carrying each contact.
+
+        Examples:
+            >>> graph = ImplicitSocialGraph(300, 3, 4, seed=1)
+            >>> explicit = graph.to_graph_arrays()
+            >>> owner, neighbors, trust = graph.expand(np.array([5, 250]))
+            >>> sorted(neighbors[owner == 0].tolist()) == explicit.indices[explicit.indptr[5]:explicit.indptr[6]].tolist()
+            True
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        owner_parts, neighbor_parts = [], []
+
+        # ring-lattice neighbors within the community
+        in_lattice = np.flatnonzero(sources < self.num_lattice_nodes)
+        if len(in_lattice) and self.half_k:
+            nodes = sources[in_lattice]
+            base = (nodes // self.community_size) * self.community_size
+            local = nodes - base
+            for j in range(1, self.half_k + 1):
+                offsets = np.full(len(nodes), j)
+                forward = base + (local + j) % self.community_size
+                backward = base + (local - j) % self.community_size
+                present = ~self._is_rewired(nodes, offsets)
+                owner_parts.append(in_lattice[present])
+                neighbor_parts.append(forward[present])
+                present = ~self._is_rewired(backward, offsets)
+                owner_parts.append(in_lattice[present])
+                neighbor_parts.append(backward[present])
+
+        # stored exception edges
+        starts = self.extra_indptr[sources]
+        counts = self.extra_indptr[sources + 1] - starts
+        row_offsets = np.cumsum(counts) - counts
+        slots = np.arange(int(counts.sum()), dtype=np.int64) + np.repeat(starts - row_offsets, counts)
+        owner_parts.append(np.repeat(np.arange(len(sources)), counts))
+        neighbor_parts.append(self.extra_indices[slots].astype(np.int64))
+
+        owner = np.concatenate(owner_parts)
+        neighbors = np.concatenate(neighbor_parts)
+        order = np.argsort(owner, kind='stable')
+        owner, neighbors = owner[order], neighbors[order]
+        return owner, neighbors, self.edge_trust(sources[owner], neighbors)
+
+    def degrees(self, chunk_size: int = 1 << 20) -> np.ndarray:
+        """
+        Returns the degree of every node, computed chunk by chunk without materializing the lattice.
+
+        Examples:
+            >>> graph = ImplicitSocialGraph(300, 3, 4, seed=1)
+            >>> bool((graph.degrees() == graph.to_graph_arrays().degrees()).all())
+            True
+        """
+        degrees = np.diff(self.extra_indptr)
+        for start in range(0, self.num_lattice_nodes, chunk_size):
+            nodes = np.arange(start, min(start + chunk_size, self.num_lattice_nodes), dtype=np.int64)
+            base = (nodes // self.community_size) * self.community_size
+            local = nodes - base
+            lattice_degree = np.full(len(nodes), 2 * self.half_k)
+            for j in range(1, self.half_k + 1):
+                offsets = np.full(len(nodes), j)
+                backward = base + (local - j) % self.community_size
+                lattice_degree -= self._is_rewired(nodes, offsets)
+                lattice_degree -= self._is_rewired(backward, offsets)
+            degrees[start:start + len(nodes)] += lattice_degree
+        return degrees
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the stored exception structures."""
+        return self._rewired_bits.nbytes + self.extra_indptr.nbytes + self.extra_indices.nbytes
+
+    def to_graph_arrays(self) -> GraphArrays:
+        """
+        Materializes the full graph as an explicit GraphArrays (with trust and community labels), for
+        checking and for networks small enough to hold explicitly.
+        """
+        owner, neighbors, trust = self.expand(np.arange(self.num_nodes))
+        keep = owner < neighbors
+        graph = GraphArrays(self.num_nodes, owner[keep], neighbors[keep], community=self.community_of(np.arange(self.num_nodes)))
+        graph.set_edge_trust(trust[keep])
+        return graph
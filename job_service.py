@@ -0,0 +1,476 @@
+'''
+job_service.py
+
+This module runs a small local simulation job service, so that several analysts can submit sweeps
+to one machine instead of hand-editing main.py: experiments are queued, executed on one shared
+process pool, identical requests are computed once, and finished results are served from the
+result cache (see result_cache.py).
+
+An experiment spec is a JSON object:
+    {"overrides": {"p_fact_check": 0.5}, "hypothesis": "h2",
+     "variant_flag": {"variant_A": true, "variant_B": false, "variant_C": false},
+     "percent_fc": null, "real_news_delay": 0, "num_runs": 1000, "seed": 0, "engine": "arrays"}
+(every key is optional). It describes one run_baseline_simulation() call. The job id is the result
+cache key of that call, so specs that differ only in spelling (defaults, key order) are the same job:
+a request for a job that is already queued or running joins it, and a request for a job whose result
+is cached completes at once.
+
+A job is split into run ranges of chunk_runs runs (seeded as in sharding.py, so the merged result
+equals a single run_baseline_simulation() call). All jobs share one process pool; ranges are
+dispatched in submission order, at most one per worker at a time.
+
+HTTP API (JSON; streams are newline-delimited JSON, one event per line, ending with the final state):
+    POST /jobs                  submit a spec           -> job state
+    GET  /jobs                  list jobs               -> [job state, ...]
+    GET  /jobs/<id>             job state with partial aggregates (means of the finished runs)
+    GET  /jobs/<id>/events      stream of job states until the job finishes
+    GET  /jobs/<id>/result      full metrics and belief revision counts of a finished job
+
+It includes:
+- parse_spec(): spec validation into run_baseline_simulation() arguments
+- JobService: queue, shared pool, coalescing, cache, HTTP server (start(), close())
+- request() / stream_events(): minimal asyncio HTTP client for localhost use and tests
+
+Command line usage:
+    python job_service.py --port 8765 --processes 4
+'''
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Tuple
+import numpy as np
+
+from config import SimulationConfig, DEFAULT_CONFIG
+from baseline_run import run_baseline_simulation, new_metrics, RunOptions
+from outcomes import outcome_samples
+from result_cache import ResultCache
+
+SPEC_KEYS = ('overrides', 'hypothesis', 'variant_flag', 'percent_fc', 'real_news_delay', 'num_runs', 'seed', 'engine')
+DEFAULT_CHUNK_RUNS = 25
+FINISHED = ('done', 'failed')
+
+
+def _integer(spec: Dict[str, Any], key: str, default: int, minimum: int | None = None) -> int:
+    value = spec.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{key} must be an integer, not {json.dumps(value)}")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{key} must be at least {minimum}")
+    return value
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_override(name: str, value: Any, default: Any) -> Any:
+    # JSON values must have the type of the config field they replace; returns the value in that type
+    if isinstance(default, bool):
+        valid = isinstance(value, bool)
+    elif isinstance(default, (int, float)):
+        valid = _is_number(value) and (isinstance(default, float) or isinstance(value, int))
+    elif name.endswith('delay_distribution'):
+        pairs = list(value.items()) if isinstance(value, dict) else value
+        valid = isinstance(pairs, list) and len(pairs) > 0 and all(
+            isinstance(pair, (list, tuple)) and len(pair) == 2 and _is_number(pair[1])
+            and (isinstance(pair[0], int) or (isinstance(pair[0], str) and pair[0].isdigit()))
+            for pair in pairs)
+    else:  # (low, high) ranges
+        valid = isinstance(value, list) and len(value) == len(default) and all(map(_is_number, value))
+    if not valid:
+        raise ValueError(f"invalid config overrides: {json.dumps(value)} is not a valid value for {name}")
+    return float(value) if isinstance(default, float) else value
+
+
+def parse_spec(spec: Dict[str, Any], config: SimulationConfig = DEFAULT_CONFIG) -> Dict[str, Any]:
+    """
+    Validates an experiment spec and converts it into run_baseline_simulation() keyword arguments
+    (config overrides, percent_fc and variant flags folded into one SimulationConfig). Every value
+    is type-checked, so a malformed spec is rejected here rather than failing in a worker.
+
+    Raises:
+        ValueError : If the spec has unknown keys or invalid values.
+
+    Examples:
+        >>> kwargs = parse_spec({'overrides': {'p_fact_check': 0.5}, 'percent_fc': 0.7, 'num_runs': 10})
+        >>> kwargs['config'].p_fact_check, kwargs['config'].percent_fact_checkers, kwargs['seed']
+        (0.5, 0.7, 0)
+        >>> parse_spec({'overrides': {'p_fact_chek': 0.5}})  # doctest: +ELLIPSIS
+        Traceback (most recent call last):
+        ...
+        ValueError: invalid config overrides: ...
+        >>> parse_spec({'seed': None})
+        Traceback (most recent call last):
+        ...
+        ValueError: seed must be an integer, not null
+        >>> parse_spec({'overrides': {'max_rounds': [1]}})
+        Traceback (most recent call last):
+        ...
+        ValueError: invalid config overrides: [1] is not a valid value for max_rounds
+        >>> parse_spec({'variant_flag': {'variant_A': 'yes'}})
+        Traceback (most recent call last):
+        ...
+        ValueError: variant_flag must map variant_A, variant_B or variant_C to true or false
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("spec must be a JSON object")
+    unknown = sorted(set(spec) - set(SPEC_KEYS))
+    if unknown:
+        raise ValueError(f"unknown spec keys {unknown} (expected {list(SPEC_KEYS)})")
+    overrides = spec.get('overrides') or {}
+    if not isinstance(overrides, dict):
+        raise ValueError("overrides must be a JSON object")
+    for name in overrides:
+        if name not in config.__dataclass_fields__:
+            raise ValueError(f"invalid config overrides: unknown parameter {name!r}")
+    config = config.replace(**{name: _check_override(name, value, getattr(config, name))
+                               for name, value in overrides.items()})
+    percent_fc = spec.get('percent_fc')
+    if percent_fc is not None:
+        if not _is_number(percent_fc) or not 0 <= percent_fc <= 1:
+            raise ValueError("percent_fc must be a number between 0 and 1")
+        config = config.replace(percent_fact_checkers=float(percent_fc))
+    variant_flag = spec.get('variant_flag')
+    if variant_flag is not None:
+        if not isinstance(variant_flag, dict) or not all(
+                name in ('variant_A', 'variant_B', 'variant_C') and isinstance(value, bool)
+                for name, value in variant_flag.items()):
+            raise ValueError("variant_flag must map variant_A, variant_B or variant_C to true or false")
+        config = config.with_variants(variant_flag)
+    hypothesis = spec.get('hypothesis')
+    if hypothesis not in (None, 'h1', 'h2', 'h3'):
+        raise ValueError(f"unknown hypothesis {json.dumps(hypothesis)}")
+    engine = spec.get('engine', 'arrays')
+    if engine not in ('reference', 'arrays', 'partitioned'):
+        raise ValueError(f"unknown engine {json.dumps(engine)}")
+    return {'num_runs': _integer(spec, 'num_runs', 1000, minimum=1), 'hypothesis': hypothesis,
+            'real_news_delay': _integer(spec, 'real_news_delay', 0, minimum=0),
+            'seed': _integer(spec, 'seed', 0), 'config': config, 'options': RunOptions(engine=engine)}
+
+
+def _run_range(kwargs: Dict[str, Any], first_run: int, num_runs: int) -> Tuple[Dict[str, list], List[int]]:
+    # executed in a pool worker: one seeded run range of a job
+    return run_baseline_simulation(**dict(kwargs, num_runs=num_runs), first_run=first_run)
+
+
+def _to_json(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+class Job:
+    """
+    State of one experiment.
+
+    Attributes:
+        id : str. Cache key of the experiment.
+        kwargs : dict. run_baseline_simulation() arguments.
+        status : str. 'queued', 'running', 'done' or 'failed'.
+        runs_done : int. Number of finished runs.
+        cached : bool. Whether the result came from the cache.
+        result : tuple or None. (metrics, belief_revised_counts) once done.
+        error : str or None. Failure message.
+    """
+    def __init__(self, job_id: str, kwargs: Dict[str, Any]):
+        self.id = job_id
+        self.kwargs = kwargs
+        self.status = 'queued'
+        self.runs_done = 0
+        self.cached = False
+        self.result = None
+        self.error = None
+        self._ranges: Dict[int, Tuple[Dict[str, list], List[int]]] = {}
+        self._subscribers: List[asyncio.Queue] = []
+
+    def partial(self) -> Dict[str, float]:
+        """Means of every outcome (see outcomes.OUTCOMES) over the finished runs."""
+        if self.result is not None:
+            metrics, revisions = self.result
+        else:
+            metrics, revisions = _merge([self._ranges[first] for first in sorted(self._ranges)])
+        if not revisions:
+            return {}
+        return {name: float(values.mean()) for name, values in outcome_samples(metrics, revisions).items()}
+
+    def state(self) -> Dict[str, Any]:
+        config = self.kwargs['config']
+        return {'id': self.id, 'status': self.status, 'runs_done': self.runs_done,
+                'num_runs': self.kwargs['num_runs'], 'cached': self.cached, 'error': self.error,
+                'hypothesis': self.kwargs['hypothesis'], 'real_news_delay': self.kwargs['real_news_delay'],
+                'variant_flag': config.variant_flags, 'percent_fc': config.percent_fact_checkers,
+                'partial': self.partial()}
+
+    def notify(self) -> None:
+        state = self.state()
+        for queue in self._subscribers:
+            queue.put_nowait(state)
+
+
+def _merge(parts: List[Tuple[Dict[str, list], List[int]]]) -> Tuple[Dict[str, list], List[int]]:
+    metrics, revisions = new_metrics(), []
+    for part_metrics, part_revisions in parts:
+        for key in metrics:
+            metrics[key].extend(part_metrics[key])
+        revisions.extend(part_revisions)
+    return metrics, revisions
+
+
+class JobService:
+    """
+    Queues experiments and runs them on one shared process pool, with request coalescing and a
+    result cache.
+
+    Attributes:
+        jobs : dict. Job id -> Job.
+        cache : ResultCache. Store of finished results.
+        chunk_runs : int. Runs per dispatched range.
+
+    Examples:
+        >>> import tempfile
+        >>> async def demo():
+        ...     service = JobService(processes=1, chunk_runs=2, cache=ResultCache(tempfile.mkdtemp()))
+        ...     server = await service.start('127.0.0.1', 0)
+        ...     port = server.sockets[0].getsockname()[1]
+        ...     spec = {'num_runs': 4, 'seed': 1, 'hypothesis': 'h3', 'real_news_delay': 2}
+        ...     same = dict(spec, engine='arrays', overrides={})
+        ...     (_, first), (_, second) = await asyncio.gather(request(port, 'POST', '/jobs', spec),
+        ...                                                    request(port, 'POST', '/jobs', same))
+        ...     events = [event async for event in stream_events(port, first['id'])]
+        ...     _, result = await request(port, 'GET', f"/jobs/{first['id']}/result")
+        ...     _, again = await request(port, 'POST', '/jobs', spec)
+        ...     status, error = await request(port, 'POST', '/jobs', {'engine': 'gpu'})
+        ...     await service.close()
+        ...     return first['id'] == second['id'], events[-1]['status'], events[-1]['runs_done'], \\
+        ...         len(result['metrics']['fake_reach']), again['status'], status
+        >>> asyncio.run(demo())
+        (True, 'done', 4, 4, 'done', 400)
+        >>> metrics, _ = run_baseline_simulation(4, seed=1, hypothesis='h3', real_news_delay=2,
+        ...                                       options=RunOptions(engine='arrays'))
+        >>> asyncio.run(_served_result(metrics)) == metrics['fake_reach']
+        True
+    """
+    def __init__(self, processes: int | None = None, chunk_runs: int = DEFAULT_CHUNK_RUNS,
+                 cache: ResultCache | None = None, config: SimulationConfig = DEFAULT_CONFIG):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.chunk_runs = chunk_runs
+        self.cache = cache if cache is not None else ResultCache()
+        self.config = config
+        self.jobs: Dict[str, Job] = {}
+        self._pool: ProcessPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._tasks: List[asyncio.Task] = []
+        self._server: asyncio.AbstractServer | None = None
+
+    # --- jobs ---
+
+    def submit(self, spec: Dict[str, Any]) -> Job:
+        """
+        Returns the job of a spec: the existing one if the same experiment was already submitted
+        (and has not failed), a finished one if its result is cached, otherwise a newly queued job.
+        """
+        kwargs = parse_spec(spec, self.config)
+        job_id = self.cache.key(run_baseline_simulation, **kwargs)[:16]
+        job = self.jobs.get(job_id)
+        if job is not None and job.status != 'failed':
+            return job
+        job = Job(job_id, kwargs)
+        self.jobs[job_id] = job
+        found, result = self.cache.get(run_baseline_simulation, **kwargs)
+        if found:
+            job.status, job.cached, job.result, job.runs_done = 'done', True, result, kwargs['num_runs']
+        else:
+            self._tasks.append(asyncio.get_running_loop().create_task(self._run(job)))
+        return job
+
+    async def _run_range(self, job: Job, first_run: int, num_runs: int) -> None:
+        async with self._slots:  # waiters are woken in submission order
+            job.status = 'running'
+            part = await asyncio.get_running_loop().run_in_executor(self._pool, _run_range, job.kwargs,
+                                                                    first_run, num_runs)
+        job._ranges[first_run] = part
+        job.runs_done += num_runs
+        job.notify()
+
+    async def _run(self, job: Job) -> None:
+        num_runs = job.kwargs['num_runs']
+        try:
+            await asyncio.gather(*(self._run_range(job, first, min(self.chunk_runs, num_runs - first))
+                                   for first in range(0, num_runs, self.chunk_runs)))
+            job.result = _merge([job._ranges[first] for first in sorted(job._ranges)])
+            job._ranges.clear()
+            self.cache.put(job.result, run_baseline_simulation, **job.kwargs)
+            job.status = 'done'
+        except Exception as error:
+            job.status, job.error = 'failed', f"{type(error).__name__}: {error}"
+        job.notify()
+
+    async def events(self, job: Job) -> AsyncIterator[Dict[str, Any]]:
+        """Yields the job's state now and after every finished range, until the job finishes."""
+        queue: asyncio.Queue = asyncio.Queue()
+        job._subscribers.append(queue)
+        try:
+            state = job.state()
+            yield state
+            while state['status'] not in FINISHED:
+                state = await queue.get()
+                yield state
+        finally:
+            job._subscribers.remove(queue)
+
+    # --- HTTP ---
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765) -> asyncio.AbstractServer:
+        """Creates the process pool and starts serving HTTP on host:port (port 0 picks a free port)."""
+        self._pool = ProcessPoolExecutor(self.processes)
+        self._slots = asyncio.Semaphore(self.processes)
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    async def close(self) -> None:
+        """Stops serving, cancels unfinished jobs and shuts the pool down."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            if len(request_line) < 2:
+                await self._respond(writer, 400, {'error': 'malformed request'})
+                return
+            await self._route(writer, request_line[0], request_line[1].rstrip('/').split('/')[1:], body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, writer: asyncio.StreamWriter, method: str, parts: List[str], body: bytes) -> None:
+        if parts[:1] != ['jobs']:
+            await self._respond(writer, 404, {'error': 'not found'})
+        elif method == 'POST' and len(parts) == 1:
+            try:
+                job = self.submit(json.loads(body or b'{}'))
+            except (TypeError, ValueError) as error:  # includes malformed JSON
+                await self._respond(writer, 400, {'error': str(error)})
+                return
+            await self._respond(writer, 200, job.state())
+        elif method == 'GET' and len(parts) == 1:
+            await self._respond(writer, 200, [job.state() for job in self.jobs.values()])
+        elif method == 'GET' and parts[1] in self.jobs and len(parts) <= 3:
+            job = self.jobs[parts[1]]
+            if len(parts) == 2:
+                await self._respond(writer, 200, job.state())
+            elif parts[2] == 'events':
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n")
+                async for state in self.events(job):
+                    writer.write(json.dumps(state, default=_to_json).encode() + b'\n')
+                    await writer.drain()
+            elif parts[2] == 'result' and job.status == 'done':
+                metrics, revisions = job.result
+                await self._respond(writer, 200, {'id': job.id, 'metrics': metrics, 'belief_revised_counts': revisions})
+            elif parts[2] == 'result':
+                await self._respond(writer, 409, {'error': f"job is {job.status}"})
+            else:
+                await self._respond(writer, 404, {'error': 'not found'})
+        else:
+            await self._respond(writer, 404, {'error': 'not found'})
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Any) -> None:
+        body = json.dumps(payload, default=_to_json).encode()
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 409: 'Conflict'}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+
+async def _open(port: int, method: str, path: str, payload: Any, host: str):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    while (await reader.readline()).strip():
+        pass
+    return reader, writer, status
+
+
+async def request(port: int, method: str, path: str, payload: Any = None,
+                  host: str = '127.0.0.1') -> Tuple[int, Any]:
+    """
+    Sends one request to a JobService and returns (HTTP status, decoded JSON body).
+    """
+    reader, writer, status = await _open(port, method, path, payload, host)
+    body = await reader.read()
+    writer.close()
+    return status, json.loads(body)
+
+
+async def stream_events(port: int, job_id: str, host: str = '127.0.0.1') -> AsyncIterator[Dict[str, Any]]:
+    """Yields the progress events of a job until it finishes."""
+    reader, writer, _ = await _open(port, 'GET', f"/jobs/{job_id}/events", None, host)
+    try:
+        while line := await reader.readline():
+            yield json.loads(line)
+    finally:
+        writer.close()
+
+
+async def _served_result(expected_metrics) -> List[List[int]]:
+    # doctest helper: result of a fresh 2-process service, with ranges finishing out of order
+    import tempfile
+    service = JobService(processes=2, chunk_runs=1, cache=ResultCache(tempfile.mkdtemp()))
+    server = await service.start('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    spec = {'num_runs': len(expected_metrics['fake_reach']), 'seed': 1, 'hypothesis': 'h3', 'real_news_delay': 2}
+    _, job = await request(port, 'POST', '/jobs', spec)
+    async for _ in stream_events(port, job['id']):
+        pass
+    _, result = await request(port, 'GET', f"/jobs/{job['id']}/result")
+    await service.close()
+    return result['metrics']['fake_reach']
+
+
+async def serve(host: str, port: int, processes: int | None, chunk_runs: int) -> None:
+    service = JobService(processes=processes, chunk_runs=chunk_runs)
+    server = await service.start(host, port)
+    print(f"job service listening on http://{host}:{server.sockets[0].getsockname()[1]} "
+          f"with {service.processes} worker processes")
+    try:
+        await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the local simulation job service.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--chunk-runs', type=int, default=DEFAULT_CHUNK_RUNS)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.processes, args.chunk_runs))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
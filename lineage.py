@@ -0,0 +1,134 @@
+'''
+lineage.py
+
+This module records who infected whom during a run, in flat arrays indexed by news code and agent id,
+so that attribution questions (which seed class a news item reached agents through, how deep a
+cascade went, how much each seed reached) can be answered after any run, in any hypothesis mode.
+
+Each infection costs a constant number of array writes: the child inherits its root seed, its
+origin class (influencer or normal seed) and its depth + 1 from the sender at infection time.
+Only the first infection of an agent by a news item is kept, so every lineage is a forest rooted
+at the seeds.
+
+It includes:
+- CascadeLineage: parent (int32), origin class (int8), root and depth arrays per news code
+- Queries: max_depth(), depth_counts(), subtree_sizes(), reach_per_seed(), origin_counts()
+'''
+
+from typing import Dict
+import numpy as np
+
+NO_PARENT = -1
+
+ORIGIN_UNKNOWN = -1
+ORIGIN_NORMAL = 0
+ORIGIN_INFLUENCER = 1
+
+
+class CascadeLineage:
+    """
+    Infection forest of one run, one row per news code.
+
+    Attributes:
+        parent : np.ndarray. int32 (num_news, n) infecting agent of every agent (NO_PARENT for seeds and unreached agents).
+        origin : np.ndarray. int8 (num_news, n) class of the seed each agent descends from (ORIGIN_*).
+        root : np.ndarray. int32 (num_news, n) seed each agent descends from (-1 if unreached).
+        depth : np.ndarray. int32 (num_news, n) number of hops from the root seed (-1 if unreached).
+
+    Examples:
+        >>> lineage = CascadeLineage(6)
+        >>> lineage.add_seeds(0, np.array([0]), np.array([True, False, False, False, False, False]))
+        >>> lineage.record(0, 1, 0); lineage.record(0, 2, 1); lineage.record(0, 3, 0); lineage.record(0, 3, 2)
+        >>> lineage.parent[0].tolist(), lineage.max_depth(0)
+        ([-1, 0, 1, 0, -1, -1], 2)
+        >>> lineage.subtree_sizes(0).tolist(), lineage.reach_per_seed(0)
+        ([4, 2, 1, 1, 0, 0], {0: 4})
+        >>> lineage.origin_counts(0)
+        {'influencer': 4, 'normal': 0}
+    """
+    def __init__(self, num_agents: int, num_news: int = 2):
+        self.parent = np.full((num_news, num_agents), NO_PARENT, dtype=np.int32)
+        self.origin = np.full((num_news, num_agents), ORIGIN_UNKNOWN, dtype=np.int8)
+        self.root = np.full((num_news, num_agents), -1, dtype=np.int32)
+        self.depth = np.full((num_news, num_agents), -1, dtype=np.int32)
+
+    @property
+    def num_agents(self) -> int:
+        return self.parent.shape[1]
+
+    def add_seeds(self, news: int, seeds: np.ndarray, is_influencer: np.ndarray) -> None:
+        """
+        Registers the seeds of a news item as roots.
+
+        Parameters:
+            news : int. News code.
+            seeds : np.ndarray. Seed agent ids.
+            is_influencer : np.ndarray. Boolean influencer flag of every agent (gives the seeds' origin class).
+        """
+        seeds = np.asarray(seeds)
+        self.parent[news, seeds] = NO_PARENT
+        self.origin[news, seeds] = np.where(is_influencer[seeds], ORIGIN_INFLUENCER, ORIGIN_NORMAL)
+        self.root[news, seeds] = seeds
+        self.depth[news, seeds] = 0
+
+    def record(self, news: int, child: int, sender: int) -> None:
+        """Records that sender passed news to child (ignored if child was already reached by it)."""
+        depth = self.depth[news]
+        if depth[child] < 0:
+            self.parent[news, child] = sender
+            self.root[news, child] = self.root[news, sender]
+            self.origin[news, child] = self.origin[news, sender]
+            depth[child] = depth[sender] + 1
+
+    def record_many(self, news: np.ndarray, children: np.ndarray, senders: np.ndarray) -> None:
+        """
+        Vectorized record() for one batch of infections whose senders were all reached before the batch.
+
+        Parameters:
+            news : np.ndarray. News code of every infection.
+            children : np.ndarray. Infected agents.
+            senders : np.ndarray. Infecting agents.
+        """
+        fresh = self.depth[news, children] < 0
+        news, children, senders = news[fresh], children[fresh], senders[fresh]
+        _, first = np.unique(news.astype(np.int64) * self.num_agents + children, return_index=True)
+        news, children, senders = news[first], children[first], senders[first]
+        self.parent[news, children] = senders
+        self.root[news, children] = self.root[news, senders]
+        self.origin[news, children] = self.origin[news, senders]
+        self.depth[news, children] = self.depth[news, senders] + 1
+
+    def max_depth(self, news: int) -> int:
+        """Returns the length of the longest infection chain of a news item (-1 if it was never seeded)."""
+        return int(self.depth[news].max())
+
+    def depth_counts(self, news: int) -> np.ndarray:
+        """Returns the number of agents reached at each depth (index 0 = seeds)."""
+        depth = self.depth[news]
+        return np.bincount(depth[depth >= 0])
+
+    def subtree_sizes(self, news: int) -> np.ndarray:
+        """
+        Returns, for every agent, the number of agents in its infection subtree (itself included;
+        0 if unreached). Children are folded into their parents one depth level at a time.
+        """
+        depth = self.depth[news]
+        parent = self.parent[news]
+        sizes = (depth >= 0).astype(np.int64)
+        reached = np.flatnonzero(depth > 0)
+        reached = reached[np.argsort(depth[reached], kind='stable')[::-1]]
+        bounds = np.flatnonzero(np.diff(depth[reached])) + 1
+        for level in np.split(reached, bounds):
+            np.add.at(sizes, parent[level], sizes[level])
+        return sizes
+
+    def reach_per_seed(self, news: int) -> Dict[int, int]:
+        """Returns seed id -> number of agents whose lineage starts at that seed (the seed included)."""
+        root = self.root[news]
+        seeds, counts = np.unique(root[root >= 0], return_counts=True)
+        return dict(zip(seeds.tolist(), counts.tolist()))
+
+    def origin_counts(self, news: int) -> Dict[str, int]:
+        """Returns the number of agents reached through influencer and through normal seeds."""
+        counts = np.bincount(self.origin[news][self.origin[news] >= 0], minlength=2)
+        return {'influencer': int(counts[ORIGIN_INFLUENCER]), 'normal': int(counts[ORIGIN_NORMAL])}
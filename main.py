@@ -23,23 +23,121 @@ Execution Flow:
    - Reports belief switches and comparative reach dynamics.
 
 Output includes summary statistics and plots to support analysis of misinformation dynamics.
+
+Results are memoized on disk (see result_cache.py): with --seed, an experiment whose configuration,
+arguments and simulation code are unchanged is loaded from .result_cache instead of being re-run.
+Summaries are printed here from the returned results, so a cached experiment prints the same output.
+Without --seed every experiment draws fresh runs and nothing is cached.
+
+Profiling mode (see profiling.py) runs a sample of one experiment under a profiler instead, and
+writes collapsed stacks for flame graphs plus a hot-function report:
+    python main.py --profile sampling --profile-experiment h1 --profile-runs 50 --profile-processes 4
 '''
 
+import argparse
+import sys
+
 from agent_initializer import *
 from metrics import plot_belief_vs_share, plot_spread_comparison, visualize_h1_results, visualize_h2_results, visualize_h3_results
-from baseline_run import run_baseline_simulation
+from baseline_run import run_baseline_simulation, RunOptions
 from hypothesis1 import run_hypothesis1_experiment
-from hypothesis2 import run_all_variants
+from hypothesis2 import run_all_variants, H2_VARIANTS
 from hypothesis3 import run_hypothesis3
+from result_cache import ResultCache
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the baseline and the three hypothesis experiments.")
+    parser.add_argument('--seed', type=int,
+                        help="base seed of every experiment; only seeded results are cached (unseeded runs are always fresh)")
+    parser.add_argument('--profile', choices=['sampling', 'deterministic'],
+                        help="profile a sample of runs instead of running the experiments")
+    parser.add_argument('--profile-experiment', choices=['baseline', 'h1', 'h2', 'h3'], default='baseline')
+    parser.add_argument('--profile-runs', type=int, default=20, help="profiled runs per experiment point")
+    parser.add_argument('--profile-processes', type=int, default=1)
+    parser.add_argument('--profile-engine', choices=['reference', 'arrays'], default='reference')
+    parser.add_argument('--profile-interval', type=float, default=0.001, help="sampling period in seconds")
+    parser.add_argument('--profile-top', type=int, default=30, help="functions listed in the report")
+    parser.add_argument('--profile-output', default='profile',
+                        help="output prefix: <prefix>.collapsed (flame graph input) and <prefix>.txt (report)")
+    return parser.parse_args(argv)
+
+
+def run_profile(args: argparse.Namespace) -> None:
+    """
+    Profiles args.profile_runs runs of every point of the chosen experiment and writes the
+    collapsed stacks and the top-function report.
+    """
+    from profiling import profile_experiment, write_collapsed, format_report
+
+    stacks = profile_experiment(args.profile_experiment, num_runs=args.profile_runs, mode=args.profile,
+                                interval=args.profile_interval, processes=args.profile_processes,
+                                engine=args.profile_engine)
+    report = format_report(stacks, top=args.profile_top)
+    write_collapsed(stacks, args.profile_output + '.collapsed')
+    with open(args.profile_output + '.txt', 'w') as f:
+        f.write(report + '\n')
+    print(report)
+    print(f"\nCollapsed stacks written to {args.profile_output}.collapsed, report to {args.profile_output}.txt")
+
+
+def print_h1_summary(h1_results: list[dict]) -> None:
+    """Prints the share and reach statistics of every fact-checker percentage of Hypothesis 1."""
+    for res in h1_results:
+        print("\n")
+        print(f"H1 Results when fact-checker percent is {res['fc_percent']}:")
+        print(f"Average number of fake news shares: {res['fake_shares_mean']:.1f} ± {res['fake_shares_std']:.1f}")
+        print(f"Average number of real news shares: {res['real_shares_mean']:.1f}± {res['real_shares_std']:.1f}")
+        print(f"Fake News - Avg Reach: {res['fake_mean']:.1f} ± {res['fake_std']:.1f}")
+        print(f"Real News - Avg Reach: {res['real_mean']:.1f} ± {res['real_std']:.1f}")
+
+
+def print_h2_summary(h2_results: dict) -> None:
+    """Prints the share and reach statistics of every Hypothesis 2 variant, and the influencer impact of Variant A."""
+    for name, res in h2_results.items():
+        print("\n")
+        print(f"H2 Results for {name}:")
+        print(f"Average number of fake news shares: {res['shared_fake']:.1f} ± {res['shared_fake_std']:.1f}")
+        print(f"Average number of real news shares: {res['shared_real']:.1f}± {res['shared_real_std']:.1f}")
+        print(f"Fake News - Avg Reach: {res['reach_fake_mean']:.1f} ± {res['reach_fake_std']:.1f}")
+        print(f"Real News - Avg Reach: {res['reach_real_mean']:.1f} ± {res['reach_real_std']:.1f}")
+
+        if H2_VARIANTS[name]['variant_A']:
+            print(f"\n{name} - Influencer Impact when variant A - Increasing the number of initial influencer seeds")
+            print(f"Avg reach of fake news from influencers: {np.mean(res['influencer_reach_fake']):.1f} ± {np.std(res['influencer_reach_fake']):.1f}")
+            print(f"Avg reach of fake news from normal users: {np.mean(res['normal_reach_fake']):.1f} ± {np.std(res['normal_reach_fake']):.1f}")
+
+
+def print_h3_summary(h3_results: dict, real_news_delay: int) -> None:
+    """Prints the share, reach and final belief statistics of Hypothesis 3."""
+    h3_metrics = h3_results['metrics']
+    final_reach_fake = [run[-1] for run in h3_metrics['fake_reach'] if len(run) > 0]
+    final_reach_real = [run[-1] for run in h3_metrics['real_reach'] if len(run) > 0]
+
+    print("\n")
+    print(f"H3 Results with a delay of {real_news_delay} rounds:")
+    print(f"Average number of fake news shares: {np.mean(h3_metrics['fake_shares']):.1f} ± {np.std(h3_metrics['fake_shares']):.1f}")
+    print(f"Average number of real news shares: {np.mean(h3_metrics['real_shares']):.1f}± {np.std(h3_metrics['real_shares']):.1f}")
+    print(f"Fake News - Avg Reach: {np.mean(final_reach_fake):.1f} ± {np.std(final_reach_fake):.1f}")
+    print(f"Real News - Avg Reach: {np.mean(final_reach_real):.1f} ± {np.std(final_reach_real):.1f}")
+    print(f"Fake News Avg Believers: {np.mean(h3_metrics['fake_belief_count']):.1f} ± {np.std(h3_metrics['fake_belief_count']):.1f}")
+    print(f"Real News Avg Believers: {np.mean(h3_metrics['real_belief_count']):.1f} ± {np.std(h3_metrics['real_belief_count']):.1f}")
 
 
 # Main Execution
 if __name__ == "__main__":
+    args = parse_args()
+    if args.profile:
+        run_profile(args)
+        sys.exit()
+
     # baseline is below
     num_runs = 1000
+    cache = ResultCache()
 
     print("--- Running Baseline ---")
-    baseline_metrics, base_belief_revised_count = run_baseline_simulation(num_runs, hypothesis=None)
+    baseline_metrics, base_belief_revised_count = cache.call(run_baseline_simulation, num_runs, hypothesis=None,
+                                                             seed=args.seed, options=RunOptions(progress='baseline'))
 
     final_reach_fake = [run[-1] for run in baseline_metrics['fake_reach'] if len(run) > 0]
     final_reach_real = [run[-1] for run in baseline_metrics['real_reach'] if len(run) > 0]
@@ -57,15 +155,21 @@ if __name__ == "__main__":
     # hypothesis 1 is below
     print("\n--- Running Hypothesis 1: Impact of having more fact-checkers in the network ---")
     fact_checker_variants = [0.5, 0.7, 0.9]
-    h1_results = run_hypothesis1_experiment(fact_checker_variants=fact_checker_variants)
+    h1_results = cache.call(run_hypothesis1_experiment, fact_checker_variants=fact_checker_variants,
+                            seed=args.seed, options=RunOptions(progress=True))
+    print_h1_summary(h1_results)
     visualize_h1_results(h1_results)
 
     # hypothesis 2 is below
     print("\n--- Running Hypothesis 2: Influencer Behavior Variants ---")
-    h2_results = run_all_variants()
+    h2_results = cache.call(run_all_variants, seed=args.seed, options=RunOptions(progress=True))
+    print_h2_summary(h2_results)
     visualize_h2_results(h2_results)
 
     # hypothesis 3 is below
     print("\n--- Running Hypothesis 3: Competitive Interference with delay---")
-    h3_results = run_hypothesis3(real_news_delay=3)
+    real_news_delay = 3
+    h3_results = cache.call(run_hypothesis3, real_news_delay=real_news_delay, seed=args.seed,
+                            options=RunOptions(progress=True))
+    print_h3_summary(h3_results, real_news_delay)
     visualize_h3_results(h3_results)
\ No newline at end of file
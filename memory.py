@@ -0,0 +1,402 @@
+'''
+memory.py
+
+This module accounts for the memory used by simulation runs and fits experiments into a memory budget.
+
+A run holds five kinds of memory, measured separately by measure_run():
+- graph: the networkx graph and its CSR arrays (GraphArrays), rebuilt for every run
+- agents: role and share-probability arrays, the Agent objects of the reference engine and the
+  per-agent belief / sharing state
+- schedule: the pending share events, at their largest round
+- trace: the event trace of the run, if traces are kept (see event_trace.py)
+- metrics: the per-round reach lists and counters of the run, the only part kept after it ends; the
+  process that collects the results holds them for the whole experiment
+
+plan_experiment() turns these measurements into a plan that fits the budget. It chooses the number
+of worker processes and whether traces can be kept. run_baseline_simulation(options=RunOptions(memory_budget=...))
+applies the plan and tracks the runs with MemoryMonitor, which records the peak RSS of this process and of
+every pool worker while runs stream in.
+
+Sizes come from deep_sizeof(), which follows containers and object attributes and counts numpy
+buffers once. They are lower bounds: allocator slack and temporaries are covered by the headroom
+factor of the plan.
+
+It includes:
+- deep_sizeof(), current_rss(), peak_rss(), parse_bytes(), format_bytes()
+- measure_run(): bytes per component for one run
+- MemoryPlan / plan_experiment(): worker count and trace decision for a memory budget
+- MemoryMonitor: peak RSS per process while a stream of runs is consumed
+
+Command line usage:
+    python memory.py --budget 4GiB --runs 1000 --engine arrays --hypothesis h3 --trace
+'''
+
+import argparse
+import functools
+import multiprocessing
+import os
+import resource
+import sys
+import types
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List
+import numpy as np
+
+from config import SimulationConfig, DEFAULT_CONFIG
+from network_generator import create_social_network
+from agent_initializer import assign_roles_bulk, assign_trust_levels_bulk
+from graph_arrays import GraphArrays
+from simulation import initialize_p_shares_bulk
+from engine import CascadeState, transmission_table, FAKE, REAL
+from event_trace import TraceRecorder
+from baseline_run import seed_run, new_metrics, record_run_metrics
+
+COMPONENTS = ('graph', 'agents', 'schedule', 'trace', 'metrics')
+
+# Objects that are shared by all runs and never counted
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+                  SimulationConfig, np.random.Generator, np.random.BitGenerator)
+
+_UNITS = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'kib': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2, 'mib': 1024 ** 2,
+          'g': 1024 ** 3, 'gb': 1024 ** 3, 'gib': 1024 ** 3}
+
+
+def deep_sizeof(obj: Any, seen: set | None = None) -> int:
+    """
+    Returns the bytes held by obj and everything it references: container items, instance
+    attributes (__dict__ and __slots__) and numpy buffers. An object reached twice is counted once,
+    and classes, modules, functions, configs and random generators are not counted.
+
+    Parameters:
+        obj : Any. Object to measure.
+        seen : set or None. ids of objects already counted (shared between calls to measure disjoint parts).
+
+    Returns:
+        int : Size in bytes.
+
+    Examples:
+        >>> array = np.zeros(1000)
+        >>> deep_sizeof([array, array, array[:10]]) - deep_sizeof([]) - 3 * 8 < 8000 + 500
+        True
+        >>> deep_sizeof({'a': [1, 2]}) > deep_sizeof({})
+        True
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, _SKIPPED_TYPES):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, np.ndarray):
+        # a view's buffer belongs to its base; an owning array's buffer is included in getsizeof
+        return size + (deep_sizeof(obj.base, seen) if obj.base is not None else 0)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+def current_rss() -> int:
+    """Returns the resident set size of this process in bytes (peak_rss() where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return peak_rss()
+
+
+def peak_rss(pid: int | None = None) -> int:
+    """
+    Returns the peak resident set size in bytes of this process, or of process pid (read from
+    /proc/<pid>/status, 0 if it has exited).
+
+    Examples:
+        >>> peak_rss() > 0 and peak_rss(os.getpid()) > 0 and current_rss() > 0
+        True
+    """
+    if pid is None:
+        scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is in bytes on macOS, KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def parse_bytes(text: str | int) -> int:
+    """
+    Parses a size such as '512MiB', '4G' or '1024' (binary units).
+
+    Examples:
+        >>> parse_bytes('4GiB'), parse_bytes('512 mb'), parse_bytes(1024)
+        (4294967296, 536870912, 1024)
+    """
+    if isinstance(text, int):
+        return text
+    value = text.strip().lower()
+    number = value.rstrip('abcdefghijklmnopqrstuvwxyz ')
+    unit = value[len(number):].strip()
+    if not number or unit not in _UNITS:
+        raise ValueError(f"Cannot parse memory size '{text}' (expected e.g. '512MiB' or '4GiB')")
+    return int(float(number) * _UNITS[unit])
+
+
+def format_bytes(size: float) -> str:
+    """
+    Formats a size in binary units.
+
+    Examples:
+        >>> format_bytes(1536), format_bytes(3 * 1024 ** 3)
+        ('1.5 KiB', '3.0 GiB')
+    """
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(size) < 1024 or unit == 'GiB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def measure_run(run_index: int = 0, hypothesis: str | None = None, real_news_delay: int = 0,
+                engine: str = 'reference', seed: int | None = 0, trace: bool = False,
+                config: SimulationConfig = DEFAULT_CONFIG) -> Dict[str, int]:
+    """
+    Builds run run_index as run_baseline_simulation() does and measures each component of its memory.
+    The cascade is replayed with the array engine, one round at a time, to find the largest schedule.
+    For the reference engine, that schedule is converted to its (agent, news type) event tuples, and
+    its Agent objects are measured as well.
+
+    Parameters:
+        run_index, hypothesis, real_news_delay, engine, seed : As in run_baseline_simulation().
+        trace : bool. Whether the run records an event trace.
+        config : SimulationConfig. Parameters of the run.
+
+    Returns:
+        dict : Bytes per component ('graph', 'agents', 'schedule', 'trace', 'metrics'); 'metrics' is
+            the size of the run's entry in the metrics of its experiment.
+
+    Examples:
+        >>> sizes = measure_run(engine='arrays', trace=True)
+        >>> sorted(sizes) == sorted(COMPONENTS) and sizes['graph'] > sizes['metrics'] > 0 and sizes['trace'] > 0
+        True
+        >>> measure_run(engine='reference')['agents'] > sizes['agents']
+        True
+    """
+    rng = seed_run(seed, run_index)
+    G = create_social_network(rng=rng, config=config)
+    graph = GraphArrays.from_networkx(G)
+    roles = assign_roles_bulk(graph.degrees(), rng, config=config)
+    initialize_p_shares_bulk(roles, rng, config=config)
+    assign_trust_levels_bulk(graph, rng)
+    transmission = transmission_table(graph, roles, config)
+
+    sizes = dict.fromkeys(COMPONENTS, 0)
+    seen = set()
+    sizes['graph'] = deep_sizeof(G, seen) + deep_sizeof(graph, seen) + deep_sizeof(transmission, seen)
+    sizes['agents'] = deep_sizeof(roles, seen)
+    if engine == 'reference':
+        sizes['agents'] += deep_sizeof(roles.to_agents(graph.degrees()), seen)
+
+    recorder = TraceRecorder() if trace else None
+    state = CascadeState(graph, roles, rng, hypothesis=hypothesis, trace=recorder,
+                         transmission=transmission, config=config)
+    sizes['agents'] += sum(deep_sizeof(getattr(state, name), seen) for name in ('belief', 'has_shared', 'infected'))
+    state.seed_news(real_news_delay)
+    while not state.done:
+        if engine == 'reference':
+            events = {share_round: [(int(agent), news) for ids, codes in batches
+                                    for agent, news in zip(ids, np.where(codes == FAKE, 'fake', 'real'))]
+                      for share_round, batches in state.schedule.items()}
+        else:
+            events = state.schedule
+        sizes['schedule'] = max(sizes['schedule'], deep_sizeof(events))
+        state.advance_round()
+    if recorder is not None:
+        sizes['trace'] = deep_sizeof(recorder)
+
+    stats, final_beliefs, _, influencer_impact = state.results()
+    metrics = new_metrics()
+    empty = deep_sizeof(metrics)
+    record_run_metrics(metrics, stats, {'fake': state.shared_count[FAKE], 'real': state.shared_count[REAL]},
+                       final_beliefs, influencer_impact)
+    sizes['metrics'] = deep_sizeof(metrics) - empty
+    return sizes
+
+
+@dataclass
+class MemoryPlan:
+    """
+    Execution plan of an experiment under a memory budget.
+
+    Attributes:
+        budget : int. Memory budget in bytes.
+        processes : int. Worker processes to use (1 runs in the collecting process).
+        keep_traces : bool. Whether event traces fit the budget.
+        run_sizes : dict. Largest bytes per component over the measured runs.
+        base_bytes : int. Resident size of an idle interpreter with the simulation modules loaded.
+        worker_bytes : int. Estimated peak of one worker process.
+        parent_bytes : int. Estimated peak of the collecting process (base plus all metrics).
+        total_bytes : int. Estimated peak of the whole experiment.
+        fits : bool. Whether total_bytes is within the budget.
+    """
+    budget: int
+    processes: int
+    keep_traces: bool
+    run_sizes: Dict[str, int] = field(default_factory=dict)
+    base_bytes: int = 0
+    worker_bytes: int = 0
+    parent_bytes: int = 0
+    total_bytes: int = 0
+    fits: bool = True
+
+    def report(self) -> str:
+        """Formats the plan and its per-run breakdown as text."""
+        lines = [f"budget {format_bytes(self.budget)}: {self.processes} process(es), traces "
+                 f"{'kept' if self.keep_traces else 'dropped'}, estimated peak {format_bytes(self.total_bytes)}"
+                 f"{'' if self.fits else ' (DOES NOT FIT)'}",
+                 f"  per worker {format_bytes(self.worker_bytes)} (interpreter {format_bytes(self.base_bytes)}), "
+                 f"collector {format_bytes(self.parent_bytes)}"]
+        lines += [f"  {name:<9}{format_bytes(size):>12} per run" for name, size in self.run_sizes.items()]
+        return '\n'.join(lines)
+
+
+@functools.lru_cache(maxsize=64)
+def _sample_sizes(sample_runs: int, hypothesis: str | None, real_news_delay: int, engine: str, seed: int | None,
+                  trace: bool, config: SimulationConfig) -> tuple:
+    # largest bytes per component over the first sample_runs runs, as ((name, size), ...)
+    run_sizes = dict.fromkeys(COMPONENTS, 0)
+    for run_index in range(sample_runs):
+        for name, size in measure_run(run_index, hypothesis, real_news_delay, engine, seed, trace, config).items():
+            run_sizes[name] = max(run_sizes[name], size)
+    return tuple(run_sizes.items())
+
+
+def plan_experiment(budget: int | str, num_runs: int = 1000, hypothesis: str | None = None, real_news_delay: int = 0,
+                    engine: str = 'reference', trace: bool = False, max_processes: int | None = None,
+                    sample_runs: int = 3, headroom: float = 1.5, seed: int | None = 0,
+                    config: SimulationConfig = DEFAULT_CONFIG) -> MemoryPlan:
+    """
+    Chooses the number of worker processes and whether to keep traces so that an experiment fits a
+    memory budget. The plan measures sample_runs runs with measure_run() and keeps the largest size
+    of each component. These calibration runs are full simulations; their sizes are cached per
+    (sample_runs, hypothesis, real_news_delay, engine, seed, trace, config), so repeated plans for the
+    same experiment (e.g. every chunk of a sweep) run them only once.
+    - A worker needs the interpreter base size plus headroom times the largest per-run working set
+      (graph, agents, schedule, and the trace if kept).
+    - The collecting process needs the base size plus the metrics of all num_runs runs.
+    - With one process, the runs execute in the collecting process.
+    Traces are dropped only when they do not fit even with a single process. If the experiment does not
+    fit without traces either, the single-process plan is returned with fits=False.
+
+    Parameters:
+        budget : int or str. Memory budget in bytes, or a size such as '4GiB' (see parse_bytes()).
+        num_runs, hypothesis, real_news_delay, engine : As in run_baseline_simulation().
+        trace : bool. Whether traces are requested.
+        max_processes : int or None. Upper bound on workers (os.cpu_count() if None).
+        sample_runs : int. Number of runs measured.
+        headroom : float. Factor applied to the measured working set for allocator slack and temporaries.
+        seed : int or None. Base seed of the measured runs.
+        config : SimulationConfig. Parameters of the runs.
+
+    Returns:
+        MemoryPlan : The chosen plan and its estimates.
+
+    Examples:
+        >>> plan = plan_experiment('64GiB', num_runs=100, engine='arrays', trace=True, max_processes=4, sample_runs=1)
+        >>> plan.processes, plan.keep_traces, plan.fits
+        (4, True, True)
+        >>> tight = plan_experiment(plan.base_bytes + plan.worker_bytes - plan.base_bytes // 2, num_runs=100,
+        ...                         engine='arrays', trace=True, max_processes=4, sample_runs=1)
+        >>> tight.processes, tight.fits
+        (1, True)
+        >>> plan_experiment('1MiB', num_runs=100, engine='arrays', sample_runs=1).fits
+        False
+    """
+    budget = parse_bytes(budget)
+    max_processes = max(1, min(max_processes or os.cpu_count() or 1, num_runs))
+    run_sizes = dict(_sample_sizes(max(1, min(sample_runs, num_runs)), hypothesis, real_news_delay, engine, seed,
+                                   trace, config))
+    base = current_rss()
+    parent = base + run_sizes['metrics'] * num_runs
+
+    def estimate(processes: int, keep_traces: bool) -> MemoryPlan:
+        working = sum(run_sizes[name] for name in ('graph', 'agents', 'schedule'))
+        working = int(headroom * (working + (run_sizes['trace'] if keep_traces else 0)))
+        total = parent + working if processes == 1 else parent + processes * (base + working)
+        return MemoryPlan(budget, processes, keep_traces, run_sizes, base, base + working, parent, total,
+                          total <= budget)
+
+    for keep_traces in ((True, False) if trace else (False,)):
+        for processes in range(max_processes, 0, -1):
+            plan = estimate(processes, keep_traces)
+            if plan.fits:
+                return plan
+    return estimate(1, False)
+
+
+class MemoryMonitor:
+    """
+    Records the peak resident set size of this process and of its pool workers while a stream of
+    runs (see baseline_run.iter_runs()) is consumed.
+
+    Attributes:
+        peaks : dict. pid -> peak RSS in bytes (this process included).
+
+    Examples:
+        >>> from baseline_run import iter_runs, RunOptions
+        >>> monitor = MemoryMonitor()
+        >>> runs = list(monitor.track(iter_runs(4, seed=1, options=RunOptions(engine='arrays', processes=2))))
+        >>> len(monitor.worker_peaks()) >= 1 and monitor.peaks[os.getpid()] > 0
+        True
+    """
+    def __init__(self):
+        self.peaks: Dict[int, int] = {}
+
+    def sample(self) -> None:
+        """Updates the peaks of this process and of its live child processes."""
+        self.peaks[os.getpid()] = peak_rss()
+        for child in multiprocessing.active_children():
+            self.peaks[child.pid] = max(self.peaks.get(child.pid, 0), peak_rss(child.pid))
+
+    def track(self, runs: Iterable[Any]) -> Iterator[Any]:
+        """Yields the items of runs unchanged, sampling after each one."""
+        for run in runs:
+            self.sample()
+            yield run
+        self.sample()
+
+    def worker_peaks(self) -> Dict[int, int]:
+        """Peak RSS of the worker processes seen so far."""
+        return {pid: peak for pid, peak in self.peaks.items() if pid != os.getpid()}
+
+    def total_peak(self) -> int:
+        """Sum of the peaks of all processes seen so far (an upper bound on the experiment's peak)."""
+        return sum(self.peaks.values())
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Plan an experiment under a memory budget.")
+    parser.add_argument('--budget', required=True, help="memory budget, e.g. 4GiB")
+    parser.add_argument('--runs', type=int, default=1000)
+    parser.add_argument('--engine', default='reference', choices=('reference', 'arrays', 'partitioned'))
+    parser.add_argument('--hypothesis', choices=('h1', 'h2', 'h3'))
+    parser.add_argument('--delay', type=int, default=0, help="real news delay (Hypothesis 3)")
+    parser.add_argument('--trace', action='store_true', help="traces are requested")
+    parser.add_argument('--processes', type=int, help="upper bound on worker processes")
+    args = parser.parse_args(argv)
+    plan = plan_experiment(args.budget, args.runs, args.hypothesis, args.delay, args.engine, args.trace, args.processes)
+    print(plan.report())
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,290 @@
+'''
+multi_item_engine.py
+
+This module generalizes the array engine (engine.py) from the fixed fake/real pair to K competing
+news items identified by integer item codes 0..K-1, for example several fake stories and their
+corrections circulating at once.
+
+Per-agent state is item-independent in size:
+- belief: int8 code of the item an agent currently believes (NO_BELIEF if none)
+- has_shared / infected: uint64 bitmasks with bit k set once the agent shared / was reached by item k
+
+Every item has its own ItemSpec: share profile (the agent's fake or real share probability), delay
+distribution, release round, number of seeds and fact-checker flagging rule. All shares scheduled
+for a round are processed together: each sharing agent's adjacency row is expanded once and its
+contacts carry every item the agent shares that round, so the cost grows with the number of share
+events rather than with K separate simulations. Within a round the first successful contact reaches
+an undecided agent, whatever its item, as in the two-item engine.
+'''
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from config import *
+from graph_arrays import AgentArrays
+from engine import FAKE, REAL, NO_BELIEF, delay_table, draw_delays, first_per_target, transmission_table
+
+MAX_ITEMS = 64
+
+
+@dataclass
+class ItemSpec:
+    """
+    Configuration of one news item in a multi-item run.
+
+    Attributes:
+        name : str. Label used in the results.
+        is_fake : bool. Whether agents share it with their fake news probability (else their real news one).
+        delay_distribution : dict or None. Share delay distribution (default: the run config's fake or real distribution).
+        num_seeds : int or None. Number of randomly chosen seed agents (default: the run config's seed_count).
+        release_round : int. Round added to the seeds' first share delay (Hypothesis 3 style head start).
+        flaggable : bool or None. Whether fact-checkers can flag it (default: is_fake).
+        flag_factor : float. Transmission multiplier once the item is flagged.
+    """
+    name: str
+    is_fake: bool
+    delay_distribution: Optional[Dict[int, float]] = None
+    release_round: int = 0
+    num_seeds: Optional[int] = None
+    flaggable: Optional[bool] = None
+    flag_factor: float = 0.3
+
+
+def _bits(codes: np.ndarray) -> np.ndarray:
+    return np.left_shift(np.uint64(1), codes.astype(np.uint64))
+
+
+class MultiItemCascade:
+    """
+    Mutable state of one K-item run, advanced one round at a time.
+
+    Attributes:
+        config : SimulationConfig. Parameters of the run.
+        belief : np.ndarray. int8 believed item per agent (NO_BELIEF if none).
+        has_shared : np.ndarray. uint64 bitmask of shared items per agent.
+        infected : np.ndarray. uint64 bitmask of items that ever reached each agent.
+        reach, shared_count : np.ndarray. Per-item counters.
+        flagged : np.ndarray. Per-item fact-checker flag.
+        revised : int. Number of belief revisions (if revision is enabled).
+        stats : dict. Item name -> reach per simulated round.
+    """
+    def __init__(self, graph, roles: AgentArrays, items: List[ItemSpec], rng: np.random.Generator,
+                 revision: bool = False, transmission: np.ndarray | None = None,
+                 config: SimulationConfig = DEFAULT_CONFIG):
+        if not 0 < len(items) <= MAX_ITEMS:
+            raise ValueError(f"between 1 and {MAX_ITEMS} news items are supported, got {len(items)}")
+        n = roles.num_agents
+        self.config = config
+        self.graph = graph
+        self.roles = roles
+        self.items = items
+        self.rng = rng
+        self.revision = revision
+
+        # Per-item constant tables
+        self.profile = np.array([FAKE if item.is_fake else REAL for item in items], dtype=np.int64)
+        self.flaggable = np.array([item.is_fake if item.flaggable is None else item.flaggable for item in items])
+        self.flag_factor = np.array([item.flag_factor for item in items])
+        self.delay_tables = [delay_table(item.delay_distribution) if item.delay_distribution is not None
+                             else config.delay_arrays['fake' if item.is_fake else 'real'] for item in items]
+        self.influencer_delays = config.delay_arrays['influencer_fake'] if config.variant_B else None
+        self.transmission = (transmission if transmission is not None
+                             else transmission_table(graph, roles, config))
+
+        # Mutable state
+        self.belief = np.full(n, NO_BELIEF, dtype=np.int8)
+        self.has_shared = np.zeros(n, dtype=np.uint64)
+        self.infected = np.zeros(n, dtype=np.uint64)
+        self.reach = np.zeros(len(items), dtype=np.int64)
+        self.shared_count = np.zeros(len(items), dtype=np.int64)
+        self.flagged = np.zeros(len(items), dtype=bool)
+        self.revised = 0
+        self.schedule = defaultdict(list)
+        self.round_num = 0
+        self.done = False
+        self.stats = {item.name: [] for item in items}
+
+    def seed_items(self) -> None:
+        """Seeds every item and schedules the seeds' first shares after its release round."""
+        for code, item in enumerate(self.items):
+            num_seeds = self.config.seed_count if item.num_seeds is None else item.num_seeds
+            seeds = self.rng.choice(self.roles.num_agents, num_seeds, replace=False)
+            codes = np.full(len(seeds), code, dtype=np.int64)
+            self.belief[seeds] = code
+            self._schedule(seeds, codes, self._sample_delays(seeds, codes) + item.release_round)
+            self._mark_infected(seeds, codes)
+
+    def _sample_delays(self, agents: np.ndarray, codes: np.ndarray, variant: bool = True) -> np.ndarray:
+        uniforms = self.rng.random(len(agents))
+        delays = np.empty(len(agents), dtype=np.int64)
+        for code in np.unique(codes).tolist():
+            mask = codes == code
+            delays[mask] = draw_delays(self.delay_tables[code], uniforms[mask])
+        if variant and self.influencer_delays is not None:
+            fast = (self.profile[codes] == FAKE) & self.roles.is_influencer[agents]
+            delays[fast] = draw_delays(self.influencer_delays, uniforms[fast])
+        return delays
+
+    def _schedule(self, agents: np.ndarray, codes: np.ndarray, rounds: np.ndarray) -> None:
+        for share_round in np.unique(rounds).tolist():
+            mask = rounds == share_round
+            self.schedule[share_round].append((agents[mask], codes[mask]))
+
+    def _mark_infected(self, agents: np.ndarray, codes: np.ndarray) -> None:
+        bits = _bits(codes)
+        fresh = (self.infected[agents] & bits) == 0
+        np.bitwise_or.at(self.infected, agents, bits)
+        self.reach += np.bincount(codes[fresh], minlength=len(self.items))
+
+    def advance_round(self) -> None:
+        """Processes every share scheduled for the current round and records each item's reach."""
+        round_num = self.round_num
+        batches = self.schedule.pop(round_num, None)
+        if batches:
+            ids = np.concatenate([agents for agents, _ in batches])
+            codes = np.concatenate([codes for _, codes in batches])
+            order = self.rng.permutation(len(ids)) # Randomize processing order of events to avoid bias
+            ids, codes = ids[order], codes[order]
+            keep = first_per_target(np.arange(len(ids)), codes * self.roles.num_agents + ids)
+            ids, codes = ids[keep], codes[keep]
+            bits = _bits(codes)
+            fresh = (self.has_shared[ids] & bits) == 0
+            ids, codes, bits = ids[fresh], codes[fresh], bits[fresh]
+            if len(ids):
+                np.bitwise_or.at(self.has_shared, ids, bits)
+                self.shared_count += np.bincount(codes, minlength=len(self.items))
+                self._propagate(ids, codes, round_num)
+
+        for code, item in enumerate(self.items):
+            self.stats[item.name].append(int(self.reach[code]))
+        self.round_num += 1
+        if not self.schedule or self.round_num >= self.config.max_rounds: # spread is over
+            self.done = True
+
+    def _contacts(self, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (share index, neighbor, slot) of every contact, in share processing order
+        # expand every sharing agent's row once; each contact is repeated for the items its sender shares
+        sharers, share_of = np.unique(ids, return_inverse=True)
+        row_owner, slots = self.graph.expand_slots(sharers)
+        shares_by_sharer = np.argsort(share_of, kind='stable')
+        counts = np.bincount(share_of, minlength=len(sharers))
+        starts = np.cumsum(counts) - counts
+        # pair every slot with each share of its row's sharer
+        per_slot = counts[row_owner]
+        slot_index = np.repeat(np.arange(len(slots)), per_slot)
+        offsets = np.arange(len(slot_index)) - np.repeat(np.cumsum(per_slot) - per_slot, per_slot)
+        share = shares_by_sharer[starts[row_owner[slot_index]] + offsets]
+        # restore the shuffled share order so earlier shares are processed first
+        order = np.lexsort((slot_index, share))
+        share, slot_index = share[order], slot_index[order]
+        return share, self.graph.indices[slots[slot_index]], slots[slot_index]
+
+    def _propagate(self, ids: np.ndarray, codes: np.ndarray, round_num: int) -> None:
+        share, neighbors, slots = self._contacts(ids)
+        news = codes[share]
+        beliefs = self.belief[neighbors]
+
+        if self.revision:
+            conflicting = np.flatnonzero((beliefs != NO_BELIEF) & (beliefs != news))
+            if len(conflicting):
+                chance = np.where(self.roles.is_fact_checker[neighbors[conflicting]], self.config.p_belief_revision, 0.25)
+                hits = first_per_target(conflicting[self.rng.random(len(conflicting)) < chance], neighbors)
+                targets = neighbors[hits]
+                self.belief[targets] = news[hits]
+                self._mark_infected(targets, news[hits])
+                self.revised += len(hits)
+                self._schedule(targets, news[hits], round_num + self._sample_delays(targets, news[hits], variant=False))
+
+        open_contacts = beliefs == NO_BELIEF
+        neighbors, news, slots = neighbors[open_contacts], news[open_contacts], slots[open_contacts]
+        if len(neighbors) == 0:
+            return
+        threshold = self.transmission[self.profile[news], slots] * np.where(self.flagged, self.flag_factor, 1.0)[news]
+        uniforms = self.rng.random(len(neighbors))
+        accepted = uniforms < threshold
+
+        # Fact-checker intervention, per flaggable item: the first successful flag lowers its later contacts
+        for code in np.flatnonzero(self.flaggable & ~self.flagged).tolist():
+            of_item = news == code
+            hits = first_per_target(np.flatnonzero(accepted & of_item & self.roles.is_fact_checker[neighbors]), neighbors)
+            flags = hits[self.rng.random(len(hits)) < self.config.p_fact_check]
+            if len(flags):
+                self.flagged[code] = True
+                later = of_item & (np.arange(len(neighbors)) > flags[0])
+                accepted[later] = uniforms[later] < threshold[later] * self.flag_factor[code]
+
+        winners = first_per_target(np.flatnonzero(accepted), neighbors)
+        targets, target_news = neighbors[winners], news[winners]
+        self.belief[targets] = target_news
+        self._mark_infected(targets, target_news)
+        self._schedule(targets, target_news, round_num + self._sample_delays(targets, target_news))
+
+    def run(self) -> None:
+        """Advances the cascade until it dies out or max_rounds is reached."""
+        while not self.done:
+            self.advance_round()
+
+    def results(self) -> tuple[dict[str, list[int]], dict[str, int], int, dict[str, int]]:
+        """
+        Returns the run outcome.
+
+        Returns:
+            stats : dict[str, list[int]]. Reach by round for each item.
+            final_beliefs : dict[str, int]. Final number of agents believing each item.
+            belief_revised_count : int. Number of belief revisions.
+            shared_counts : dict[str, int]. Number of shares of each item.
+        """
+        believers = np.bincount(self.belief[self.belief != NO_BELIEF], minlength=len(self.items))
+        final_beliefs = {item.name: int(believers[code]) for code, item in enumerate(self.items)}
+        shared_counts = {item.name: int(self.shared_count[code]) for code, item in enumerate(self.items)}
+        return self.stats, final_beliefs, self.revised, shared_counts
+
+
+def simulate_spread_multi(graph, roles: AgentArrays, items: List[ItemSpec], rng: np.random.Generator | None = None,
+                          revision: bool = False, transmission: np.ndarray | None = None,
+                          config: SimulationConfig = DEFAULT_CONFIG
+                          ) -> tuple[dict[str, list[int]], dict[str, int], int, dict[str, int]]:
+    """
+    Simulates the competing spread of K news items.
+
+    Parameters:
+        graph : GraphArrays. Network with trust weights.
+        roles : AgentArrays. Roles and share probabilities of every agent.
+        items : list of ItemSpec. The competing items; item k has code k.
+        rng : np.random.Generator or None. Per-run random generator (a fresh one if None).
+        revision : bool. Whether agents may switch belief on receiving a conflicting item (as in Hypothesis 3).
+        transmission : np.ndarray or None. Precomputed engine.transmission_table() for graph and roles.
+        config : SimulationConfig. Default seed count and delays, fact-checking and revision probabilities, round limit
+            and variant flags (B: faster influencer shares of fake items, C: influencer trust boost).
+
+    Returns:
+        stats : dict[str, list[int]]. Reach by round for each item.
+        final_beliefs : dict[str, int]. Final number of agents believing each item.
+        belief_revised_count : int. Number of belief revisions.
+        shared_counts : dict[str, int]. Number of shares of each item.
+
+    Examples:
+        >>> from parallel_run import build_problem
+        >>> from rng_context import RunRNG
+        >>> from engine import simulate_spread_arrays
+        >>> graph, roles, _ = build_problem(RunRNG(0))
+        >>> stats, beliefs, revised, _ = simulate_spread_multi(
+        ...     graph, roles, [ItemSpec('fake', True), ItemSpec('real', False)], rng=np.random.default_rng(3))
+        >>> (stats, beliefs) == simulate_spread_arrays(graph, roles, rng=np.random.default_rng(3))[:2]
+        True
+        >>> rng = np.random.default_rng(0)
+        >>> items = [ItemSpec('rumor_a', True), ItemSpec('rumor_b', True),
+        ...          ItemSpec('correction_a', False, release_round=3), ItemSpec('correction_b', False, release_round=6)]
+        >>> stats, beliefs, revised, shares = simulate_spread_multi(graph, roles, items, rng=rng, revision=True)
+        >>> sorted(stats) == sorted(beliefs) == sorted(item.name for item in items)
+        True
+        >>> all(reach[0] >= seed_count for reach in stats.values())
+        True
+    """
+    state = MultiItemCascade(graph, roles, items, rng if rng is not None else np.random.default_rng(),
+                             revision=revision, transmission=transmission, config=config)
+    state.seed_items()
+    state.run()
+    return state.results()
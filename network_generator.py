@@ -13,13 +13,44 @@ influence dynamics, and community-based behaviors.
 
 Key Features:
 - Adjustable number of agents, communities, and local connectivity.
+- Communities occupy contiguous blocks of node ids; the true label array is emitted with the graph.
 - Optional debug mode to inspect node and edge structure.
+- All randomness comes from a per-run RunRNG (rng_context.py), so a network is reproducible from its seed.
+- Structure parameters come from a SimulationConfig (config.py); explicit arguments override it.
 '''
 
 from config import *
+import numpy as np
 import networkx as nx
+from rng_context import RunRNG, as_run_rng
 
-def create_social_network(num_agents: int, num_communities: int, k_neighbors: int, debug: bool = False) -> nx.Graph:
+
+def community_labels(num_agents: int, num_communities: int) -> np.ndarray:
+    """
+    Returns the community label of every node as laid out by create_social_network():
+    community i owns the contiguous block of node ids [i * community_size, (i + 1) * community_size).
+    Nodes beyond the last full block only receive Barabási–Albert edges and are labelled -1.
+
+    Parameters:
+        num_agents : int. Total number of agents (nodes) in the network.
+        num_communities : int. Number of community clusters.
+
+    Returns:
+        np.ndarray : int32 array of community labels, indexed by node id.
+
+    Examples:
+        >>> community_labels(7, 3).tolist()
+        [0, 0, 1, 1, 2, 2, -1]
+    """
+    community_size = num_agents // num_communities
+    labels = np.full(num_agents, -1, dtype=np.int32)
+    labels[:community_size * num_communities] = np.arange(community_size * num_communities) // community_size
+    return labels
+
+
+def create_social_network(num_agents: int | None = None, num_communities: int | None = None, k_neighbors: int | None = None,
+                          debug: bool = False, return_labels: bool = False, rng: RunRNG | None = None,
+                          config: SimulationConfig = DEFAULT_CONFIG) -> nx.Graph | tuple[nx.Graph, np.ndarray]:
     """
     Creates a synthetic hybrid social network by combining multiple small-world
     communities (Watts-Strogatz) with global scale-free connectivity (Barabási–Albert).
@@ -28,13 +59,20 @@ def create_social_network(num_agents: int, num_communities: int, k_neighbors: in
     and long-range influence via central hubs.
 
     Parameters:
-        num_agents : int. Total number of agents (nodes) in the network.
-        num_communities : int. Number of community clusters to divide the network into.
-        k_neighbors : int. Each node is connected to k nearest neighbors in ring topology (used in Watts-Strogatz model).
+        num_agents : int or None. Total number of agents (nodes) in the network (config.num_agents if None).
+        num_communities : int or None. Number of community clusters to divide the network into (config.num_communities if None).
+        k_neighbors : int or None. Each node is connected to k nearest neighbors in ring topology (used in Watts-Strogatz model;
+            config.k_neighbors if None).
         debug : bool, optional. If True, prints out sample node and edge attributes for debugging (default is False).
+        return_labels : bool, optional. If True, also returns the community label array (default is False).
+        rng : RunRNG or None, optional. Per-run random stream; each networkx generator is seeded from it
+            (default is a fresh unseeded stream).
+        config : SimulationConfig, optional. Source of the defaults above, rewire_fraction and ba_attachment.
 
     Returns:
-        nx.Graph : A NetworkX graph representing the synthetic social network.
+        nx.Graph : A NetworkX graph representing the synthetic social network. The community label
+            array is also stored as G.graph['community'].
+        np.ndarray : Community label of every node (only if return_labels is True).
 
     Examples:
         >>> G = create_social_network(150, 3, 4)
@@ -44,21 +82,33 @@ def create_social_network(num_agents: int, num_communities: int, k_neighbors: in
         150
         >>> nx.number_connected_components(G) == 1  # Should be one connected network
         True
+        >>> G, labels = create_social_network(150, 3, 4, return_labels=True)
+        >>> int(labels[49]), int(labels[50])
+        (0, 1)
+        >>> from rng_context import RunRNG
+        >>> sorted(create_social_network(150, 3, 4, rng=RunRNG(1)).edges()) == sorted(create_social_network(150, 3, 4, rng=RunRNG(1)).edges())
+        True
     """
+    rng = as_run_rng(rng)
+    num_agents = config.num_agents if num_agents is None else num_agents
+    num_communities = config.num_communities if num_communities is None else num_communities
+    k_neighbors = config.k_neighbors if k_neighbors is None else k_neighbors
     community_size = num_agents // num_communities
     G = nx.Graph()
     all_nodes = []
 
     for i in range(num_communities):
-        ws = nx.watts_strogatz_graph(community_size, k_neighbors, rewire_fraction)
+        ws = nx.watts_strogatz_graph(community_size, k_neighbors, config.rewire_fraction, seed=rng.seed_int())
         mapping = {node: node + i * community_size for node in ws.nodes()}
         ws = nx.relabel_nodes(ws, mapping)
         G = nx.compose(G, ws)
         all_nodes.extend(ws.nodes())
 
     # Add long-range edges across communities (simulate scale-free hubs)
-    ba = nx.barabasi_albert_graph(num_agents, ba_attachment)
+    ba = nx.barabasi_albert_graph(num_agents, config.ba_attachment, seed=rng.seed_int())
     G.add_edges_from(ba.edges())
+    labels = community_labels(num_agents, num_communities)
+    G.graph['community'] = labels
 
     if debug:
         print("Debug: Sample node data")
@@ -78,4 +128,6 @@ def create_social_network(num_agents: int, num_communities: int, k_neighbors: in
         if 5 in G.nodes:
             print(G.nodes[5])
 
+    if return_labels:
+        return G, labels
     return G
\ No newline at end of file
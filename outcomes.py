@@ -0,0 +1,49 @@
+'''
+outcomes.py
+
+This module defines the per-run outcomes of an experiment, extracted from the (metrics,
+belief_revised_counts) output of run_baseline_simulation() and the other batch runners. It depends
+on numpy only, so lightweight consumers such as the job service can summarize results without
+importing the engines.
+
+It includes:
+- OUTCOMES: names of the per-run outcomes
+- outcome_samples(): one value per run of every outcome
+'''
+
+from typing import Any, Dict, List
+import numpy as np
+
+OUTCOMES = ('final_fake_reach', 'final_real_reach', 'fake_shares', 'real_shares', 'fake_believers',
+            'real_believers', 'fake_peak_round', 'real_peak_round', 'belief_revisions',
+            'influencer_reach_fake', 'normal_reach_fake')
+
+
+def outcome_samples(metrics: Dict[str, List[Any]], belief_revised_counts: List[int]) -> Dict[str, np.ndarray]:
+    """
+    Extracts one value per run of every outcome in OUTCOMES from run_baseline_simulation() output.
+
+    Examples:
+        >>> from baseline_run import run_baseline_simulation
+        >>> metrics, revisions = run_baseline_simulation(3, seed=0)
+        >>> samples = outcome_samples(metrics, revisions)
+        >>> sorted(samples) == sorted(OUTCOMES) and all(len(values) == 3 for values in samples.values())
+        True
+    """
+    def final(reaches):
+        return [reach[-1] if len(reach) else 0 for reach in reaches]
+
+    values = {
+        'final_fake_reach': final(metrics['fake_reach']),
+        'final_real_reach': final(metrics['real_reach']),
+        'fake_shares': metrics['fake_shares'],
+        'real_shares': metrics['real_shares'],
+        'fake_believers': metrics['fake_belief_count'],
+        'real_believers': metrics['real_belief_count'],
+        'fake_peak_round': metrics['fake_peak_round'],
+        'real_peak_round': metrics['real_peak_round'],
+        'belief_revisions': belief_revised_counts,
+        'influencer_reach_fake': metrics['influencer_reach_fake'],
+        'normal_reach_fake': metrics['normal_reach_fake'],
+    }
+    return {name: np.asarray(values[name], dtype=float) for name in OUTCOMES}
@@ -0,0 +1,172 @@
+'''
+parallel_run.py
+
+This module runs Monte Carlo trials of the array engine (engine.py) on a process pool whose workers
+share the network instead of receiving a pickled copy of it with every task.
+
+A small ensemble of networks is generated once in the parent, each with its roles, share
+probabilities, trust weights and transmission table, and published with shared_graph.publish_problem(). Workers attach
+to every published network once, in the pool initializer, and afterwards only receive
+(run index, network index) tasks. Each run draws its own seeding, sharing decisions and delays
+from a private random stream, so runs differ even when they reuse a network, and the results do
+not depend on how runs are distributed over workers.
+
+Unlike run_baseline_simulation(), which builds a fresh network for every run, runs here cycle over
+the ensemble; ensemble_size=num_runs reproduces the one-network-per-run design.
+'''
+
+import multiprocessing
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+from config import *
+from network_generator import create_social_network
+from agent_initializer import assign_roles_bulk, assign_trust_levels_bulk
+from graph_arrays import GraphArrays
+from news_item import NewsItem
+from simulation import initialize_p_shares_bulk
+from engine import simulate_spread_arrays, transmission_table
+from shared_graph import publish_problem, attach_problem
+from baseline_run import new_metrics, record_run_metrics
+from rng_context import RunRNG
+
+# Per-process state filled by _attach_worker(): the attached networks and their mappings
+_worker_problems = []
+_worker_keepalive = []
+_worker_settings = {}
+
+
+def build_problem(rng: RunRNG, percent_fc: float | None = None,
+                  config: SimulationConfig = DEFAULT_CONFIG) -> Tuple[GraphArrays, Any, np.ndarray]:
+    """
+    Generates one network with roles, share probabilities, trust weights and transmission table, ready to be
+    published.
+
+    Parameters:
+        rng : RunRNG. Random stream for the network, roles, share probabilities and trust.
+        percent_fc : float or None. Proportion of skeptical agents designated as fact-checkers (config value if None).
+        config : SimulationConfig. Network, role and Variant C parameters.
+
+    Returns:
+        graph : GraphArrays. Network with per-slot trust.
+        roles : AgentArrays. Roles and share probabilities.
+        transmission : np.ndarray. Per-slot transmission probabilities (see engine.transmission_table()).
+    """
+    G = create_social_network(rng=rng, config=config)
+    graph = GraphArrays.from_networkx(G)
+    roles = assign_roles_bulk(graph.degrees(), rng, percent_fc=percent_fc, config=config)
+    initialize_p_shares_bulk(roles, rng, config=config)
+    assign_trust_levels_bulk(graph, rng)
+    graph.slot_trust  # materialize the per-slot trust before publishing
+    return graph, roles, transmission_table(graph, roles, config)
+
+
+def _attach_worker(handles, settings) -> None:
+    global _worker_settings
+    for handle in handles:
+        # the transmission table is built once in the parent and mapped like the CSR arrays
+        graph, roles, transmission, keepalive = attach_problem(handle)
+        _worker_problems.append((graph, roles, transmission))
+        _worker_keepalive.append(keepalive)
+    _worker_settings = settings
+
+
+def _detach_worker() -> None:
+    _worker_problems.clear()
+    for keepalive in _worker_keepalive:
+        if hasattr(keepalive, 'close'):
+            keepalive.close()
+    _worker_keepalive.clear()
+
+
+def _run_task(task: Tuple[int, int]) -> Tuple[int, Any, Dict[str, int], Dict[str, int], int, Dict[str, int]]:
+    run_index, problem_index = task
+    settings = _worker_settings
+    graph, roles, transmission = _worker_problems[problem_index]
+    rng = np.random.default_rng(np.random.SeedSequence(settings['entropy'], spawn_key=(1, run_index)))
+    news_items = {
+        'fake': NewsItem("Fake News", is_fake=True),
+        'real': NewsItem("Real News", is_fake=False)
+    }
+    stats, final_beliefs, belief_revised_count, influencer_impact = simulate_spread_arrays(
+        graph, roles, news_items, hypothesis=settings['hypothesis'], real_news_delay=settings['real_news_delay'],
+        rng=rng, transmission=transmission, config=settings['config'])
+    shares = {news_type: item.shared_count for news_type, item in news_items.items()}
+    return run_index, stats, shares, final_beliefs, belief_revised_count, influencer_impact
+
+
+def run_parallel_simulation(num_runs: int = 1000, processes: int | None = None, ensemble_size: int = 1,
+                            hypothesis: str | None = None, percent_fc: float | None = None,
+                            variant_flag: Dict[str, bool] | None = None, real_news_delay: int = 0,
+                            seed: int | None = None, backing: str = 'shm', chunksize: int = 4,
+                            network_seed: int | None = None,
+                            config: SimulationConfig = DEFAULT_CONFIG) -> tuple[dict[str, list[Any]], list[int]]:
+    """
+    Executes Monte Carlo runs of the array engine on a worker pool sharing the network arrays.
+
+    Parameters:
+        num_runs : int. Number of simulation runs to perform.
+        processes : int or None. Pool size (None = os.cpu_count()); 0 runs every task in this process.
+        ensemble_size : int. Number of distinct networks the runs cycle over. The default, 1, is the case this
+            runner exists for: every worker attaches to a single published copy of one network and the runs
+            estimate outcomes on that network. Larger ensembles also average over network variability at the
+            cost of one published copy each; num_runs reproduces run_baseline_simulation()'s design.
+        hypothesis : str or None. Optional hypothesis label ('h2', 'h3') for variant configuration.
+        percent_fc : float or None. Proportion of skeptical agents designated as fact-checkers (overrides config).
+        variant_flag : dict or None. Flags enabling variant features (e.g., influencer control, trust boost; overrides config).
+        real_news_delay : int. Number of rounds to delay the real news release (used in Hypothesis 3).
+        seed : int or None. Seed of the per-run random streams; None draws fresh entropy.
+        backing : str. 'shm' (shared memory) or 'mmap' (memory-mapped temporary file).
+        chunksize : int. Number of runs sent to a worker per task message.
+        network_seed : int or None. If given, the ensemble networks are generated from it instead of seed, so
+            runs with different seeds can share the same networks.
+        config : SimulationConfig. Parameters of every run (sent to the workers once, with the settings).
+
+    Returns:
+        metrics : dict. Same keys as run_baseline_simulation().
+        belief_revised_counts : list. List of belief revision counts per run.
+
+    Examples:
+        >>> metrics, revisions = run_parallel_simulation(num_runs=4, processes=2, ensemble_size=2, seed=7)
+        >>> len(metrics['fake_reach']), len(revisions)
+        (4, 4)
+        >>> again, _ = run_parallel_simulation(num_runs=4, processes=0, ensemble_size=2, seed=7)
+        >>> metrics['fake_belief_count'] == again['fake_belief_count']
+        True
+    """
+    if percent_fc is not None:
+        config = config.replace(percent_fact_checkers=percent_fc)
+    if variant_flag is not None:
+        config = config.with_variants(variant_flag)
+    entropy = np.random.SeedSequence(seed).entropy
+    network_entropy = entropy if network_seed is None else np.random.SeedSequence(network_seed).entropy
+    settings = {'entropy': entropy, 'hypothesis': hypothesis, 'real_news_delay': real_news_delay, 'config': config}
+    published = []
+    try:
+        for index in range(ensemble_size):
+            rng = RunRNG(np.random.SeedSequence(network_entropy, spawn_key=(0, index)))
+            graph, roles, transmission = build_problem(rng, config=config)
+            published.append(publish_problem(graph, roles, backing=backing, transmission=transmission))
+            del graph, roles, transmission
+        handles = [shared.handle for shared in published]
+        tasks = [(run_index, run_index % ensemble_size) for run_index in range(num_runs)]
+
+        if processes == 0:
+            _attach_worker(handles, settings)
+            try:
+                outcomes = [_run_task(task) for task in tasks]
+            finally:
+                _detach_worker()
+        else:
+            with multiprocessing.Pool(processes, initializer=_attach_worker, initargs=(handles, settings)) as pool:
+                outcomes = list(pool.imap(_run_task, tasks, chunksize=chunksize))
+    finally:
+        for shared in published:
+            shared.unlink()
+
+    metrics = new_metrics()
+    belief_revised_counts = []
+    for _, stats, shares, final_beliefs, belief_revised_count, influencer_impact in outcomes:
+        record_run_metrics(metrics, stats, shares, final_beliefs, influencer_impact)
+        belief_revised_counts.append(belief_revised_count)
+    return metrics, belief_revised_counts
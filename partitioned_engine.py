@@ -0,0 +1,580 @@
+'''
+partitioned_engine.py
+
+This module splits a single cascade over several workers, one per group of community blocks,
+so that one very large run can use several cores.
+
+Every node is owned by exactly one partition (see partition_nodes()). A partition keeps the mutable
+state of the agents it owns (belief, shared flags, schedule, origin) and advances in lock step with
+the others, three phases per round:
+
+- emit: the partition processes the shares scheduled for its agents in this round, expands their
+  contacts through the shared graph and decides, on the sender side, everything that only depends on
+  the sender (share probability, trust, trust boost and the random draws). Every share gets a random
+  order key, so all contacts of the round have one global processing order as in the sequential
+  engine. Contacts that may still succeed are sent to the partition owning the receiver.
+- receive: the partition sorts the contacts it received by order key, checks the receivers' current
+  beliefs and proposes the position of its earliest fact-checker flag.
+- absorb: given the earliest flag over all partitions (a min-reduction by the coordinator), the
+  partition lowers trust for fake contacts after it, applies Hypothesis 3 belief revision and
+  first-sender-wins resolution, and schedules the new shares of its agents.
+
+The coordinator routes the messages and reduces the flag, reach and share counters; the cascade ends
+when no partition has pending shares or max_rounds is reached. Results match simulate_spread_arrays()
+in distribution, not bit for bit, since the partitions draw from their own random streams.
+
+With a TraceRecorder, partitions collect the events of their own agents each round and the coordinator
+records them in the order of simulate_spread_arrays() (shares, revisions, infections).
+
+Partitions run either as worker processes attached to a shared-memory copy of the graph
+(shared_graph.py) or, with parallel=False, as plain objects in the calling process.
+
+Run `python partitioned_engine.py --num-agents 200000 --partitions 1 2 4 8` to time one cascade
+with simulate_spread_arrays() and with each partition count on the same network; the speedup
+needs at least as many free cores as partitions.
+
+It includes:
+- partition_nodes: assigns whole community blocks to partitions.
+- PartitionWorker: state and per-round phases of one partition.
+- simulate_spread_partitioned: runs one cascade over all partitions.
+- benchmark: times the partitioned engine against the sequential array engine.
+'''
+
+import argparse
+import multiprocessing
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+
+from config import *
+from news_item import NewsItem
+from graph_arrays import AgentArrays
+from engine import FAKE, REAL, NO_BELIEF, NEWS_TYPES, draw_delays, first_per_target
+from lineage import ORIGIN_UNKNOWN, ORIGIN_NORMAL, ORIGIN_INFLUENCER
+from shared_graph import publish_problem, attach_problem
+from event_trace import TraceRecorder, EVENT_SEED, EVENT_SHARE, EVENT_INFECT, EVENT_REVISION
+
+MESSAGE_FIELDS = ('target', 'sender', 'news', 'key', 'rank', 'uniform', 'threshold', 'revise_uniform', 'origin')
+NO_FLAG = (np.inf, 0)
+
+
+def partition_nodes(community: np.ndarray, num_partitions: int) -> np.ndarray:
+    """
+    Assigns every node to a partition: whole community blocks are grouped into num_partitions
+    consecutive groups, and nodes without a community (-1) are spread round-robin.
+
+    Parameters:
+        community : np.ndarray. Community label per node (-1 = no community).
+        num_partitions : int. Number of partitions.
+
+    Returns:
+        np.ndarray : int32 partition index per node.
+
+    Examples:
+        >>> partition_nodes(np.array([0, 0, 1, 1, 2, 2, 3, 3, -1, -1]), 2).tolist()
+        [0, 0, 0, 0, 1, 1, 1, 1, 0, 1]
+    """
+    community = np.asarray(community)
+    num_labels = int(community.max()) + 1 if (community >= 0).any() else 0
+    part_of = np.empty(len(community), dtype=np.int32)
+    labelled = community >= 0
+    part_of[labelled] = community[labelled].astype(np.int64) * num_partitions // max(1, num_labels)
+    part_of[~labelled] = np.flatnonzero(~labelled) % num_partitions
+    return part_of
+
+
+def _empty_messages() -> Dict[str, np.ndarray]:
+    return {'target': np.empty(0, np.int32), 'sender': np.empty(0, np.int32), 'news': np.empty(0, np.int8),
+            'key': np.empty(0), 'rank': np.empty(0, np.int64), 'uniform': np.empty(0), 'threshold': np.empty(0),
+            'revise_uniform': np.empty(0), 'origin': np.empty(0, np.int8)}
+
+
+def _concat_messages(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    parts = [part for part in parts if len(part['target'])]
+    if not parts:
+        return _empty_messages()
+    return {field: np.concatenate([part[field] for part in parts]) for field in MESSAGE_FIELDS}
+
+
+class PartitionWorker:
+    """
+    State and round logic of one partition of a partitioned cascade.
+
+    Attributes:
+        config : SimulationConfig. Parameters of the run.
+        part : int. Index of this partition.
+        owned : np.ndarray. Global ids of the agents owned by this partition.
+        local_index : np.ndarray. Local index of every global id (-1 for agents owned elsewhere).
+        belief, has_shared, infected, origin : np.ndarray. State of the owned agents (see engine.CascadeState).
+        schedule : dict. round -> list of (global agent ids, news codes) share batches.
+        events : list or None. If traced, the (round, sources, targets, news codes, kind) event batches of the
+            current round, handed to the coordinator by summary().
+    """
+    def __init__(self, graph, roles: AgentArrays, part_of: np.ndarray, part: int, rng: np.random.Generator,
+                 hypothesis: str | None = None, config: SimulationConfig = DEFAULT_CONFIG, traced: bool = False):
+        self.config = config
+        self.graph = graph
+        self.roles = roles
+        self.part_of = part_of
+        self.part = part
+        self.rng = rng
+        self.revise = hypothesis == 'h3'
+        self.track_sources = hypothesis == 'h2' and config.variant_A
+        self.trust_boost = config.variant_C
+        self.delay_tables = (config.delay_arrays['fake'], config.delay_arrays['real'])
+        self.influencer_fake_delays = config.delay_arrays['influencer_fake'] if config.variant_B else None
+
+        self.owned = np.flatnonzero(part_of == part).astype(np.int32)
+        self.local_index = np.full(len(part_of), -1, dtype=np.int32)
+        self.local_index[self.owned] = np.arange(len(self.owned), dtype=np.int32)
+        n = len(self.owned)
+        self.belief = np.full(n, NO_BELIEF, dtype=np.int8)
+        self.has_shared = np.zeros((2, n), dtype=bool)
+        self.infected = np.zeros((2, n), dtype=bool)
+        self.origin = np.full(n, ORIGIN_UNKNOWN, dtype=np.int8)
+        self.schedule = defaultdict(list)
+        self.reach = [0, 0]
+        self.shared_count = [0, 0]
+        self.revised = 0
+        self.flagged = False
+        self.contacts = self.beliefs = self.accepted = None # contacts of the current round between receive() and absorb()
+        self.events = [] if traced else None
+
+    def _record(self, round_num: int, sources, targets: np.ndarray, codes: np.ndarray, kind: int) -> None:
+        if self.events is not None and len(targets):
+            self.events.append((round_num, sources, targets, codes, kind))
+
+    def _sample_delays(self, agents: np.ndarray, codes: np.ndarray, variant: bool = True) -> np.ndarray:
+        uniforms = self.rng.random(len(agents))
+        delays = np.empty(len(agents), dtype=np.int64)
+        for code in (FAKE, REAL):
+            mask = codes == code
+            delays[mask] = draw_delays(self.delay_tables[code], uniforms[mask])
+        if variant and self.influencer_fake_delays is not None:
+            fast = (codes == FAKE) & self.roles.is_influencer[agents]
+            delays[fast] = draw_delays(self.influencer_fake_delays, uniforms[fast])
+        return delays
+
+    def _schedule(self, agents: np.ndarray, codes: np.ndarray, rounds: np.ndarray) -> None:
+        for share_round in np.unique(rounds).tolist():
+            mask = rounds == share_round
+            self.schedule[share_round].append((agents[mask], codes[mask]))
+
+    def _mark_infected(self, local: np.ndarray, codes: np.ndarray) -> None:
+        fresh = ~self.infected[codes, local]
+        self.infected[codes, local] = True
+        counts = np.bincount(codes[fresh], minlength=2)
+        self.reach[FAKE] += int(counts[FAKE])
+        self.reach[REAL] += int(counts[REAL])
+
+    def seed(self, agents: np.ndarray, codes: np.ndarray, origins: np.ndarray, delay_rounds: np.ndarray) -> None:
+        """Seeds the owned agents among a global seed list (chosen by the coordinator)."""
+        mine = self.part_of[agents] == self.part
+        agents, codes, origins, delay_rounds = agents[mine], codes[mine], origins[mine], delay_rounds[mine]
+        local = self.local_index[agents]
+        self.belief[local] = codes
+        self.origin[local] = origins
+        self._schedule(agents, codes, self._sample_delays(agents, codes) + delay_rounds)
+        self._mark_infected(local, codes)
+
+    def emit(self, round_num: int, flagged: bool) -> Dict[int, Dict[str, np.ndarray]]:
+        """
+        Shares the news scheduled for this round and returns the contacts that may succeed,
+        grouped by the partition owning the receiver.
+        """
+        self.flagged = flagged
+        batches = self.schedule.pop(round_num, None)
+        if not batches:
+            return {}
+        ids = np.concatenate([agents for agents, _ in batches])
+        codes = np.concatenate([codes for _, codes in batches])
+        keep = first_per_target(np.arange(len(ids)), codes.astype(np.int64) * len(self.part_of) + ids)
+        ids, codes = ids[keep], codes[keep]
+        fresh = ~self.has_shared[codes, self.local_index[ids]]
+        ids, codes = ids[fresh], codes[fresh]
+        if len(ids) == 0:
+            return {}
+        self.has_shared[codes, self.local_index[ids]] = True
+        self._record(round_num, ids, np.full(len(ids), -1), codes, EVENT_SHARE)
+        counts = np.bincount(codes, minlength=2)
+        self.shared_count[FAKE] += int(counts[FAKE])
+        self.shared_count[REAL] += int(counts[REAL])
+
+        keys = self.rng.random(len(ids)) # position of each share in the round's global processing order
+        owner, neighbors, trust = self.graph.expand(ids)
+        sources = ids[owner]
+        news = codes[owner]
+        p_share = np.where(news == FAKE, self.roles.p_share_fake[sources], self.roles.p_share_real[sources])
+        threshold = p_share * trust
+        if self.trust_boost:
+            threshold *= np.where(self.roles.is_influencer[sources], 1.2, 1.0)
+        if flagged:
+            threshold[news == FAKE] *= 0.3 # reduce trust for flagged fake news
+        uniforms = self.rng.random(len(neighbors))
+        send = uniforms < threshold
+        revise_uniforms = np.empty(len(neighbors))
+        if self.revise:
+            revise_uniforms = self.rng.random(len(neighbors))
+            send |= revise_uniforms < max(self.config.p_belief_revision, 0.25)
+
+        sent = np.flatnonzero(send)
+        destinations = self.part_of[neighbors[sent]]
+        sent = sent[np.argsort(destinations, kind='stable')]
+        destinations = self.part_of[neighbors[sent]]
+        bounds = np.flatnonzero(np.diff(destinations)) + 1
+        messages = {}
+        for chunk in np.split(sent, bounds):
+            if len(chunk):
+                messages[int(self.part_of[neighbors[chunk[0]]])] = {
+                    'target': neighbors[chunk].astype(np.int32), 'sender': sources[chunk].astype(np.int32),
+                    'news': news[chunk].astype(np.int8), 'key': keys[owner[chunk]], 'rank': chunk.astype(np.int64),
+                    'uniform': uniforms[chunk],
+                    'threshold': threshold[chunk], 'revise_uniform': revise_uniforms[chunk],
+                    'origin': self.origin[self.local_index[sources[chunk]]]}
+        return messages
+
+    def receive(self, round_num: int, inbox: List[Dict[str, np.ndarray]]) -> Tuple[float, int]:
+        """
+        Orders the contacts received for the owned agents and returns the (key, rank) position of the
+        first fact-checker flag among them, or NO_FLAG.
+        """
+        contacts = _concat_messages(inbox)
+        order = np.lexsort((contacts['rank'], contacts['key']))
+        contacts = {field: values[order] for field, values in contacts.items()}
+        beliefs = self.belief[self.local_index[contacts['target']]]
+        self.contacts, self.beliefs = contacts, beliefs
+        self.accepted = (beliefs == NO_BELIEF) & (contacts['uniform'] < contacts['threshold'])
+        if self.flagged:
+            return NO_FLAG
+        # Fact-checker intervention: the first successful flag reduces trust for all later fake contacts
+        hits = self.accepted & (contacts['news'] == FAKE) & self.roles.is_fact_checker[contacts['target']]
+        candidates = first_per_target(np.flatnonzero(hits), contacts['target'])
+        flags = candidates[self.rng.random(len(candidates)) < self.config.p_fact_check]
+        if len(flags) == 0:
+            return NO_FLAG
+        return float(contacts['key'][flags[0]]), int(contacts['rank'][flags[0]])
+
+    def absorb(self, round_num: int, flag_position: Tuple[float, int]) -> Dict[str, Any]:
+        """
+        Resolves the received contacts given the earliest flag over all partitions and returns the
+        partition's counters.
+        """
+        contacts, beliefs, accepted = self.contacts, self.beliefs, self.accepted
+        self.contacts = self.beliefs = self.accepted = None
+        targets, news = contacts['target'], contacts['news']
+
+        if flag_position != NO_FLAG:
+            self.flagged = True
+            key, rank = flag_position
+            later = (news == FAKE) & ((contacts['key'] > key) | ((contacts['key'] == key) & (contacts['rank'] > rank)))
+            accepted[later] &= contacts['uniform'][later] < contacts['threshold'][later] * 0.3
+
+        if self.revise:
+            conflicting = np.flatnonzero((beliefs != NO_BELIEF) & (beliefs != news))
+            chance = np.where(self.roles.is_fact_checker[targets[conflicting]], self.config.p_belief_revision, 0.25)
+            hits = first_per_target(conflicting[contacts['revise_uniform'][conflicting] < chance], targets)
+            self._infect(round_num, targets[hits], news[hits], contacts['origin'][hits], variant=False)
+            self._record(round_num, contacts['sender'][hits], targets[hits], news[hits], EVENT_REVISION)
+            self.revised += len(hits)
+
+        winners = first_per_target(np.flatnonzero(accepted), targets)
+        self._infect(round_num, targets[winners], news[winners], contacts['origin'][winners])
+        self._record(round_num, contacts['sender'][winners], targets[winners], news[winners], EVENT_INFECT)
+        return self.summary()
+
+    def _infect(self, round_num: int, targets: np.ndarray, news: np.ndarray, origins: np.ndarray,
+                variant: bool = True) -> None:
+        local = self.local_index[targets]
+        self.belief[local] = news
+        self._mark_infected(local, news)
+        if self.track_sources:
+            self.origin[local] = origins # Inherit source for comparison during H2
+        self._schedule(targets, news, round_num + self._sample_delays(targets, news, variant=variant))
+
+    def summary(self) -> Dict[str, Any]:
+        """Returns the counters the coordinator reduces after every round (and the round's events, if traced)."""
+        events, self.events = self.events, ([] if self.events is not None else None)
+        return {'reach': list(self.reach), 'shared_count': list(self.shared_count), 'flagged': self.flagged,
+                'pending': bool(self.schedule), 'events': events or []}
+
+    def results(self) -> Dict[str, int]:
+        """Returns this partition's share of the final beliefs, revisions and influencer attribution."""
+        reached = self.origin[self.infected[FAKE]]
+        return {'fake': int((self.belief == FAKE).sum()), 'real': int((self.belief == REAL).sum()),
+                'revised': self.revised, 'influencer': int((reached == ORIGIN_INFLUENCER).sum()),
+                'normal': int((reached == ORIGIN_NORMAL).sum())}
+
+
+def _partition_process(connection, handle, part_of, part, seed_sequence, hypothesis, config, traced) -> None:
+    graph, roles, _, keepalive = attach_problem(handle)
+    worker = PartitionWorker(graph, roles, part_of, part, np.random.default_rng(seed_sequence),
+                             hypothesis=hypothesis, config=config, traced=traced)
+    while True:
+        command, args = connection.recv()
+        if command == 'stop':
+            break
+        connection.send(getattr(worker, command)(*args))
+    del worker, graph, roles
+    connection.close()
+
+
+class _ProcessPartition:
+    """Proxy forwarding PartitionWorker calls to a worker process over a pipe."""
+    def __init__(self, context, handle, part_of, part, seed_sequence, hypothesis, config, traced):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_partition_process, daemon=True,
+                                       args=(child, handle, part_of, part, seed_sequence, hypothesis, config, traced))
+        self.process.start()
+        child.close()
+
+    def send(self, command: str, *args) -> None:
+        self.connection.send((command, args))
+
+    def receive(self):
+        return self.connection.recv()
+
+    def stop(self) -> None:
+        self.connection.send(('stop', ()))
+        self.process.join()
+
+
+class _LocalPartition:
+    """Same interface as _ProcessPartition for an in-process PartitionWorker."""
+    def __init__(self, worker: PartitionWorker):
+        self.worker = worker
+        self.pending = None
+
+    def send(self, command: str, *args) -> None:
+        self.pending = getattr(self.worker, command)(*args)
+
+    def receive(self):
+        result, self.pending = self.pending, None
+        return result
+
+    def stop(self) -> None:
+        pass
+
+
+def _broadcast(partitions, command: str, per_partition_args=None, shared_args=()) -> list:
+    for index, partition in enumerate(partitions):
+        args = per_partition_args[index] if per_partition_args is not None else ()
+        partition.send(command, *shared_args, *args)
+    return [partition.receive() for partition in partitions]
+
+
+def _choose_seeds(roles: AgentArrays, rng: np.random.Generator, track_sources: bool, seed_count: int) -> np.ndarray:
+    if track_sources:
+        influencers = np.flatnonzero(roles.is_influencer)
+        others = np.flatnonzero(~roles.is_influencer)
+        seed_influencers = rng.choice(influencers, min(7, len(influencers)), replace=False)
+        seed_others = rng.choice(others, seed_count - len(seed_influencers), replace=False)
+        return np.concatenate([seed_influencers, seed_others])
+    return rng.choice(roles.num_agents, seed_count, replace=False)
+
+
+def simulate_spread_partitioned(graph, roles: AgentArrays, num_partitions: int = 4,
+                                news_items: Dict[str, NewsItem] | None = None, hypothesis=None,
+                                real_news_delay=0,
+                                seed: int | None = None, parallel: bool = True, community: np.ndarray | None = None,
+                                backing: str = 'shm', trace: TraceRecorder | None = None,
+                                config: SimulationConfig = DEFAULT_CONFIG) -> tuple[dict[str, list[int]], dict[str, int], int, dict[str, int]]:
+    """
+    Simulates one cascade split over num_partitions community-block partitions.
+
+    Parameters:
+        graph : GraphArrays. Network with trust weights (ImplicitSocialGraph also works with parallel=False).
+        roles : AgentArrays. Roles and share probabilities of every agent.
+        num_partitions : int. Number of partitions (one worker process each when parallel=True).
+        news_items : dict or None. If given, shared_count and is_flagged_fake of the 'fake' and 'real' items are updated.
+        hypothesis : str or None. One of 'h2', 'h3', or None to control variant logic.
+        real_news_delay : int. Optional delay in seeding real news (used in Hypothesis 3).
+        seed : int or None. Seed of the coordinator and partition random streams.
+        parallel : bool. Run partitions as worker processes (True) or in this process (False).
+        community : np.ndarray or None. Community labels used for partitioning (default: graph.community).
+        backing : str. Shared array backing for worker processes ('shm' or 'mmap').
+        trace : TraceRecorder or None. If given, every seed, share, infection and belief revision is recorded
+            into it, round by round, with the metadata of simulate_spread_arrays() traces.
+        config : SimulationConfig. Seed count, fact-checking and revision probabilities, delays, round limit and
+            Hypothesis 2 variant flags.
+
+    Returns:
+        stats : dict[str, list[int]]. Reach by round for each news type.
+        final_beliefs : dict[str, int]. Final number of agents believing fake or real news.
+        belief_revised_count : int. Number of agents who switched beliefs after receiving conflicting news.
+        influencer_impact : dict[str, int]. Spread attribution (influencer vs. normal) for fake news (only in H2).
+
+    Examples:
+        >>> import networkx as nx
+        >>> from network_generator import create_social_network
+        >>> from graph_arrays import GraphArrays
+        >>> from agent_initializer import assign_roles_bulk, assign_trust_levels_bulk
+        >>> from simulation import initialize_p_shares_bulk
+        >>> rng = np.random.default_rng(0)
+        >>> graph = GraphArrays.from_networkx(create_social_network(300, 6, 6))
+        >>> roles = assign_roles_bulk(graph.degrees(), rng)
+        >>> initialize_p_shares_bulk(roles, rng)
+        >>> _ = assign_trust_levels_bulk(graph, rng)
+        >>> serial = simulate_spread_partitioned(graph, roles, 3, hypothesis='h3', seed=5, parallel=False)
+        >>> forked = simulate_spread_partitioned(graph, roles, 3, hypothesis='h3', seed=5, parallel=True)
+        >>> serial == forked
+        True
+        >>> serial[0]['fake'][0] >= seed_count
+        True
+        >>> from event_trace import EVENT_SHARE
+        >>> trace, forked_trace = TraceRecorder(), TraceRecorder()
+        >>> traced = simulate_spread_partitioned(graph, roles, 3, hypothesis='h3', seed=5, parallel=False, trace=trace)
+        >>> _ = simulate_spread_partitioned(graph, roles, 3, hypothesis='h3', seed=5, trace=forked_trace)
+        >>> traced == serial, bool((trace.records == forked_trace.records).all())
+        (True, True)
+        >>> reached = trace.records[(trace.records['kind'] != EVENT_SHARE) & (trace.records['news'] == 0)]
+        >>> len(np.unique(reached['target'])) == serial[0]['fake'][-1], trace.metadata['rounds'] == len(serial[0]['fake'])
+        (True, True)
+    """
+    if community is None:
+        community = graph.community if getattr(graph, 'community', None) is not None \
+            else graph.community_of(np.arange(roles.num_agents))
+    part_of = partition_nodes(community, num_partitions)
+    seed_sequence = np.random.SeedSequence(seed)
+    coordinator_seed, *partition_seeds = seed_sequence.spawn(num_partitions + 1)
+    rng = np.random.default_rng(coordinator_seed)
+    track_sources = hypothesis == 'h2' and config.variant_A
+
+    shared = None
+    if parallel:
+        shared = publish_problem(graph, roles, backing=backing)
+        context = multiprocessing.get_context()
+        partitions = [_ProcessPartition(context, shared.handle, part_of, part, partition_seeds[part], hypothesis,
+                                        config, trace is not None) for part in range(num_partitions)]
+    else:
+        partitions = [_LocalPartition(PartitionWorker(graph, roles, part_of, part,
+                                                      np.random.default_rng(partition_seeds[part]),
+                                                      hypothesis=hypothesis, config=config,
+                                                      traced=trace is not None))
+                      for part in range(num_partitions)]
+    try:
+        # Seeding: the coordinator draws the global seed lists, partitions seed their own agents
+        for code, news_type in enumerate(NEWS_TYPES):
+            delay_round = real_news_delay if news_type == 'real' and hypothesis == 'h3' else 0
+            seeds = _choose_seeds(roles, rng, track_sources, config.seed_count)
+            origins = (np.where(roles.is_influencer[seeds], ORIGIN_INFLUENCER, ORIGIN_NORMAL).astype(np.int8)
+                       if track_sources else np.full(len(seeds), ORIGIN_UNKNOWN, dtype=np.int8))
+            if trace is not None:
+                trace.record_many(0, -1, seeds, code, EVENT_SEED)
+            _broadcast(partitions, 'seed', shared_args=(seeds, np.full(len(seeds), code, dtype=np.int8), origins,
+                                                        np.full(len(seeds), delay_round, dtype=np.int64)))
+
+        stats = {'fake': [], 'real': []}
+        flagged = False
+        round_num = 0
+        while True:
+            outboxes = _broadcast(partitions, 'emit', shared_args=(round_num, flagged))
+            inboxes = [[outbox[part] for outbox in outboxes if part in outbox] for part in range(num_partitions)]
+            flag_position = min(_broadcast(partitions, 'receive', [(inbox,) for inbox in inboxes],
+                                           shared_args=(round_num,)))
+            summaries = _broadcast(partitions, 'absorb', shared_args=(round_num, flag_position))
+            flagged = flagged or flag_position != NO_FLAG
+            if trace is not None:  # in the order of simulate_spread_arrays(): shares, revisions, infections
+                for kind in (EVENT_SHARE, EVENT_REVISION, EVENT_INFECT):
+                    for summary in summaries:
+                        for event in summary['events']:
+                            if event[4] == kind:
+                                trace.record_many(*event)
+            stats['fake'].append(sum(summary['reach'][FAKE] for summary in summaries))
+            stats['real'].append(sum(summary['reach'][REAL] for summary in summaries))
+            round_num += 1
+            if not any(summary['pending'] for summary in summaries) or round_num >= config.max_rounds: # spread is over
+                break
+        partial = _broadcast(partitions, 'results')
+    finally:
+        for partition in partitions:
+            partition.stop()
+        if shared is not None:
+            shared.unlink()
+
+    final_beliefs = {'fake': sum(p['fake'] for p in partial), 'real': sum(p['real'] for p in partial)}
+    belief_revised_count = sum(p['revised'] for p in partial)
+    influencer_impact = {'influencer': 0, 'normal': 0}
+    if track_sources:
+        influencer_impact = {'influencer': sum(p['influencer'] for p in partial),
+                             'normal': sum(p['normal'] for p in partial)}
+    if news_items is not None:
+        news_items['fake'].shared_count += sum(s['shared_count'][FAKE] for s in summaries)
+        news_items['real'].shared_count += sum(s['shared_count'][REAL] for s in summaries)
+        news_items['fake'].is_flagged_fake = news_items['fake'].is_flagged_fake or flagged
+    if trace is not None:
+        trace.metadata.update({
+            'num_agents': roles.num_agents,
+            'rounds': len(stats['fake']),
+            'hypothesis': hypothesis,
+            'variant_flags': config.variant_flags,
+            'influencers': np.flatnonzero(roles.is_influencer).tolist(),
+        })
+    return stats, final_beliefs, belief_revised_count, influencer_impact
+
+
+def benchmark(num_agents: int, partition_counts: Sequence[int], hypothesis: str | None = None, seed: int = 0,
+              repeats: int = 3, config: SimulationConfig = DEFAULT_CONFIG) -> List[Tuple[str, float, int]]:
+    """
+    Times one cascade with simulate_spread_arrays() and with simulate_spread_partitioned() on the same network.
+
+    Parameters:
+        num_agents : int. Number of agents of the generated network.
+        partition_counts : sequence of int. Partition counts to time (worker processes each).
+        hypothesis : str or None. Hypothesis of the timed cascades.
+        seed : int. Seed of the network and of the cascades.
+        repeats : int. Number of cascades per engine; the fastest one is reported.
+        config : SimulationConfig. Base configuration (num_agents is replaced).
+
+    Returns:
+        timings : list of (label, seconds, final fake reach). 'arrays' first, then 'partitioned-<count>'.
+
+    Examples:
+        >>> timings = benchmark(300, [2], seed=1, repeats=1)
+        >>> [label for label, _, _ in timings]
+        ['arrays', 'partitioned-2']
+    """
+    from parallel_run import build_problem
+    from engine import simulate_spread_arrays
+    from rng_context import RunRNG
+
+    config = config.replace(num_agents=num_agents)
+    graph, roles, transmission = build_problem(RunRNG(seed), config=config)
+    runners = [('arrays', lambda: simulate_spread_arrays(graph, roles, hypothesis=hypothesis,
+                                                         rng=np.random.default_rng(seed), transmission=transmission,
+                                                         config=config))]
+    runners += [(f'partitioned-{count}',
+                 lambda count=count: simulate_spread_partitioned(graph, roles, count, hypothesis=hypothesis,
+                                                                 seed=seed, config=config))
+                for count in partition_counts]
+    timings = []
+    for label, runner in runners:
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            stats = runner()[0]
+            best = min(best, time.perf_counter() - start)
+        timings.append((label, best, stats['fake'][-1]))
+    return timings
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Time one cascade split over several partitions against the "
+                                                 "sequential array engine.")
+    parser.add_argument('--num-agents', type=int, default=200000)
+    parser.add_argument('--partitions', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--hypothesis', choices=['h2', 'h3'], default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{multiprocessing.cpu_count()} cores available")
+    timings = benchmark(args.num_agents, args.partitions, args.hypothesis, args.seed, args.repeats)
+    reference = timings[0][1]
+    for label, seconds, reach in timings:
+        print(f"{label:16s} {seconds:8.2f} s  speedup {reference / seconds:5.2f}x  final fake reach {reach}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
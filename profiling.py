@@ -0,0 +1,270 @@
+'''
+profiling.py
+
+This module profiles a sample of simulation runs and reports where the time goes, inside
+simulate_spread, the role and trust initializers, the array engine and the networkx calls.
+
+Both profilers record time per full call stack (root to leaf), so their output can be drawn as a
+flame graph:
+- 'sampling': a SIGPROF interval timer interrupts the process every `interval` seconds of CPU time
+  and charges the CPU time used since the previous sample to the current stack (low overhead,
+  statistical; timer expirations that the kernel merges are still accounted for).
+- 'deterministic': a sys.setprofile hook sees every Python and C function call and return and
+  charges the exact elapsed time to the stack that was running (exact attribution, high overhead).
+
+Runs can be spread over worker processes; every worker profiles its own run range and the stack
+weights are summed. Nothing here is imported by the simulation modules, so profiling costs nothing
+when it is off.
+
+Outputs:
+- collapsed stacks ("module:function;module:function <microseconds>" per line), the input format of
+  flamegraph.pl, inferno and speedscope
+- a report of the top-N functions by self time, with cumulative time
+
+It includes:
+- StackProfiler: sampling or deterministic stack profiler (context manager)
+- merge_stacks(), write_collapsed(), function_times(), format_report()
+- profile_experiment(): profiled runs of an experiment, optionally in several processes
+'''
+
+import multiprocessing
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+from config import SimulationConfig, DEFAULT_CONFIG
+from baseline_run import run_baseline_simulation, RunOptions
+from sharding import experiment_points
+
+MODES = ('sampling', 'deterministic')
+DEFAULT_INTERVAL = 0.001
+
+Stack = Tuple[str, ...]
+
+
+def _frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+def _builtin_label(function) -> str:
+    module = getattr(function, '__module__', None) or type(getattr(function, '__self__', None)).__name__
+    return f"{module}:{getattr(function, '__qualname__', repr(function))}"
+
+
+class StackProfiler:
+    """
+    Records time (seconds) per call stack while active.
+
+    Attributes:
+        mode : str. 'sampling' or 'deterministic'.
+        interval : float. Sampling period in seconds of CPU time (sampling mode).
+        stacks : Counter. Stack (tuple of 'module:function' labels, root first) -> seconds.
+
+    Examples:
+        >>> def leaf():
+        ...     return sum(range(1000))
+        >>> def root():
+        ...     for _ in range(50):
+        ...         leaf()
+        >>> with StackProfiler('deterministic') as profiler:
+        ...     root()
+        >>> sorted(profiler.stacks)
+        [('profiling:root',), ('profiling:root', 'profiling:leaf'), ('profiling:root', 'profiling:leaf', 'builtins:sum')]
+        >>> with StackProfiler('sampling', interval=0.001) as profiler:
+        ...     for _ in range(100):
+        ...         root()
+        >>> sum(profiler.stacks.values()) > 0
+        True
+    """
+    def __init__(self, mode: str = 'sampling', interval: float = DEFAULT_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}' (expected one of {MODES})")
+        self.mode = mode
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._previous_handler = None
+        self._base = None
+        self._stack: Stack = ()
+        self._last = 0.0
+
+    def _sample(self, signum, frame) -> None:
+        now = time.process_time()
+        labels = []
+        while frame is not None and frame is not self._base:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        self.stacks[tuple(reversed(labels))] += now - self._last
+        self._last = now
+
+    def _trace(self, frame, event: str, arg) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            self.stacks[self._stack] += now - self._last
+        if event == 'call':
+            self._stack += (_frame_label(frame),)
+        elif event == 'c_call':
+            self._stack += (_builtin_label(arg),)
+        elif self._stack:  # return, c_return, c_exception (frames entered before start() are ignored)
+            self._stack = self._stack[:-1]
+        self._last = time.perf_counter()  # the hook's own time is not charged
+
+    def start(self, base_frame=None) -> None:
+        """
+        Starts recording. Stacks are rooted below base_frame (default: the caller), so frames that
+        were already running, such as a worker process's bootstrap, are left out.
+        """
+        if self.mode == 'sampling':
+            if threading.current_thread() is not threading.main_thread():
+                raise RuntimeError("sampling profiler must run in the main thread (it uses SIGPROF)")
+            self._base = base_frame or sys._getframe(1)
+            self._last = time.process_time()
+            self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._stack = ()
+            self._last = time.perf_counter()
+            sys.setprofile(self._trace)
+
+    def stop(self) -> None:
+        if self.mode == 'sampling':
+            signal.setitimer(signal.ITIMER_PROF, 0.0, 0.0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+            self._base = None
+        else:
+            sys.setprofile(None)
+            for stack in [stack for stack in self.stacks if stack[0].startswith('profiling:StackProfiler.')]:
+                del self.stacks[stack]  # the profiler's own exit
+
+    def __enter__(self) -> 'StackProfiler':
+        self.start(sys._getframe(1))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def merge_stacks(profiles: Iterable[Dict[Stack, float]]) -> Counter:
+    """
+    Sums stack weights over several profiles (for example one per worker process).
+
+    Examples:
+        >>> merge_stacks([{('a:f',): 1.0}, {('a:f',): 0.5, ('a:f', 'a:g'): 2.0}])
+        Counter({('a:f', 'a:g'): 2.0, ('a:f',): 1.5})
+    """
+    merged: Counter = Counter()
+    for profile in profiles:
+        merged.update(profile)
+    return merged
+
+
+def write_collapsed(stacks: Dict[Stack, float], path: str) -> None:
+    """
+    Writes stacks in collapsed format, one "frame;frame;frame weight" line per stack with the
+    weight in integer microseconds (stacks below one microsecond are dropped).
+
+    Parameters:
+        stacks : dict. Stack -> seconds.
+        path : str. Output file.
+    """
+    with open(path, 'w') as f:
+        for stack, seconds in sorted(stacks.items()):
+            microseconds = round(seconds * 1e6)
+            if microseconds > 0:
+                f.write(f"{';'.join(label.replace(';', ',') for label in stack)} {microseconds}\n")
+
+
+def function_times(stacks: Dict[Stack, float]) -> Tuple[Counter, Counter]:
+    """
+    Returns self time (time at the top of the stack) and cumulative time (time anywhere on the
+    stack, counted once per stack for recursive functions) of every function.
+
+    Examples:
+        >>> own, cumulative = function_times({('m:main', 'm:f'): 2.0, ('m:main',): 1.0})
+        >>> own['m:f'], own['m:main'], cumulative['m:main']
+        (2.0, 1.0, 3.0)
+    """
+    own: Counter = Counter()
+    cumulative: Counter = Counter()
+    for stack, seconds in stacks.items():
+        own[stack[-1]] += seconds
+        for label in set(stack):
+            cumulative[label] += seconds
+    return own, cumulative
+
+
+def format_report(stacks: Dict[Stack, float], top: int = 30) -> str:
+    """
+    Formats the top functions by self time as a text table.
+
+    Parameters:
+        stacks : dict. Stack -> seconds.
+        top : int. Number of functions listed.
+
+    Returns:
+        str : Report with self time, its share of the total and cumulative time per function.
+
+    Examples:
+        >>> print(format_report({('m:main', 'm:f'): 3.0, ('m:main',): 1.0}, top=1))
+        total profiled time 4.000 s
+          self (s)  self %    cum (s)  function
+             3.000    75.0      3.000  m:f
+    """
+    own, cumulative = function_times(stacks)
+    total = sum(stacks.values())
+    lines = [f"total profiled time {total:.3f} s", f"{'self (s)':>10}  {'self %':>6}  {'cum (s)':>9}  function"]
+    for label, seconds in own.most_common(top):
+        lines.append(f"{seconds:10.3f}  {100 * seconds / total if total else 0.0:6.1f}  {cumulative[label]:9.3f}  {label}")
+    return '\n'.join(lines)
+
+
+def _profile_task(task: Dict[str, Any]) -> Dict[Stack, float]:
+    # profiles one run range of one experiment point (in a worker process or in-process)
+    profiler = StackProfiler(task['mode'], task['interval'])
+    with profiler:
+        run_baseline_simulation(task['num_runs'], seed=task['seed'], first_run=task['first_run'],
+                                config=task['config'], options=RunOptions(engine=task['engine']), **task['kwargs'])
+    return dict(profiler.stacks)
+
+
+def profile_experiment(kind: str = 'baseline', num_runs: int = 20, mode: str = 'sampling',
+                       interval: float = DEFAULT_INTERVAL, processes: int = 1, seed: int = 0,
+                       engine: str = 'reference', values: List[Any] | None = None,
+                       config: SimulationConfig = DEFAULT_CONFIG) -> Counter:
+    """
+    Profiles num_runs seeded runs of every point of an experiment (see sharding.experiment_points()).
+
+    Parameters:
+        kind : str. 'baseline', 'h1', 'h2' or 'h3'.
+        num_runs : int. Profiled runs per experiment point.
+        mode : str. 'sampling' or 'deterministic'.
+        interval : float. Sampling period in seconds (sampling mode).
+        processes : int. Worker processes; the runs of every point are split into contiguous ranges.
+        seed : int. Base seed of the runs.
+        engine : str. Engine passed to run_baseline_simulation().
+        values : list or None. Experiment values (see sharding.experiment_points()).
+        config : SimulationConfig. Parameters of every run.
+
+    Returns:
+        Counter : Stack -> seconds, summed over all workers.
+
+    Examples:
+        >>> stacks = profile_experiment('baseline', num_runs=2, mode='deterministic', engine='arrays')
+        >>> own, cumulative = function_times(stacks)
+        >>> cumulative['engine:simulate_spread_arrays'] > 0 and cumulative['agent_initializer:assign_roles_bulk'] > 0
+        True
+    """
+    tasks = []
+    for _, kwargs in experiment_points(kind, values):
+        bounds = [num_runs * part // processes for part in range(processes + 1)]
+        for first_run, last_run in zip(bounds, bounds[1:]):
+            if last_run > first_run:
+                tasks.append({'mode': mode, 'interval': interval, 'num_runs': last_run - first_run,
+                              'first_run': first_run, 'seed': seed, 'engine': engine, 'config': config,
+                              'kwargs': kwargs})
+    if processes == 1:
+        return merge_stacks(_profile_task(task) for task in tasks)
+    with multiprocessing.Pool(processes) as pool:
+        return merge_stacks(pool.imap_unordered(_profile_task, tasks))
@@ -0,0 +1,128 @@
+'''
+progress.py
+
+This module displays the progress of a batch of simulation runs: a text bar with the number of
+finished runs, the measured throughput in runs per second, the estimated time remaining and an optional
+status text (e.g. the running summary of baseline_run.MetricsAccumulator), redrawn in place on a
+terminal stream (stderr by default) at most every min_interval seconds.
+
+It includes:
+- ProgressReporter: progress state, rate / ETA estimate and text rendering
+- track(): wraps an iterable of runs (see baseline_run.iter_runs()) with a ProgressReporter
+'''
+
+import sys
+import time
+from typing import Callable, Iterable, Iterator, TextIO, TypeVar
+
+T = TypeVar('T')
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Formats a duration as h:mm:ss.
+
+    Examples:
+        >>> format_duration(3725.4)
+        '1:02:05'
+    """
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressReporter:
+    """
+    Tracks finished runs and estimates the time remaining from the measured run rate.
+
+    Attributes:
+        total : int. Number of runs expected.
+        done : int. Number of finished runs.
+        label : str. Text shown before the bar.
+        status : callable or None. Returns text shown after the ETA, called at every redraw.
+
+    Examples:
+        >>> import io
+        >>> ticks = iter([0.0, 2.0, 4.0, 4.0])
+        >>> stream = io.StringIO()
+        >>> reporter = ProgressReporter(10, 'baseline', stream=stream, clock=lambda: next(ticks), width=10)
+        >>> reporter.update(2); reporter.update(2)
+        >>> reporter.rate(), reporter.eta()
+        (1.0, 6.0)
+        >>> reporter.close()
+        >>> stream.getvalue().split('\\r')[-1]
+        'baseline [####------] 4/10 1.00 runs/s ETA 0:00:06\\n'
+        >>> ProgressReporter(10, stream=stream, status=lambda: 'fake reach 12.0', width=10).render()
+        'runs [----------] 0/10 0.00 runs/s ETA ? | fake reach 12.0'
+    """
+    def __init__(self, total: int, label: str = 'runs', stream: TextIO | None = None, width: int = 30,
+                 min_interval: float = 0.2, clock: Callable[[], float] = time.monotonic,
+                 status: Callable[[], str] | None = None):
+        self.total = total
+        self.label = label
+        self.stream = stream if stream is not None else sys.stderr
+        self.width = width
+        self.min_interval = min_interval
+        self.clock = clock
+        self.status = status
+        self.done = 0
+        self.start = clock()
+        self._now = self.start
+        self._last_draw = None
+
+    def rate(self) -> float:
+        """Finished runs per second since the start."""
+        elapsed = self._now - self.start
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> float | None:
+        """Estimated seconds until all runs are finished (None before the rate is known)."""
+        rate = self.rate()
+        return (self.total - self.done) / rate if rate > 0 else None
+
+    def render(self) -> str:
+        filled = self.width * self.done // self.total if self.total else self.width
+        eta = self.eta()
+        text = (f"{self.label} [{'#' * filled}{'-' * (self.width - filled)}] {self.done}/{self.total} "
+                f"{self.rate():.2f} runs/s ETA {format_duration(eta) if eta is not None else '?'}")
+        return text if self.status is None else f"{text} | {self.status()}"
+
+    def update(self, count: int = 1) -> None:
+        """Records count finished runs and redraws the bar if min_interval has passed."""
+        self.done += count
+        self._now = self.clock()
+        if self._last_draw is None or self._now - self._last_draw >= self.min_interval:
+            self._draw()
+
+    def _draw(self) -> None:
+        self._last_draw = self._now
+        self.stream.write('\r' + self.render())
+        self.stream.flush()
+
+    def close(self) -> None:
+        """Draws the final state and ends the line."""
+        self._draw()
+        self.stream.write('\n')
+        self.stream.flush()
+
+
+def track(runs: Iterable[T], total: int, label: str = 'runs', stream: TextIO | None = None,
+          status: Callable[[], str] | None = None) -> Iterator[T]:
+    """
+    Yields the items of runs unchanged while displaying a ProgressReporter of total items (with the
+    given status text); the bar is closed when runs is exhausted or the consumer stops early.
+
+    Examples:
+        >>> import io
+        >>> stream = io.StringIO()
+        >>> list(track(iter(range(3)), 3, stream=stream))
+        [0, 1, 2]
+        >>> stream.getvalue().rstrip().split('\\r')[-1].startswith('runs [' + '#' * 30 + '] 3/3')
+        True
+    """
+    reporter = ProgressReporter(total, label, stream=stream, status=status)
+    try:
+        for item in runs:
+            reporter.update()
+            yield item
+    finally:
+        reporter.close()
@@ -0,0 +1,235 @@
+'''
+rare_event.py
+
+This module estimates tail probabilities such as P(final fake reach >= 50% of the agents), which
+plain Monte Carlo (run_baseline_simulation) almost never samples under baseline parameters, with
+multilevel splitting on the reach.
+
+Reach only grows during a run, so a run can only exceed the target threshold after crossing every
+lower level L1 < L2 < ... < threshold. Fixed-effort splitting estimates
+
+    P(reach >= threshold) = P(reach >= L1) * P(reach >= L2 | reach >= L1) * ...
+
+stage by stage: num_particles runs are advanced until they cross the next level or die out, the
+fraction that crossed estimates the stage probability, and the next stage restarts num_particles
+runs from forks (engine.CascadeState.fork()) of the crossing states drawn with replacement. Each
+forked run continues with its own random stream and shares its network with its ancestor. The
+product of stage fractions is an unbiased estimate of the tail probability; independent repetitions
+of the whole procedure give its standard error and confidence interval.
+
+Intermediate levels are best placed so that every stage keeps a similar fraction of its runs;
+pilot_levels() finds such levels with a small adaptive pass whose runs are not reused in the estimate.
+
+It includes:
+- default_levels(): geometric intermediate levels
+- pilot_levels(): adaptive intermediate levels from a pilot run
+- multilevel_splitting(): one splitting estimate
+- estimate_tail_probability(): repeated estimates with a confidence interval
+'''
+
+import math
+from statistics import NormalDist
+from typing import Any, Dict, List
+import numpy as np
+
+from config import *
+from engine import CascadeState, NEWS_TYPES
+from parallel_run import build_problem
+from rng_context import RunRNG
+
+
+def default_levels(threshold: int, start: int | None = None, ratio: float = 2.0,
+                   config: SimulationConfig = DEFAULT_CONFIG) -> List[int]:
+    """
+    Returns geometrically spaced reach levels from start (4 * config.seed_count if None) up to threshold
+    (included), about ratio apart.
+
+    Examples:
+        >>> default_levels(750)
+        [40, 72, 129, 232, 417, 750]
+        >>> default_levels(750, config=DEFAULT_CONFIG.replace(seed_count=50))
+        [200, 387, 750]
+    """
+    start = 4 * config.seed_count if start is None else start
+    if threshold <= start:
+        return [threshold]
+    num_levels = math.ceil(math.log(threshold / start, ratio)) + 1
+    return sorted(set(np.geomspace(start, threshold, num_levels).round().astype(int).tolist()))
+
+
+def _advance_until(state: CascadeState, news_code: int, level: int) -> bool:
+    # advances a run until its reach crosses level (True) or it dies out (False)
+    while state.reach[news_code] < level and not state.done:
+        state.advance_round()
+    return state.reach[news_code] >= level
+
+
+def _initial_particles(num_particles: int, network_seeds: np.random.SeedSequence, new_rng, hypothesis: str | None,
+                       percent_fc: float | None, variant_flag: Dict[str, bool] | None, real_news_delay: int,
+                       config: SimulationConfig) -> List[CascadeState]:
+    # independent seeded runs, each on its own network
+    if variant_flag is not None:
+        config = config.with_variants(variant_flag)
+    particles = []
+    for network_seed in network_seeds.spawn(num_particles):
+        graph, roles, transmission = build_problem(RunRNG(network_seed), percent_fc=percent_fc, config=config)
+        state = CascadeState(graph, roles, new_rng(), hypothesis=hypothesis, transmission=transmission, config=config)
+        state.seed_news(real_news_delay)
+        particles.append(state)
+    return particles
+
+
+def pilot_levels(threshold: int, num_particles: int = 50, keep_fraction: float = 0.2, max_levels: int = 20,
+                 news: str = 'fake', hypothesis: str | None = None, percent_fc: float | None = None,
+                 variant_flag: Dict[str, bool] | None = None, real_news_delay: int = 0,
+                 seed: int | np.random.SeedSequence | None = None,
+                 config: SimulationConfig = DEFAULT_CONFIG) -> List[int]:
+    """
+    Chooses intermediate levels adaptively: each level is the (1 - keep_fraction) quantile of the final
+    reach of runs continued from the previous level, so each splitting stage keeps about keep_fraction
+    of its runs.
+
+    Parameters:
+        threshold : int. Reach (number of agents) defining the tail event.
+        num_particles : int. Runs per pilot stage.
+        keep_fraction : float. Target fraction of runs crossing each level.
+        max_levels : int. Maximum number of intermediate levels.
+        news, hypothesis, percent_fc, variant_flag, real_news_delay, config : As in multilevel_splitting().
+        seed : int, SeedSequence or None. Seed of the pilot.
+
+    Returns:
+        list : Increasing levels ending with threshold.
+    """
+    news_code = NEWS_TYPES.index(news)
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    network_seeds, run_seeds, resample_seed = root.spawn(3)
+    resample_rng = np.random.default_rng(resample_seed)
+
+    def new_rng() -> np.random.Generator:
+        return np.random.default_rng(run_seeds.spawn(1)[0])
+
+    particles = _initial_particles(num_particles, network_seeds, new_rng, hypothesis, percent_fc, variant_flag,
+                                   real_news_delay, config)
+    levels = []
+    while particles and len(levels) < max_levels:
+        parents = resample_rng.integers(len(particles), size=num_particles).tolist()
+        finals = []
+        for index in parents:
+            trial = particles[index].fork(new_rng())
+            trial.run()
+            finals.append(trial.reach[news_code])
+        level = max(int(np.quantile(finals, 1 - keep_fraction)), levels[-1] + 1 if levels else 1)
+        if level >= threshold:
+            break
+        levels.append(level)
+        forks = [particles[index].fork(new_rng()) for index in parents]
+        particles = [state for state in forks if _advance_until(state, news_code, level)]
+    return levels + [threshold]
+
+
+def multilevel_splitting(threshold: int, levels: List[int] | None = None, num_particles: int = 100,
+                         news: str = 'fake', hypothesis: str | None = None, percent_fc: float | None = None,
+                         variant_flag: Dict[str, bool] | None = None, real_news_delay: int = 0,
+                         seed: int | np.random.SeedSequence | None = None,
+                         config: SimulationConfig = DEFAULT_CONFIG) -> Dict[str, Any]:
+    """
+    Computes one fixed-effort multilevel splitting estimate of P(final reach of news >= threshold).
+
+    Parameters:
+        threshold : int. Reach (number of agents) defining the tail event.
+        levels : list or None. Increasing intermediate levels (default_levels(threshold, config=config) if None).
+        num_particles : int. Runs per stage.
+        news : str. 'fake' or 'real'.
+        hypothesis : str or None. Hypothesis label ('h2', 'h3') for variant configuration.
+        percent_fc : float or None. Proportion of skeptical agents designated as fact-checkers (config value if None).
+        variant_flag : dict or None. Flags enabling variant features (config flags if None).
+        real_news_delay : int. Number of rounds to delay the real news release (used in Hypothesis 3).
+        seed : int, SeedSequence or None. Seed of the networks and of every run's random stream.
+        config : SimulationConfig. Parameters of every run.
+
+    Returns:
+        dict : 'probability' (estimate), 'levels', 'level_probabilities' (stage fractions),
+            'networks' (networks generated) and 'rounds' (simulated rounds, a cost measure).
+    """
+    levels = [level for level in (levels or default_levels(threshold, config=config)) if level < threshold] + [threshold]
+    news_code = NEWS_TYPES.index(news)
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    network_seeds, run_seeds, resample_seed = root.spawn(3)
+    resample_rng = np.random.default_rng(resample_seed)
+
+    def new_rng() -> np.random.Generator:
+        return np.random.default_rng(run_seeds.spawn(1)[0])
+
+    particles = _initial_particles(num_particles, network_seeds, new_rng, hypothesis, percent_fc, variant_flag,
+                                   real_news_delay, config)
+
+    level_probabilities = []
+    rounds = 0
+    for stage, level in enumerate(levels):
+        if stage > 0:
+            parents = resample_rng.integers(len(particles), size=num_particles)
+            particles = [particles[index].fork(new_rng()) for index in parents.tolist()]
+        start_rounds = sum(state.round_num for state in particles)
+        crossed = [_advance_until(state, news_code, level) for state in particles]
+        rounds += sum(state.round_num for state in particles) - start_rounds
+        particles = [state for state, ok in zip(particles, crossed) if ok]
+        level_probabilities.append(len(particles) / num_particles)
+        if not particles:
+            break
+
+    return {
+        'probability': float(np.prod(level_probabilities)) if len(level_probabilities) == len(levels) else 0.0,
+        'levels': levels,
+        'level_probabilities': level_probabilities,
+        'networks': num_particles,
+        'rounds': rounds,
+    }
+
+
+def estimate_tail_probability(threshold: int, repetitions: int = 5, confidence: float = 0.95,
+                              levels: List[int] | None = None, pilot_particles: int = 50,
+                              seed: int | None = None, **kwargs) -> Dict[str, Any]:
+    """
+    Estimates P(final reach >= threshold) from independent repetitions of multilevel_splitting(),
+    using levels from pilot_levels() unless levels are given.
+
+    Parameters:
+        threshold : int. Reach (number of agents) defining the tail event.
+        repetitions : int. Independent splitting estimates (at least 2 for a confidence interval).
+        confidence : float. Confidence level of the interval (normal approximation).
+        levels : list or None. Intermediate levels (chosen by pilot_levels() if None).
+        pilot_particles : int. Runs per pilot stage when levels is None.
+        seed : int or None. Seed of the whole estimate.
+        **kwargs : Passed to multilevel_splitting() (num_particles, news, hypothesis, ...).
+
+    Returns:
+        dict : 'probability' (mean estimate), 'std_error', 'ci' (low, high), 'estimates' (one per
+            repetition), 'levels' and 'level_probabilities' (mean stage fractions).
+
+    Examples:
+        >>> result = estimate_tail_probability(60, repetitions=2, num_particles=10, levels=[30], seed=1)
+        >>> 0.0 <= result['ci'][0] <= result['probability'] <= result['ci'][1] <= 1.0
+        True
+        >>> len(result['estimates']), len(result['level_probabilities'])
+        (2, 2)
+    """
+    pilot_seed, *run_seeds = np.random.SeedSequence(seed).spawn(repetitions + 1)
+    if levels is None:
+        pilot_options = {key: value for key, value in kwargs.items() if key != 'num_particles'}
+        levels = pilot_levels(threshold, num_particles=pilot_particles, seed=pilot_seed, **pilot_options)
+    runs = [multilevel_splitting(threshold, levels=levels, seed=child, **kwargs) for child in run_seeds]
+    estimates = np.array([run['probability'] for run in runs])
+    probability = float(estimates.mean())
+    std_error = float(estimates.std(ddof=1) / math.sqrt(repetitions)) if repetitions > 1 else math.nan
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    num_levels = len(runs[0]['levels'])
+    stage_fractions = np.array([run['level_probabilities'] + [0.0] * (num_levels - len(run['level_probabilities']))
+                                for run in runs])
+    return {
+        'probability': probability,
+        'std_error': std_error,
+        'ci': (max(0.0, probability - z * std_error), min(1.0, probability + z * std_error)),
+        'estimates': estimates.tolist(),
+        'levels': runs[0]['levels'],
+        'level_probabilities': stage_fractions.mean(axis=0).tolist(),
+    }
@@ -0,0 +1,341 @@
+'''
+reorder.py
+
+This module relabels the nodes of a network so that neighbors get nearby ids, which improves memory
+locality in the array engine. A round expands the adjacency rows of the sharing agents and then
+gathers per-agent state (belief, role flags, share probabilities) at every neighbor id. When
+neighbors have nearby ids, those gathers touch few cache lines and pages instead of being spread
+over the whole arrays. This matters once the arrays no longer fit in the CPU caches.
+
+create_social_network() numbers nodes in community blocks, so lattice neighbors are already close,
+but every Barabási–Albert edge joins two arbitrary ids. Graphs loaded from edge lists (see
+edge_list_loader.py) can be in any order at all.
+
+Orderings (ORDERINGS):
+- 'rcm': reverse Cuthill–McKee. A breadth-first numbering from a low-degree node in each component,
+  with the children of a node taken by increasing degree, then reversed. It minimizes the id span of
+  edges (bandwidth).
+- 'degree': decreasing degree. Hubs, which are reached most often, share a compact hot region.
+- 'community': community blocks, decreasing degree within each block.
+- 'random': a random permutation (the worst case, as a control).
+
+The runners do not reorder. On the generated networks (300k agents, one core), no ordering beat the
+generator's ids: random and rcm were within noise, and degree and community were 25-30% slower per contact.
+Reordering also changes seeded results, because seeds and other draws are taken by id. This module is an
+opt-in utility for measuring orderings (see benchmark()) and for relabeling graphs loaded in arbitrary order.
+
+A Reordering keeps the permutation both ways. It permutes the graph (edge ids and per-edge trust are
+kept), the agent arrays and any per-node array. It maps node ids in results back to the original
+ids: traces, lineages and per-node arrays. Aggregate results (reach per round, share and belief
+counts) do not depend on ids.
+
+It includes:
+- rcm_order(), degree_order(), community_order(), random_order() and ORDERINGS
+- Reordering: permutation with graph / agent / per-node permutes and their inverses
+- mean_edge_span(): average id distance of the edges (locality measure)
+- benchmark(): engine and neighbor-scan timings of every ordering on a large network
+
+Command line usage:
+    python reorder.py --agents 300000 --runs 3
+'''
+
+import argparse
+import sys
+import time
+from typing import Callable, Dict, List, Sequence
+import numpy as np
+
+from graph_arrays import GraphArrays, AgentArrays
+from event_trace import TraceRecorder
+from lineage import CascadeLineage
+
+
+def rcm_order(graph: GraphArrays) -> np.ndarray:
+    """
+    Returns the reverse Cuthill–McKee order of the nodes (new position -> original id). Each
+    component is numbered breadth-first from its lowest-degree node. The nodes discovered from one
+    parent are taken by increasing degree, and each level is computed in one vectorized pass.
+    Isolated nodes are placed last before the reversal.
+
+    Examples:
+        >>> import networkx as nx
+        >>> rng = np.random.default_rng(0)
+        >>> path = GraphArrays.from_networkx(nx.relabel_nodes(nx.path_graph(8), dict(enumerate(rng.permutation(8).tolist()))))
+        >>> order = rcm_order(path)
+        >>> sorted(order.tolist()) == list(range(8)) and mean_edge_span(Reordering(order).permute_graph(path))
+        1.0
+    """
+    n = graph.num_nodes
+    degree = graph.degrees()
+    visited = np.zeros(n, dtype=bool)
+    order = np.empty(n, dtype=np.int64)
+    filled = 0
+    isolated = np.flatnonzero(degree == 0)
+    visited[isolated] = True
+    by_degree = np.argsort(degree, kind='stable')
+    cursor = 0
+    while filled < n - len(isolated):
+        while visited[by_degree[cursor]]:
+            cursor += 1
+        frontier = by_degree[cursor:cursor + 1]
+        visited[frontier] = True
+        while len(frontier):
+            order[filled:filled + len(frontier)] = frontier
+            filled += len(frontier)
+            owner, slots = graph.expand_slots(frontier)
+            neighbors = graph.indices[slots]
+            fresh = ~visited[neighbors]
+            owner, neighbors = owner[fresh], neighbors[fresh]
+            # children of earlier parents first, then by increasing degree; a node goes to its first parent
+            ranked = np.lexsort((neighbors, degree[neighbors], owner))
+            _, first = np.unique(neighbors[ranked], return_index=True)
+            frontier = neighbors[ranked[np.sort(first)]]
+            visited[frontier] = True
+    order[filled:] = isolated
+    return order[::-1].copy()
+
+
+def degree_order(graph: GraphArrays) -> np.ndarray:
+    """
+    Returns the nodes by decreasing degree (ties by id).
+
+    Examples:
+        >>> import networkx as nx
+        >>> degree_order(GraphArrays.from_networkx(nx.star_graph(3))).tolist()
+        [0, 1, 2, 3]
+    """
+    return np.argsort(-graph.degrees(), kind='stable')
+
+
+def community_order(graph: GraphArrays) -> np.ndarray:
+    """
+    Returns the nodes grouped by community label (unlabelled nodes, -1, first), by decreasing degree
+    within each community. Falls back to degree_order() without community labels.
+
+    Examples:
+        >>> import networkx as nx
+        >>> graph = GraphArrays.from_networkx(nx.path_graph(4))
+        >>> graph.set_community(np.array([1, 0, 1, 0]))
+        >>> community_order(graph).tolist()
+        [1, 3, 2, 0]
+    """
+    if graph.community is None:
+        return degree_order(graph)
+    return np.lexsort((np.arange(graph.num_nodes), -graph.degrees(), graph.community))
+
+
+def random_order(graph: GraphArrays, seed: int = 0) -> np.ndarray:
+    """Returns a random permutation of the nodes (a control with no locality)."""
+    return np.random.default_rng(seed).permutation(graph.num_nodes)
+
+
+ORDERINGS: Dict[str, Callable[[GraphArrays], np.ndarray]] = {
+    'rcm': rcm_order,
+    'degree': degree_order,
+    'community': community_order,
+    'random': random_order,
+}
+
+
+class Reordering:
+    """
+    Relabelling of the nodes of a network: node order[i] becomes node i.
+
+    Attributes:
+        order : np.ndarray. Original id of every new id.
+        rank : np.ndarray. New id of every original id (the inverse of order).
+
+    Examples:
+        >>> import networkx as nx
+        >>> from agent_initializer import assign_roles_bulk
+        >>> graph = GraphArrays.from_networkx(nx.path_graph(4))
+        >>> graph.set_edge_trust(np.array([0.1, 0.2, 0.3]))
+        >>> reordering = Reordering(np.array([2, 0, 3, 1]))
+        >>> permuted = reordering.permute_graph(graph)
+        >>> reordering.to_original(permuted.indices[permuted.indptr[0]:permuted.indptr[1]]).tolist()
+        [3, 1]
+        >>> permuted.slot_trust[permuted.indptr[0]:permuted.indptr[1]].tolist()
+        [0.3, 0.2]
+        >>> roles = assign_roles_bulk(graph.degrees(), np.random.default_rng(0))
+        >>> moved = reordering.permute_agents(roles)
+        >>> bool(np.array_equal(reordering.restore_nodes(moved.p_share_fake), roles.p_share_fake))
+        True
+        >>> trace = TraceRecorder()
+        >>> trace.record(0, -1, 0, 'fake', 0); trace.metadata['influencers'] = [0, 1]
+        >>> reordering.restore_trace(trace)
+        >>> trace.records['source'].tolist(), trace.records['target'].tolist(), trace.metadata['influencers']
+        ([-1], [2], [0, 2])
+    """
+    def __init__(self, order: np.ndarray):
+        self.order = np.asarray(order, dtype=np.int64)
+        self.rank = np.empty_like(self.order)
+        self.rank[self.order] = np.arange(len(self.order))
+
+    @classmethod
+    def compute(cls, graph: GraphArrays, method: str) -> 'Reordering':
+        """Returns the Reordering of graph by one of ORDERINGS."""
+        if method not in ORDERINGS:
+            raise ValueError(f"Unknown ordering '{method}' (expected one of {sorted(ORDERINGS)})")
+        return cls(ORDERINGS[method](graph))
+
+    def to_original(self, ids: np.ndarray) -> np.ndarray:
+        """Maps new node ids to original ids (negative ids, meaning 'none', are kept)."""
+        ids = np.asarray(ids)
+        return np.where(ids >= 0, self.order[np.maximum(ids, 0)], ids).astype(ids.dtype)
+
+    def to_new(self, ids: np.ndarray) -> np.ndarray:
+        """Maps original node ids to new ids."""
+        return self.rank[ids]
+
+    def permute_nodes(self, values: np.ndarray) -> np.ndarray:
+        """Reorders a per-node array (last axis) from original to new ids."""
+        return np.asarray(values)[..., self.order]
+
+    def restore_nodes(self, values: np.ndarray) -> np.ndarray:
+        """Reorders a per-node array (last axis) from new back to original ids."""
+        return np.asarray(values)[..., self.rank]
+
+    def permute_graph(self, graph: GraphArrays) -> GraphArrays:
+        """
+        Returns graph (which needs its edge list) with relabelled nodes. Edge ids are unchanged, so
+        per-edge trust carries over.
+        """
+        community = self.permute_nodes(graph.community) if graph.community is not None else None
+        permuted = GraphArrays(graph.num_nodes, self.rank[graph.edge_u], self.rank[graph.edge_v], community=community)
+        if graph.edge_trust is not None:
+            permuted.set_edge_trust(graph.edge_trust)
+        return permuted
+
+    def permute_agents(self, roles: AgentArrays) -> AgentArrays:
+        """Returns the agent arrays indexed by new ids."""
+        return AgentArrays.from_dict({name: self.permute_nodes(values) for name, values in roles.as_dict().items()})
+
+    def restore_trace(self, trace: TraceRecorder) -> None:
+        """Rewrites the agent ids of a trace recorded on the permuted graph (events and influencer list) to original ids, in place."""
+        records = trace.records
+        for name in ('source', 'target'):
+            records[name] = self.to_original(records[name])
+        if 'influencers' in trace.metadata:
+            trace.metadata['influencers'] = sorted(self.order[trace.metadata['influencers']].tolist())
+
+    def restore_lineage(self, lineage: CascadeLineage) -> None:
+        """Rewrites a lineage recorded on the permuted graph to original ids, in place."""
+        lineage.parent = self.to_original(self.restore_nodes(lineage.parent))
+        lineage.root = self.to_original(self.restore_nodes(lineage.root))
+        lineage.origin = self.restore_nodes(lineage.origin)
+        lineage.depth = self.restore_nodes(lineage.depth)
+
+
+def mean_edge_span(graph: GraphArrays) -> float:
+    """
+    Returns the mean id distance |u - v| over the edges: a machine-independent measure of how far
+    apart in memory the state of neighbors lies.
+
+    Examples:
+        >>> import networkx as nx
+        >>> mean_edge_span(GraphArrays.from_networkx(nx.path_graph(5)))
+        1.0
+    """
+    return float(np.abs(graph.edge_u.astype(np.int64) - graph.edge_v).mean()) if graph.num_edges else 0.0
+
+
+def _scan_seconds(graph: GraphArrays, roles: AgentArrays, batches: List[np.ndarray]) -> float:
+    # time of the engine's access pattern: expand rows, then gather neighbor state
+    start = time.perf_counter()
+    for sources in batches:
+        owner, neighbors, trust = graph.expand(sources)
+        (roles.p_share_fake[sources][owner] * trust * roles.is_fact_checker[neighbors]).sum()
+    return time.perf_counter() - start
+
+
+def benchmark(num_agents: int = 300000, methods: Sequence[str] = ('none', 'random', 'rcm', 'degree', 'community'),
+              num_runs: int = 3, scan_batches: int = 200, seed: int = 0, stream=None) -> Dict[str, Dict[str, float]]:
+    """
+    Times the array engine and its neighbor-scan access pattern on one large network under each
+    ordering. 'none' keeps the generator's ids, and the other methods relabel that network. Every
+    ordering runs the same network, roles and trust, and the same random source batches mapped to
+    new ids. Engine runs seed 1% of the agents so that cascades cover a large part of the network.
+    The runs use the same seeds, but seeds are drawn by id, so each ordering simulates different
+    cascades. Engine time is therefore also reported per contact, that is per (sharer, neighbor)
+    pair expanded.
+
+    Parameters:
+        num_agents : int. Network size (an ImplicitSocialGraph materialized as GraphArrays, 300 nodes per community).
+        methods : sequence of str. 'none' and names of ORDERINGS.
+        num_runs : int. Engine runs timed per ordering.
+        scan_batches : int. Neighbor-scan batches (of 1% of the nodes each) timed per ordering.
+        seed : int. Seed of the network, roles, batches and runs.
+        stream : file or None. Where progress lines are printed (sys.stdout if None).
+
+    Returns:
+        dict : Per method: 'span' (mean_edge_span), 'order_seconds' (time to compute the ordering),
+            'scan_seconds', 'run_seconds' (mean engine seconds per run) and 'ns_per_contact'.
+
+    Examples:
+        >>> import io
+        >>> results = benchmark(3000, methods=('none', 'random', 'rcm'), num_runs=1, scan_batches=5, stream=io.StringIO())
+        >>> results['rcm']['span'] < results['random']['span'] and results['rcm']['ns_per_contact'] > 0
+        True
+    """
+    from implicit_graph import ImplicitSocialGraph
+    from agent_initializer import assign_roles_bulk
+    from simulation import initialize_p_shares_bulk
+    from engine import CascadeState, transmission_table
+    from config import DEFAULT_CONFIG
+
+    stream = sys.stdout if stream is None else stream
+    rng = np.random.default_rng(seed)
+    config = DEFAULT_CONFIG.replace(seed_count=max(DEFAULT_CONFIG.seed_count, num_agents // 100))
+    base = ImplicitSocialGraph(num_agents, max(1, num_agents // 300), seed=seed).to_graph_arrays()
+    roles = assign_roles_bulk(base.degrees(), rng)
+    initialize_p_shares_bulk(roles, rng)
+    batches = [rng.choice(num_agents, size=max(1, num_agents // 100), replace=False) for _ in range(scan_batches)]
+
+    results = {}
+    for method in methods:
+        start = time.perf_counter()
+        reordering = Reordering(np.arange(num_agents)) if method == 'none' else Reordering.compute(base, method)
+        graph = base if method == 'none' else reordering.permute_graph(base)
+        order_seconds = time.perf_counter() - start
+        agents = reordering.permute_agents(roles)
+        scan = _scan_seconds(graph, agents, [np.sort(reordering.to_new(sources)) for sources in batches])
+        transmission = transmission_table(graph, agents, config)
+        degrees = graph.degrees()
+        contacts = 0
+        warm_up = CascadeState(graph, agents, np.random.default_rng(seed), transmission=transmission, config=config)
+        warm_up.seed_news()
+        warm_up.run()
+        start = time.perf_counter()
+        for run in range(num_runs):
+            state = CascadeState(graph, agents, np.random.default_rng([seed, run]), transmission=transmission,
+                                 config=config)
+            state.seed_news()
+            state.run()
+            contacts += int((state.has_shared * degrees).sum())
+        seconds = time.perf_counter() - start
+        results[method] = {'span': mean_edge_span(graph), 'order_seconds': order_seconds, 'scan_seconds': scan,
+                           'run_seconds': seconds / num_runs, 'ns_per_contact': 1e9 * seconds / max(1, contacts)}
+        print(f"{method:>10}: edge span {results[method]['span']:10.1f}  ordering {order_seconds:6.2f} s  "
+              f"scan {scan:6.2f} s  engine {results[method]['run_seconds']:6.2f} s/run "
+              f"({results[method]['ns_per_contact']:.0f} ns/contact)", file=stream)
+    return results
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark node orderings for the array engine.")
+    parser.add_argument('--agents', type=int, default=300000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--batches', type=int, default=200)
+    parser.add_argument('--methods', nargs='+', default=['none', 'random', 'rcm', 'degree', 'community'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    results = benchmark(args.agents, args.methods, args.runs, args.batches, args.seed)
+    if 'none' in results:
+        for method, result in results.items():
+            print(f"{method:>10}: speedup vs generator order: scan "
+                  f"{results['none']['scan_seconds'] / result['scan_seconds']:.2f}x, engine per contact "
+                  f"{results['none']['ns_per_contact'] / result['ns_per_contact']:.2f}x")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,338 @@
+'''
+result_cache.py
+
+This module memoizes experiment results on local disk, so that re-running main.py after changing one
+experiment only re-executes that experiment.
+
+A result is stored under a content hash of everything that determines it:
+- the experiment function (module and name),
+- its full effective arguments after defaults are applied: the SimulationConfig field by field
+  (config values and variant flags), percent_fc, real_news_delay, num_runs, the base seed, ...,
+- the simulation code version: a hash of the source files of CODE_MODULES, the experiment modules and
+  every project module they import.
+
+Changing any config value, argument or simulation source file therefore gives a new key, and stale
+entries are never returned; they simply stop being used and are eventually evicted. An unseeded call
+(seed=None) draws fresh runs every time, so it always runs and is never stored.
+
+Entries are pickle files in <directory>/<function name>/<key>.pkl. A cache hit refreshes the file's
+modification time, and when the total size exceeds max_bytes the least recently used entries are
+deleted first.
+
+It includes:
+- project_modules(): the project modules an experiment depends on
+- code_version(): hash of their source files
+- ResultCache: call(), wrap(), get(), put(), key(), invalidate(), evict(), size()
+
+Command line usage:
+    python result_cache.py info
+    python result_cache.py clear [--function run_hypothesis3]
+'''
+
+import argparse
+import ast
+import dataclasses
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import tempfile
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+
+DEFAULT_CACHE_DIR = '.result_cache'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Modules of the cached experiments; the code version hashes them and every project module they import
+# (found by project_modules(), so new engines are covered without editing this list)
+ENTRY_MODULES = ('baseline_run', 'hypothesis1', 'hypothesis2', 'hypothesis3')
+
+
+def project_modules(entries: Tuple[str, ...] = ENTRY_MODULES) -> Tuple[str, ...]:
+    """
+    Returns entries and every project module they import, directly or not, including imports inside
+    functions. Standard library and third-party imports are skipped.
+
+    Examples:
+        >>> modules = project_modules(('baseline_run',))
+        >>> {'baseline_run', 'config', 'engine', 'simulation'} <= set(modules) and 'numpy' not in modules
+        True
+    """
+    base = os.path.dirname(os.path.abspath(__file__))
+    found = set()
+    pending = list(entries)
+    while pending:
+        name = pending.pop()
+        path = os.path.join(base, name + '.py')
+        if name in found or not os.path.exists(path):
+            continue
+        found.add(name)
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                pending.append(node.module.split('.')[0])
+    return tuple(sorted(found))
+
+
+CODE_MODULES = project_modules()
+
+# Arguments with side effects (or that may stop a run early): a call that sets any of them always runs
+# and is never stored. Fields of dataclass arguments (e.g. baseline_run.RunOptions) count as arguments.
+SIDE_EFFECT_ARGUMENTS = ('trace_dir', 'cancel')
+
+# Arguments that do not change the result (display and scheduling only): left out of the key, at the top
+# level and as fields of dataclass arguments
+IGNORED_ARGUMENTS = ('processes', 'progress', 'memory_budget')
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(modules: Tuple[str, ...] = CODE_MODULES) -> str:
+    """
+    Returns a hash of the source files of the given project modules.
+
+    Examples:
+        >>> len(code_version()) == 16 and code_version() != code_version(('config',))
+        True
+    """
+    base = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in modules:
+        with open(os.path.join(base, name + '.py'), 'rb') as f:
+            digest.update(name.encode() + b'\0' + f.read() + b'\0')
+    return digest.hexdigest()[:16]
+
+
+def _canonical(value: Any) -> Any:
+    # reduces an argument to nested tuples of plain values with a stable repr
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return (type(value).__name__,) + tuple((field.name, _canonical(getattr(value, field.name)))
+                                               for field in dataclasses.fields(value)
+                                               if field.name not in IGNORED_ARGUMENTS)
+    if isinstance(value, dict):
+        return ('dict',) + tuple(sorted((repr(_canonical(key)), _canonical(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_canonical(item) for item in value)
+    if isinstance(value, np.ndarray):
+        return ('ndarray', str(value.dtype), value.shape, value.tobytes())
+    raise TypeError(f"cannot derive a cache key from {type(value).__name__} argument {value!r}")
+
+
+def _is_unseeded(function: Callable, arguments: Dict[str, Any]) -> bool:
+    # whether the call takes a seed and leaves it unset (explicitly or through the default)
+    parameter = inspect.signature(function).parameters.get('seed')
+    if parameter is None:
+        return False
+    return arguments.get('seed', parameter.default) is None
+
+
+def _sets_side_effect(arguments: Dict[str, Any]) -> bool:
+    # whether a side-effect argument is set, directly or as a field of a dataclass argument
+    for value in arguments.values():
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            if any(getattr(value, name, None) is not None for name in SIDE_EFFECT_ARGUMENTS):
+                return True
+    return any(arguments.get(name) is not None for name in SIDE_EFFECT_ARGUMENTS)
+
+
+class ResultCache:
+    """
+    Disk cache of experiment results keyed by function, effective arguments and code version.
+
+    Attributes:
+        directory : str. Root directory of the entries.
+        max_bytes : int. Size limit; least recently used entries are evicted above it.
+        version : str. Code version folded into every key.
+        hits, misses : int. Number of cached and computed calls.
+
+    Examples:
+        >>> from baseline_run import run_baseline_simulation, RunOptions
+        >>> from config import DEFAULT_CONFIG
+        >>> cache = ResultCache(tempfile.mkdtemp())
+        >>> run = cache.wrap(run_baseline_simulation)
+        >>> first = run(2, seed=3)
+        >>> run(num_runs=2, seed=3) == first, (cache.hits, cache.misses)
+        (True, (1, 1))
+        >>> _ = run(2, seed=3, config=DEFAULT_CONFIG.replace(p_fact_check=0.5))
+        >>> _ = run(2, seed=3, percent_fc=0.5)
+        >>> cache.hits, cache.misses
+        (1, 3)
+        >>> _ = run(2, seed=3, options=RunOptions(processes=2, progress='cached'))
+        >>> cache.hits, cache.misses
+        (2, 3)
+        >>> import threading
+        >>> _ = run(2, seed=3, options=RunOptions(cancel=threading.Event()))  # may stop early: never stored
+        >>> cache.hits, cache.misses
+        (2, 3)
+        >>> _ = run(2)  # unseeded: a fresh sample every call, never stored
+        >>> cache.hits, cache.misses
+        (2, 3)
+        >>> cache.invalidate(run_baseline_simulation, 2, seed=3), cache.invalidate()
+        (1, 2)
+    """
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 version: str | None = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = code_version() if version is None else version
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, function: Callable, *args, **kwargs) -> str:
+        """Returns the content hash of a call of function with the given arguments."""
+        bound = inspect.signature(function).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple((name, _canonical(value)) for name, value in bound.arguments.items()
+                          if name not in IGNORED_ARGUMENTS)
+        content = repr((function.__module__, function.__qualname__, arguments, self.version))
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _path(self, function: Callable, key: str) -> str:
+        return os.path.join(self.directory, function.__name__, key + '.pkl')
+
+    def get(self, function: Callable, *args, **kwargs) -> Tuple[bool, Any]:
+        """
+        Looks up the stored result of a call without running it.
+
+        Returns:
+            found : bool. Whether the call was stored.
+            result : Any. The stored result (None if not found).
+        """
+        path = self._path(function, self.key(function, *args, **kwargs))
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False, None
+        os.utime(path)  # mark as recently used
+        return True, result
+
+    def put(self, result: Any, function: Callable, *args, **kwargs) -> None:
+        """Stores result as the outcome of function(*args, **kwargs), then evicts if needed."""
+        path = self._path(function, self.key(function, *args, **kwargs))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(handle, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)  # readers never see a partial entry
+        self.evict()
+
+    def call(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Returns function(*args, **kwargs), from the cache if this call was stored before.
+        Unseeded calls and calls setting a side-effect argument (SIDE_EFFECT_ARGUMENTS) always run and
+        are not stored.
+        """
+        bound = inspect.signature(function).bind(*args, **kwargs)
+        if _is_unseeded(function, bound.arguments) or _sets_side_effect(bound.arguments):
+            return function(*args, **kwargs)
+        found, result = self.get(function, *args, **kwargs)
+        if found:
+            self.hits += 1
+            return result
+        result = function(*args, **kwargs)
+        self.misses += 1
+        self.put(result, function, *args, **kwargs)
+        return result
+
+    def wrap(self, function: Callable) -> Callable:
+        """Returns a version of function whose calls go through call()."""
+        @functools.wraps(function)
+        def cached(*args, **kwargs):
+            return self.call(function, *args, **kwargs)
+        return cached
+
+    def _entries(self, function_name: str | None = None) -> List[Tuple[float, int, str]]:
+        # (last use, size, path) of the stored entries, oldest first
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        names = [function_name] if function_name else os.listdir(self.directory)
+        for name in names:
+            folder = os.path.join(self.directory, name)
+            if not os.path.isdir(folder):
+                continue
+            for file_name in os.listdir(folder):
+                if file_name.endswith('.pkl'):
+                    path = os.path.join(folder, file_name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def size(self) -> int:
+        """Returns the total size in bytes of the stored entries."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_bytes: int | None = None) -> int:
+        """
+        Deletes least recently used entries until the cache fits in max_bytes (self.max_bytes if None).
+
+        Returns:
+            int : Number of deleted entries.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def invalidate(self, function: Callable | str | None = None, *args, **kwargs) -> int:
+        """
+        Deletes stored results: every entry if function is None, every entry of function if no
+        arguments are given, otherwise only the entry of that exact call.
+
+        Returns:
+            int : Number of deleted entries.
+        """
+        if function is not None and (args or kwargs):
+            path = self._path(function, self.key(function, *args, **kwargs))
+            if not os.path.exists(path):
+                return 0
+            os.remove(path)
+            return 1
+        name = function if isinstance(function, str) or function is None else function.__name__
+        entries = self._entries(name)
+        for _, _, path in entries:
+            os.remove(path)
+        return len(entries)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect or clear the experiment result cache.")
+    parser.add_argument('--directory', default=DEFAULT_CACHE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('info', help="print the number and size of stored entries per function")
+    clear = commands.add_parser('clear', help="delete stored entries")
+    clear.add_argument('--function', help="only delete the entries of this function (e.g. run_hypothesis3)")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.directory)
+    if args.command == 'info':
+        counts: Dict[str, List[int]] = {}
+        for _, size, path in cache._entries():
+            entry = counts.setdefault(os.path.basename(os.path.dirname(path)), [0, 0])
+            entry[0] += 1
+            entry[1] += size
+        for name, (count, size) in sorted(counts.items()):
+            print(f"{name}: {count} entries, {size / 1024 ** 2:.1f} MiB")
+        print(f"code version {cache.version}, total {cache.size() / 1024 ** 2:.1f} MiB")
+    else:
+        print(f"deleted {cache.invalidate(args.function)} entries")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,136 @@
+'''
+rng_context.py
+
+This module defines the per-run random number context used by every stage of a simulation run
+(network generation, role and trust assignment, share probabilities and spread), so that a run is
+fully determined by its seed and does not touch the global random or np.random state.
+
+RunRNG is a numpy Generator (all vectorized draws such as uniform(), integers(), permutation()
+or choice() work unchanged) extended with:
+- next_uniform(): scalar uniforms for hot loops, served from prefilled blocks of
+  Generator.random() output instead of one Generator call per draw
+- sample() / randint() / shuffle() on Python lists, mirroring the random module calls they replace
+- seed_int(): integer seeds for libraries with their own generator (networkx)
+- for_run(): the stream of one run of a seeded experiment
+as_run_rng() lets functions taking a RunRNG also accept None or a plain numpy Generator.
+'''
+
+import copy
+import functools
+import itertools
+from typing import Any, List, Sequence
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 8192
+
+
+class RunRNG(np.random.Generator):
+    """
+    Per-run random stream backed by a PCG64 numpy Generator.
+
+    Attributes:
+        seed_sequence : np.random.SeedSequence or None. Seed of the stream (that of the wrapped bit generator, if any).
+        block_size : int. Number of uniforms prefilled at a time for next_uniform().
+        next_uniform : callable. Returns the next uniform float in [0, 1) from the prefilled block.
+
+    Examples:
+        >>> a, b = RunRNG(5), RunRNG(5)
+        >>> [a.next_uniform() for _ in range(3)] == [b.next_uniform() for _ in range(3)]
+        True
+        >>> a.sample(['x', 'y', 'z'], 2) == b.sample(['x', 'y', 'z'], 2)
+        True
+        >>> items = [1, 2, 3, 4]; a.shuffle(items); sorted(items)
+        [1, 2, 3, 4]
+        >>> 3 <= a.randint(3, 4) <= 4
+        True
+    """
+    def __init__(self, seed: int | np.random.SeedSequence | np.random.BitGenerator | None = None,
+                 block_size: int = DEFAULT_BLOCK_SIZE):
+        if isinstance(seed, np.random.BitGenerator):
+            bit_generator = seed  # share the stream of an existing generator
+            self.seed_sequence = bit_generator.seed_seq
+        else:
+            self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+            bit_generator = np.random.PCG64(self.seed_sequence)
+        super().__init__(bit_generator)
+        self.block_size = block_size
+        self._prime([])
+
+    def _prime(self, buffered: List[float]) -> None:
+        # blocks are handed to the chain as list iterators, so self._block is the one being consumed
+        # and __reduce__ can copy the values that are still buffered
+        def next_block():
+            self._block = iter(self.random(self.block_size).tolist())
+            return self._block
+        self._block = iter(buffered)
+        blocks = itertools.chain([self._block], iter(next_block, None))
+        self.next_uniform = functools.partial(next, itertools.chain.from_iterable(blocks))
+
+    def __reduce__(self):
+        """
+        Pickles the stream with its bit generator state and the uniforms still buffered by next_uniform().
+
+        Examples:
+            >>> import pickle
+            >>> rng = RunRNG(3); _ = rng.next_uniform()
+            >>> clone = pickle.loads(pickle.dumps(rng))
+            >>> type(clone).__name__, clone.next_uniform() == rng.next_uniform()
+            ('RunRNG', True)
+            >>> float(clone.random()) == float(rng.random())
+            True
+        """
+        return _restore_run_rng, (self.bit_generator, self.block_size, list(copy.copy(self._block)))
+
+    @classmethod
+    def for_run(cls, seed: int, run_index: int, block_size: int = DEFAULT_BLOCK_SIZE) -> 'RunRNG':
+        """
+        Returns the stream of run run_index of an experiment seeded with seed. It derives from
+        SeedSequence(seed, spawn_key=(run_index,)) and is independent of the other runs' streams.
+
+        Examples:
+            >>> int(RunRNG.for_run(42, 7).integers(1000)) == int(RunRNG.for_run(42, 7).integers(1000))
+            True
+        """
+        return cls(np.random.SeedSequence(seed, spawn_key=(run_index,)), block_size=block_size)
+
+    def sample(self, population: Sequence[Any], k: int) -> List[Any]:
+        """Draws k distinct elements of population (replaces random.sample)."""
+        population = list(population)
+        return [population[i] for i in self.choice(len(population), k, replace=False).tolist()]
+
+    def randint(self, low: int, high: int) -> int:
+        """Draws an integer in [low, high], both included (replaces random.randint)."""
+        return int(self.integers(low, high + 1))
+
+    def seed_int(self) -> int:
+        """Draws a non-negative integer seed for a library that needs its own generator."""
+        return int(self.integers(2 ** 63))
+
+
+def _restore_run_rng(bit_generator: np.random.BitGenerator, block_size: int, buffered: List[float]) -> RunRNG:
+    rng = RunRNG(bit_generator, block_size=block_size)
+    rng._prime(buffered)
+    return rng
+
+
+def as_run_rng(rng: RunRNG | np.random.Generator | None) -> RunRNG:
+    """
+    Returns rng as a RunRNG: rng itself, a fresh unseeded RunRNG if rng is None, or, for a plain numpy
+    Generator, a RunRNG drawing from the same bit generator (the Generator's stream advances with it).
+
+    Examples:
+        >>> rng = as_run_rng(np.random.default_rng(1))
+        >>> isinstance(rng, RunRNG), 0 <= rng.next_uniform() < 1
+        (True, True)
+        >>> as_run_rng(1)
+        Traceback (most recent call last):
+        ...
+        TypeError: rng must be a RunRNG, a numpy Generator or None, not int
+    """
+    if rng is None:
+        return RunRNG()
+    if isinstance(rng, RunRNG):
+        return rng
+    if isinstance(rng, np.random.Generator):
+        return RunRNG(rng.bit_generator)
+    raise TypeError(f"rng must be a RunRNG, a numpy Generator or None, not {type(rng).__name__}")
@@ -0,0 +1,516 @@
+'''
+sharding.py
+
+This module splits the runs of an experiment into deterministic seed-range shards that any number of
+independent worker processes can execute. The coordinator keeps the experiment in a SQLite job queue on
+its local disk (SQLite locking is not reliable over network filesystems). Workers on the same host can
+claim shards from that queue directly; workers on several hosts share a queue directory on shared
+storage (NFS, SMB, ...) instead, which the coordinator publishes from the SQLite queue and collects back.
+
+An experiment is one of the project's run families:
+- 'baseline': run_baseline_simulation() with default parameters
+- 'h1': one point per fact-checker percentage (Hypothesis 1)
+- 'h2': one point per influencer variant in hypothesis2.H2_VARIANTS (Hypothesis 2)
+- 'h3': one point per real news delay (Hypothesis 3)
+
+Every point runs num_runs seeded runs; a shard covers the run range [first_run, first_run + num_runs)
+of one point. Run i of every point is seeded with baseline_run.seed_run(seed, i), so the points share
+common random numbers and the merged result of a sharded experiment is identical to a single-process
+run_baseline_simulation(num_runs, seed=seed, ...) call per point.
+
+Workers claim pending shards in a short write transaction; a shard whose worker has not reported
+within the lease time is handed out again. The merge step concatenates the shard outputs of every
+point in run order.
+
+The shared queue directory holds spec.json and one file per shard, moved between subdirectories:
+pending/<id>.json is claimed by an atomic os.rename() to claimed/<id>@<worker>.json (exactly one worker's
+rename succeeds, also on NFS), and a finished shard writes results/<id>.pkl through a temporary file
+and os.replace(). A claim older than the lease is renamed back to pending/ (this assumes the host clocks
+agree to well within the lease); a shard run twice writes the same seeded result.
+
+Command line usage:
+    python sharding.py create jobs.db h1 --num-runs 1000 --shard-size 50 --seed 7 --values 0.5 0.7 0.9
+    python sharding.py work jobs.db            (start as many of these as needed, on the coordinator host)
+    python sharding.py status jobs.db
+    python sharding.py merge jobs.db merged.pkl
+    python sharding.py local jobs.db --processes 8   (coordinator plus local workers on one box)
+
+    python sharding.py publish jobs.db /shared/queue    (on the coordinator)
+    python sharding.py work-shared /shared/queue        (on any number of hosts)
+    python sharding.py collect jobs.db /shared/queue    (on the coordinator, then merge as above)
+'''
+
+import argparse
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import tempfile
+import time
+import multiprocessing
+from typing import Any, Dict, List, Tuple
+
+from config import *
+from baseline_run import run_baseline_simulation, new_metrics, RunOptions
+from hypothesis2 import H2_VARIANTS
+
+DEFAULT_LEASE_SECONDS = 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiment (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    point INTEGER NOT NULL,
+    first_run INTEGER NOT NULL,
+    num_runs INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    claimed_at REAL,
+    result BLOB
+);
+CREATE INDEX IF NOT EXISTS shards_status ON shards (status);
+"""
+
+
+def experiment_points(kind: str, values: List[Any] | None = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Lists the (label, run_baseline_simulation keyword arguments) points of an experiment.
+
+    Parameters:
+        kind : str. 'baseline', 'h1', 'h2' or 'h3'.
+        values : list or None. Fact-checker percentages (h1), variant names (h2) or real news delays (h3);
+            defaults to the values used in main.py.
+
+    Returns:
+        list : List of (label, kwargs) pairs.
+
+    Examples:
+        >>> [label for label, _ in experiment_points('h1', [0.5, 0.7])]
+        ['fc_0.5', 'fc_0.7']
+        >>> experiment_points('h3')[0][1]
+        {'hypothesis': 'h3', 'real_news_delay': 3}
+    """
+    if kind == 'baseline':
+        return [('baseline', {'hypothesis': None})]
+    if kind == 'h1':
+        return [(f"fc_{fc_pct}", {'hypothesis': 'h1', 'percent_fc': float(fc_pct)})
+                for fc_pct in (values if values is not None else [0.5, 0.7, 0.9])]
+    if kind == 'h2':
+        return [(name, {'hypothesis': 'h2', 'variant_flag': H2_VARIANTS[name]})
+                for name in (values if values is not None else list(H2_VARIANTS))]
+    if kind == 'h3':
+        return [(f"delay_{delay}", {'hypothesis': 'h3', 'real_news_delay': int(delay)})
+                for delay in (values if values is not None else [3])]
+    raise ValueError(f"Unknown experiment kind '{kind}' (expected baseline, h1, h2 or h3)")
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(db_path, timeout=60.0, isolation_level=None)
+    connection.execute("PRAGMA busy_timeout = 60000")
+    return connection
+
+
+def create_experiment(db_path: str, kind: str, num_runs: int = 1000, shard_size: int = 50, seed: int = 0,
+                      values: List[Any] | None = None, engine: str = 'reference') -> int:
+    """
+    Creates the job queue of an experiment: one shard per shard_size runs of every point.
+
+    Parameters:
+        db_path : str. SQLite database file (created if missing; must not hold another experiment).
+        kind : str. Experiment kind (see experiment_points()).
+        num_runs : int. Number of runs per point.
+        shard_size : int. Number of runs per shard.
+        seed : int. Base seed of the experiment.
+        values : list or None. Point values (see experiment_points()).
+        engine : str. Engine passed to run_baseline_simulation().
+
+    Returns:
+        int : Number of shards created.
+    """
+    points = experiment_points(kind, values)
+    connection = _connect(db_path)
+    try:
+        connection.executescript(_SCHEMA)
+        connection.execute("BEGIN IMMEDIATE")
+        if connection.execute("SELECT COUNT(*) FROM experiment").fetchone()[0]:
+            connection.execute("ROLLBACK")
+            raise ValueError(f"{db_path} already holds an experiment")
+        spec = {'kind': kind, 'num_runs': num_runs, 'shard_size': shard_size, 'seed': seed, 'engine': engine,
+                'points': points}
+        connection.execute("INSERT INTO experiment VALUES ('spec', ?)", (json.dumps(spec),))
+        shards = [(point, first_run, min(shard_size, num_runs - first_run))
+                  for point in range(len(points)) for first_run in range(0, num_runs, shard_size)]
+        connection.executemany("INSERT INTO shards (point, first_run, num_runs) VALUES (?, ?, ?)", shards)
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+    return len(shards)
+
+
+def load_spec(db_path: str) -> Dict[str, Any]:
+    """Returns the experiment specification stored by create_experiment()."""
+    connection = _connect(db_path)
+    try:
+        return json.loads(connection.execute("SELECT value FROM experiment WHERE key = 'spec'").fetchone()[0])
+    finally:
+        connection.close()
+
+
+def claim_shard(db_path: str, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Tuple[int, int, int, int] | None:
+    """
+    Atomically claims a pending shard (or one whose lease expired).
+
+    Returns:
+        tuple or None : (shard id, point, first_run, num_runs), or None if no shard is available.
+    """
+    connection = _connect(db_path)
+    try:
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        row = connection.execute(
+            "SELECT id, point, first_run, num_runs FROM shards "
+            "WHERE status = 'pending' OR (status = 'running' AND claimed_at < ?) ORDER BY id LIMIT 1",
+            (now - lease_seconds,)).fetchone()
+        if row is not None:
+            connection.execute("UPDATE shards SET status = 'running', worker = ?, claimed_at = ? WHERE id = ?",
+                               (worker, now, row[0]))
+        connection.execute("COMMIT")
+        return row
+    finally:
+        connection.close()
+
+
+def complete_shard(db_path: str, shard_id: int, worker: str, result: Any) -> bool:
+    """
+    Stores the output of a shard. Returns False if the shard was meanwhile completed by another worker.
+    """
+    connection = _connect(db_path)
+    try:
+        cursor = connection.execute("UPDATE shards SET status = 'done', worker = ?, result = ? "
+                                    "WHERE id = ? AND status != 'done'", (worker, pickle.dumps(result), shard_id))
+        return cursor.rowcount == 1
+    finally:
+        connection.close()
+
+
+def _run_shard(spec: Dict[str, Any], point: int, first_run: int, num_runs: int) -> Any:
+    # output of one shard, as stored by complete_shard()
+    _, kwargs = spec['points'][point]
+    return run_baseline_simulation(num_runs, seed=spec['seed'], first_run=first_run,
+                                   options=RunOptions(engine=spec['engine']), **kwargs)
+
+
+def run_worker(db_path: str, worker: str | None = None, max_shards: int | None = None,
+               lease_seconds: float = DEFAULT_LEASE_SECONDS) -> int:
+    """
+    Claims and executes shards until the queue is empty (or max_shards were run).
+
+    Parameters:
+        db_path : str. Job queue database.
+        worker : str or None. Worker name recorded with claimed shards (default: host:pid).
+        max_shards : int or None. Stop after this many shards.
+        lease_seconds : float. Age after which a running shard may be claimed again.
+
+    Returns:
+        int : Number of shards executed.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    spec = load_spec(db_path)
+    executed = 0
+    while max_shards is None or executed < max_shards:
+        claimed = claim_shard(db_path, worker, lease_seconds)
+        if claimed is None:
+            break
+        shard_id, point, first_run, num_runs = claimed
+        complete_shard(db_path, shard_id, worker, _run_shard(spec, point, first_run, num_runs))
+        executed += 1
+    return executed
+
+
+def shard_status(db_path: str) -> Dict[str, int]:
+    """Returns the number of shards per status."""
+    connection = _connect(db_path)
+    try:
+        return dict(connection.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall())
+    finally:
+        connection.close()
+
+
+def merge_results(db_path: str) -> Dict[str, Tuple[Dict[str, list], list]]:
+    """
+    Combines the shard outputs of every point, in run order.
+
+    Returns:
+        dict : label -> (metrics, belief_revised_counts), as returned by run_baseline_simulation().
+    """
+    spec = load_spec(db_path)
+    connection = _connect(db_path)
+    try:
+        pending = connection.execute("SELECT COUNT(*) FROM shards WHERE status != 'done'").fetchone()[0]
+        if pending:
+            raise RuntimeError(f"{pending} shards of {db_path} are not done yet")
+        rows = connection.execute("SELECT point, result FROM shards ORDER BY point, first_run").fetchall()
+    finally:
+        connection.close()
+    merged = {label: (new_metrics(), []) for label, _ in spec['points']}
+    for point, blob in rows:
+        metrics, belief_revised_counts = pickle.loads(blob)
+        merged_metrics, merged_counts = merged[spec['points'][point][0]]
+        for key, values in metrics.items():
+            merged_metrics[key].extend(values)
+        merged_counts.extend(belief_revised_counts)
+    return merged
+
+
+def publish_shards(db_path: str, directory: str) -> int:
+    """
+    Publishes the unfinished shards of a SQLite queue as a shared queue directory that workers on other
+    hosts can claim from (see run_shared_worker()). The SQLite file itself stays on the coordinator.
+
+    Parameters:
+        db_path : str. Job queue database of the coordinator.
+        directory : str. Queue directory on storage shared with the workers (created if missing).
+
+    Returns:
+        int : Number of shards published.
+    """
+    spec = load_spec(db_path)
+    connection = _connect(db_path)
+    try:
+        rows = connection.execute("SELECT id, point, first_run, num_runs FROM shards WHERE status != 'done' "
+                                  "ORDER BY id").fetchall()
+    finally:
+        connection.close()
+    for name in ('pending', 'claimed', 'results'):
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+    _write_atomic(os.path.join(directory, 'spec.json'), json.dumps(spec).encode())
+    published = 0
+    for shard_id, point, first_run, num_runs in rows:
+        if os.path.exists(os.path.join(directory, 'results', f"{shard_id}.pkl")):
+            continue
+        _write_atomic(os.path.join(directory, 'pending', f"{shard_id}.json"),
+                      json.dumps([point, first_run, num_runs]).encode())
+        published += 1
+    return published
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # readers on any host see either no file or the complete file
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(handle, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _requeue_expired(directory: str, lease_seconds: float) -> None:
+    # moves claims older than the lease back to pending/; a concurrent requeue or completion makes the rename fail
+    claimed = os.path.join(directory, 'claimed')
+    now = time.time()
+    for name in os.listdir(claimed):
+        path = os.path.join(claimed, name)
+        try:
+            if os.stat(path).st_mtime < now - lease_seconds:
+                os.rename(path, os.path.join(directory, 'pending', name.split('@')[0] + '.json'))
+        except FileNotFoundError:
+            continue
+
+
+def claim_shared_shard(directory: str, worker: str,
+                       lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Tuple[int, int, int, int] | None:
+    """
+    Atomically claims a pending shard of a shared queue directory by renaming its file into claimed/
+    (claims older than lease_seconds are first returned to pending/).
+
+    Returns:
+        tuple or None : (shard id, point, first_run, num_runs), or None if no shard is available.
+
+    Examples:
+        >>> import tempfile
+        >>> directory = tempfile.mkdtemp()
+        >>> db = os.path.join(directory, 'jobs.db')
+        >>> create_experiment(db, 'baseline', num_runs=2, shard_size=2)
+        1
+        >>> publish_shards(db, os.path.join(directory, 'queue'))
+        1
+        >>> claim_shared_shard(os.path.join(directory, 'queue'), 'host-a:1')
+        (1, 0, 0, 2)
+        >>> claim_shared_shard(os.path.join(directory, 'queue'), 'host-b:1') is None
+        True
+        >>> claim_shared_shard(os.path.join(directory, 'queue'), 'host-b:1', lease_seconds=-1)  # expired lease
+        (1, 0, 0, 2)
+    """
+    _requeue_expired(directory, lease_seconds)
+    pending = os.path.join(directory, 'pending')
+    for shard_id in sorted(int(name[:-len('.json')]) for name in os.listdir(pending) if name.endswith('.json')):
+        claim = os.path.join(directory, 'claimed', f"{shard_id}@{worker}.json")
+        try:
+            os.rename(os.path.join(pending, f"{shard_id}.json"), claim)
+        except FileNotFoundError:
+            continue  # claimed by another worker first
+        os.utime(claim)  # the lease starts now
+        with open(claim) as f:
+            point, first_run, num_runs = json.load(f)
+        return shard_id, point, first_run, num_runs
+    return None
+
+
+def complete_shared_shard(directory: str, shard_id: int, worker: str, result: Any) -> None:
+    """Writes the output of a shard to results/<id>.pkl of a shared queue directory and releases its claim."""
+    _write_atomic(os.path.join(directory, 'results', f"{shard_id}.pkl"), pickle.dumps(result))
+    try:
+        os.remove(os.path.join(directory, 'claimed', f"{shard_id}@{worker}.json"))
+    except FileNotFoundError:
+        pass  # the lease expired and the shard was requeued; its result is the same
+
+
+def run_shared_worker(directory: str, worker: str | None = None, max_shards: int | None = None,
+                      lease_seconds: float = DEFAULT_LEASE_SECONDS) -> int:
+    """
+    Claims and executes shards of a shared queue directory until it is empty (or max_shards were run).
+
+    Parameters:
+        directory : str. Queue directory written by publish_shards().
+        worker, max_shards, lease_seconds : As in run_worker().
+
+    Returns:
+        int : Number of shards executed.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    with open(os.path.join(directory, 'spec.json')) as f:
+        spec = json.load(f)
+    executed = 0
+    while max_shards is None or executed < max_shards:
+        claimed = claim_shared_shard(directory, worker, lease_seconds)
+        if claimed is None:
+            break
+        shard_id, point, first_run, num_runs = claimed
+        complete_shared_shard(directory, shard_id, worker, _run_shard(spec, point, first_run, num_runs))
+        executed += 1
+    return executed
+
+
+def collect_shared_results(db_path: str, directory: str) -> int:
+    """
+    Stores the result files of a shared queue directory in the coordinator's SQLite queue, so that
+    shard_status() and merge_results() cover them.
+
+    Returns:
+        int : Number of shards newly completed.
+
+    Examples:
+        >>> import tempfile
+        >>> directory = tempfile.mkdtemp()
+        >>> db, queue = os.path.join(directory, 'jobs.db'), os.path.join(directory, 'queue')
+        >>> create_experiment(db, 'h1', num_runs=3, shard_size=2, seed=11, values=[0.9])
+        2
+        >>> publish_shards(db, queue)
+        2
+        >>> workers = [multiprocessing.Process(target=run_shared_worker, args=(queue, f"host-{index}:1"))
+        ...            for index in range(2)]
+        >>> for worker in workers: worker.start()
+        >>> for worker in workers: worker.join()
+        >>> collect_shared_results(db, queue), shard_status(db)
+        (2, {'done': 2})
+        >>> merge_results(db)['fc_0.9'] == run_baseline_simulation(3, hypothesis='h1', percent_fc=0.9, seed=11)
+        True
+    """
+    results = os.path.join(directory, 'results')
+    collected = 0
+    for name in sorted(os.listdir(results)):
+        if not name.endswith('.pkl'):
+            continue
+        with open(os.path.join(results, name), 'rb') as f:
+            result = pickle.load(f)
+        collected += complete_shard(db_path, int(name.split('.')[0]), 'shared', result)
+    return collected
+
+
+def run_local(db_path: str, processes: int = 2) -> Dict[str, Tuple[Dict[str, list], list]]:
+    """
+    Runs the queue of db_path with local worker processes and merges the results.
+
+    Examples:
+        >>> import tempfile
+        >>> db = os.path.join(tempfile.mkdtemp(), 'jobs.db')
+        >>> create_experiment(db, 'h1', num_runs=3, shard_size=2, seed=11, values=[0.5, 0.9])
+        4
+        >>> merged = run_local(db, processes=2)
+        >>> shard_status(db)
+        {'done': 4}
+        >>> single = run_baseline_simulation(3, hypothesis='h1', percent_fc=0.9, seed=11)
+        >>> merged['fc_0.9'][0] == single[0] and merged['fc_0.9'][1] == single[1]
+        True
+    """
+    workers = [multiprocessing.Process(target=run_worker, args=(db_path, f"local-{index}")) for index in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return merge_results(db_path)
+
+
+def _parse_value(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded experiment runs through a SQLite job queue, "
+                                                 "or a shared queue directory for workers on several hosts.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    create = commands.add_parser('create', help="create the job queue of an experiment")
+    create.add_argument('db')
+    create.add_argument('kind', choices=['baseline', 'h1', 'h2', 'h3'])
+    create.add_argument('--num-runs', type=int, default=1000)
+    create.add_argument('--shard-size', type=int, default=50)
+    create.add_argument('--seed', type=int, default=0)
+    create.add_argument('--values', nargs='*', type=_parse_value)
+    create.add_argument('--engine', choices=['reference', 'arrays'], default='reference')
+    work = commands.add_parser('work', help="claim and run shards until the queue is empty")
+    work.add_argument('db')
+    work.add_argument('--max-shards', type=int)
+    work.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS)
+    status = commands.add_parser('status', help="count shards per status")
+    status.add_argument('db')
+    merge = commands.add_parser('merge', help="merge finished shards into a pickle of label -> (metrics, revisions)")
+    merge.add_argument('db')
+    merge.add_argument('output')
+    local = commands.add_parser('local', help="run the queue with local worker processes")
+    local.add_argument('db')
+    local.add_argument('--processes', type=int, default=os.cpu_count())
+    publish = commands.add_parser('publish', help="publish unfinished shards to a queue directory on shared storage")
+    publish.add_argument('db')
+    publish.add_argument('directory')
+    work_shared = commands.add_parser('work-shared', help="claim and run shards of a shared queue directory")
+    work_shared.add_argument('directory')
+    work_shared.add_argument('--max-shards', type=int)
+    work_shared.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS)
+    collect = commands.add_parser('collect', help="store the results of a shared queue directory in the database")
+    collect.add_argument('db')
+    collect.add_argument('directory')
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        print(f"{create_experiment(args.db, args.kind, args.num_runs, args.shard_size, args.seed, args.values, args.engine)} shards created")
+    elif args.command == 'work':
+        print(f"{run_worker(args.db, max_shards=args.max_shards, lease_seconds=args.lease)} shards executed")
+    elif args.command == 'status':
+        print(shard_status(args.db))
+    elif args.command == 'merge':
+        with open(args.output, 'wb') as f:
+            pickle.dump(merge_results(args.db), f)
+    elif args.command == 'local':
+        run_local(args.db, args.processes)
+        print(shard_status(args.db))
+    elif args.command == 'publish':
+        print(f"{publish_shards(args.db, args.directory)} shards published")
+    elif args.command == 'work-shared':
+        print(f"{run_shared_worker(args.directory, max_shards=args.max_shards, lease_seconds=args.lease)} shards executed")
+    elif args.command == 'collect':
+        print(f"{collect_shared_results(args.db, args.directory)} shards collected")
+        print(shard_status(args.db))
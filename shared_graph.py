@@ -0,0 +1,206 @@
+'''
+shared_graph.py
+
+This module places the read-only inputs of a simulation run (the CSR adjacency, the per-slot trust
+weights, the agent role arrays and optionally the per-slot transmission table) in memory that several worker processes can map at the same
+time, so a process pool holds one copy of a graph instead of one copy per worker.
+
+Two backings are supported:
+- 'shm': a multiprocessing.shared_memory block (POSIX shared memory, freed by unlink())
+- 'mmap': a memory-mapped file on disk, which also allows several independent jobs to share a
+  graph that was written once
+
+The owner creates a SharedArrays object; workers receive its small, picklable SharedArraysHandle and
+call attach() to obtain read-only NumPy views. Everything a run mutates (beliefs, schedules,
+counters) lives in the worker's private CascadeState (see engine.py).
+
+It includes:
+- SharedArrays / SharedArraysHandle: a named group of arrays in one shared block
+- attach(): read-only views of a published group
+- publish_problem() / attach_problem(): shared GraphArrays + AgentArrays pairs (with their transmission table)
+'''
+
+import os
+import tempfile
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from graph_arrays import GraphArrays, AgentArrays
+
+_ALIGNMENT = 64
+
+
+@dataclass(frozen=True)
+class SharedArraysHandle:
+    """
+    Picklable description of a published array group.
+
+    Attributes:
+        backing : str. 'shm' or 'mmap'.
+        name : str. Shared-memory block name ('shm') or file path ('mmap').
+        size : int. Size of the block in bytes.
+        layout : tuple. (key, dtype string, shape, byte offset) of every array.
+    """
+    backing: str
+    name: str
+    size: int
+    layout: Tuple[Tuple[str, str, Tuple[int, ...], int], ...]
+
+
+def _plan_layout(arrays: Dict[str, np.ndarray]) -> Tuple[Tuple[Tuple[str, str, Tuple[int, ...], int], ...], int]:
+    layout = []
+    offset = 0
+    for key, array in arrays.items():
+        offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+        layout.append((key, array.dtype.str, tuple(array.shape), offset))
+        offset += array.nbytes
+    return tuple(layout), max(offset, 1)
+
+
+def _views(buffer, layout, writeable: bool) -> Dict[str, np.ndarray]:
+    views = {}
+    for key, dtype, shape, offset in layout:
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+        view.flags.writeable = writeable
+        views[key] = view
+    return views
+
+
+class SharedArrays:
+    """
+    Owner of a group of arrays copied once into shared memory or a memory-mapped file.
+
+    The owner must outlive every worker that attached to the group and should call unlink()
+    (or use the object as a context manager) once the workers are done.
+
+    Examples:
+        >>> arrays = {'a': np.arange(5), 'b': np.ones((2, 3), dtype=np.float32)}
+        >>> with SharedArrays(arrays) as shared:
+        ...     views, keepalive = attach(shared.handle)
+        ...     print(views['a'].tolist(), views['b'].shape, views['a'].flags.writeable)
+        ...     del views, keepalive
+        [0, 1, 2, 3, 4] (2, 3) False
+    """
+    def __init__(self, arrays: Dict[str, np.ndarray], backing: str = 'shm', path: Optional[str] = None):
+        arrays = {key: np.ascontiguousarray(value) for key, value in arrays.items()}
+        layout, size = _plan_layout(arrays)
+        self._shm = None
+        self._mmap = None
+        if backing == 'shm':
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            buffer, name = self._shm.buf, self._shm.name
+        elif backing == 'mmap':
+            if path is None:
+                fd, path = tempfile.mkstemp(prefix='misinfo_graph_', suffix='.bin')
+                os.close(fd)
+            self._mmap = np.memmap(path, dtype=np.uint8, mode='w+', shape=(size,))
+            buffer, name = self._mmap, path
+        else:
+            raise ValueError(f"Unknown backing '{backing}' (expected 'shm' or 'mmap')")
+        for key, view in _views(buffer, layout, writeable=True).items():
+            view[...] = arrays[key]
+        if self._mmap is not None:
+            self._mmap.flush()
+        self.handle = SharedArraysHandle(backing, name, size, layout)
+
+    def close(self) -> None:
+        """Releases the owner's own mapping (the data stays available until unlink())."""
+        if self._shm is not None:
+            self._shm.close()
+        self._mmap = None
+
+    def unlink(self) -> None:
+        """Releases the mapping and destroys the shared block or file."""
+        self.close()
+        if self.handle.backing == 'shm':
+            self._shm.unlink()
+        elif os.path.exists(self.handle.name):
+            os.remove(self.handle.name)
+
+    def __enter__(self) -> 'SharedArrays':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.unlink()
+
+
+def attach(handle: SharedArraysHandle) -> Tuple[Dict[str, np.ndarray], object]:
+    """
+    Maps a published array group read-only.
+
+    Parameters:
+        handle : SharedArraysHandle. Handle of the published group.
+
+    Returns:
+        views : dict. Read-only array views by key.
+        keepalive : object. Underlying mapping; keep a reference for as long as the views are used.
+    """
+    if handle.backing == 'shm':
+        # Attaching processes must not unlink the block; only the owner registers it for cleanup.
+        try:
+            keepalive = shared_memory.SharedMemory(name=handle.name, track=False)
+        except TypeError:  # Python < 3.13 has no track argument
+            keepalive = shared_memory.SharedMemory(name=handle.name)
+        buffer = keepalive.buf
+    else:
+        keepalive = np.memmap(handle.name, dtype=np.uint8, mode='r', shape=(handle.size,))
+        buffer = keepalive
+    return _views(buffer, handle.layout, writeable=False), keepalive
+
+
+def publish_problem(graph: GraphArrays, roles: AgentArrays, backing: str = 'shm',
+                    path: Optional[str] = None, transmission: Optional[np.ndarray] = None) -> SharedArrays:
+    """
+    Publishes the read-only inputs of a run: CSR adjacency, slot trust, communities, agent roles and,
+    if given, the transmission table (see engine.transmission_table()), so that workers share it too.
+
+    Parameters:
+        graph : GraphArrays. Network with trust already assigned.
+        roles : AgentArrays. Roles and share probabilities.
+        backing : str. 'shm' or 'mmap'.
+        path : str or None. File used by the 'mmap' backing (a temporary file by default).
+        transmission : np.ndarray or None. (2, slots) transmission probabilities of the network.
+
+    Returns:
+        shared : SharedArrays. Owner of the published block.
+
+    Examples:
+        >>> import networkx as nx
+        >>> graph = GraphArrays.from_networkx(nx.cycle_graph(4))
+        >>> roles = AgentArrays(4)
+        >>> with publish_problem(graph, roles, backing='mmap', transmission=np.ones((2, 8), np.float32)) as shared:
+        ...     shared_graph, shared_roles, transmission, keepalive = attach_problem(shared.handle)
+        ...     print(shared_graph.degrees().tolist(), shared_roles.num_agents, transmission.shape)
+        ...     del shared_graph, shared_roles, transmission, keepalive
+        [2, 2, 2, 2] 4 (2, 8)
+    """
+    arrays = {'indptr': graph.indptr, 'indices': graph.indices, 'slot_trust': graph.slot_trust}
+    if graph.community is not None:
+        arrays['community'] = graph.community
+    arrays.update(roles.as_dict())
+    if transmission is not None:
+        arrays['transmission'] = transmission
+    return SharedArrays(arrays, backing=backing, path=path)
+
+
+def attach_problem(handle: SharedArraysHandle) -> Tuple[GraphArrays, AgentArrays, Optional[np.ndarray], object]:
+    """
+    Rebuilds zero-copy GraphArrays and AgentArrays views over a block created by publish_problem().
+
+    Returns:
+        graph : GraphArrays. Read-only CSR view.
+        roles : AgentArrays. Read-only role view.
+        transmission : np.ndarray or None. Read-only view of the transmission table, if it was published.
+        keepalive : object. Underlying mapping (see attach()).
+    """
+    views, keepalive = attach(handle)
+    graph = GraphArrays.from_csr(views['indptr'], views['indices'], views['slot_trust'], views.get('community'))
+    roles = AgentArrays.from_dict(views)
+    return graph, roles, views.get('transmission'), keepalive
+
+
+def shared_nbytes(handles: List[SharedArraysHandle]) -> int:
+    """Returns the total size in bytes of several published groups."""
+    return sum(handle.size for handle in handles)
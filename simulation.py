@@ -3,19 +3,24 @@ simulation.py
 
 This module contains the core simulation logic for modeling the spread of fake and real news
 through a synthetic social network. It includes functions for:
-- Initializing agents with probabilistic sharing behavior
+- Initializing agents with probabilistic sharing behavior (per agent, or vectorized per role group)
 - Seeding news items into the network (standard or influencer-biased)
 - Scheduling shares with delay distributions
 - Simulating propagation rounds with belief updates and fact-checker interventions
+  (on graphs with any node labels, mapped to indices by index_nodes())
 
 The simulation supports experimental variants aligned with specific hypotheses:
 - Hypothesis 2: Influencer-controlled dynamics (Variants A, B, C)
 - Hypothesis 3: Belief revision under competing news exposure
 
 Output metrics include infection counts, belief conversions, and influencer impact.
+
+Every random draw of a run comes from its RunRNG (rng_context.py): vectorized draws use the
+Generator methods and the propagation loop reads scalar uniforms from prefilled blocks.
+Parameters come from an explicit SimulationConfig (config.py), DEFAULT_CONFIG unless given.
 '''
 
-import random
+import functools
 from collections import defaultdict, deque
 from typing import Dict, Tuple, List, Any, Set
 import numpy as np
@@ -23,14 +28,23 @@ import networkx as nx
 from config import *
 from news_item import NewsItem
 from agent_initializer import Agent
+from graph_arrays import AgentArrays, SUSCEPTIBLE_NORMAL, HIGHLY_SUSCEPTIBLE, SUPER_SPREADER
+from event_trace import TraceRecorder, EVENT_SEED, EVENT_SHARE, EVENT_INFECT, EVENT_REVISION
+from rng_context import RunRNG, as_run_rng
+from graph_arrays import GraphArrays
+from engine import transmission_table
+from lineage import CascadeLineage
 
 
-def initialize_p_shares(agents: Dict[int, Agent]) -> None:
+def initialize_p_shares(agents: Dict[int, Agent], rng: np.random.Generator | None = None,
+                        config: SimulationConfig = DEFAULT_CONFIG) -> None:
     """
     Assigns probabilistic share likelihoods to each agent based on their role.
 
     Parameters:
         agents : dict. Dictionary mapping agent ID to Agent instance.
+        rng : RunRNG, np.random.Generator or None. Per-run random stream (a fresh unseeded one if None).
+        config : SimulationConfig. Share probability ranges.
 
     Returns:
         None
@@ -46,63 +60,113 @@ def initialize_p_shares(agents: Dict[int, Agent]) -> None:
         >>> 0.0 <= agents[0].p_share_real <= 1.0
         True
     """
+    rng = as_run_rng(rng)
     for agent in agents.values():
         try:
             if agent.is_fact_checker:
-                agent.p_share_fake = np.random.uniform(*p_fake_fact_checker)
+                agent.p_share_fake = float(rng.uniform(*config.p_fake_fact_checker))
             elif agent.is_susceptible:
                 if agent.susceptible_type == "super_spreader":
-                    agent.p_share_fake = np.random.uniform(*p_fake_super_spreader)
+                    agent.p_share_fake = float(rng.uniform(*config.p_fake_super_spreader))
                 elif agent.susceptible_type == "highly_susceptible":
-                    agent.p_share_fake = np.random.uniform(*p_fake_highly_susceptible)
+                    agent.p_share_fake = float(rng.uniform(*config.p_fake_highly_susceptible))
                 else:
-                    agent.p_share_fake = np.random.uniform(*p_fake_susceptible)
+                    agent.p_share_fake = float(rng.uniform(*config.p_fake_susceptible))
             else:
-                agent.p_share_fake = np.random.uniform(*p_fake_normal)
-            agent.p_share_real = np.random.uniform(*p_real_normal)
+                agent.p_share_fake = float(rng.uniform(*config.p_fake_normal))
+            agent.p_share_real = float(rng.uniform(*config.p_real_normal))
         except Exception as e:
             print(f"Error initializing p_shares for agent {agent.id}: {e}")
 
 
-def select_initial_seeds(agents: Dict[int, Agent], news_type: str) -> List[int]:
+def initialize_p_shares_bulk(roles: AgentArrays, rng: np.random.Generator, agents: Dict[int, Agent] | None = None,
+                             config: SimulationConfig = DEFAULT_CONFIG) -> None:
+    """
+    Vectorized counterpart of initialize_p_shares(). Draws the share probabilities of each
+    role group in a single call and writes them into the AgentArrays.
+
+    Parameters:
+        roles : AgentArrays. Role flags of every agent; p_share_fake and p_share_real are filled in.
+        rng : np.random.Generator. Per-run random generator.
+        agents : dict or None. If given, the probabilities are also written back to these Agent objects.
+        config : SimulationConfig. Share probability ranges.
+
+    Returns:
+        None
+
+    Examples:
+        >>> from graph_arrays import AgentArrays
+        >>> roles = AgentArrays(4)
+        >>> roles.is_fact_checker[0] = True
+        >>> initialize_p_shares_bulk(roles, np.random.default_rng(0))
+        >>> bool(0.05 <= roles.p_share_fake[0] <= 0.07)
+        True
+        >>> bool(((roles.p_share_real >= 0.06) & (roles.p_share_real <= 0.09)).all())
+        True
+    """
+    fact_checker = roles.is_fact_checker
+    susceptible = ~fact_checker & roles.is_susceptible
+    groups = [
+        (fact_checker, config.p_fake_fact_checker),
+        (susceptible & (roles.susceptible_code == SUPER_SPREADER), config.p_fake_super_spreader),
+        (susceptible & (roles.susceptible_code == HIGHLY_SUSCEPTIBLE), config.p_fake_highly_susceptible),
+        (susceptible & (roles.susceptible_code == SUSCEPTIBLE_NORMAL), config.p_fake_susceptible),
+        (~fact_checker & ~roles.is_susceptible, config.p_fake_normal),
+    ]
+    for mask, (low, high) in groups:
+        roles.p_share_fake[mask] = rng.uniform(low, high, size=int(mask.sum()))
+    roles.p_share_real[:] = rng.uniform(*config.p_real_normal, size=roles.num_agents)
+
+    if agents is not None:
+        roles.write_back(agents)
+
+
+def select_initial_seeds(agents: Dict[int, Agent], news_type: str, rng: RunRNG,
+                         config: SimulationConfig = DEFAULT_CONFIG) -> List[int]:
     """
     Randomly selects a set of seed agents and assigns them a belief state.
 
     Parameters:
         agents : dict. All agents in the simulation.
         news_type : str. Either 'fake' or 'real'.
+        rng : RunRNG. Per-run random stream.
+        config : SimulationConfig. Gives the number of seeds.
 
     Returns:
         List: list. List of agent IDs seeded with the news.
     """
-    seeds = random.sample(list(agents.keys()), seed_count)
+    seeds = rng.sample(agents.keys(), config.seed_count)
     for uid in seeds:
         agents[uid].belief_state = news_type
     return seeds
 
 
-def select_initial_seeds_variant(agents: Dict[int, Agent], news_type: str) -> List[int]:
+def select_initial_seeds_variant(agents: Dict[int, Agent], news_type: str, rng: RunRNG,
+                                 config: SimulationConfig = DEFAULT_CONFIG) -> List[int]:
     """
     Selects seed users for news introduction with preference for influencers (Variant A).
 
     Parameters:
         agents : dict. Mapping of agent IDs to Agent objects.
         news_type : str. Either 'fake' or 'real'.
+        rng : RunRNG. Per-run random stream.
+        config : SimulationConfig. Gives the number of seeds.
 
     Returns:
         List : list. List of seeded agent IDs.
     """
     influencers = [uid for uid, agent in agents.items() if agent.is_influencer]
     others = [uid for uid in agents if uid not in influencers]
-    seed_influencers = random.sample(influencers, min(7, len(influencers)))
-    seed_others = random.sample(others, seed_count - len(seed_influencers))
+    seed_influencers = rng.sample(influencers, min(7, len(influencers)))
+    seed_others = rng.sample(others, config.seed_count - len(seed_influencers))
     seeds = seed_influencers + seed_others
     for uid in seeds:
         agents[uid].belief_state = news_type
     return seeds
 
 
-def sample_delay_from_distribution(delay_dist: Dict[int, float], agent: Agent, news_type: str, variant_flag_dict: Dict[str, bool] = variant_config) -> int:
+def sample_delay_from_distribution(delay_dist: Dict[int, float], agent: Agent, news_type: str,
+                                   rng: RunRNG | None = None, config: SimulationConfig = DEFAULT_CONFIG) -> int:
     """
     Samples a delay (in rounds) from a distribution based on user role and variant flags.
 
@@ -110,21 +174,21 @@ def sample_delay_from_distribution(delay_dist: Dict[int, float], agent: Agent, n
         delay_dist : dict. Delay distribution dictionary (delay: probability).
         agent : Agent. The agent sharing the news.
         news_type : str. Either 'fake' or 'real'.
-        variant_flag_dict : dict. Configuration flags for enabled variants.
+        rng : RunRNG or None. Per-run random stream (a fresh unseeded one if None).
+        config : SimulationConfig. Gives the Variant B flag and influencer delay distribution.
 
     Returns:
         int : int. The number of rounds to delay.
     Examples:
-        >>> import random; random.seed(0)
         >>> from agent_initializer import Agent
         >>> agent = Agent(2)
         >>> delay_dist = {1: 0.7, 2: 0.3}
-        >>> sample_delay_from_distribution(delay_dist, agent, 'real', {'variant_B': False}) in delay_dist
+        >>> sample_delay_from_distribution(delay_dist, agent, 'real', RunRNG(0)) in delay_dist
         True
     """
-    if news_type == 'fake' and variant_flag_dict['variant_B'] and agent.is_influencer:
-        delay_dist = {1: 0.95, 2: 0.05}
-    rand_val = random.random()
+    if news_type == 'fake' and config.variant_B and agent.is_influencer:
+        delay_dist = dict(config.influencer_fake_delay_distribution)
+    rand_val = as_run_rng(rng).next_uniform()
     cumulative = 0.0
     for delay, prob in sorted(delay_dist.items()):
         cumulative += prob
@@ -133,7 +197,8 @@ def sample_delay_from_distribution(delay_dist: Dict[int, float], agent: Agent, n
     return max(delay_dist.keys())
 
 
-def schedule_initial_shares(seeds: List[int], agents: Dict[int, Agent], news_type: str, schedule: Dict[int, List[Tuple[int, str]]], delay_offset: int = 0, variant_flag_dict: Dict[str, bool] = variant_config) -> None:
+def schedule_initial_shares(seeds: List[int], agents: Dict[int, Agent], news_type: str, schedule: Dict[int, List[Tuple[int, str]]], delay_offset: int = 0,
+                            rng: RunRNG | None = None, config: SimulationConfig = DEFAULT_CONFIG) -> None:
     """
     Adds initial share events to the schedule queue for each seeded user.
 
@@ -143,25 +208,27 @@ def schedule_initial_shares(seeds: List[int], agents: Dict[int, Agent], news_typ
         news_type : str. Either 'fake' or 'real'.
         schedule : dict. A schedule of future events (round: list of (user, news_type)).
         delay_offset : int. Additional delay offset for real news (used in Hypothesis 3).
-        variant_flag_dict : dict. Variant control flags.
+        rng : RunRNG or None. Per-run random stream (a fresh unseeded one if None).
+        config : SimulationConfig. Gives the delay distributions and the Variant B flag.
 
     Returns:
         None
     """
-    dist = fake_delay_distribution if news_type == 'fake' else real_delay_distribution
+    rng = as_run_rng(rng)
+    dist = dict(config.fake_delay_distribution if news_type == 'fake' else config.real_delay_distribution)
     for uid in seeds:
-        delay = sample_delay_from_distribution(dist, agents[uid], news_type,variant_flag_dict=variant_flag_dict)
+        delay = sample_delay_from_distribution(dist, agents[uid], news_type, rng=rng, config=config)
         schedule[delay + delay_offset].append((uid, news_type))
 
 
-def modified_trust(source_agent: Agent, trust: float, variant_flag_dict: Dict[str, bool] = variant_config) -> float:
+def modified_trust(source_agent: Agent, trust: float, config: SimulationConfig = DEFAULT_CONFIG) -> float:
     """
     Applies a trust multiplier if the source is an influencer (Variant C).
 
     Parameters:
         source_agent : Agent. The agent sharing the news.
         trust : float. Original trust value.
-        variant_flag_dict : dict. Flags for controlling variant logic.
+        config : SimulationConfig. Gives the Variant C flag.
 
     Returns:
         float : float. Modified trust value.
@@ -169,15 +236,328 @@ def modified_trust(source_agent: Agent, trust: float, variant_flag_dict: Dict[st
         >>> from agent_initializer import Agent
         >>> agent = Agent(1)
         >>> agent.is_influencer = True
-        >>> modified_trust(agent, 0.5, {'variant_C': True})
+        >>> modified_trust(agent, 0.5, DEFAULT_CONFIG.replace(variant_C=True))
         0.6
-        >>> modified_trust(agent, 0.5, {'variant_C': False})
+        >>> modified_trust(agent, 0.5)
         0.5
     """
-    return trust * 1.2 if variant_flag_dict['variant_C'] and source_agent.is_influencer else trust
+    return trust * 1.2 if config.variant_C and source_agent.is_influencer else trust
+
+def _draw_delay(cumulative: List[Tuple[int, float]], rand_val: float) -> int:
+    """Returns the first delay whose cumulative probability covers rand_val (same rule as sample_delay_from_distribution)."""
+    for delay, cum in cumulative:
+        if rand_val <= cum:
+            return delay
+    return cumulative[-1][0]
+
+
+# Propagation kernels. Every factory binds the run state and returns kernel(current_events, round_num)
+# -> number of belief revisions; they consume random numbers in the same order, so a run gives the
+# same result with any of them. See build_propagation_kernel().
+
+def _make_basic_kernel(indptr, indices, transmission, agents, news_items, infected, schedule, lineage, trace, rand,
+                       delay_tables, config):
+    # Baseline, H1 and H2 without lineage or tracing: no belief revision, lineage or trace branches
+    fake_item = news_items['fake']
+    p_fact_check = config.p_fact_check
+    fake_transmission, real_transmission = transmission
+    fake_cum, real_cum, influencer_fake_cum, _ = delay_tables
+
+    def kernel(current_events, round_num):
+        fake_scale = 0.3 if fake_item.is_flagged_fake else 1.0
+        for uid, news_type in current_events:
+            agent = agents[uid]
+            if agent.has_shared[news_type]:
+                continue # this agent has already shared this news type
+            agent.has_shared[news_type] = True
+            news_items[news_type].shared_count += 1
+
+            is_fake = news_type == 'fake'
+            if is_fake:
+                slot_probs, scale, event_cum, event_influencer_cum = fake_transmission, fake_scale, fake_cum, influencer_fake_cum
+            else:
+                slot_probs, scale, event_cum, event_influencer_cum = real_transmission, 1.0, real_cum, real_cum
+
+            start, end = indptr[uid], indptr[uid + 1]
+            for neighbor_id, slot_prob in zip(indices[start:end].tolist(), slot_probs[start:end].tolist()):
+                neighbor = agents[neighbor_id]
+                if neighbor.belief_state is not None:
+                    continue
+
+                if rand() < slot_prob * scale: # share probability x trust (x Variant C boost), x flag
+                    # Fact-checker intervention
+                    if is_fake and neighbor.is_fact_checker:
+                        if rand() < p_fact_check:
+                            fake_item.is_flagged_fake = True
+                            scale = fake_scale = 0.3
+
+                    neighbor.belief_state = news_type
+                    infected[news_type].add(neighbor_id)
+                    delay = _draw_delay(event_influencer_cum if neighbor.is_influencer else event_cum, rand())
+                    schedule[round_num + delay].append((neighbor_id, news_type))
+        return 0
+
+    return kernel
+
+
+def _make_tracked_kernel(indptr, indices, transmission, agents, news_items, infected, schedule, lineage, trace, rand,
+                         delay_tables, config):
+    # H2 Variant A (and any run with a CascadeLineage) without revision or tracing: only the lineage branch
+    fake_item = news_items['fake']
+    p_fact_check = config.p_fact_check
+    fake_transmission, real_transmission = transmission
+    fake_cum, real_cum, influencer_fake_cum, _ = delay_tables
+    record = lineage.record
+
+    def kernel(current_events, round_num):
+        fake_scale = 0.3 if fake_item.is_flagged_fake else 1.0
+        for uid, news_type in current_events:
+            agent = agents[uid]
+            if agent.has_shared[news_type]:
+                continue # this agent has already shared this news type
+            agent.has_shared[news_type] = True
+            news_items[news_type].shared_count += 1
+
+            is_fake = news_type == 'fake'
+            if is_fake:
+                slot_probs, scale, event_cum, event_influencer_cum = fake_transmission, fake_scale, fake_cum, influencer_fake_cum
+                news_code = 0
+            else:
+                slot_probs, scale, event_cum, event_influencer_cum = real_transmission, 1.0, real_cum, real_cum
+                news_code = 1
+
+            start, end = indptr[uid], indptr[uid + 1]
+            for neighbor_id, slot_prob in zip(indices[start:end].tolist(), slot_probs[start:end].tolist()):
+                neighbor = agents[neighbor_id]
+                if neighbor.belief_state is not None:
+                    continue
+
+                if rand() < slot_prob * scale: # share probability x trust (x Variant C boost), x flag
+                    # Fact-checker intervention
+                    if is_fake and neighbor.is_fact_checker:
+                        if rand() < p_fact_check:
+                            fake_item.is_flagged_fake = True
+                            scale = fake_scale = 0.3
+
+                    neighbor.belief_state = news_type
+                    infected[news_type].add(neighbor_id)
+                    record(news_code, neighbor_id, uid)
+                    delay = _draw_delay(event_influencer_cum if neighbor.is_influencer else event_cum, rand())
+                    schedule[round_num + delay].append((neighbor_id, news_type))
+        return 0
+
+    return kernel
+
+
+def _make_revision_kernel(indptr, indices, transmission, agents, news_items, infected, schedule, lineage, trace, rand,
+                          delay_tables, config):
+    # H3 without lineage or tracing: only the belief revision branch
+    fake_item = news_items['fake']
+    p_fact_check = config.p_fact_check
+    p_belief_revision = config.p_belief_revision
+    fake_transmission, real_transmission = transmission
+    fake_cum, real_cum, influencer_fake_cum, revision_cum = delay_tables
+
+    def kernel(current_events, round_num):
+        revised = 0
+        fake_scale = 0.3 if fake_item.is_flagged_fake else 1.0
+        for uid, news_type in current_events:
+            agent = agents[uid]
+            if agent.has_shared[news_type]:
+                continue # this agent has already shared this news type
+            agent.has_shared[news_type] = True
+            news_items[news_type].shared_count += 1
+
+            is_fake = news_type == 'fake'
+            if is_fake:
+                slot_probs, scale, event_cum, event_influencer_cum = fake_transmission, fake_scale, fake_cum, influencer_fake_cum
+            else:
+                slot_probs, scale, event_cum, event_influencer_cum = real_transmission, 1.0, real_cum, real_cum
+            revision_delay_cum = revision_cum[news_type]
+
+            start, end = indptr[uid], indptr[uid + 1]
+            for neighbor_id, slot_prob in zip(indices[start:end].tolist(), slot_probs[start:end].tolist()):
+                neighbor = agents[neighbor_id]
+                belief = neighbor.belief_state
+                if belief is not None:
+                    if belief != news_type:
+                        if rand() < (p_belief_revision if neighbor.is_fact_checker else 0.25):
+                            neighbor.belief_state = news_type
+                            infected[news_type].add(neighbor_id)
+                            revised += 1
+                            delay = _draw_delay(revision_delay_cum, rand())
+                            schedule[round_num + delay].append((neighbor_id, news_type))
+                    continue
+
+                if rand() < slot_prob * scale: # share probability x trust (x Variant C boost), x flag
+                    # Fact-checker intervention
+                    if is_fake and neighbor.is_fact_checker:
+                        if rand() < p_fact_check:
+                            fake_item.is_flagged_fake = True
+                            scale = fake_scale = 0.3
+
+                    neighbor.belief_state = news_type
+                    infected[news_type].add(neighbor_id)
+                    delay = _draw_delay(event_influencer_cum if neighbor.is_influencer else event_cum, rand())
+                    schedule[round_num + delay].append((neighbor_id, news_type))
+        return revised
+
+    return kernel
+
+
+def _make_full_kernel(indptr, indices, transmission, agents, news_items, infected, schedule, lineage, trace, rand,
+                      delay_tables, config, revise=False):
+    # Combinations without a dedicated factory: H3 belief revision (revise), lineage tracking (lineage
+    # not None) and event tracing (trace not None) together, or any traced run
+    fake_item = news_items['fake']
+    p_fact_check = config.p_fact_check
+    p_belief_revision = config.p_belief_revision
+    fake_transmission, real_transmission = transmission
+    fake_cum, real_cum, influencer_fake_cum, revision_cum = delay_tables
+    tracked = lineage is not None
+    traced = trace is not None
+
+    def kernel(current_events, round_num):
+        revised = 0
+        fake_scale = 0.3 if fake_item.is_flagged_fake else 1.0
+        for uid, news_type in current_events:
+            agent = agents[uid]
+            if agent.has_shared[news_type]:
+                continue # this agent has already shared this news type
+            agent.has_shared[news_type] = True
+            news_items[news_type].shared_count += 1
+            if traced:
+                trace.record(round_num, uid, -1, news_type, EVENT_SHARE)
+
+            is_fake = news_type == 'fake'
+            if is_fake:
+                slot_probs, scale, event_cum, event_influencer_cum = fake_transmission, fake_scale, fake_cum, influencer_fake_cum
+                news_code = 0
+            else:
+                slot_probs, scale, event_cum, event_influencer_cum = real_transmission, 1.0, real_cum, real_cum
+                news_code = 1
+
+            start, end = indptr[uid], indptr[uid + 1]
+            for neighbor_id, slot_prob in zip(indices[start:end].tolist(), slot_probs[start:end].tolist()):
+                neighbor = agents[neighbor_id]
+                belief = neighbor.belief_state
+                if belief is not None:
+                    if revise and belief != news_type:
+                        if rand() < (p_belief_revision if neighbor.is_fact_checker else 0.25):
+                            neighbor.belief_state = news_type
+                            infected[news_type].add(neighbor_id)
+                            revised += 1
+                            if tracked:
+                                lineage.record(news_code, neighbor_id, uid)
+                            if traced:
+                                trace.record(round_num, uid, neighbor_id, news_type, EVENT_REVISION)
+                            delay = _draw_delay(revision_cum[news_type], rand())
+                            schedule[round_num + delay].append((neighbor_id, news_type))
+                    continue
+
+                if rand() < slot_prob * scale: # share probability x trust (x Variant C boost), x flag
+                    # Fact-checker intervention
+                    if is_fake and neighbor.is_fact_checker:
+                        if rand() < p_fact_check:
+                            fake_item.is_flagged_fake = True
+                            scale = fake_scale = 0.3
+
+                    neighbor.belief_state = news_type
+                    infected[news_type].add(neighbor_id)
+                    if traced:
+                        trace.record(round_num, uid, neighbor_id, news_type, EVENT_INFECT)
+                    if tracked:
+                        lineage.record(news_code, neighbor_id, uid)
+                    delay = _draw_delay(event_influencer_cum if neighbor.is_influencer else event_cum, rand())
+                    schedule[round_num + delay].append((neighbor_id, news_type))
+        return revised
+
+    return kernel
+
+
+_make_full_revision_kernel = functools.partial(_make_full_kernel, revise=True)
+
+
+def build_propagation_kernel(hypothesis: str | None, config: SimulationConfig = DEFAULT_CONFIG, traced: bool = False,
+                             tracked: bool = False):
+    """
+    Returns the kernel factory for one (hypothesis, variant, tracing) combination: runs without H3
+    belief revision, lineage tracking and event tracing use the basic kernel, whose hot loop has none
+    of those branches; runs with only lineage tracking (Hypothesis 2, Variant A) or only belief
+    revision (Hypothesis 3) use a kernel with just that branch; traced runs and the remaining
+    combinations use the full kernel. The Variant B delay boost is a delay table
+    (equal to the normal one when the variant is off) and the Variant C trust boost is part of the
+    per-slot transmission table, so neither needs a branch.
+
+    Parameters:
+        hypothesis : str or None. One of 'h2', 'h3', or None.
+        config : SimulationConfig. Gives the variant flags.
+        traced : bool. Whether events are recorded into a TraceRecorder.
+        tracked : bool. Whether infections are recorded into a CascadeLineage (always on for Hypothesis 2, Variant A).
+
+    Returns:
+        callable : make_kernel(indptr, indices, transmission, agents, news_items, infected, schedule, lineage,
+            trace, rand, delay_tables, config),
+            which binds the run state and returns kernel(current_events, round_num) -> number of belief revisions.
+
+    Examples:
+        >>> config = DEFAULT_CONFIG.replace(variant_C=True)
+        >>> build_propagation_kernel(None, config) is build_propagation_kernel('h1')
+        True
+        >>> build_propagation_kernel('h3', config) is build_propagation_kernel(None, config)
+        False
+        >>> build_propagation_kernel('h2', config.replace(variant_A=True)) is build_propagation_kernel(None, tracked=True)
+        True
+        >>> build_propagation_kernel('h3', tracked=True) is build_propagation_kernel('h3', traced=True)
+        True
+        >>> build_propagation_kernel('h3') is build_propagation_kernel('h3', tracked=True)
+        False
+    """
+    tracked = tracked or (hypothesis == 'h2' and config.variant_A)
+    if hypothesis == 'h3':
+        return _make_full_revision_kernel if traced or tracked else _make_revision_kernel
+    if traced:
+        return _make_full_kernel
+    return _make_tracked_kernel if tracked else _make_basic_kernel
+
+
+def index_nodes(G: nx.Graph, agents: Dict[Any, Agent]) -> Tuple[nx.Graph, Dict[int, Agent], List[Any] | None]:
+    """
+    Relabels G and agents to the integers 0..n-1 expected by the propagation kernels.
+
+    Parameters:
+        G : nx.Graph. The social network graph, with any hashable node labels.
+        agents : dict. Mapping of G's node labels to Agent objects.
+
+    Returns:
+        G : nx.Graph. G itself if its nodes are already 0..n-1, else a copy relabeled by position in G.nodes().
+        agents : dict. The same Agent objects keyed by node index.
+        labels : list or None. Node label of every index (None if G was not relabeled).
+
+    Examples:
+        >>> import networkx as nx
+        >>> from agent_initializer import Agent
+        >>> G = nx.path_graph(['a', 'b', 'c'])
+        >>> H, indexed, labels = index_nodes(G, {node: Agent(node) for node in G})
+        >>> sorted(H.edges()), indexed[2].id, labels
+        ([(0, 1), (1, 2)], 'c', ['a', 'b', 'c'])
+        >>> index_nodes(nx.path_graph(3), {0: Agent(0), 1: Agent(1), 2: Agent(2)})[2] is None
+        True
+    """
+    labels = list(G.nodes())
+    if set(labels) == set(range(len(labels))):
+        return G, agents, None
+    if len(agents) != len(labels) or any(label not in agents for label in labels):
+        raise ValueError("agents must map every node of G, and only those, to an Agent")
+    position = {label: index for index, label in enumerate(labels)}
+    return nx.relabel_nodes(G, position, copy=True), {position[label]: agents[label] for label in labels}, labels
+
 
 def simulate_spread(G: nx.Graph, agents: Dict[int, Agent], news_items: Dict[str, NewsItem], hypothesis=None, real_news_delay=0,
-                    variant_flag_dict: Dict[str, Any] = variant_config,) -> tuple[dict[str, list[Any]], dict[str, int], int | Any, dict[str, int] | None]:
+                    trace: TraceRecorder | None = None,
+                    rng: RunRNG | None = None, graph: GraphArrays | None = None,
+                    transmission: np.ndarray | None = None, lineage: CascadeLineage | None = None,
+                    config: SimulationConfig = DEFAULT_CONFIG) -> tuple[dict[str, list[Any]], dict[str, int], int | Any, dict[str, int] | None]:
     """
     Simulates the round-based spread of fake and real news through a social network.
     Agents may adopt beliefs, share news with delays, and revise beliefs based on trust,
@@ -186,12 +566,21 @@ def simulate_spread(G: nx.Graph, agents: Dict[int, Agent], news_items: Dict[str,
     - Hypothesis 3: Competing real vs. fake news with belief revision
 
     Parameters:
-    G : nx.Graph. The social network graph with trust-weighted edges.
-    agents : dict. Mapping of agent IDs to Agent objects.
+    G : nx.Graph. The social network graph with trust-weighted edges. Nodes that are not the integers 0..n-1
+        are mapped to their position in G.nodes() (see index_nodes()); trace and lineage then record positions,
+        and trace.metadata['node_labels'] maps them back to labels.
+    agents : dict. Mapping of agent IDs (node labels of G) to Agent objects.
     news_items : dict. Dictionary with 'fake' and 'real' NewsItem instances.
     hypothesis : str or None. One of 'h2', 'h3', or None to control variant logic.
     real_news_delay : int. Optional delay in seeding real news (used in Hypothesis 3).
-    variant_flag_dict : dict. Dictionary of variant activation flags.
+    trace : TraceRecorder or None. If given, every seed, share, infection and belief revision is recorded into it.
+    rng : RunRNG or None. Per-run random stream; the run is fully determined by it (a fresh unseeded one if None).
+    graph : GraphArrays or None. CSR view of G, indexed by node position, with its trust values (built from G's
+        'trust' attributes if None).
+    transmission : np.ndarray or None. Per-slot transmission probabilities of graph (see engine.transmission_table());
+        built from the agents if None.
+    lineage : CascadeLineage or None. If given, filled with the infection forest of the run (who infected whom).
+    config : SimulationConfig. Seed count, fact-checking and revision probabilities, delays, round limit and Hypothesis 2 variant flags.
 
     Returns:
         stats : dict[str, list[int]]. Infection count by round for each news type.
@@ -209,97 +598,79 @@ def simulate_spread(G: nx.Graph, agents: Dict[int, Agent], news_items: Dict[str,
         >>> news_items = {'fake': NewsItem("Fake", is_fake=True), 'real': NewsItem("Real", is_fake=False)}
         >>> simulate_spread(G, agents, news_items)  # doctest: +SKIP
     """
+    rng = as_run_rng(rng)
+    G, agents, labels = index_nodes(G, agents)
     schedule = defaultdict(list) #e.g - { 7 :[ ( 1239, "real") ], 2 : [( 1100, "fake")]} Will first get updated with initial seed numbers and then later with neighbors
     stats = {'fake': [], 'real': []}
     infected = {'fake': set(), 'real': set()}
     belief_revised_count = 0
-    source_map = {}  # uid -> 'influencer' or 'normal'
+    track_sources = hypothesis == 'h2' and config.variant_A
+    if lineage is None and track_sources:
+        lineage = CascadeLineage(len(agents))  # parent, root seed and seed class of every infected agent
+    is_influencer = np.array([agents[uid].is_influencer for uid in range(len(agents))]) if lineage is not None else None
 
     for news_type in ['fake', 'real']:  # Initialize seeds for both news types
         delay_round = real_news_delay if news_type == 'real' and hypothesis == 'h3' else 0 #for hypothesis 3, add a delay for real news
-        if hypothesis == 'h2' and variant_flag_dict['variant_A']:
-            seeds = select_initial_seeds_variant(agents, news_type)
-            # Track origin type for seeds
-            for uid in seeds:
-                source_map[uid] = 'influencer' if agents[uid].is_influencer else 'normal'
+        if track_sources:
+            seeds = select_initial_seeds_variant(agents, news_type, rng, config=config)
         else:
-            seeds = select_initial_seeds(agents, news_type)
+            seeds = select_initial_seeds(agents, news_type, rng, config=config)
+        if lineage is not None:
+            lineage.add_seeds(0 if news_type == 'fake' else 1, np.array(seeds, dtype=np.int64), is_influencer)
 
-        schedule_initial_shares(seeds, agents, news_type, schedule, delay_round, variant_flag_dict=variant_flag_dict)
+        schedule_initial_shares(seeds, agents, news_type, schedule, delay_round, rng=rng,
+                                config=config)
         infected[news_type].update(seeds)
+        if trace is not None:
+            for uid in seeds:
+                trace.record(0, -1, uid, news_type, EVENT_SEED)
+
+    # Edge-level precomputation: unflagged transmission probability of every directed edge
+    if graph is None:
+        graph = GraphArrays.from_networkx(G, trust_attr='trust')
+    if transmission is None:
+        transmission = transmission_table(graph, AgentArrays.from_agents(agents), config)
+
+    # Select the kernel specialized for this run's hypothesis and variant flags
+    cumulative = config.delay_cumulative
+    delay_tables = (
+        cumulative['fake'],
+        cumulative['real'],
+        cumulative['influencer_fake' if config.variant_B else 'fake'],  # Variant B: influencers share fake news faster
+        {'fake': cumulative['fake'], 'real': cumulative['real']},
+    )
+    make_kernel = build_propagation_kernel(hypothesis, config, traced=trace is not None,
+                                           tracked=lineage is not None)
+    # Only the CSR rows of agents that share are converted to Python lists, one row slice per share
+    kernel = make_kernel(graph.indptr.tolist(), graph.indices, transmission, agents, news_items,
+                         infected, schedule, lineage, trace, rng.next_uniform, delay_tables, config)
 
     # Run simulation rounds
-    for round_num in range(max_rounds): #500
+    for round_num in range(config.max_rounds): #500
         current_events = schedule.pop(round_num, [])
-        random.shuffle(current_events) # Randomize processing order of events to avoid bias
-
-        for uid, news_type in current_events:
-            agent = agents[uid]
-            if agent.has_shared[news_type]:
-                continue # this agent has already shared this news type, so continue
-
-            # Agent shares the news now
-            agent.has_shared[news_type] = True
-            news_items[news_type].shared_count += 1
-
-            # Propagate to neighbors
-            for neighbor_id in G.neighbors(uid):
-                neighbor = agents[neighbor_id]
-
-                if neighbor.belief_state is not None: # This neighbor already believes a news type
-
-                    # Check for hypothesis 3
-                    if hypothesis == 'h3' and neighbor.belief_state != news_type:
-                        # if this agent already believes in a news but received a conflicting news
-                        # they may check the fact and change their belief state
-                        revision_chance = p_belief_revision if neighbor.is_fact_checker else 0.25
-                        if random.random() < revision_chance:
-                            neighbor.belief_state = news_type
-                            infected[news_type].add(neighbor_id)
-                            belief_revised_count += 1
-                            delay = sample_delay_from_distribution(
-                                real_delay_distribution if news_type == 'real' else fake_delay_distribution,
-                                neighbor, news_type
-                            )
-                            schedule[round_num + delay].append((neighbor_id, news_type))
-                    continue # since this agent already believes a news type, continue to the next neighbor
-
-                # change the belief state of the neighbor, if he doesn't believe any news type yet
-                trust = G[uid][neighbor_id].get('trust', 0.5)
-                trust = modified_trust(agent, trust, variant_flag_dict=variant_flag_dict)
-                if news_type == 'fake' and news_items['fake'].is_flagged_fake:
-                    trust *= 0.3 # reduce trust for flagged fake news
-
-                prob = agent.p_share_fake if news_type == 'fake' else agent.p_share_real
-                if random.random() < prob * trust:  # if the effective probability falls within a random theshold, then share the news
-                    # Fact-checker intervention
-                    if news_type == 'fake' and neighbor.is_fact_checker:
-                        if random.random() < p_fact_check:
-                            news_items['fake'].is_flagged_fake = True
-
-                    # Commit to believe the current news if this neighbor doesn't believe any news yet
-                    neighbor.belief_state = news_type
-                    infected[news_type].add(neighbor_id)
-                    if hypothesis == 'h2' and variant_flag_dict['variant_A']:
-                        source_map[neighbor_id] = source_map.get(uid, 'unknown')  # Inherit source for comparison during H2
-                    delay = sample_delay_from_distribution(
-                        fake_delay_distribution if news_type == 'fake' else real_delay_distribution,
-                        neighbor, news_type, variant_flag_dict=variant_flag_dict
-                    )
-                    schedule[round_num + delay].append((neighbor_id, news_type))
+        rng.shuffle(current_events) # Randomize processing order of events to avoid bias
+        belief_revised_count += kernel(current_events, round_num)
 
         stats['fake'].append(len(infected['fake'])) # how many agents got infected with the fake news in current round
         stats['real'].append(len(infected['real'])) # how many agents got infected with the real news in current round
         if not schedule: # spread is over
             break
 
+    if trace is not None:
+        trace.metadata.update({
+            'num_agents': len(agents),
+            'rounds': len(stats['fake']),
+            'hypothesis': hypothesis,
+            'variant_flags': config.variant_flags,
+            'influencers': sorted(uid for uid, agent in agents.items() if agent.is_influencer),
+        })
+        if labels is not None:
+            trace.metadata['node_labels'] = labels
+
     influencer_impact = {'influencer': 0, 'normal': 0}
     # track how many users got infected with the fake news when source of information was an influencer
-    if hypothesis == 'h2':
-        influencer_impact = {
-            'influencer': sum(1 for uid in infected['fake'] if source_map.get(uid) == 'influencer'),
-            'normal': sum(1 for uid in infected['fake'] if source_map.get(uid) == 'normal')
-        }
+    if track_sources:
+        influencer_impact = lineage.origin_counts(0)
     final_beliefs = {'fake': 0, 'real': 0} # final belief count for each type of news at the end of each simulation
     for agent in agents.values():
         if agent.belief_state == 'fake':
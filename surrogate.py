@@ -0,0 +1,300 @@
+'''
+surrogate.py
+
+This module screens the config parameter space with a cheap statistical surrogate instead of full
+Monte Carlo sweeps at every point of interest.
+
+Pipeline:
+1. latin_hypercube() draws a space-filling design over selected config parameters (by default
+   p_fact_check, p_belief_revision, percent_susceptible and rewire_fraction).
+2. run_design() runs a modest number of simulations per design point through run_baseline_simulation(),
+   each point being an explicit SimulationConfig (point_config(): the base config with the point's
+   parameters replaced) and every point using the same seed, so that differences between points are
+   not blurred by independent run-to-run noise. Nothing is changed outside the config objects.
+3. ParameterSurrogate fits a Gaussian process per output (mean final fake/real reach and believers)
+   on the unit-scaled parameters, with each point's Monte Carlo variance as observation noise, and
+   predicts means with standard deviations anywhere in the box.
+4. ParameterSurrogate.suggest() proposes the next points to simulate where the surrogate is least certain.
+
+It includes:
+- latin_hypercube(), point_config(), run_design(), build_surrogate()
+- ParameterSurrogate: fit(), predict(), suggest()
+'''
+
+import dataclasses
+from typing import Dict, List, Tuple
+import numpy as np
+
+from config import SimulationConfig, DEFAULT_CONFIG
+from baseline_run import run_baseline_simulation, RunOptions
+
+DEFAULT_RANGES = {
+    'p_fact_check': (0.05, 0.6),
+    'p_belief_revision': (0.25, 1.0),
+    'percent_susceptible': (0.02, 0.3),
+    'rewire_fraction': (0.0, 0.5),
+}
+
+OUTPUTS = ('fake_reach', 'real_reach', 'fake_believers', 'real_believers')
+
+
+def latin_hypercube(num_points: int, ranges: Dict[str, Tuple[float, float]],
+                    rng: np.random.Generator) -> List[Dict[str, float]]:
+    """
+    Draws a Latin hypercube design: every parameter range is cut into num_points equal strata and
+    each stratum is used by exactly one point.
+
+    Parameters:
+        num_points : int. Number of design points.
+        ranges : dict. Parameter name -> (low, high).
+        rng : np.random.Generator. Random generator.
+
+    Returns:
+        list : One {parameter: value} dict per point.
+
+    Examples:
+        >>> design = latin_hypercube(5, {'p_fact_check': (0.0, 1.0)}, np.random.default_rng(0))
+        >>> sorted(int(point['p_fact_check'] * 5) for point in design)
+        [0, 1, 2, 3, 4]
+    """
+    strata = rng.permuted(np.tile(np.arange(num_points), (len(ranges), 1)), axis=1).T
+    unit = (strata + rng.random(strata.shape)) / num_points
+    return _from_unit(unit, ranges)
+
+
+def _to_unit(points: List[Dict[str, float]], ranges: Dict[str, Tuple[float, float]]) -> np.ndarray:
+    low, high = np.array(list(ranges.values()), dtype=float).T
+    values = np.array([[point[name] for name in ranges] for point in points], dtype=float)
+    return (values - low) / (high - low)
+
+
+def _from_unit(unit: np.ndarray, ranges: Dict[str, Tuple[float, float]]) -> List[Dict[str, float]]:
+    low, high = np.array(list(ranges.values()), dtype=float).T
+    values = low + unit * (high - low)
+    return [dict(zip(ranges, row.tolist())) for row in values]
+
+
+def point_config(point: Dict[str, float], config: SimulationConfig = DEFAULT_CONFIG) -> SimulationConfig:
+    """
+    Returns the configuration of one design point: config with the point's parameters replaced.
+
+    Parameters:
+        point : dict. {parameter: value}; every parameter must be a SimulationConfig field.
+        config : SimulationConfig. Base configuration.
+
+    Returns:
+        SimulationConfig : Configuration of the point.
+
+    Examples:
+        >>> point_config({'p_fact_check': 0.9}).p_fact_check, DEFAULT_CONFIG.p_fact_check
+        (0.9, 0.3)
+        >>> point_config({'p_fact_checks': 0.9})
+        Traceback (most recent call last):
+        ...
+        KeyError: "unknown config parameter 'p_fact_checks'"
+    """
+    fields = {field.name for field in dataclasses.fields(SimulationConfig)}
+    for name in point:
+        if name not in fields:
+            raise KeyError(f"unknown config parameter {name!r}")
+    return config.replace(**point)
+
+
+def run_design(points: List[Dict[str, float]], runs_per_point: int = 20, hypothesis: str | None = None,
+               seed: int | None = 0, engine: str = 'arrays',
+               config: SimulationConfig = DEFAULT_CONFIG) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simulates every design point and summarizes the outputs.
+
+    Parameters:
+        points : list. {parameter: value} dicts (see latin_hypercube()).
+        runs_per_point : int. Monte Carlo runs per point.
+        hypothesis : str or None. Hypothesis label passed to run_baseline_simulation().
+        seed : int or None. Seed shared by all points (common random numbers).
+        engine : str. Engine passed to run_baseline_simulation().
+        config : SimulationConfig. Base configuration; each point runs with point_config(point, config).
+
+    Returns:
+        means : np.ndarray. (num_points, len(OUTPUTS)) mean final fake/real reach and believers.
+        variances : np.ndarray. Same shape; variance of each mean (sample variance / runs_per_point).
+    """
+    means = np.empty((len(points), len(OUTPUTS)))
+    variances = np.empty_like(means)
+    for index, point in enumerate(points):
+        metrics, _ = run_baseline_simulation(runs_per_point, hypothesis=hypothesis, seed=seed,
+                                             config=point_config(point, config), options=RunOptions(engine=engine))
+        samples = np.array([[run[-1] for run in metrics['fake_reach']], [run[-1] for run in metrics['real_reach']],
+                            metrics['fake_belief_count'], metrics['real_belief_count']], dtype=float).T
+        means[index] = samples.mean(axis=0)
+        variances[index] = samples.var(axis=0, ddof=1) / runs_per_point if runs_per_point > 1 else 0.0
+    return means, variances
+
+
+class ParameterSurrogate:
+    """
+    Gaussian-process surrogate (squared exponential kernel with one length scale per parameter)
+    of the simulation outputs over a parameter box. Length scales and signal variance are chosen by
+    maximizing the summed log marginal likelihood of the outputs over random candidates.
+
+    Attributes:
+        ranges : dict. Parameter name -> (low, high).
+        config : SimulationConfig. Base configuration the design points modify.
+        points : list. Simulated design points.
+        means, variances : np.ndarray. Observed output means and their Monte Carlo variances.
+    """
+    def __init__(self, ranges: Dict[str, Tuple[float, float]] = DEFAULT_RANGES, jitter: float = 1e-6,
+                 config: SimulationConfig = DEFAULT_CONFIG):
+        for name in ranges:
+            point_config({name: ranges[name][0]}, config)  # reject unknown parameters before any simulation
+        self.ranges = dict(ranges)
+        self.config = config
+        self.jitter = jitter
+        self.points = []
+        self.means = np.empty((0, len(OUTPUTS)))
+        self.variances = np.empty((0, len(OUTPUTS)))
+
+    def fit(self, points: List[Dict[str, float]], means: np.ndarray, variances: np.ndarray,
+            rng: np.random.Generator | None = None, num_candidates: int = 256) -> 'ParameterSurrogate':
+        """
+        Adds observations and refits the Gaussian processes.
+
+        Parameters:
+            points : list. {parameter: value} dicts.
+            means : np.ndarray. (len(points), len(OUTPUTS)) observed output means.
+            variances : np.ndarray. Monte Carlo variance of each mean (observation noise).
+            rng : np.random.Generator or None. Generator for the hyperparameter search.
+            num_candidates : int. Number of random hyperparameter candidates.
+
+        Returns:
+            ParameterSurrogate : self.
+        """
+        rng = rng if rng is not None else np.random.default_rng(0)
+        self.points = self.points + list(points)
+        self.means = np.vstack([self.means, means])
+        self.variances = np.vstack([self.variances, variances])
+        self._x = _to_unit(self.points, self.ranges)
+        self._offset = self.means.mean(axis=0)
+        self._scale = np.maximum(self.means.std(axis=0), 1e-9)
+        self._y = (self.means - self._offset) / self._scale
+        self._noise = self.variances / self._scale ** 2 + self.jitter
+
+        dims = self._x.shape[1]
+        candidates = np.exp(rng.uniform(np.log(0.05), np.log(3.0), size=(num_candidates, dims)))
+        amplitudes = np.exp(rng.uniform(np.log(0.25), np.log(4.0), size=num_candidates))
+        scores = [self._log_likelihood(lengths, amplitude) for lengths, amplitude in zip(candidates, amplitudes)]
+        best = int(np.argmax(scores))
+        self.length_scales, self.amplitude = candidates[best], float(amplitudes[best])
+        self._factors = [self._factor(self._covariance(self._x, self._x), column) for column in range(len(OUTPUTS))]
+        return self
+
+    def _covariance(self, a: np.ndarray, b: np.ndarray, lengths: np.ndarray | None = None,
+                    amplitude: float | None = None) -> np.ndarray:
+        lengths = self.length_scales if lengths is None else lengths
+        amplitude = self.amplitude if amplitude is None else amplitude
+        diff = (a[:, None, :] - b[None, :, :]) / lengths
+        return amplitude * np.exp(-0.5 * np.einsum('ijk,ijk->ij', diff, diff))
+
+    def _factor(self, covariance: np.ndarray, column: int) -> Tuple[np.ndarray, np.ndarray]:
+        chol = np.linalg.cholesky(covariance + np.diag(self._noise[:, column]))
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, self._y[:, column]))
+        return chol, alpha
+
+    def _log_likelihood(self, lengths: np.ndarray, amplitude: float) -> float:
+        covariance = self._covariance(self._x, self._x, lengths, amplitude)
+        total = 0.0
+        for column in range(len(OUTPUTS)):
+            try:
+                chol, alpha = self._factor(covariance, column)
+            except np.linalg.LinAlgError:
+                return -np.inf
+            total -= 0.5 * self._y[:, column] @ alpha + np.log(np.diag(chol)).sum()
+        return total
+
+    def predict(self, points: List[Dict[str, float]]) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        Predicts the outputs at new parameter points.
+
+        Parameters:
+            points : list. {parameter: value} dicts.
+
+        Returns:
+            mean : dict. Output name -> predicted mean at every point.
+            std : dict. Output name -> predictive standard deviation (surrogate uncertainty) at every point.
+        """
+        x = _to_unit(points, self.ranges)
+        cross = self._covariance(x, self._x)
+        mean, std = {}, {}
+        for column, name in enumerate(OUTPUTS):
+            chol, alpha = self._factors[column]
+            v = np.linalg.solve(chol, cross.T)
+            variance = np.maximum(self.amplitude - np.einsum('ij,ij->j', v, v), 0.0)
+            mean[name] = self._offset[column] + self._scale[column] * (cross @ alpha)
+            std[name] = self._scale[column] * np.sqrt(variance)
+        return mean, std
+
+    def suggest(self, num_points: int = 5, rng: np.random.Generator | None = None,
+                num_candidates: int = 2048) -> List[Dict[str, float]]:
+        """
+        Proposes the next points to simulate: greedily picks the candidate with the largest summed
+        (standardized) predictive variance, then conditions on it before picking the next one, so a
+        batch spreads over the uncertain regions instead of piling up at one spot.
+
+        Parameters:
+            num_points : int. Number of points to propose.
+            rng : np.random.Generator or None. Generator for the random candidates.
+            num_candidates : int. Number of random candidates scored.
+
+        Returns:
+            list : {parameter: value} dicts.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        candidates = rng.random((num_candidates, len(self.ranges)))
+        chosen = []
+        for _ in range(num_points):
+            x = np.vstack([self._x] + [candidates[index][None] for index in chosen])
+            noise = np.concatenate([self._noise.mean(axis=1), np.full(len(chosen), self.jitter)])
+            chol = np.linalg.cholesky(self._covariance(x, x) + np.diag(noise))
+            v = np.linalg.solve(chol, self._covariance(candidates, x).T)
+            variance = self.amplitude - np.einsum('ij,ij->j', v, v)
+            variance[chosen] = -np.inf
+            chosen.append(int(np.argmax(variance)))
+        return _from_unit(candidates[chosen], self.ranges)
+
+
+def build_surrogate(ranges: Dict[str, Tuple[float, float]] = DEFAULT_RANGES, num_points: int = 20,
+                    runs_per_point: int = 20, hypothesis: str | None = None, seed: int = 0,
+                    engine: str = 'arrays', config: SimulationConfig = DEFAULT_CONFIG) -> ParameterSurrogate:
+    """
+    Runs a Latin hypercube design over ranges and fits a surrogate to it.
+
+    Parameters:
+        ranges : dict. Config parameter name -> (low, high).
+        num_points : int. Number of design points.
+        runs_per_point : int. Monte Carlo runs per point.
+        hypothesis : str or None. Hypothesis label passed to run_baseline_simulation().
+        seed : int. Seed of the design and of the simulation runs.
+        engine : str. Engine passed to run_baseline_simulation().
+        config : SimulationConfig. Base configuration of every design point.
+
+    Returns:
+        ParameterSurrogate : Fitted surrogate; refine it with suggest(), run_design() and fit().
+
+    Examples:
+        >>> ranges = {'p_fact_check': (0.05, 0.6), 'percent_susceptible': (0.02, 0.3)}
+        >>> surrogate = build_surrogate(ranges, num_points=4, runs_per_point=2)
+        >>> mean, std = surrogate.predict([{'p_fact_check': 0.3, 'percent_susceptible': 0.1}])
+        >>> sorted(mean) == sorted(OUTPUTS) and bool((std['fake_reach'] >= 0).all())
+        True
+        >>> new_points = surrogate.suggest(2, rng=np.random.default_rng(1))
+        >>> len(new_points), sorted(new_points[0]) == sorted(ranges)
+        (2, True)
+        >>> _ = surrogate.fit(new_points, *run_design(new_points, runs_per_point=2, config=surrogate.config))
+        >>> len(surrogate.points)
+        6
+    """
+    surrogate = ParameterSurrogate(ranges, config=config)
+    rng = np.random.default_rng(seed)
+    points = latin_hypercube(num_points, ranges, rng)
+    means, variances = run_design(points, runs_per_point, hypothesis=hypothesis, seed=seed, engine=engine,
+                                   config=config)
+    return surrogate.fit(points, means, variances, rng=rng)
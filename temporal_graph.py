@@ -0,0 +1,393 @@
+'''
+temporal_graph.py
+
+This module supports a temporal network mode, in which follow edges are added, removed and rewired
+while a story spreads, instead of the network staying fixed for the whole cascade.
+
+The network is held in a DynamicCSR: a CSR adjacency where every node's row has slack capacity
+beyond its degree. Adding an edge writes into the slack of both endpoint rows. Removing one moves the
+row's last entry into the freed slot. Only when a row is full is it relocated to the end of the slot
+arrays with double the capacity. Abandoned rows are reclaimed by an occasional compaction. Each edge
+update therefore costs O(degree) and touches two rows; the CSR and the networkx graph are never
+rebuilt per round. Edge trust is stored per slot, next to the neighbor id, so the trust structure is
+updated together with the adjacency.
+
+In temporal mode (SimulationConfig.temporal_rewire_rate > 0), the array engine (engine.py) wraps the
+run's network in a DynamicCSR. After every round, it rewires each edge with probability
+temporal_rewire_rate, as the Watts-Strogatz model does with rewire_fraction: one endpoint is kept,
+the other is replaced by a uniformly drawn node that is not yet a neighbor, and the new edge draws
+its trust with the community rule of assign_trust_levels_bulk(). rate_from_fraction() converts a
+total rewired fraction over a run into that per-round rate.
+
+It includes:
+- DynamicCSR: slack-capacity adjacency with add_edge(), remove_edge(), rewire_edge() and expand()
+- draw_trust(): trust of new edges
+- rewire_edges(): one round of random rewiring
+- rate_from_fraction(): per-round rewiring rate from a fraction of edges rewired per run
+'''
+
+from typing import Tuple
+import numpy as np
+
+from graph_arrays import GraphArrays
+
+
+class DynamicCSR:
+    """
+    Undirected network with incremental edge updates, stored as a CSR adjacency with per-row slack.
+
+    Row u occupies slots start[u] .. start[u] + degree[u] - 1 of indices / slot_trust / slot_edge
+    and owns capacity[u] slots from start[u]. The undirected edges are also kept as a dense edge
+    list (edge_u, edge_v, edge_trust) of length num_edges, which removals keep dense by moving the
+    last edge into the freed id.
+
+    Attributes:
+        num_nodes : int. Number of nodes.
+        num_edges : int. Number of undirected edges.
+        start, degree, capacity : np.ndarray. Row start slot, degree and capacity of every node (int64).
+        indices : np.ndarray. Neighbor id of every slot (int32).
+        slot_trust : np.ndarray. Trust of the edge of every slot (float64).
+        slot_edge : np.ndarray. Undirected edge id of every slot (int64).
+        community : np.ndarray or None. Community label per node.
+
+    Examples:
+        >>> import networkx as nx
+        >>> G = nx.path_graph(5)
+        >>> graph = DynamicCSR.from_graph(GraphArrays.from_networkx(G), slack=0.0, min_slack=1)
+        >>> graph.add_edge(0, 4, 0.9), graph.add_edge(0, 4, 0.9), graph.remove_edge(1, 2)
+        (True, False, True)
+        >>> sorted(graph.neighbors(0).tolist()), graph.degrees().tolist(), graph.num_edges
+        ([1, 4], [2, 1, 1, 2, 2], 4)
+        >>> for u in range(5):
+        ...     for v in range(u + 1, 5):
+        ...         _ = graph.add_edge(u, v, 0.5)
+        >>> graph.num_edges, graph.degrees().tolist()
+        (10, [4, 4, 4, 4, 4])
+        >>> owner, neighbors, trust = graph.expand(np.array([4]))
+        >>> sorted(zip(neighbors.tolist(), trust.tolist()))
+        [(0, 0.9), (1, 0.5), (2, 0.5), (3, 0.5)]
+    """
+    def __init__(self, num_nodes: int, edge_u: np.ndarray, edge_v: np.ndarray, edge_trust: np.ndarray,
+                 community: np.ndarray | None = None, slack: float = 0.25, min_slack: int = 2):
+        self.num_nodes = int(num_nodes)
+        self.community = community
+        self.slack = slack
+        self.min_slack = min_slack
+        self.num_edges = len(edge_u)
+        capacity = max(self.num_edges, 16)
+        self.edge_u = np.zeros(capacity, dtype=np.int32)
+        self.edge_v = np.zeros(capacity, dtype=np.int32)
+        self.edge_trust = np.zeros(capacity)
+        self.edge_u[:self.num_edges] = edge_u
+        self.edge_v[:self.num_edges] = edge_v
+        self.edge_trust[:self.num_edges] = edge_trust
+        low, high = np.minimum(edge_u, edge_v).astype(np.int64), np.maximum(edge_u, edge_v).astype(np.int64)
+        self._edge_keys = set((low * self.num_nodes + high).tolist())  # O(1) has_edge()
+        self._layout()
+
+    @classmethod
+    def from_graph(cls, graph: GraphArrays, slack: float = 0.25, min_slack: int = 2) -> 'DynamicCSR':
+        """
+        Copies a GraphArrays (edges, trust and communities) into a DynamicCSR.
+
+        Parameters:
+            graph : GraphArrays. Static network with its edge list.
+            slack : float. Spare capacity of every row as a fraction of its degree.
+            min_slack : int. Minimum spare capacity of every row.
+
+        Returns:
+            DynamicCSR : Dynamic copy of graph; graph itself is not modified.
+
+        Examples:
+            >>> import networkx as nx
+            >>> static = GraphArrays.from_networkx(nx.cycle_graph(6))
+            >>> graph = DynamicCSR.from_graph(static)
+            >>> graph.to_graph_arrays().indices.tolist() == static.indices.tolist()
+            True
+        """
+        return cls(graph.num_nodes, graph.edge_u, graph.edge_v, graph.slot_trust[np.argsort(graph.slot_edge)[::2]],
+                   community=graph.community, slack=slack, min_slack=min_slack)
+
+    def _layout(self) -> None:
+        # lays all rows out contiguously with fresh slack, from the edge list
+        m = self.num_edges
+        rows = np.concatenate([self.edge_u[:m], self.edge_v[:m]]).astype(np.int64)
+        cols = np.concatenate([self.edge_v[:m], self.edge_u[:m]])
+        edge_ids = np.concatenate([np.arange(m), np.arange(m)])
+        order = np.lexsort((cols, rows))
+        self.degree = np.bincount(rows, minlength=self.num_nodes).astype(np.int64)
+        self.capacity = self.degree + np.maximum(np.ceil(self.slack * self.degree).astype(np.int64), self.min_slack)
+        self.start = np.zeros(self.num_nodes, dtype=np.int64)
+        np.cumsum(self.capacity[:-1], out=self.start[1:])
+        self._end = int(self.capacity.sum())
+        self._wasted = 0
+        self.indices = np.full(self._end, -1, dtype=np.int32)
+        self.slot_trust = np.zeros(self._end)
+        self.slot_edge = np.full(self._end, -1, dtype=np.int64)
+        slots = self.start[rows[order]] + (np.arange(2 * m) - np.repeat(np.cumsum(self.degree) - self.degree, self.degree))
+        self.indices[slots] = cols[order]
+        self.slot_edge[slots] = edge_ids[order]
+        self.slot_trust[slots] = self.edge_trust[edge_ids[order]]
+
+    def compact(self) -> None:
+        """
+        Rebuilds the slot arrays without abandoned rows, with fresh slack in every row. Edge updates call
+        it when the slots abandoned by relocated rows outnumber the live ones.
+
+        Examples:
+            >>> import networkx as nx
+            >>> graph = DynamicCSR.from_graph(GraphArrays.from_networkx(nx.empty_graph(40)), slack=0.0, min_slack=1)
+            >>> for v in range(1, 40):  # row 0 outgrows its slots six times
+            ...     _ = graph.add_edge(0, v, 0.5)
+            >>> for v in range(2, 40):
+            ...     _ = graph.remove_edge(0, v)
+            >>> size = len(graph.indices)
+            >>> for v in range(2, 40):  # the first relocation of row 1 compacts the abandoned slots away
+            ...     _ = graph.add_edge(1, v, 0.5)
+            >>> len(graph.indices) < size, sorted(graph.neighbors(1).tolist()) == [0] + list(range(2, 40))
+            (True, True)
+            >>> int(graph.degrees().sum()) == 2 * graph.num_edges, graph.neighbors(0).tolist()
+            (True, [1])
+        """
+        self._layout()
+
+    def copy(self) -> 'DynamicCSR':
+        """Returns an independent copy (for example for a forked run)."""
+        m = self.num_edges
+        return DynamicCSR(self.num_nodes, self.edge_u[:m], self.edge_v[:m], self.edge_trust[:m],
+                          community=self.community, slack=self.slack, min_slack=self.min_slack)
+
+    def degrees(self) -> np.ndarray:
+        """Returns the degree of every node as an int64 array."""
+        return self.degree.copy()
+
+    def neighbors(self, u: int) -> np.ndarray:
+        """Returns the neighbor ids of node u (in no particular order)."""
+        return self.indices[self.start[u]:self.start[u] + self.degree[u]]
+
+    def _key(self, u: int, v: int) -> int:
+        return min(u, v) * self.num_nodes + max(u, v)
+
+    def has_edge(self, u: int, v: int) -> bool:
+        return self._key(u, v) in self._edge_keys
+
+    def _find_slot(self, u: int, v: int) -> int:
+        # slot of v in row u (the edge must exist)
+        start = int(self.start[u])
+        return start + self.indices[start:start + int(self.degree[u])].tolist().index(v)
+
+    def _make_room(self, *nodes: int) -> None:
+        # gives every full row among nodes a free slot. Called before the edge list changes, because a
+        # compaction lays the rows out again from the edge list. Compacting only once the abandoned slots
+        # outnumber the live ones (2 per edge) amortizes its O(num_edges) rebuild.
+        if any(self.degree[u] == self.capacity[u] for u in nodes) and self._wasted > 2 * self.num_edges:
+            self.compact()
+        for u in nodes:
+            if self.degree[u] == self.capacity[u]:
+                self._relocate(u)
+
+    def _relocate(self, u: int) -> None:
+        # moves full row u to the end of the slot arrays with double capacity
+        old_start, degree = int(self.start[u]), int(self.degree[u])
+        new_capacity = max(2 * int(self.capacity[u]), degree + max(1, self.min_slack))
+        if self._end + new_capacity > len(self.indices):
+            size = max(2 * len(self.indices), self._end + new_capacity)
+            for name, fill in (('indices', -1), ('slot_trust', 0.0), ('slot_edge', -1)):
+                array = getattr(self, name)
+                grown = np.full(size, fill, dtype=array.dtype)
+                grown[:self._end] = array[:self._end]
+                setattr(self, name, grown)
+        new_start = self._end
+        for array in (self.indices, self.slot_trust, self.slot_edge):
+            array[new_start:new_start + degree] = array[old_start:old_start + degree]
+        self._wasted += int(self.capacity[u])
+        self.start[u], self.capacity[u] = new_start, new_capacity
+        self._end += new_capacity
+
+    def _append_slot(self, u: int, v: int, trust: float, edge: int) -> None:
+        # row u must have a free slot (see _make_room())
+        slot = int(self.start[u] + self.degree[u])
+        self.indices[slot], self.slot_trust[slot], self.slot_edge[slot] = v, trust, edge
+        self.degree[u] += 1
+
+    def _remove_slot(self, u: int, slot: int) -> None:
+        last = int(self.start[u] + self.degree[u] - 1)
+        for array in (self.indices, self.slot_trust, self.slot_edge):
+            array[slot] = array[last]
+        self.degree[u] -= 1
+
+    def add_edge(self, u: int, v: int, trust: float) -> bool:
+        """
+        Adds the undirected edge (u, v) with the given trust.
+
+        Returns:
+            bool : False if the edge already exists or u == v (nothing is changed).
+        """
+        if u == v or self.has_edge(u, v):
+            return False
+        self._make_room(u, v)
+        edge = self.num_edges
+        if edge == len(self.edge_u):
+            for name in ('edge_u', 'edge_v', 'edge_trust'):
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate([array, np.zeros_like(array)]))
+        self.edge_u[edge], self.edge_v[edge], self.edge_trust[edge] = u, v, trust
+        self.num_edges += 1
+        self._edge_keys.add(self._key(u, v))
+        self._append_slot(u, v, trust, edge)
+        self._append_slot(v, u, trust, edge)
+        return True
+
+    def remove_edge(self, u: int, v: int) -> bool:
+        """
+        Removes the undirected edge (u, v). The last edge of the edge list takes over its id.
+
+        Returns:
+            bool : False if there is no such edge.
+        """
+        if not self.has_edge(u, v):
+            return False
+        self._edge_keys.discard(self._key(u, v))
+        slot = self._find_slot(u, v)
+        edge = int(self.slot_edge[slot])
+        self._remove_slot(u, slot)
+        self._remove_slot(v, self._find_slot(v, u))
+        last = self.num_edges - 1
+        if edge != last:
+            a, b = int(self.edge_u[last]), int(self.edge_v[last])
+            self.edge_u[edge], self.edge_v[edge], self.edge_trust[edge] = a, b, self.edge_trust[last]
+            self.slot_edge[self._find_slot(a, b)] = edge
+            self.slot_edge[self._find_slot(b, a)] = edge
+        self.num_edges = last
+        return True
+
+    def rewire_edge(self, edge: int, w: int, trust: float) -> bool:
+        """
+        Replaces edge (edge_u[edge], edge_v[edge]) by (edge_u[edge], w) with the given trust, keeping
+        its edge id.
+
+        Returns:
+            bool : False if w is edge_u[edge] or already one of its neighbors (nothing is changed).
+
+        Examples:
+            >>> import networkx as nx
+            >>> graph = DynamicCSR.from_graph(GraphArrays.from_networkx(nx.path_graph(4)))
+            >>> graph.rewire_edge(0, 3, 0.7), graph.rewire_edge(1, 2, 0.7)
+            (True, False)
+            >>> sorted(map(tuple, graph.edge_list().tolist()))
+            [(0, 3), (1, 2), (2, 3)]
+        """
+        u, v = int(self.edge_u[edge]), int(self.edge_v[edge])
+        if w == u or self.has_edge(u, w):
+            return False
+        self._make_room(w)
+        self._edge_keys.discard(self._key(u, v))
+        self._edge_keys.add(self._key(u, w))
+        self._remove_slot(v, self._find_slot(v, u))
+        slot = self._find_slot(u, v)
+        self.indices[slot], self.slot_trust[slot] = w, trust
+        self.edge_v[edge], self.edge_trust[edge] = w, trust
+        self._append_slot(w, u, trust, edge)
+        return True
+
+    def edge_list(self) -> np.ndarray:
+        """Returns the current undirected edges as a (num_edges, 2) array."""
+        return np.stack([self.edge_u[:self.num_edges], self.edge_v[:self.num_edges]], axis=1)
+
+    def to_graph_arrays(self) -> GraphArrays:
+        """Returns a static GraphArrays snapshot of the current network, with its edge trust."""
+        graph = GraphArrays(self.num_nodes, self.edge_u[:self.num_edges], self.edge_v[:self.num_edges],
+                            community=self.community)
+        graph.set_edge_trust(self.edge_trust[:self.num_edges].copy())
+        return graph
+
+    def expand(self, sources: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Adjacency protocol used by the array engine (see GraphArrays.expand()): returns every
+        (source, neighbor, trust) contact of the given nodes in the current network.
+        """
+        starts = self.start[sources]
+        counts = self.degree[sources]
+        owner = np.repeat(np.arange(len(counts)), counts)
+        row_offsets = np.cumsum(counts) - counts
+        slots = np.arange(int(counts.sum()), dtype=np.int64) + np.repeat(starts - row_offsets, counts)
+        return owner, self.indices[slots], self.slot_trust[slots]
+
+
+def draw_trust(community: np.ndarray | None, u: int, v: int, uniform: float) -> float:
+    """
+    Maps a uniform draw to the trust of a new edge (u, v) as assign_trust_levels_bulk() does:
+    U(0.8, 1.0) within a community, U(0.1, 0.5) across communities or without community labels.
+
+    Examples:
+        >>> community = np.array([0, 0, 1])
+        >>> draw_trust(community, 0, 1, 0.0), draw_trust(community, 0, 2, 1.0)
+        (0.8, 0.5)
+    """
+    if community is not None and community[u] == community[v] and community[u] >= 0:
+        return 0.8 + 0.2 * uniform
+    return 0.1 + 0.4 * uniform
+
+
+def rewire_edges(graph: DynamicCSR, rate: float, rng: np.random.Generator) -> int:
+    """
+    Rewires every edge with probability rate: the edge keeps its first endpoint and gets a new,
+    uniformly drawn second endpoint that is not already a neighbor (as in the Watts-Strogatz model),
+    with a trust drawn by draw_trust().
+
+    Parameters:
+        graph : DynamicCSR. Network updated in place.
+        rate : float. Rewiring probability of each edge.
+        rng : np.random.Generator. Random generator of the run.
+
+    Returns:
+        int : Number of rewired edges.
+
+    Examples:
+        >>> import networkx as nx
+        >>> from network_generator import community_labels
+        >>> static = GraphArrays.from_networkx(nx.watts_strogatz_graph(200, 6, 0.0, seed=1))
+        >>> from agent_initializer import assign_trust_levels_bulk
+        >>> static.set_community(community_labels(200, 4))
+        >>> _ = assign_trust_levels_bulk(static, np.random.default_rng(2))
+        >>> graph = DynamicCSR.from_graph(static, slack=0.0, min_slack=1)
+        >>> rng = np.random.default_rng(3)
+        >>> rewired = sum(rewire_edges(graph, 0.2, rng) for _ in range(10))
+        >>> rewired > 300, graph.num_edges == static.num_edges, int(graph.degrees().sum()) == 2 * graph.num_edges
+        (True, True, True)
+        >>> G = nx.Graph(graph.edge_list().tolist())
+        >>> all(sorted(graph.neighbors(u).tolist()) == sorted(G[u]) for u in G)
+        True
+        >>> snapshot = graph.to_graph_arrays()
+        >>> bool(np.all((snapshot.edge_trust >= 0.8) == snapshot.intra_community))
+        True
+    """
+    count = int(rng.binomial(graph.num_edges, rate))
+    if count == 0:
+        return 0
+    edges = rng.choice(graph.num_edges, size=count, replace=False)
+    sources = graph.edge_u[edges].tolist()
+    targets = rng.integers(graph.num_nodes, size=count).tolist()
+    uniforms = rng.random(count).tolist()
+    rewired = 0
+    for edge, u, w, uniform in zip(edges.tolist(), sources, targets, uniforms):
+        if graph.degree[u] >= graph.num_nodes - 1:
+            continue  # u is already linked to every other node
+        while w == u or graph.has_edge(u, w):
+            w = int(rng.integers(graph.num_nodes))
+        rewired += graph.rewire_edge(edge, w, draw_trust(graph.community, u, w, uniform))
+    return rewired
+
+
+def rate_from_fraction(rewire_fraction: float, rounds: int) -> float:
+    """
+    Returns the per-round rewiring rate at which each edge is rewired at least once during rounds
+    rounds with probability rewire_fraction.
+
+    Examples:
+        >>> round(rate_from_fraction(0.1, 20), 5)
+        0.00525
+        >>> round(1 - (1 - rate_from_fraction(0.1, 20)) ** 20, 6)
+        0.1
+    """
+    return 1.0 - (1.0 - rewire_fraction) ** (1.0 / rounds)